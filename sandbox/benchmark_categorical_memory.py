@@ -0,0 +1,36 @@
+"""
+Memory report: compares the memory footprint of bags loaded with and without the
+categorical option.
+
+usage: python benchmark_categorical_memory.py [path to a quarter folder, e.g. .../parquet/quarter/2024q1.zip]
+"""
+import os
+import sys
+import time
+
+from secfsdstools.d_container.databagmodel import RawDataBag
+
+CURRENT_DIR, _ = os.path.split(__file__)
+DEFAULT_FOLDER = f'{CURRENT_DIR}/../tests/_testdata/parquet_new/quarter/2010q1.zip'
+
+
+def report(bag: RawDataBag, name: str, duration: float):
+    print(f"{name} (load time {duration:.2f}s)")
+    total = 0
+    for df_name in ['sub_df', 'pre_df', 'num_df']:
+        size = getattr(bag, df_name).memory_usage(deep=True).sum()
+        total += size
+        print(f"   {df_name:7}: {size / 1024 / 1024:10.1f} MB")
+
+    joined_size = bag.join().pre_num_df.memory_usage(deep=True).sum()
+    print(f"   total  : {total / 1024 / 1024:10.1f} MB")
+    print(f"   joined : {joined_size / 1024 / 1024:10.1f} MB")
+
+
+if __name__ == '__main__':
+    folder = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FOLDER
+
+    for categorical in [False, True]:
+        start = time.time()
+        loaded_bag = RawDataBag.load(folder, categorical=categorical)
+        report(loaded_bag, f"categorical={categorical}", time.time() - start)
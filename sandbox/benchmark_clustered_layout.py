@@ -0,0 +1,74 @@
+"""
+Compares the bytes and row groups that have to be read to load a single report
+(as SingleReportCollector.get_report_by_adsh does) from a quarter folder in the original
+layout against the same folder rewritten in the clustered layout.
+
+usage: python benchmark_clustered_layout.py [path to a quarter folder, e.g. .../parquet/quarter/2024q1.zip]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from secfsdstools.a_utils.constants import NUM_TXT, PRE_TXT
+from secfsdstools.c_transform.clusterlayout_process import ClusterLayoutTask, get_unclustered_files
+from secfsdstools.e_collector.basecollector import BaseCollector
+
+CURRENT_DIR, _ = os.path.split(__file__)
+DEFAULT_FOLDER = f'{CURRENT_DIR}/../tests/_testdata/parquet_new/quarter/2010q1.zip'
+
+
+def bytes_to_read(file: str, adsh: str) -> Tuple[int, int, int]:
+    """ returns (row groups to read, total row groups, compressed bytes to read) for a filter on adsh"""
+    fragment = next(ds.dataset(file).get_fragments())
+    total = len(fragment.row_groups)
+    matching = fragment.split_by_row_group(ds.field("adsh") == adsh)
+
+    metadata = fragment.metadata
+    read_bytes = 0
+    for row_group_fragment in matching:
+        for row_group in row_group_fragment.row_groups:
+            rg_meta = metadata.row_group(row_group.id)
+            read_bytes += sum(rg_meta.column(i).total_compressed_size for i in range(rg_meta.num_columns))
+    return len(matching), total, read_bytes
+
+
+def measure(folder: str, adshs) -> None:
+    collector_time = time.time()
+    for adsh in adshs:
+        BaseCollector(datapath=folder).basecollect(sub_df_filter=('adsh', '==', adsh))
+    collector_time = (time.time() - collector_time) / len(adshs)
+
+    for file in [NUM_TXT, PRE_TXT]:
+        stats = [bytes_to_read(os.path.join(folder, f"{file}.parquet"), adsh) for adsh in adshs]
+        row_groups = sum(s[0] for s in stats) / len(stats)
+        read_bytes = sum(s[2] for s in stats) / len(stats)
+        print(f"   {file:8}: row groups read {row_groups:6.1f} of {stats[0][1]:4}, "
+              f"compressed bytes read {read_bytes / 1024:10.1f} KB")
+    print(f"   avg load time per report: {collector_time * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    source_folder = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FOLDER
+
+    sub_df = pd.read_parquet(os.path.join(source_folder, "sub.txt.parquet"), columns=['adsh'])
+    sample_adshs = sub_df.adsh.sample(n=min(20, len(sub_df)), random_state=1).tolist()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original = os.path.join(tmp_dir, "original")
+        clustered = os.path.join(tmp_dir, "clustered")
+        shutil.copytree(source_folder, original)
+        shutil.copytree(source_folder, clustered)
+
+        ClusterLayoutTask(folder_path=Path(clustered), files=get_unclustered_files(Path(clustered))).execute()
+
+        print("original layout:")
+        measure(original, sample_adshs)
+        print("clustered layout:")
+        measure(clustered, sample_adshs)
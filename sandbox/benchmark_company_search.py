@@ -0,0 +1,50 @@
+"""
+Times the company search of ParquetDBIndexingAccessor on a synthetic index: the former LIKE query
+over the whole index_parquet_reports table, find_company_by_name, which uses the company names
+table and its trigram index, and the ranked search_companies.
+
+usage: python benchmark_company_search.py [number of rows, default 1'000'000]
+"""
+import logging
+import sys
+import tempfile
+import time
+
+from benchmark_index_queries import _fill_table
+
+from secfsdstools.b_setup.setupdb import DbCreator
+from secfsdstools.c_index.indexdataaccess import ParquetDBIndexingAccessor
+
+QUERIES = ["COMPANY 4711", "4711", "ANY 471", "INC"]
+REPETITIONS = 20
+
+
+def _time(function, query: str) -> float:
+    start = time.time()
+    for _ in range(REPETITIONS):
+        function(query)
+    return (time.time() - start) / REPETITIONS * 1000
+
+
+if __name__ == '__main__':
+    logging.disable(logging.INFO)
+    rows_to_create = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        DbCreator(db_dir=db_dir).create_db()
+        accessor = ParquetDBIndexingAccessor(db_dir=db_dir)
+
+        start_fill = time.time()
+        _fill_table(accessor, rows_to_create)
+        print(f"created {rows_to_create:,} rows (incl. the company names) in {time.time() - start_fill:.1f}s")
+
+        def like_on_reports(name_part: str):
+            accessor.execute_read_as_df(f"""
+                SELECT DISTINCT name, cik from {accessor.index_reports_table}
+                WHERE name like '%{name_part}%'
+                ORDER BY name""")
+
+        for query in QUERIES:
+            print(f"{query:14}: LIKE on reports {_time(like_on_reports, query):8.2f}ms, "
+                  f"find_company_by_name {_time(accessor.find_company_by_name, query):8.2f}ms, "
+                  f"search_companies {_time(accessor.search_companies, query):8.2f}ms")
@@ -0,0 +1,60 @@
+"""
+Compares the runtime of the standardizers when the rule trees are applied with pandas
+operations (default) and with the compiled numpy execution plan (use_compiled_rules=True)
+on a joined bag that is concatenated from several quarters. It also checks that both
+variants produce the same results.
+
+usage: python benchmark_compiled_rules.py [parquet quarter dir, e.g. .../parquet/quarter] [number of quarters]
+"""
+import logging
+import os
+import sys
+import time
+from glob import glob
+
+import pandas as pd
+
+from secfsdstools.d_container.databagmodel import JoinedDataBag
+from secfsdstools.e_collector.zipcollecting import ZipCollector
+from secfsdstools.f_standardize.bs_standardize import BalanceSheetStandardizer
+from secfsdstools.f_standardize.cf_standardize import CashFlowStandardizer
+from secfsdstools.f_standardize.is_standardize import IncomeStatementStandardizer
+from secfsdstools.u_usecases.bulk_loading import default_postloadfilter
+
+CURRENT_DIR, _ = os.path.split(__file__)
+DEFAULT_DIR = f'{CURRENT_DIR}/../tests/_testdata/parquet_new/quarter'
+
+STANDARDIZERS = {'BS': BalanceSheetStandardizer,
+                 'IS': IncomeStatementStandardizer,
+                 'CF': CashFlowStandardizer}
+
+
+if __name__ == '__main__':
+    logging.disable(logging.INFO)
+
+    quarter_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DIR
+    nr_of_quarters = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    # only folders that contain all three files
+    available = sorted(os.path.dirname(x) for x in glob(os.path.join(quarter_dir, '*', 'num.txt.parquet')))
+    paths = available[-nr_of_quarters:]
+
+    for stmt, standardizer_class in STANDARDIZERS.items():
+        bag: JoinedDataBag = ZipCollector(datapaths=paths, forms_filter=['10-K', '10-Q'],
+                                          stmt_filter=[stmt],
+                                          post_load_filter=default_postloadfilter).collect().join()
+        print(f"\n{stmt}: {len(paths)} quarters, {len(bag.pre_num_df):,} rows")
+
+        results = {}
+        for use_compiled_rules in [False, True]:
+            standardizer = standardizer_class(use_compiled_rules=use_compiled_rules)
+            start = time.time()
+            standardizer.present(bag)
+            duration = time.time() - start
+            results[use_compiled_rules] = standardizer.get_standardize_bag()
+            print(f"use_compiled_rules={use_compiled_rules!s:5}: {duration:6.2f}s, "
+                  f"{len(results[use_compiled_rules].result_df):,} reports")
+
+        pd.testing.assert_frame_equal(results[False].result_df, results[True].result_df)
+        pd.testing.assert_frame_equal(results[False].applied_rules_log_df,
+                                      results[True].applied_rules_log_df)
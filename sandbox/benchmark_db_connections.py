@@ -0,0 +1,59 @@
+"""
+Times many single report lookups of ParquetDBIndexingAccessor, once with a new connection per
+query (as before) and once with the reused connection of the current thread, sequentially and
+from several threads.
+
+usage: python benchmark_db_connections.py [number of lookups, default 20'000]
+"""
+import concurrent.futures
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import List
+
+from benchmark_index_queries import _fill_table
+
+from secfsdstools.b_setup.setupdb import DbCreator
+from secfsdstools.c_index.indexdataaccess import ParquetDBIndexingAccessor
+
+NR_OF_ROWS = 500_000
+NR_OF_THREADS = 8
+
+
+def _lookup(accessor: ParquetDBIndexingAccessor, adshs: List[str], threads: int) -> float:
+    start = time.time()
+    if threads == 1:
+        for adsh in adshs:
+            accessor.read_index_report_for_adsh(adsh)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(accessor.read_index_report_for_adsh, adshs))
+    return time.time() - start
+
+
+class _UnpooledAccessor(ParquetDBIndexingAccessor):
+
+    def get_connection(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.database)
+
+
+if __name__ == '__main__':
+    logging.disable(logging.INFO)
+    nr_of_lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        DbCreator(db_dir=db_dir).create_db()
+        pooled = ParquetDBIndexingAccessor(db_dir=db_dir)
+        _fill_table(pooled, NR_OF_ROWS)
+        unpooled = _UnpooledAccessor(db_dir=db_dir)
+
+        adsh_list = [row[0] for row in pooled.execute_fetchall(
+            f"SELECT adsh FROM {pooled.index_reports_table} ORDER BY random() LIMIT {nr_of_lookups}")]
+
+        for nr_of_threads in [1, NR_OF_THREADS]:
+            duration_unpooled = _lookup(unpooled, adsh_list, nr_of_threads)
+            duration_pooled = _lookup(pooled, adsh_list, nr_of_threads)
+            print(f"{len(adsh_list):,} lookups, {nr_of_threads} thread(s): "
+                  f"{duration_unpooled:.3f}s -> {duration_pooled:.3f}s")
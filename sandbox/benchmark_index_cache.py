@@ -0,0 +1,53 @@
+"""
+Times single report lookups by adsh and by cik, once with the ParquetDBIndexingAccessor, which
+queries the database, and once with the CachedIndexAccessor, which answers them from the
+in-memory snapshot of the index.
+
+usage: python benchmark_index_cache.py [number of rows, default 1'000'000]
+"""
+import logging
+import random
+import sys
+import tempfile
+import time
+
+from benchmark_index_queries import NR_OF_COMPANIES, _fill_table
+
+from secfsdstools.b_setup.setupdb import DbCreator
+from secfsdstools.c_index.indexcache import CachedIndexAccessor
+from secfsdstools.c_index.indexdataaccess import ParquetDBIndexingAccessor
+
+NR_OF_LOOKUPS = 10_000
+
+if __name__ == '__main__':
+    logging.disable(logging.INFO)
+    rows_to_create = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        DbCreator(db_dir=db_dir).create_db()
+        db_accessor = ParquetDBIndexingAccessor(db_dir=db_dir)
+        _fill_table(db_accessor, rows_to_create)
+        cached_accessor = CachedIndexAccessor(db_dir=db_dir)
+
+        start_load = time.time()
+        cached_accessor.get_snapshot()
+        print(f"loaded snapshot of {rows_to_create:,} rows in {time.time() - start_load:.1f}s")
+
+        adshs = [row[0] for row in db_accessor.execute_fetchall(
+            f"SELECT adsh FROM {db_accessor.index_reports_table} "
+            f"ORDER BY random() LIMIT {NR_OF_LOOKUPS}")]
+        ciks = [random.randrange(NR_OF_COMPANIES) for _ in range(NR_OF_LOOKUPS)]
+
+        for name, accessor in [('db', db_accessor), ('cache', cached_accessor)]:
+            start = time.time()
+            for adsh in adshs:
+                accessor.read_index_report_for_adsh(adsh)
+            adsh_duration = time.time() - start
+
+            start = time.time()
+            for cik in ciks:
+                accessor.read_index_reports_for_ciks([cik], forms=['10-K'])
+            cik_duration = time.time() - start
+
+            print(f"{name:5}: {adsh_duration / len(adshs) * 1e6:8.1f} us per adsh lookup, "
+                  f"{cik_duration / len(ciks) * 1e6:8.1f} us per cik lookup")
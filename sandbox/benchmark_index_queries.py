@@ -0,0 +1,112 @@
+"""
+Times the read methods of ParquetDBIndexingAccessor on a synthetic index_parquet_reports table,
+once without and once with the secondary indexes of the V6 migration, and prints the query
+plans that SQLite uses with the indexes.
+
+usage: python benchmark_index_queries.py [number of rows, default 10'000'000]
+"""
+import logging
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from secfsdstools.b_setup.setupdb import DbCreator
+from secfsdstools.c_index.indexdataaccess import ParquetDBIndexingAccessor
+
+NR_OF_COMPANIES = 50_000
+BATCH_SIZE = 500_000
+
+
+def _drop_secondary_indexes(accessor: ParquetDBIndexingAccessor):
+    # the automatic index of the primary key has no sql and cannot be dropped
+    sql = f"""SELECT name FROM sqlite_master
+               WHERE type = 'index' AND tbl_name = '{accessor.index_reports_table}'
+               AND sql IS NOT NULL"""
+    with accessor.get_connection() as conn:
+        for (name,) in accessor.execute_fetchall(sql):
+            conn.execute(f"DROP INDEX {name}")
+
+
+def _fill_table(accessor: ParquetDBIndexingAccessor, nr_of_rows: int):
+    forms = ['10-K', '10-Q', '8-K', '10-K/A']
+
+    def rows(start: int, end: int):
+        for i in range(start, end):
+            cik = i % NR_OF_COMPANIES
+            quarter = i // NR_OF_COMPANIES
+            file_type = 'daily' if i % 20 == 0 else 'quarter'
+            origin_file = f"{2009 + quarter // 4}q{quarter % 4 + 1}.zip"
+            adsh = f"{cik:010d}-{quarter:02d}-{i:06d}"
+            yield (adsh, cik, f"COMPANY {cik} INC", forms[i % 4],
+                   20090101 + quarter, 20081231 + quarter,
+                   f"/home/user/secfsdstools/data/parquet/{file_type}/{origin_file}",
+                   origin_file, file_type,
+                   f"https://www.sec.gov/Archives/edgar/data/{cik}/{adsh.replace('-', '')}")
+
+    sql = f"INSERT INTO {accessor.index_reports_table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    with accessor.get_connection() as conn:
+        for start in range(0, nr_of_rows, BATCH_SIZE):
+            accessor.execute_many(sql, rows(start, min(start + BATCH_SIZE, nr_of_rows)), conn)
+
+
+def _time_methods(methods: Dict[str, Callable]) -> Dict[str, float]:
+    durations: Dict[str, float] = {}
+    for name, method in methods.items():
+        start = time.time()
+        method()
+        durations[name] = time.time() - start
+    return durations
+
+
+def _print_query_plans(accessor: ParquetDBIndexingAccessor, sqls: List[str]):
+    for sql in sqls:
+        plan = accessor.execute_fetchall(f"EXPLAIN QUERY PLAN {sql}")
+        print(f"{sql}\n    -> {' | '.join(row[-1] for row in plan)}")
+
+
+if __name__ == '__main__':
+    logging.disable(logging.INFO)
+    rows_to_create = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        DbCreator(db_dir=db_dir).create_db()
+        accessor = ParquetDBIndexingAccessor(db_dir=db_dir)
+        _drop_secondary_indexes(accessor)
+
+        start_fill = time.time()
+        _fill_table(accessor, rows_to_create)
+        print(f"created {rows_to_create:,} rows in {time.time() - start_fill:.1f}s")
+
+        accessor_methods = {
+            'find_latest_company_report': lambda: accessor.find_latest_company_report(4711),
+            'read_index_reports_for_ciks': lambda: accessor.read_index_reports_for_ciks(
+                [4711, 815, 42], forms=['10-K', '10-Q']),
+            'read_index_reports_for_ciks_df': lambda: accessor.read_index_reports_for_ciks_df(
+                [4711, 815, 42]),
+            'find_company_by_name': lambda: accessor.find_company_by_name("COMPANY 4711"),
+            'read_filenames_by_type': lambda: accessor.read_filenames_by_type("quarter"),
+        }
+
+        before = _time_methods(accessor_methods)
+
+        start_index = time.time()
+        # applies the V6 migration
+        DbCreator(db_dir=db_dir).create_db()
+        print(f"created indexes in {time.time() - start_index:.1f}s\n")
+
+        after = _time_methods(accessor_methods)
+
+        for method_name, duration in before.items():
+            print(f"{method_name:32}: {duration:8.3f}s -> {after[method_name]:8.3f}s")
+
+        print()
+        table = accessor.index_reports_table
+        _print_query_plans(accessor, [
+            f"SELECT * FROM {table} WHERE cik = 4711 and originFileType = 'quarter' "
+            f"ORDER BY period DESC LIMIT 1",
+            f"SELECT * FROM {table} WHERE cik in (4711, 815) and form in ('10-K') "
+            f"ORDER BY period DESC",
+            f"SELECT DISTINCT name, cik FROM {table} WHERE name like '%4711%' ORDER BY name",
+            f"SELECT DISTINCT ORIGINFILE FROM {table} WHERE ORIGINFILETYPE='quarter'",
+        ])
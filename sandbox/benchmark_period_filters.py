@@ -0,0 +1,80 @@
+"""
+Compares the former implementation of the ReportPeriodRawFilter and the
+ReportPeriodAndPreviousPeriodRawFilter (python dict per adsh and Series.map on every row) with
+the vectorised implementation (shifted periods calculated once per report and looked up by
+the position of the adsh) on a bag that is concatenated from several quarters.
+
+usage: python benchmark_period_filters.py [parquet quarter dir, e.g. .../parquet/quarter] [number of quarters]
+"""
+import os
+import sys
+import time
+from glob import glob
+from typing import Callable
+
+import pandas as pd
+
+from secfsdstools.a_utils.basic import calculate_previous_period
+from secfsdstools.d_container.databagmodel import RawDataBag
+from secfsdstools.e_filter.rawfiltering import (
+    PeriodOffsetRawFilter,
+    ReportPeriodAndPreviousPeriodRawFilter,
+    ReportPeriodRawFilter,
+)
+
+CURRENT_DIR, _ = os.path.split(__file__)
+DEFAULT_DIR = f'{CURRENT_DIR}/../tests/_testdata/parquet_new/quarter'
+
+
+def dict_report_period_mask(bag: RawDataBag) -> pd.Series:
+    adsh_period_map = bag.sub_df[['adsh', 'period']].set_index('adsh').to_dict()['period']
+    return bag.num_df['adsh'].map(adsh_period_map) == bag.num_df['ddate']
+
+
+def dict_previous_period_mask(bag: RawDataBag) -> pd.Series:
+    adsh_period_map = bag.sub_df[['adsh', 'period']].set_index('adsh').to_dict()['period']
+    adsh_previous_period_map = {adsh: calculate_previous_period(period)
+                                for adsh, period in adsh_period_map.items()}
+    return (bag.num_df['adsh'].map(adsh_period_map) == bag.num_df['ddate']) | \
+        (bag.num_df['adsh'].map(adsh_previous_period_map) == bag.num_df['ddate'])
+
+
+def measure(name: str, mask_function: Callable[[RawDataBag], pd.Series], bag: RawDataBag,
+            runs: int = 3) -> pd.Series:
+    durations = []
+    mask = None
+    for _ in range(runs):
+        start = time.time()
+        mask = mask_function(bag)
+        durations.append(time.time() - start)
+    print(f"{name:45}: best {min(durations):6.3f}s, selected rows {int(mask.sum()):,}")
+    return mask
+
+
+if __name__ == '__main__':
+    quarter_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DIR
+    nr_of_quarters = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+    # only folders that contain all three files
+    available = sorted(os.path.dirname(x) for x in glob(os.path.join(quarter_dir, '*', 'num.txt.parquet')))
+    # if there are not enough quarters available (e.g. test data), the available ones are repeated
+    paths = [available[i % len(available)] for i in range(nr_of_quarters)]
+
+    for categorical in [False, True]:
+        bag = RawDataBag.concat([RawDataBag.load(path, categorical=categorical) for path in paths])
+        print(f"\n{len(paths)} quarters, categorical={categorical}, "
+              f"{len(bag.sub_df):,} reports, {len(bag.num_df):,} num rows")
+
+        old_mask = measure("report period, dict + map", dict_report_period_mask, bag)
+        new_mask = measure("report period, vectorised",
+                           lambda x: ReportPeriodRawFilter().get_masks(x)['num_df'], bag)
+        assert (old_mask.to_numpy() == new_mask.to_numpy()).all()
+
+        old_mask = measure("report and previous period, dict + map", dict_previous_period_mask, bag)
+        new_mask = measure("report and previous period, vectorised",
+                           lambda x: ReportPeriodAndPreviousPeriodRawFilter().get_masks(x)['num_df'],
+                           bag)
+        assert (old_mask.to_numpy() == new_mask.to_numpy()).all()
+
+        measure("prior quarter, vectorised",
+                lambda x: PeriodOffsetRawFilter(quarters=1).get_masks(x)['num_df'], bag)
@@ -0,0 +1,60 @@
+"""
+Compares the time to collect the data of several quarters in parallel, when the collected
+RawDataBags are handed back to the main process by pickling (the former behavior) and when they
+are handed back as Arrow IPC files in shared memory. It also compares creating a new pool for
+every execute call against reusing a persistent pool.
+
+usage: python benchmark_result_transport.py [parquet quarter dir, e.g. .../parquet/quarter] [number of quarters]
+"""
+import os
+import sys
+import time
+from glob import glob
+from typing import List, Optional
+
+from secfsdstools.a_utils.parallelexecution import ParallelExecutor, ResultTransport
+from secfsdstools.d_container.databagmodel import RawDataBag
+from secfsdstools.e_collector.basecollector import BaseCollector, RawDataBagIpcTransport
+
+CURRENT_DIR, _ = os.path.split(__file__)
+DEFAULT_DIR = f'{CURRENT_DIR}/../tests/_testdata/parquet_new/quarter'
+
+
+def collect(executor: ParallelExecutor, datapaths: List[str]) -> RawDataBag:
+    def process_element(datapath: str) -> RawDataBag:
+        return BaseCollector(datapath=datapath).basecollect(sub_df_filter=('form', 'in', ['10-K', '10-Q']))
+
+    executor.set_get_entries_function(lambda: datapaths)
+    executor.set_process_element_function(process_element)
+    executor.set_post_process_chunk_function(lambda parts: parts)
+    bags, _ = executor.execute()
+    return RawDataBag.concat(bags)
+
+
+def measure(name: str, datapaths: List[str], transport: Optional[ResultTransport], keep_pool: bool,
+            runs: int = 3):
+    executor = ParallelExecutor(chunksize=0, keep_pool=keep_pool, transport=transport)
+    with executor:
+        durations = []
+        for _ in range(runs):
+            start = time.time()
+            bag = collect(executor, datapaths)
+            durations.append(time.time() - start)
+    print(f"{name:35}: first {durations[0]:6.2f}s, best {min(durations):6.2f}s, "
+          f"num rows {len(bag.num_df):,}")
+
+
+if __name__ == '__main__':
+    quarter_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DIR
+    nr_of_quarters = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    # only folders that contain all three files
+    available = sorted(os.path.dirname(x) for x in glob(os.path.join(quarter_dir, '*', 'num.txt.parquet')))
+    # if there are not enough quarters available (e.g. test data), the available ones are repeated
+    paths = [available[i % len(available)] for i in range(nr_of_quarters)]
+    print(f"collecting {len(paths)} quarters")
+
+    measure("pickle, new pool", paths, transport=None, keep_pool=False)
+    measure("pickle, persistent pool", paths, transport=None, keep_pool=True)
+    measure("arrow ipc, new pool", paths, transport=RawDataBagIpcTransport(), keep_pool=False)
+    measure("arrow ipc, persistent pool", paths, transport=RawDataBagIpcTransport(), keep_pool=True)
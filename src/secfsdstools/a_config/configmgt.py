@@ -176,6 +176,8 @@ class ConfigurationManager:
             post_update_hook=config["DEFAULT"].get("PostUpdateHook", None),
             post_update_processes=config["DEFAULT"].get("PostUpdateProcesses", None),
             daily_processing=config["DEFAULT"].getboolean("DailyProcessing", False),
+            build_joined_parquet=config["DEFAULT"].getboolean("BuildJoinedParquet", False),
+            use_index_cache=config["DEFAULT"].getboolean("UseIndexCache", False),
             config_parser=config,
         )
 
@@ -337,6 +339,8 @@ class ConfigurationManager:
             "KeepZipFiles": configuration.keep_zip_files,
             "NoParallelProcessing": configuration.no_parallel_processing,
             "DailyProcessing": configuration.daily_processing,
+            "BuildJoinedParquet": configuration.build_joined_parquet,
+            "UseIndexCache": configuration.use_index_cache,
         }
 
         with open(file_path, "w", encoding="utf8") as configfile:
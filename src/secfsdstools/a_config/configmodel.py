@@ -26,6 +26,8 @@ class Configuration:
 
     daily_download_dir: str = ""
     daily_processing: bool = False
+    build_joined_parquet: bool = False
+    use_index_cache: bool = False
 
     def __post_init__(self):
         if self.daily_download_dir == "":
@@ -1,6 +1,7 @@
 """
 General utility methods
 """
+import numpy as np
 
 
 def calculate_previous_period(period: int) -> int:
@@ -40,3 +41,52 @@ def calculate_previous_period(period: int) -> int:
         previous_value = previous_value + 1
 
     return previous_value
+
+
+# days per month in a non leap year
+_DAYS_PER_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+
+
+def _days_in_month(year: np.ndarray, month: np.ndarray) -> np.ndarray:
+    is_leap_year = ((year % 4) == 0) & (((year % 100) != 0) | ((year % 400) == 0))
+    return _DAYS_PER_MONTH[month - 1] + ((month == 2) & is_leap_year)
+
+
+def calculate_period_offsets(periods: np.ndarray, years: int = 0, months: int = 0) -> np.ndarray:
+    """
+    vectorised and generalised version of calculate_previous_period. calculates for every
+    period (int in the format YYYYMMDD) the period which lies the provided number of years and
+    months before it. e.g. years=1 is the previous year (as calculate_previous_period),
+    months=3 the previous quarter.
+
+    If a period is the last day of its month, the result is the last day of the target month
+    (20210228 -> 20200229 with years=1, 20210630 -> 20210331 with months=3), otherwise the
+    day is kept as long as the target month is long enough.
+
+    Args:
+        periods: the periods as int or float array, NaN or other invalid dates are allowed
+        years: number of years to go back
+        months: number of months to go back
+
+    Returns:
+        np.ndarray: the shifted periods as int64 array, invalid periods are set to -1
+    """
+    periods = np.asarray(periods, dtype=np.float64)
+    valid = ~np.isnan(periods) & (periods > 0)
+
+    period_values = np.where(valid, periods, 0).astype(np.int64)
+    year, monthday = np.divmod(period_values, 10_000)
+    month, day = np.divmod(monthday, 100)
+
+    valid &= (month >= 1) & (month <= 12) & (day >= 1)
+    month = np.where(valid, month, 1)
+
+    target_year, target_month = np.divmod(year * 12 + month - 1 - (years * 12 + months), 12)
+    target_month += 1
+
+    target_days_in_month = _days_in_month(target_year, target_month)
+    is_end_of_month = day == _days_in_month(year, month)
+    target_day = np.where(is_end_of_month, target_days_in_month,
+                          np.minimum(day, target_days_in_month))
+
+    return np.where(valid, target_year * 10_000 + target_month * 100 + target_day, -1)
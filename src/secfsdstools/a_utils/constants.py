@@ -1,7 +1,7 @@
 """
 base constant values
 """
-from typing import Dict
+from typing import Dict, List
 
 import pyarrow as pa
 
@@ -136,3 +136,38 @@ PA_SCHEMA_MAP: Dict[str, pa.Schema] = {
         ("negating", pa.int32()),
     ])
 }
+
+# columns that are always loaded, if only a subset of the columns is requested (column projection).
+# they identify the entries and are needed to join, filter, and concat the data.
+KEY_COLS_MAP: Dict[str, List[str]] = {
+    SUB_TXT: SUB_COLS,
+    PRE_TXT: ['adsh', 'tag', 'version', 'report', 'line', 'stmt'],
+    NUM_TXT: ['adsh', 'tag', 'version', 'ddate', 'qtrs', 'uom', 'segments', 'coreg'],
+    PRE_NUM_TXT: ['adsh', 'tag', 'version', 'ddate', 'qtrs', 'uom', 'segments', 'coreg',
+                  'report', 'line', 'stmt'],
+}
+
+# columns with a low cardinality compared to the number of rows. they can be loaded as
+# pandas categoricals (dictionary encoded), which needs a lot less memory than object columns.
+CATEGORICAL_COLS: List[str] = ['adsh', 'tag', 'version', 'uom', 'stmt', 'form', 'coreg',
+                               'segments', 'rfile']
+
+# clustered parquet layout: the rows of the files are sorted by these columns and written in
+# bounded row groups, so that the min/max statistics of the row groups can be used to prune
+# whole row groups when filtering for adsh (and tag).
+CLUSTER_COLS_MAP: Dict[str, List[str]] = {
+    SUB_TXT: ['adsh'],
+    PRE_TXT: ['adsh', 'tag'],
+    NUM_TXT: ['adsh', 'tag'],
+    PRE_NUM_TXT: ['adsh', 'tag'],
+}
+
+CLUSTERED_ROW_GROUP_SIZE = 50_000
+
+# max number of rows that are sorted at once in memory when a file is written in the clustered
+# layout from a stream of batches, see write_batches_clustered
+CLUSTER_MAX_ROWS_IN_MEMORY = 2_000_000
+
+# key in the parquet schema metadata that marks a file as written in the clustered layout
+PARQUET_LAYOUT_KEY = b'secfsdstools.layout'
+PARQUET_LAYOUT_CLUSTERED = b'clustered'
@@ -5,9 +5,10 @@ Basic DB handling functionality
 import logging
 import os
 import sqlite3
+import threading
 from abc import ABC
 from dataclasses import Field
-from typing import List, Optional, Tuple, TypeVar
+from typing import Dict, Iterable, List, Optional, Tuple, TypeVar
 
 import pandas as pd
 
@@ -15,6 +16,53 @@ T = TypeVar("T")  # pylint: disable=W0621
 
 LOGGER = logging.getLogger(__name__)
 
+# pragmas that are set on every new connection. synchronous NORMAL is safe in WAL journal mode,
+# the cache_size is negative and therefore in KiB
+CONNECTION_PRAGMAS: Dict[str, object] = {
+    'synchronous': 'NORMAL',
+    'cache_size': -64_000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# number of prepared statements that are kept per connection
+CACHED_STATEMENTS = 256
+
+
+class _ThreadConnections(threading.local):
+    """
+    the open connections of the current thread, one per database file together with the
+    identity (device and inode) of the file at the time the connection was opened.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.pid = os.getpid()
+        self.connections: Dict[str, Tuple[sqlite3.Connection, Tuple[int, int]]] = {}
+
+
+_THREAD_CONNECTIONS = _ThreadConnections()
+
+# connections that a forked process inherited from its parent. they must neither be used nor
+# closed in the child, so they are only kept from being garbage collected.
+_INHERITED_CONNECTIONS: List[sqlite3.Connection] = []
+
+
+def _file_identity(database: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(database)
+        return stat.st_dev, stat.st_ino
+    except FileNotFoundError:
+        return None
+
+
+def _is_open(conn: sqlite3.Connection) -> bool:
+    try:
+        _ = conn.total_changes
+        return True
+    except sqlite3.ProgrammingError:
+        return False
+
 
 # noinspection SqlResolve
 class DB(ABC):
@@ -22,6 +70,10 @@ class DB(ABC):
     Base class for DB handling. Provides some basic functionality.
     """
 
+    # name of the temporary table that contains the keys of a bulk lookup, see create_lookup_table
+    LOOKUP_TABLE = 'lookup_keys'
+    LOOKUP_COLUMN = 'lookup_value'
+
     def __init__(self, db_dir="db/"):
         self.db_dir = db_dir
         self.database = os.path.join(self.db_dir, 'secfsdstools.db')
@@ -51,12 +103,59 @@ class DB(ABC):
 
     def get_connection(self) -> sqlite3.Connection:
         """
-        creates a connection to the db.
+        returns the connection to the db of the current thread. The connection is opened with
+        the first call in a thread and then reused by all DB instances of the same database in
+        that thread, so that the prepared statements are cached across the calls.
+        A new connection is opened if the connection was closed, if the db file was replaced
+        or removed, or if the current process was forked.
+        The connection should not be closed by the caller, use it as context manager in order
+        to commit a transaction.
 
         Returns:
             sqlite3.Connection: sqlite3 connection instance
         """
-        return sqlite3.connect(self.database)
+        thread_connections = _THREAD_CONNECTIONS
+        if thread_connections.pid != os.getpid():
+            _INHERITED_CONNECTIONS.extend(conn for conn, _ in thread_connections.connections.values())
+            thread_connections.connections = {}
+            thread_connections.pid = os.getpid()
+
+        key = os.path.abspath(self.database)
+        entry = thread_connections.connections.get(key)
+        if entry is not None:
+            conn, identity = entry
+            if identity == _file_identity(key) and _is_open(conn):
+                return conn
+            conn.close()
+
+        conn = self._open_connection()
+        thread_connections.connections[key] = (conn, _file_identity(key))
+        return conn
+
+    def _open_connection(self) -> sqlite3.Connection:
+        LOGGER.debug("open connection to %s", self.database)
+        conn = sqlite3.connect(self.database, cached_statements=CACHED_STATEMENTS)
+        for pragma, value in CONNECTION_PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def close_connection(self):
+        """
+        closes the connection of the current thread to the db, if there is one. This is only
+        necessary if the db file has to be released, e.g. before it is deleted on windows.
+        """
+        entry = _THREAD_CONNECTIONS.connections.pop(os.path.abspath(self.database), None)
+        if entry is not None:
+            entry[0].close()
+
+    def enable_wal_mode(self):
+        """
+        switches the db to the WAL journal mode, which is stored in the db file itself. In WAL
+        mode, readers do not block a writer and a writer does not block the readers, so that
+        the db can be read while an update is running.
+        """
+        mode = self.get_connection().execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        LOGGER.debug("journal mode of %s: %s", self.database, mode)
 
     def execute_read_as_df(self, sql: str) -> pd.DataFrame:
         """
@@ -66,12 +165,20 @@ class DB(ABC):
         Returns:
             pd.DataFrame: pd.DataFrame
         """
-        conn = self.get_connection()
-        try:
-            LOGGER.debug("execute %s", sql)
-            return pd.read_sql_query(sql, conn)
-        finally:
-            conn.close()
+        LOGGER.debug("execute %s", sql)
+        return pd.read_sql_query(sql, self.get_connection())
+
+    def execute_read_as_df_params(self, sql: str, params: Tuple) -> pd.DataFrame:
+        """
+        like execute_read_as_df, but for a statement with ? placeholders
+        Args:
+             sql (str): Select String with ? placeholders
+             params (Tuple): the values for the placeholders
+        Returns:
+            pd.DataFrame: pd.DataFrame
+        """
+        LOGGER.debug("execute %s", sql)
+        return pd.read_sql_query(sql, self.get_connection(), params=params)
 
     def execute_fetchall(self, sql: str) -> List[Tuple]:
         """
@@ -81,12 +188,8 @@ class DB(ABC):
         Returns:
             List[Tuple]: list with tuples
         """
-        conn = self.get_connection()
-        try:
-            LOGGER.debug("execute %s", sql)
-            return conn.execute(sql).fetchall()
-        finally:
-            conn.close()
+        LOGGER.debug("execute %s", sql)
+        return self.get_connection().execute(sql).fetchall()
 
     def execute_fetchall_typed(self, sql: str, T) -> List[T]:  # pylint: disable=W0621,C0103
         """fetches all data of the sql statement and directly wraps it
@@ -100,16 +203,93 @@ class DB(ABC):
         Returns:
              List[T]: list of instances of the type
         """
+        LOGGER.debug("execute %s", sql)
+        cursor = self.get_connection().cursor()
+        cursor.row_factory = sqlite3.Row
+        results = cursor.execute(sql).fetchall()
+        return [T(**dict(x)) for x in results]
+
+    def create_lookup_table(self, keys: Iterable, conn: sqlite3.Connection):
+        """
+        creates the temporary table LOOKUP_TABLE, which only exists for the provided
+        connection, and inserts the keys into its column LOOKUP_COLUMN with a single
+        executemany. Queries can select the matching rows with
+        "WHERE col IN (SELECT lookup_value FROM lookup_keys)", which uses the index of col
+        for every key, instead of building a huge IN (...) literal.
+        The keys are deduplicated and sorted beforehand, so that they are appended to the
+        primary key of the WITHOUT ROWID table in order.
+
+        Args:
+             keys (Iterable): the keys to look up, all of the same type, duplicates are ignored
+             conn (sqlite3.Connection): connection to use
+        """
+        conn.execute(f"DROP TABLE IF EXISTS temp.{self.LOOKUP_TABLE}")
+        conn.execute(f"CREATE TEMP TABLE {self.LOOKUP_TABLE} "
+                     f"({self.LOOKUP_COLUMN} PRIMARY KEY) WITHOUT ROWID")
+        self.execute_many(f"INSERT INTO {self.LOOKUP_TABLE} VALUES (?)",
+                          [(key,) for key in sorted(set(keys))], conn)
+
+    def drop_lookup_table(self, conn: sqlite3.Connection, rollback: bool):
+        """
+        drops the temporary LOOKUP_TABLE, so that the reused connection does not keep the keys.
+
+        Args:
+             conn (sqlite3.Connection): connection that was used in create_lookup_table
+             rollback (bool): whether the implicit transaction that was started by inserting
+                              the keys has to be rolled back. must be False if a transaction
+                              was already open before the keys were inserted
+        """
+        if rollback:
+            conn.rollback()
+        conn.execute(f"DROP TABLE IF EXISTS temp.{self.LOOKUP_TABLE}")
+
+    def execute_fetchall_typed_for_keys(self, sql: str, keys: Iterable, T,  # pylint: disable=W0621,C0103
+                                        params: Tuple = ()) -> List[T]:
+        """
+        like execute_fetchall_typed, but the provided keys are available in the temporary
+        table LOOKUP_TABLE (see create_lookup_table).
+
+        Args:
+             sql (str): sql string, can use the lookup table and ? placeholders
+             keys (Iterable): the keys to look up
+             T: type class
+             params (Tuple, optional, ()): the values for the placeholders
+        Returns:
+             List[T]: list of instances of the type
+        """
         conn = self.get_connection()
+        in_transaction = conn.in_transaction
         try:
+            self.create_lookup_table(keys, conn)
             LOGGER.debug("execute %s", sql)
-            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
-            cursor.execute(sql)
-            results = cursor.fetchall()
+            cursor.row_factory = sqlite3.Row
+            results = cursor.execute(sql, params).fetchall()
             return [T(**dict(x)) for x in results]
         finally:
-            conn.close()
+            self.drop_lookup_table(conn, rollback=not in_transaction)
+
+    def execute_read_as_df_for_keys(self, sql: str, keys: Iterable,
+                                    params: Tuple = ()) -> pd.DataFrame:
+        """
+        like execute_read_as_df, but the provided keys are available in the temporary
+        table LOOKUP_TABLE (see create_lookup_table).
+
+        Args:
+             sql (str): Select String, can use the lookup table and ? placeholders
+             keys (Iterable): the keys to look up
+             params (Tuple, optional, ()): the values for the placeholders
+        Returns:
+            pd.DataFrame: pd.DataFrame
+        """
+        conn = self.get_connection()
+        in_transaction = conn.in_transaction
+        try:
+            self.create_lookup_table(keys, conn)
+            LOGGER.debug("execute %s", sql)
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            self.drop_lookup_table(conn, rollback=not in_transaction)
 
     def execute_single(self, sql: str, conn: sqlite3.Connection):
         """
@@ -6,12 +6,23 @@ import logging
 import os
 import zipfile
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import pyarrow.parquet as pq
 
-from secfsdstools.a_utils.constants import PA_SCHEMA_MAP
+from secfsdstools.a_utils.constants import (
+    CATEGORICAL_COLS,
+    CLUSTER_MAX_ROWS_IN_MEMORY,
+    CLUSTERED_ROW_GROUP_SIZE,
+    PA_SCHEMA_MAP,
+    PARQUET_LAYOUT_CLUSTERED,
+    PARQUET_LAYOUT_KEY,
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -55,6 +66,228 @@ def concat_parquet_files(input_files: List[str], output_file: str):
         logging.info("only non-empty files were provided - skipping creation of output file")
 
 
+def read_df_from_parquet(file: str, filters=None, categorical: bool = False,
+                         columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    reads a parquet file into a dataframe.
+
+    Args:
+        file (str): path to the parquet file
+        filters (optional, None): filters that are directly applied during reading, see pd.read_parquet
+        categorical (bool, optional, False): if True, the columns defined in CATEGORICAL_COLS are read
+            as pandas categoricals (directly from the dictionary encoded data in the parquet file)
+            which massively reduces the memory footprint.
+            Note: columns that were saved as categoricals are always read as categoricals.
+        columns (List[str], optional, None): if set, only these columns are read. Columns that
+            are not present in the file are ignored. The order of the columns in the file is kept.
+
+    Returns:
+        pd.DataFrame: the read content
+    """
+    read_dictionary = None
+    read_columns = None
+
+    if categorical or columns is not None:
+        names = pq.read_schema(file).names
+        if columns is not None:
+            read_columns = [col for col in names if col in columns]
+        if categorical:
+            read_dictionary = [col for col in (read_columns or names) if col in CATEGORICAL_COLS]
+
+    return pd.read_parquet(file, columns=read_columns, filters=filters, read_dictionary=read_dictionary)
+
+
+def write_table_clustered(table: pa.Table, target_file: str, sort_by: List[str],
+                          row_group_size: int = CLUSTERED_ROW_GROUP_SIZE):
+    """
+    writes the table sorted by the sort_by columns in row groups of at most row_group_size rows.
+    Since the statistics (min/max) of every row group are written as well, a filter on the
+    sort_by columns (e.g. ('adsh', '==', 'xyz')) only has to read the few row groups
+    which can contain the requested value.
+
+    The file is marked as clustered in the schema metadata, see is_clustered_parquet_file.
+
+    Args:
+        table (pa.Table): the data to be written
+        target_file (str): path of the parquet file
+        sort_by (List[str]): columns to sort by
+        row_group_size (int, optional, 50'000): max number of rows per row group
+    """
+    table = table.sort_by([(col, "ascending") for col in sort_by])
+
+    metadata = dict(table.schema.metadata or {})
+    metadata[PARQUET_LAYOUT_KEY] = PARQUET_LAYOUT_CLUSTERED
+    table = table.replace_schema_metadata(metadata)
+
+    pq.write_table(table, target_file, row_group_size=row_group_size, write_statistics=True)
+
+
+def _get_key_ranges(key_counts: Dict, max_rows: int) -> List[tuple]:
+    """ splits the sorted keys into consecutive ranges [lower, upper) with at most max_rows rows,
+    unless a single key has more rows. the upper bound of the last range is None."""
+    ranges = []
+    lower = None
+    rows_in_range = 0
+    for key in sorted(key_counts):
+        if lower is not None and rows_in_range + key_counts[key] > max_rows:
+            ranges.append((lower, key))
+            lower = None
+            rows_in_range = 0
+        if lower is None:
+            lower = key
+        rows_in_range += key_counts[key]
+    if lower is not None:
+        ranges.append((lower, None))
+    return ranges
+
+
+def _split_into_buckets(table: pa.Table, key_col: str, ranges: List[tuple]) -> List[pa.Table]:
+    """ splits the rows of the table into one part per key range of _get_key_ranges and a last
+    part for the rows without a key. """
+    uppers = np.array([upper for _, upper in ranges[:-1]], dtype=object)
+    keys = table[key_col]
+    bucket_numbers = np.searchsorted(
+        uppers, pc.fill_null(keys, ranges[0][0]).to_numpy(zero_copy_only=False), side="right")
+    bucket_numbers[pc.is_null(keys).to_numpy(zero_copy_only=False)] = len(ranges)
+
+    # the rows are grouped by bucket, so that every bucket is a single slice
+    table = table.take(np.argsort(bucket_numbers, kind="stable"))
+    bucket_ends = np.cumsum(np.bincount(bucket_numbers, minlength=len(ranges) + 1))
+    bucket_starts = np.concatenate([[0], bucket_ends[:-1]])
+    return [table.slice(start, end - start) for start, end in zip(bucket_starts, bucket_ends)]
+
+
+def write_batches_clustered(batches: Iterable[pa.Table], target_file: str, sort_by: List[str],
+                            row_group_size: int = CLUSTERED_ROW_GROUP_SIZE,
+                            max_rows_in_memory: int = CLUSTER_MAX_ROWS_IN_MEMORY):
+    """
+    writes a stream of batches in the same clustered layout as write_table_clustered, but with
+    a bounded peak memory. The batches are first streamed into a temporary parquet file while the
+    rows per value of the first sort_by column are counted. Then the temporary file is read once
+    and its rows are split into consecutive ranges of that column with at most
+    max_rows_in_memory rows (unless a single value has more rows), one temporary file per range.
+    Finally, every range is read, sorted and appended to the target file.
+
+    Args:
+        batches (Iterable[pa.Table]): the data to be written, all with the same schema.
+            there has to be at least one (maybe empty) batch.
+        target_file (str): path of the parquet file
+        sort_by (List[str]): columns to sort by
+        row_group_size (int, optional, 50'000): max number of rows per row group
+        max_rows_in_memory (int, optional, 2'000'000): max number of rows that are sorted at once
+    """
+    key_col = sort_by[0]
+    key_counts: Dict = {}
+    nr_of_rows = 0
+
+    tmp_file = f"{target_file}.unsorted.tmp"
+    bucket_files: List[str] = []
+    writer = None
+    try:
+        try:
+            for batch in batches:
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_file, batch.schema)
+                writer.write_table(batch.cast(writer.schema), row_group_size=row_group_size)
+                nr_of_rows += batch.num_rows
+                for entry in pc.value_counts(batch[key_col]).to_pylist():
+                    key_counts[entry["values"]] = key_counts.get(entry["values"], 0) + entry["counts"]
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if nr_of_rows <= max_rows_in_memory:
+            write_table_clustered(table=pq.read_table(tmp_file), target_file=target_file,
+                                  sort_by=sort_by, row_group_size=row_group_size)
+            return
+
+        # rows without a key are sorted to the end, like table.sort_by does
+        key_counts.pop(None, None)
+        ranges = _get_key_ranges(key_counts, max_rows_in_memory)
+
+        # the last bucket contains the rows without a key
+        bucket_files = [f"{target_file}.bucket_{i}.tmp" for i in range(len(ranges) + 1)]
+        schema = pq.read_schema(tmp_file)
+        bucket_writers = [pq.ParquetWriter(bucket_file, schema) for bucket_file in bucket_files]
+        try:
+            for record_batch in pq.ParquetFile(tmp_file).iter_batches(batch_size=row_group_size):
+                buckets = _split_into_buckets(pa.Table.from_batches([record_batch]), key_col, ranges)
+                for bucket_writer, bucket in zip(bucket_writers, buckets):
+                    if bucket.num_rows > 0:
+                        bucket_writer.write_table(bucket)
+        finally:
+            for bucket_writer in bucket_writers:
+                bucket_writer.close()
+        os.remove(tmp_file)
+
+        metadata = dict(schema.metadata or {})
+        metadata[PARQUET_LAYOUT_KEY] = PARQUET_LAYOUT_CLUSTERED
+        schema = schema.with_metadata(metadata)
+
+        with pq.ParquetWriter(target_file, schema, write_statistics=True) as target_writer:
+            for bucket_file in bucket_files:
+                table = pq.read_table(bucket_file)
+                os.remove(bucket_file)
+                if table.num_rows == 0:
+                    continue
+                table = table.sort_by([(col, "ascending") for col in sort_by])
+                target_writer.write_table(table.cast(schema), row_group_size=row_group_size)
+    finally:
+        for file in [tmp_file] + bucket_files:
+            if os.path.exists(file):
+                os.remove(file)
+
+
+def is_clustered_parquet_file(file: str) -> bool:
+    """
+    checks whether the parquet file was written in the clustered layout.
+    Only the footer of the file is read.
+
+    Args:
+        file (str): path to the parquet file
+
+    Returns:
+        bool: True if the file was written with write_table_clustered
+    """
+    metadata = pq.read_schema(file).metadata or {}
+    return metadata.get(PARQUET_LAYOUT_KEY) == PARQUET_LAYOUT_CLUSTERED
+
+
+def cluster_parquet_file(file: str, sort_by: List[str],
+                         row_group_size: int = CLUSTERED_ROW_GROUP_SIZE,
+                         max_rows_in_memory: int = CLUSTER_MAX_ROWS_IN_MEMORY):
+    """
+    rewrites an existing parquet file in place in the clustered layout.
+    The file is read record batch by record batch and written with write_batches_clustered, so
+    it is never loaded at once. The data is first written into a temporary file in the same
+    directory which then replaces the original file, so an interrupted run never leaves a half
+    written file behind.
+
+    Args:
+        file (str): path to the parquet file
+        sort_by (List[str]): columns to sort by
+        row_group_size (int, optional, 50'000): max number of rows per row group
+        max_rows_in_memory (int, optional, 2'000'000): max number of rows that are sorted at once
+    """
+    tmp_file = f"{file}.tmp"
+    try:
+        with pq.ParquetFile(file) as parquet_file:
+            if parquet_file.metadata.num_rows == 0:
+                # write_batches_clustered needs at least one batch
+                batches: Iterable[pa.Table] = [parquet_file.schema_arrow.empty_table()]
+            else:
+                batches = (pa.Table.from_batches([record_batch])
+                           for record_batch in parquet_file.iter_batches(batch_size=row_group_size))
+
+            write_batches_clustered(batches=batches, target_file=tmp_file, sort_by=sort_by,
+                                    row_group_size=row_group_size,
+                                    max_rows_in_memory=max_rows_in_memory)
+        os.replace(tmp_file, file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
 def check_dir(target_path: str):
     """
     checks if the path exists and if it is empty.
@@ -118,6 +351,77 @@ def read_df_from_file_in_zip(zip_file: str, file_to_extract: str,
                            dtype=dtype, usecols=usecols, **kwargs)
 
 
+def _get_csv_options(column_types: Optional[Dict[str, pa.DataType]], block_size: Optional[int],
+                     use_threads: bool):
+    """ csv options for the tab separated files from the sec. empty entries are read as null,
+    like pandas.read_csv does."""
+    read_options = pacsv.ReadOptions(use_threads=use_threads, block_size=block_size)
+    parse_options = pacsv.ParseOptions(delimiter="\t", newlines_in_values=True)
+    convert_options = pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True,
+                                           quoted_strings_can_be_null=True)
+    return read_options, parse_options, convert_options
+
+
+def read_table_from_file_in_zip(zip_file: str, file_to_extract: str,
+                                column_types: Optional[Dict[str, pa.DataType]] = None,
+                                use_threads: bool = True) -> pa.Table:
+    """
+    reads the content of a tab separated file inside a zip file directly into a pyarrow table.
+    The file is decompressed while it is read and parsed by multiple threads.
+
+    Args:
+        zip_file (str): the zip file containing the data file
+        file_to_extract (str): the file with the data
+        column_types (Dict[str, pa.DataType], optional, None): types of the columns,
+            columns without a type are inferred. Types of columns not present in the file are ignored.
+        use_threads (bool, optional, True): parse with multiple threads
+
+    Returns:
+        pa.Table: the table
+    """
+    read_options, parse_options, convert_options = _get_csv_options(column_types=column_types,
+                                                                     block_size=None,
+                                                                     use_threads=use_threads)
+    with zipfile.ZipFile(zip_file, "r") as zip_fp:
+        with zip_fp.open(Path(file_to_extract).name) as file_fp:
+            return pacsv.read_csv(file_fp, read_options=read_options, parse_options=parse_options,
+                                  convert_options=convert_options)
+
+
+def iter_batches_from_file_in_zip(zip_file: str, file_to_extract: str,
+                                  column_types: Optional[Dict[str, pa.DataType]] = None,
+                                  block_size: int = 16 * 1024 * 1024) -> Iterator[pa.RecordBatch]:
+    """
+    reads the content of a tab separated file inside a zip file as a stream of record batches.
+    Only about block_size bytes of the file are decompressed and held in memory at a time.
+
+    Args:
+        zip_file (str): the zip file containing the data file
+        file_to_extract (str): the file with the data
+        column_types (Dict[str, pa.DataType], optional, None): types of the columns,
+            columns without a type are inferred from the first block.
+        block_size (int, optional, 16MB): number of bytes that are processed in one batch
+
+    Returns:
+        Iterator[pa.RecordBatch]: the batches. At least one (maybe empty) batch is returned.
+    """
+    read_options, parse_options, convert_options = _get_csv_options(column_types=column_types,
+                                                                     block_size=block_size,
+                                                                     use_threads=True)
+    with zipfile.ZipFile(zip_file, "r") as zip_fp:
+        with zip_fp.open(Path(file_to_extract).name) as file_fp:
+            reader = pacsv.open_csv(file_fp, read_options=read_options, parse_options=parse_options,
+                                    convert_options=convert_options)
+            empty = True
+            for batch in reader:
+                empty = False
+                yield batch
+
+            # ensure that at least one (empty) batch with the schema is returned
+            if empty:
+                yield pa.RecordBatch.from_pylist([], schema=reader.schema)
+
+
 def read_content_from_file_in_zip(zip_file: str, file_to_extract: str) -> str:
     """
     reads the text content of a file inside a zip file
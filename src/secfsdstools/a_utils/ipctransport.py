@@ -0,0 +1,88 @@
+"""
+Helper methods to hand over dataframes between processes as Arrow IPC files.
+
+Instead of pickling the dataframes and sending them through the pipe of the process pool,
+a worker writes them as Arrow IPC files into shared memory (/dev/shm, if available) and just
+returns the path of the folder. The main process memory maps these files and converts them back
+to dataframes.
+"""
+import glob
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+SHARED_MEMORY_DIR = "/dev/shm"
+IPC_DIR_PREFIX = "secfsdstools_ipc_"
+IPC_FILE_ENDING = ".arrow"
+
+
+def get_transport_dir() -> str:
+    """
+    returns the directory in which the ipc files are written. This is /dev/shm if it exists
+    and is writable (so the data never touches a disk), otherwise the default temp dir.
+
+    Returns:
+        str: the directory for the ipc files
+    """
+    if os.path.isdir(SHARED_MEMORY_DIR) and os.access(SHARED_MEMORY_DIR, os.W_OK):
+        return SHARED_MEMORY_DIR
+    return tempfile.gettempdir()
+
+
+def write_dataframes_to_ipc(dfs: Dict[str, pd.DataFrame], base_dir: Optional[str] = None) -> str:
+    """
+    writes the dataframes as uncompressed Arrow IPC files into a new folder.
+
+    Args:
+        dfs: the dataframes to write, the keys are used as file names
+        base_dir: directory in which the folder is created, default is get_transport_dir()
+
+    Returns:
+        str: path of the folder containing the ipc files
+    """
+    target_dir = tempfile.mkdtemp(prefix=IPC_DIR_PREFIX, dir=base_dir or get_transport_dir())
+    try:
+        for name, df in dfs.items():
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with pa.OSFile(os.path.join(target_dir, f"{name}{IPC_FILE_ENDING}"), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+    except Exception:
+        shutil.rmtree(target_dir, ignore_errors=True)
+        raise
+    return target_dir
+
+
+def remove_ipc_dir(source_dir: str):
+    """
+    removes a folder written by write_dataframes_to_ipc without reading it.
+
+    Args:
+        source_dir: folder returned by write_dataframes_to_ipc
+    """
+    shutil.rmtree(source_dir, ignore_errors=True)
+
+
+def read_dataframes_from_ipc(source_dir: str) -> Dict[str, pd.DataFrame]:
+    """
+    reads the dataframes written by write_dataframes_to_ipc and removes the folder afterwards.
+
+    Args:
+        source_dir: folder returned by write_dataframes_to_ipc
+
+    Returns:
+        Dict[str, pd.DataFrame]: the dataframes with the same keys as they were written
+    """
+    result: Dict[str, pd.DataFrame] = {}
+    try:
+        for file in glob.glob(os.path.join(source_dir, f"*{IPC_FILE_ENDING}")):
+            name = os.path.basename(file)[:-len(IPC_FILE_ENDING)]
+            with pa.memory_map(file, "r") as source:
+                result[name] = pa.ipc.open_file(source).read_all().to_pandas()
+    finally:
+        remove_ipc_dir(source_dir)
+    return result
@@ -7,9 +7,10 @@ using pathos.multiprocessing instead of multiprocessing, so that method function
 
 import concurrent.futures
 import logging
+import uuid
 from abc import ABC, abstractmethod
 from time import sleep, time
-from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+from typing import Any, Callable, Generic, List, Optional, Tuple, TypeVar
 
 from pathos.multiprocessing import ProcessingPool as Pool
 from pathos.multiprocessing import cpu_count
@@ -200,13 +201,141 @@ class ParallelExecutorBase(Generic[IT, PT, OT], ABC):
         return result_list, missing
 
 
+class ResultTransport(Generic[PT], ABC):
+    """
+    Defines how the result of the process_element function is handed back from a worker
+    process to the main process. Without a transport, the results are pickled.
+    """
+
+    @abstractmethod
+    def dump(self, result: PT) -> Any:
+        """
+        called inside the worker process. stores the result and returns a small handle
+        that is sent to the main process instead of the result itself.
+        """
+
+    @abstractmethod
+    def load(self, handle: Any) -> PT:
+        """
+        called inside the main process. restores the result from the handle returned by dump.
+        """
+
+    def discard(self, handle: Any):
+        """
+        called inside the main process for handles that are not loaded, because processing or
+        loading an other entry of the same chunk failed. releases what dump stored for the handle.
+        """
+
+
 class ParallelExecutor(ParallelExecutorBase[IT, PT, OT]):
     """
     Parallel executor that uses multiprocess package to parallelize
     """
+
+    def __init__(self,
+                 processes: int = cpu_count(),
+                 chunksize: int = 100,
+                 max_calls_per_sec: int = 0,
+                 intend: str = "    ",
+                 execute_serial: bool = False,
+                 keep_pool: bool = False,
+                 transport: Optional[ResultTransport[PT]] = None):
+        """
+        Args:
+            processes (int, optional, cpu_count()): number of parallel processes,
+             default is cpu_count
+            chunksize (int, optional, 100): size of chunk - think of it as a commit,
+             default is 100
+            max_calls_per_sec (int, optional, 0): how many calls may be made per
+             second (for all processes), default is 0, meaning no limit
+            intend (str, optional, '    '): how much log messages should be intended
+            execute_serial (bool, optional, False): for easier debugging, this
+             flag ensures that all data areprocessed in the main thread
+            keep_pool (bool, optional, False): if True, the executor creates its own pool of
+             worker processes once and reuses it for all chunks and all calls of execute.
+             The pool has to be released with close(), or by using the executor as context manager.
+            transport (ResultTransport, optional, None): defines how the results are handed
+             back from the worker processes. Default is None, meaning the results are pickled.
+        """
+        super().__init__(processes=processes,
+                         chunksize=chunksize,
+                         max_calls_per_sec=max_calls_per_sec,
+                         intend=intend,
+                         execute_serial=execute_serial)
+        self.keep_pool = keep_pool
+        self.transport = transport
+        self._pool: Optional[Pool] = None
+
+    def __getstate__(self):
+        # the executor is sent to the worker processes together with the process function,
+        # but the pool itself cannot be pickled
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        terminates the worker processes of the pool that was created with keep_pool=True.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool.clear()
+            self._pool = None
+
+    def _get_kept_pool(self) -> Pool:
+        if self._pool is None:
+            # pathos shares one pool per id within the whole process, so the kept pool
+            # gets its own id and is not closed or replaced by other executors
+            self._pool = Pool(self.processes, id=f"parallelexecutor_{uuid.uuid4().hex}")
+        return self._pool
+
+    def _process_transported(self, data: IT) -> Tuple[bool, Any]:
+        # the error is returned instead of raised, so that map completes for the other
+        # entries and the main process can release all the handles that were written
+        try:
+            return True, self.transport.dump(self._process_throttled_parallel(data))
+        except Exception as ex:  # pylint: disable=broad-except
+            return False, ex
+
     def _execute_parallel(self, chunk: List[IT]) -> List[PT]:
-        with Pool(self.processes) as pool:
-            return pool.map(self._process_throttled_parallel, chunk)
+        process_function = self._process_throttled_parallel
+        if self.transport is not None:
+            process_function = self._process_transported
+
+        if self.keep_pool:
+            results = self._get_kept_pool().map(process_function, chunk)
+        else:
+            with Pool(self.processes) as pool:
+                results = pool.map(process_function, chunk)
+
+        if self.transport is None:
+            return results
+
+        handles = [value for success, value in results if success]
+        errors = [value for success, value in results if not success]
+        if errors:
+            # the handles of the entries that were processed would never be released otherwise
+            for handle in handles:
+                self.transport.discard(handle)
+            raise errors[0]
+
+        loaded: List[PT] = []
+        try:
+            for handle in handles:
+                loaded.append(self.transport.load(handle))
+        except Exception:
+            # the handles that were not loaded yet would never be released otherwise
+            for handle in handles[len(loaded):]:
+                self.transport.discard(handle)
+            raise
+        return loaded
 
 
 class ThreadExecutor(ParallelExecutorBase[IT, PT, OT]):
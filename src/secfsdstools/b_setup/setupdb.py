@@ -12,6 +12,7 @@ from secfsdstools.a_utils.dbutils import DB
 
 CURRENT_DIR, CURRENT_FILE = os.path.split(__file__)
 DDL_PATH = os.path.join(CURRENT_DIR, "sql")
+COMPANY_NAMES_FTS_SCRIPT = os.path.join(DDL_PATH, "fts", "company_names_fts.sql")
 
 LOGGER = logging.getLogger(__name__)
 
@@ -21,6 +22,8 @@ class DbCreator(DB):
     responsible to  create the database.
     """
 
+    COMPANY_NAMES_FTS_TABLE = "index_parquet_company_names_fts"
+
     def __init__(self, db_dir: str):
         super().__init__(db_dir=db_dir)
 
@@ -45,6 +48,28 @@ class DbCreator(DB):
             else:
                 print(f"An error occurred: {exc}")
 
+    def create_company_names_fts(self):
+        """
+        creates the optional trigram full text index on the company names, which is used by
+        ParquetDBIndexingAccessor.search_companies. If the sqlite version does not support
+        it, the company search falls back to LIKE queries on the company names table.
+        """
+        fts_exists = self.table_exists(self.COMPANY_NAMES_FTS_TABLE)
+        conn = self.get_connection()
+        try:
+            with open(COMPANY_NAMES_FTS_SCRIPT, 'r', encoding='utf8') as scriptfile:
+                conn.executescript(scriptfile.read())
+        except sqlite3.OperationalError as exc:
+            LOGGER.warning("full text search on company names is not available with sqlite %s: %s",
+                           sqlite3.sqlite_version, exc)
+            return
+
+        if not fts_exists:
+            # index the names that were registered before the full text index existed
+            with conn:
+                conn.execute(f"INSERT INTO {self.COMPANY_NAMES_FTS_TABLE} "
+                             f"({self.COMPANY_NAMES_FTS_TABLE}) VALUES ('rebuild')")
+
     def create_db(self):
         """
         reads the ddl files from the ddl directory and creates the tables
@@ -77,4 +102,7 @@ class DbCreator(DB):
 
         # adding columns that do not exist - so far none are needed
 
-        conn.close()
+        self.create_company_names_fts()
+
+        # readers (e.g. the index lookups) must not be blocked while an update is running
+        self.enable_wal_mode()
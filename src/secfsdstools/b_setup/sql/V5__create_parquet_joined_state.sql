@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS index_parquet_joined_state
+(
+    fileName,
+    fullPath,
+    status,
+    entries,
+    processTime,
+    PRIMARY KEY (fileName)
+);
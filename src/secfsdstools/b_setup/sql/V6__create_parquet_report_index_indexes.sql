@@ -0,0 +1,16 @@
+-- find_latest_company_report: WHERE cik = ? AND originFileType = ? ORDER BY period DESC LIMIT 1
+CREATE INDEX IF NOT EXISTS idx_index_parquet_reports_cik_type_period
+    ON index_parquet_reports (cik, originFileType, period);
+
+-- read_index_reports_for_ciks: WHERE cik IN (...) AND form IN (...) ORDER BY period DESC
+CREATE INDEX IF NOT EXISTS idx_index_parquet_reports_cik_form_period
+    ON index_parquet_reports (cik, form, period);
+
+-- read_filenames_by_type: covering, SELECT DISTINCT originFile WHERE originFileType = ?
+CREATE INDEX IF NOT EXISTS idx_index_parquet_reports_type_file
+    ON index_parquet_reports (originFileType, originFile);
+
+-- find_company_by_name: a LIKE '%..%' cannot seek, but scanning this covering index is much
+-- smaller than scanning the table and already delivers the rows ordered by name
+CREATE INDEX IF NOT EXISTS idx_index_parquet_reports_name_cik
+    ON index_parquet_reports (name, cik);
@@ -0,0 +1,21 @@
+-- the distinct names of every company, including its former names. the trigger registers the
+-- name of every report that is added to the index (see IndexingTask), so that the company
+-- search does not have to scan all the reports
+CREATE TABLE IF NOT EXISTS index_parquet_company_names
+(
+    name TEXT NOT NULL,
+    cik  INT  NOT NULL,
+    UNIQUE (name, cik)
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_index_parquet_reports_company_name
+    AFTER INSERT ON index_parquet_reports
+BEGIN
+    INSERT OR IGNORE INTO index_parquet_company_names (name, cik) VALUES (NEW.name, NEW.cik);
+END;
+
+-- names of the reports that were indexed before the table existed
+INSERT OR IGNORE INTO index_parquet_company_names (name, cik)
+SELECT DISTINCT name, cik
+FROM index_parquet_reports
+WHERE NOT EXISTS (SELECT 1 FROM index_parquet_company_names);
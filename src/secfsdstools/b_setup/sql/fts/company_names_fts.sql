@@ -0,0 +1,21 @@
+-- trigram full text index on the company names. it is optional, since it needs a sqlite
+-- version with fts5 and the trigram tokenizer (3.34 or newer), see DbCreator.create_db
+CREATE VIRTUAL TABLE IF NOT EXISTS index_parquet_company_names_fts USING fts5
+(
+    name,
+    content = 'index_parquet_company_names',
+    tokenize = 'trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_index_parquet_company_names_fts_insert
+    AFTER INSERT ON index_parquet_company_names
+BEGIN
+    INSERT INTO index_parquet_company_names_fts (rowid, name) VALUES (NEW.rowid, NEW.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_index_parquet_company_names_fts_delete
+    AFTER DELETE ON index_parquet_company_names
+BEGIN
+    INSERT INTO index_parquet_company_names_fts (index_parquet_company_names_fts, rowid, name)
+    VALUES ('delete', OLD.rowid, OLD.name);
+END;
@@ -10,6 +10,7 @@ import pandas as pd
 from secfsdstools.a_config.configmgt import ConfigurationManager
 from secfsdstools.a_config.configmodel import Configuration
 from secfsdstools.a_utils.constants import SUB_TXT
+from secfsdstools.c_index.indexcache import get_index_accessor
 from secfsdstools.c_index.indexdataaccess import IndexReport, ParquetDBIndexingAccessor
 
 
@@ -33,7 +34,7 @@ class CompanyIndexReader:
         """
         if configuration is None:
             configuration = ConfigurationManager.read_config_file()
-        dbaccessor = ParquetDBIndexingAccessor(db_dir=configuration.db_dir)
+        dbaccessor = get_index_accessor(configuration)
         return CompanyIndexReader(cik, dbaccessor=dbaccessor)
 
     def __init__(self, cik: int, dbaccessor: ParquetDBIndexingAccessor):
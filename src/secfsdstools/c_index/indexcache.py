@@ -0,0 +1,296 @@
+"""
+Optional in-memory snapshot of the index_parquet_reports table. The whole table is loaded once
+into an arrow table, which is sorted by cik and period, and lookups by adsh and cik are answered
+from it without a round trip to the database.
+
+The snapshot is shared by all CachedIndexAccessor instances of the same database within the
+process. It is reloaded when the content of the index_parquet_processing_state table changes,
+which is the case after every run of the ReportParquetIndexerProcess, or when it is invalidated
+explicitly.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from secfsdstools.a_config.configmodel import Configuration
+from secfsdstools.c_index.indexdataaccess import IndexReport, ParquetDBIndexingAccessor
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_ROWS_READ_BY_VALUE = 8
+
+
+class IndexSnapshot:
+    """
+    Columnar snapshot of the index_parquet_reports table. The rows are sorted by cik and by
+    period in descending order, so that the reports of a company are a contiguous range of rows.
+    """
+
+    def __init__(self, reports_df: pd.DataFrame, fingerprint: Tuple):
+        """
+        Args:
+            reports_df: the content of the index_parquet_reports table
+            fingerprint: the state of the processing table the content belongs to
+        """
+        self.fingerprint = fingerprint
+        self.table: pa.Table = pa.Table.from_pandas(reports_df, preserve_index=False) \
+            .sort_by([('cik', 'ascending'), ('period', 'descending')])
+
+        self.ciks: np.ndarray = self.table['cik'].to_numpy()
+        self.periods: np.ndarray = self.table['period'].to_numpy()
+        # only a few distinct values, so they are kept as codes
+        self.form_codes, self.form_code_by_value = self._factorize('form')
+        self.file_type_codes, self.file_type_code_by_value = self._factorize('originFileType')
+        self.columns: Dict[str, pa.Array] = {name: self.table[name].combine_chunks()
+                                             for name in self.table.column_names}
+
+        # hash index on adsh. if an adsh is present in a quarter and a daily file, the
+        # quarter entry is preferred, like in ParquetDBIndexingAccessor.read_index_report_for_adsh
+        adsh_order = pc.sort_indices(
+            self.table, sort_keys=[('adsh', 'ascending'), ('originFileType', 'descending')]).to_numpy()
+        adshs = pd.Series(self.table['adsh'].take(adsh_order).to_numpy(zero_copy_only=False))
+        is_first = ~adshs.duplicated().to_numpy()
+        self.adsh_index = pd.Index(adshs[is_first])
+        self.adsh_rows: np.ndarray = adsh_order[is_first]
+
+    def _factorize(self, column: str) -> Tuple[np.ndarray, Dict[str, int]]:
+        codes, uniques = pd.factorize(self.table[column].to_numpy(zero_copy_only=False))
+        return codes, {value: code for code, value in enumerate(uniques)}
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def get_adsh_row(self, adsh: str) -> Optional[int]:
+        """
+        Args:
+            adsh: the adsh to look up
+
+        Returns:
+            Optional[int]: the row of the adsh, None if the adsh is unknown
+        """
+        try:
+            return int(self.adsh_rows[self.adsh_index.get_loc(adsh)])
+        except KeyError:
+            return None
+
+    def get_adsh_rows(self, adshs: List[str]) -> np.ndarray:
+        """
+        Args:
+            adshs: the adshs to look up, unknown adshs are ignored
+
+        Returns:
+            np.ndarray: the rows of the adshs in the order of the provided adshs
+        """
+        positions = self.adsh_index.get_indexer(adshs)
+        return self.adsh_rows[positions[positions >= 0]]
+
+    def get_cik_rows(self, cik: int) -> np.ndarray:
+        """
+        Args:
+            cik: the cik of the company
+
+        Returns:
+            np.ndarray: the rows of the reports of the company, sorted by period descending
+        """
+        start, end = np.searchsorted(self.ciks, [cik, cik + 1])
+        return np.arange(start, end)
+
+    @staticmethod
+    def _filter(rows: np.ndarray, codes: np.ndarray, code_by_value: Dict[str, int],
+                values: List[str]) -> np.ndarray:
+        # comparing the codes directly is much faster than np.isin for the few rows of a company
+        row_codes = codes[rows]
+        mask = np.zeros(len(rows), dtype=bool)
+        for value in set(values):
+            if value in code_by_value:
+                mask |= row_codes == code_by_value[value]
+        return rows[mask]
+
+    def filter_forms(self, rows: np.ndarray, forms: List[str]) -> np.ndarray:
+        """
+        Args:
+            rows: the rows to filter
+            forms: the forms to keep, like ['10-K', '10-Q']
+
+        Returns:
+            np.ndarray: the rows with one of the forms
+        """
+        return self._filter(rows, self.form_codes, self.form_code_by_value, forms)
+
+    def filter_file_type(self, rows: np.ndarray, file_type: str) -> np.ndarray:
+        """
+        Args:
+            rows: the rows to filter
+            file_type: the originFileType to keep, like 'quarter'
+
+        Returns:
+            np.ndarray: the rows with the file type
+        """
+        return self._filter(rows, self.file_type_codes, self.file_type_code_by_value, [file_type])
+
+    def to_report(self, row: int) -> IndexReport:
+        """
+        Args:
+            row: the row to convert
+
+        Returns:
+            IndexReport: the IndexReport of the row
+        """
+        return IndexReport(**{name: column[row].as_py() for name, column in self.columns.items()})
+
+    def to_reports(self, rows: np.ndarray) -> List[IndexReport]:
+        """
+        Args:
+            rows: the rows to convert
+
+        Returns:
+            List[IndexReport]: an IndexReport for every row
+        """
+        # reading single values is faster for a few rows, taking the rows for many
+        if len(rows) <= MAX_ROWS_READ_BY_VALUE:
+            return [self.to_report(row) for row in rows]
+        return [IndexReport(**entry) for entry in self.table.take(rows).to_pylist()]
+
+    def to_df(self, rows: np.ndarray) -> pd.DataFrame:
+        """
+        Args:
+            rows: the rows to convert
+
+        Returns:
+            pd.DataFrame: the rows with the columns of the index_parquet_reports table
+        """
+        return self.table.take(rows).to_pandas()
+
+
+class CachedIndexAccessor(ParquetDBIndexingAccessor):
+    """
+    ParquetDBIndexingAccessor that answers the lookups of reports by adsh and cik from an
+    in-memory IndexSnapshot. All other methods read from the database.
+
+    Whether the snapshot is still up to date is checked at most every check_interval
+    seconds, so changes to the index can be visible with that delay.
+    Note: only changes that are also recorded in the index_parquet_processing_state table
+    (like the ones of the ReportParquetIndexerProcess) are detected.
+    """
+
+    _snapshots: Dict[str, IndexSnapshot] = {}
+    _last_checks: Dict[str, float] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, db_dir: str, check_interval: float = 1.0):
+        """
+        Args:
+            db_dir: location of the dbfile
+            check_interval: seconds between two checks whether the snapshot is outdated
+        """
+        super().__init__(db_dir=db_dir)
+        self.check_interval = check_interval
+        self.key = os.path.abspath(self.database)
+
+    @classmethod
+    def invalidate(cls, db_dir: Optional[str] = None):
+        """
+        removes the snapshot of the provided db, so that it is reloaded with the next lookup.
+
+        Args:
+            db_dir: location of the dbfile, if None, all snapshots are removed
+        """
+        with cls._lock:
+            if db_dir is None:
+                cls._snapshots.clear()
+                cls._last_checks.clear()
+            else:
+                key = os.path.abspath(ParquetDBIndexingAccessor(db_dir=db_dir).database)
+                cls._snapshots.pop(key, None)
+                cls._last_checks.pop(key, None)
+
+    def _read_fingerprint(self) -> Tuple:
+        sql = f"""SELECT count(*), max(processTime), total(entries), max(fileName)
+                   FROM {self.index_processing_table}"""
+        return tuple(self.execute_fetchall(sql)[0])
+
+    def get_snapshot(self) -> IndexSnapshot:
+        """
+        returns the snapshot of the db, which is loaded if it is not present yet or if the
+        processing state changed since it was loaded.
+
+        Returns:
+            IndexSnapshot: the current snapshot
+        """
+        now = time.monotonic()
+        snapshot = self._snapshots.get(self.key)
+        if snapshot is not None and now - self._last_checks.get(self.key, 0.0) < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshots.get(self.key)
+            fingerprint = self._read_fingerprint()
+            if snapshot is None or snapshot.fingerprint != fingerprint:
+                start = time.time()
+                snapshot = IndexSnapshot(self.read_all_indexreports_df(), fingerprint)
+                LOGGER.info("loaded %d index reports of %s in %.2fs",
+                            len(snapshot), self.database, time.time() - start)
+                self._snapshots[self.key] = snapshot
+            self._last_checks[self.key] = now
+            return snapshot
+
+    def _get_rows_for_ciks(self, snapshot: IndexSnapshot, ciks: List[int],
+                           forms: Optional[List[str]]) -> np.ndarray:
+        rows = np.concatenate([snapshot.get_cik_rows(int(cik)) for cik in dict.fromkeys(ciks)]
+                              + [np.empty(0, dtype=np.int64)])
+        if forms is not None:
+            rows = snapshot.filter_forms(rows, [form.upper() for form in forms])
+        # ORDER BY period DESC over all companies
+        return rows[np.argsort(-snapshot.periods[rows], kind='stable')]
+
+    def find_latest_company_report(self, cik: int, filetype: str = "quarter") -> Optional[IndexReport]:
+        snapshot = self.get_snapshot()
+        rows = snapshot.get_cik_rows(int(cik))
+        rows = snapshot.filter_file_type(rows, filetype)
+        if len(rows) == 0:
+            return None
+        return snapshot.to_report(rows[0])
+
+    def read_index_report_for_adsh(self, adsh: str) -> IndexReport:
+        snapshot = self.get_snapshot()
+        row = snapshot.get_adsh_row(adsh)
+        if row is None:
+            # same error as the database query without a result
+            raise IndexError(f"no report for adsh {adsh}")
+        return snapshot.to_report(row)
+
+    def read_index_reports_for_adshs(self, adshs: List[str]) -> List[IndexReport]:
+        snapshot = self.get_snapshot()
+        # sorted by adsh, like the result of the database query
+        return snapshot.to_reports(snapshot.get_adsh_rows(sorted({adsh.upper() for adsh in adshs})))
+
+    def read_index_reports_for_ciks(self, ciks: List[int], forms: Optional[List[str]] = None) -> List[IndexReport]:
+        snapshot = self.get_snapshot()
+        return snapshot.to_reports(self._get_rows_for_ciks(snapshot, ciks, forms))
+
+    def read_index_reports_for_ciks_df(self, ciks: List[int], forms: Optional[List[str]] = None) -> pd.DataFrame:
+        snapshot = self.get_snapshot()
+        return snapshot.to_df(self._get_rows_for_ciks(snapshot, ciks, forms))
+
+
+def get_index_accessor(configuration: Configuration) -> ParquetDBIndexingAccessor:
+    """
+    creates the accessor for the index of the configuration. If the configuration enables the
+    index cache (UseIndexCache), the lookups of reports are answered from an in-memory snapshot.
+
+    Args:
+        configuration: the configuration
+
+    Returns:
+        ParquetDBIndexingAccessor: a CachedIndexAccessor or a ParquetDBIndexingAccessor
+    """
+    if configuration.use_index_cache:
+        return CachedIndexAccessor(db_dir=configuration.db_dir)
+    return ParquetDBIndexingAccessor(db_dir=configuration.db_dir)
@@ -2,7 +2,7 @@
 
 import sqlite3
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import pandas as pd
 
@@ -41,9 +41,14 @@ class ParquetDBIndexingAccessor(DB):
 
     index_reports_table = "index_parquet_reports"
     index_processing_table = "index_parquet_processing_state"
+    index_joined_table = "index_parquet_joined_state"
+    company_names_table = "index_parquet_company_names"
+    company_names_fts_table = "index_parquet_company_names_fts"
 
     def __init__(self, db_dir: str):
         super().__init__(db_dir=db_dir)
+        self._has_company_names_table: Optional[bool] = None
+        self._has_company_names_fts: Optional[bool] = None
 
     def read_all_indexreports(self) -> List[IndexReport]:
         """
@@ -126,10 +131,9 @@ class ParquetDBIndexingAccessor(DB):
         Returns:
             List[IndexFileProcessingState]: the processing state instance
         """
-        filenames_str = ", ".join(["'" + x + "'" for x in filenames])
-
-        sql = f"SELECT * FROM {self.index_processing_table} WHERE fileName in ({filenames_str})"
-        return self.execute_fetchall_typed(sql, IndexFileProcessingState)
+        sql = f"""SELECT * FROM {self.index_processing_table}
+                   WHERE fileName in (SELECT {self.LOOKUP_COLUMN} FROM {self.LOOKUP_TABLE})"""
+        return self.execute_fetchall_typed_for_keys(sql, filenames, IndexFileProcessingState)
 
     def insert_indexreport(self, data: IndexReport):
         """
@@ -186,6 +190,28 @@ class ParquetDBIndexingAccessor(DB):
         sql = self.create_insert_statement_for_dataclass(self.index_processing_table, data)
         self.execute_single(sql, conn)
 
+    def read_all_indexjoined(self) -> List[IndexFileProcessingState]:
+        """
+        reads all entries of the index_parquet_joined_state table. it contains an entry for every
+        folder for which the joined pre_num.txt parquet file was created.
+
+        Returns:
+            List[IndexFileProcessingState]: List with IndexFileProcessingState objects
+        """
+        sql = f"SELECT * FROM {self.index_joined_table}"
+        return self.execute_fetchall_typed(sql, IndexFileProcessingState)
+
+    def insert_indexjoined(self, data: IndexFileProcessingState):
+        """
+        inserts an entry into the index_parquet_joined_state table
+
+        Args:
+            data (IndexFileProcessingState): IndexFileProcessingState data object to insert
+        """
+        sql = self.create_insert_statement_for_dataclass(self.index_joined_table, data)
+        with self.get_connection() as conn:
+            self.execute_single(sql, conn)
+
     def find_latest_company_report(self, cik: int, filetype: str = "quarter") -> Optional[IndexReport]:
         """
         returns the latest report of a company
@@ -200,7 +226,8 @@ class ParquetDBIndexingAccessor(DB):
         sql = f"""SELECT *
                     FROM {self.index_reports_table}
                     WHERE cik = {cik} and originFileType = '{filetype}'
-                    ORDER BY period DESC"""
+                    ORDER BY period DESC
+                    LIMIT 1"""
 
         results = self.execute_fetchall_typed(sql, IndexReport)
         if len(results) == 0:
@@ -221,7 +248,8 @@ class ParquetDBIndexingAccessor(DB):
         sql = f"""SELECT *
                     FROM {self.index_reports_table}
                     WHERE adsh = '{adsh}'
-                    ORDER BY originFileType DESC"""
+                    ORDER BY originFileType DESC
+                    LIMIT 1"""
         return self.execute_fetchall_typed(sql, IndexReport)[0]
 
     def read_index_reports_for_adshs(self, adshs: List[str]) -> List[IndexReport]:
@@ -234,15 +262,15 @@ class ParquetDBIndexingAccessor(DB):
             List[IndexReport]: the reports for the provided adshs
         """
 
-        adshs_str = ", ".join(["'" + x.upper() + "'" for x in adshs])
         # sorting by originfiletype, so we prefer official data from SEC,
         # over the daily files, in case both should be present.
         sql = f"""SELECT *
                     FROM {self.index_reports_table}
-                    WHERE adsh in ({adshs_str})
+                    WHERE adsh in (SELECT {self.LOOKUP_COLUMN} FROM {self.LOOKUP_TABLE})
                     ORDER BY adsh, originFileType DESC"""
 
-        reports: List[IndexReport] = self.execute_fetchall_typed(sql, IndexReport)
+        reports: List[IndexReport] = self.execute_fetchall_typed_for_keys(
+            sql, [adsh.upper() for adsh in adshs], IndexReport)
 
         last_adsh = None
         filtered_reports: List[IndexReport] = []
@@ -254,6 +282,17 @@ class ParquetDBIndexingAccessor(DB):
 
         return filtered_reports
 
+    def _create_reports_for_ciks_sql(self, forms: Optional[List[str]]) -> Tuple[str, Tuple]:
+        # the ciks are provided in the lookup table, the forms as parameters
+        sql = f"""SELECT * FROM {self.index_reports_table}
+                   WHERE cik in (SELECT {self.LOOKUP_COLUMN} FROM {self.LOOKUP_TABLE})"""
+        params: Tuple = ()
+        if forms is not None:
+            sql = sql + f" and form in ({', '.join(['?'] * len(forms))}) "
+            params = tuple(form.upper() for form in forms)
+        sql = sql + " ORDER BY period DESC"
+        return sql, params
+
     def read_index_reports_for_ciks(self, ciks: List[int], forms: Optional[List[str]] = None) -> List[IndexReport]:
         """
         gets all reports as IndexReport instances for the companies identified by their cik numbers.
@@ -267,14 +306,9 @@ class ParquetDBIndexingAccessor(DB):
         Returns:
             List[IndexReport]
         """
-        ciks_str = [str(cik) for cik in ciks]
-        sql = f'SELECT * FROM {self.index_reports_table} WHERE cik in ({",".join(ciks_str)})'
-        if forms is not None:
-            forms_str = ", ".join(["'" + x.upper() + "'" for x in forms])
-            sql = sql + f" and form in ({forms_str}) "
-        sql = sql + " ORDER BY period DESC"
-
-        return self.execute_fetchall_typed(sql, IndexReport)
+        sql, params = self._create_reports_for_ciks_sql(forms)
+        return self.execute_fetchall_typed_for_keys(sql, [int(cik) for cik in ciks], IndexReport,
+                                                    params=params)
 
     def read_index_reports_for_ciks_df(self, ciks: List[int], forms: Optional[List[str]] = None) -> pd.DataFrame:
         """
@@ -289,19 +323,33 @@ class ParquetDBIndexingAccessor(DB):
         Returns:
             pd.DataFrame
         """
-        ciks_str = [str(cik) for cik in ciks]
-        sql = f'SELECT * FROM {self.index_reports_table} WHERE cik in ({",".join(ciks_str)})'
-        if forms is not None:
-            forms_str = ", ".join(["'" + x.upper() + "'" for x in forms])
-            sql = sql + f" and form in ({forms_str}) "
-        sql = sql + " ORDER BY period DESC"
+        sql, params = self._create_reports_for_ciks_sql(forms)
+        return self.execute_read_as_df_for_keys(sql, [int(cik) for cik in ciks], params=params)
 
-        return self.execute_read_as_df(sql)
+    def has_company_names_table(self) -> bool:
+        """
+        Returns:
+            bool: True if the table with the company names is present, which is not the case
+                  for databases that were not updated by DbCreator since the table was added
+        """
+        if self._has_company_names_table is None:
+            self._has_company_names_table = self.table_exists(self.company_names_table)
+        return self._has_company_names_table
+
+    def has_company_names_fts(self) -> bool:
+        """
+        Returns:
+            bool: True if the trigram full text index on the company names is present, which
+                  depends on the sqlite version the db was created with (see DbCreator)
+        """
+        if self._has_company_names_fts is None:
+            self._has_company_names_fts = self.table_exists(self.company_names_fts_table)
+        return self._has_company_names_fts
 
     def find_company_by_name(self, name_part: str) -> pd.DataFrame:
         """
         Finds companies in the index based on the provided part of the name.
-        Lower and uppercase are ignored.
+        Lower and uppercase are ignored. Former names of a company are also found.
 
         Args:
             name_part: the part of the name
@@ -309,16 +357,75 @@ class ParquetDBIndexingAccessor(DB):
         Returns:
             pd.DataFrame: with columns name and cik
         """
+        if not self.has_company_names_table():
+            sql = f"""
+                    SELECT DISTINCT name, cik from {self.index_reports_table}
+                    WHERE name like ?
+                    ORDER BY name"""
+            return self.execute_read_as_df_params(sql, (f"%{name_part}%",))
+
+        # the trigram index also supports LIKE, if the part has at least 3 characters
+        names_table = self.company_names_table
+        if self.has_company_names_fts():
+            names_table = self.company_names_fts_table
         sql = f"""
-                SELECT DISTINCT name, cik from {self.index_reports_table}
-                WHERE name like '%{name_part}%'
+                SELECT name, cik from {self.company_names_table}
+                WHERE rowid in (SELECT rowid FROM {names_table} WHERE name like ?)
                 ORDER BY name"""
-        return self.execute_read_as_df(sql)
+        return self.execute_read_as_df_params(sql, (f"%{name_part}%",))
+
+    def search_companies(self, query: str, limit: int = 20) -> pd.DataFrame:
+        """
+        Searches companies by the words in the query, e.g. for a search as you type. Every
+        word has to be part of the name (in any order), lower and uppercase are ignored.
+        Words with less than 3 characters, or all words if the full text index is not present,
+        are matched with like.
+        The results are ranked: names that start with the query come first, then the names
+        ordered by the relevance of the full text search. Former names of a company are also
+        found.
+
+        Args:
+            query: the search query, like "micro corp"
+            limit: the maximum number of results
+
+        Returns:
+            pd.DataFrame: with columns name and cik
+        """
+        words = query.split()
+        prefix = f"{query.strip()}%"
+
+        # the trigram index needs words with at least 3 characters, the shorter words are
+        # checked with like
+        fts_words = [word for word in words if len(word) >= 3] if self.has_company_names_fts() else []
+        like_words = [f"%{word}%" for word in words if len(word) < 3 or len(fts_words) == 0]
+
+        if len(fts_words) == 0:
+            names_table = self.company_names_table
+            if not self.has_company_names_table():
+                names_table = f"(SELECT DISTINCT name, cik FROM {self.index_reports_table})"
+            where = f"WHERE {' AND '.join(['name like ?'] * len(like_words))}" if like_words else ""
+            sql = f"""
+                    SELECT name, cik FROM {names_table}
+                    {where}
+                    ORDER BY name like ? DESC, name
+                    LIMIT ?"""
+            return self.execute_read_as_df_params(sql, (*like_words, prefix, limit))
+
+        match = " ".join('"' + word.replace('"', '""') + '"' for word in fts_words)
+        like_conditions = "".join(" AND names.name like ?" for _ in like_words)
+        sql = f"""
+                SELECT names.name, names.cik
+                FROM {self.company_names_fts_table} fts
+                JOIN {self.company_names_table} names ON names.rowid = fts.rowid
+                WHERE fts.name MATCH ?{like_conditions}
+                ORDER BY names.name like ? DESC, fts.rank, names.name
+                LIMIT ?"""
+        return self.execute_read_as_df_params(sql, (match, *like_words, prefix, limit))
 
     # pylint: disable=C0103
     def read_filenames_by_type(self, originFileType: str = "quarter") -> List[str]:
         """
-        Returns all filenames of the provided file type (usually "quarter")
+        Returns all distinct filenames of the provided file type (usually "quarter")
         Args:
             origin_file_type:
 
@@ -327,7 +434,7 @@ class ParquetDBIndexingAccessor(DB):
 
         """
         sql = f"""
-                 SELECT ORIGINFILE
+                 SELECT DISTINCT ORIGINFILE
                  FROM {self.index_reports_table}
                  WHERE ORIGINFILETYPE='{originFileType}'"""
 
@@ -347,8 +454,7 @@ class ParquetDBIndexingAccessor(DB):
 
         cut_off_file_name: str = f"{cut_off_day}.zip"
 
-        conn = self.get_connection()
-        try:
+        with self.get_connection() as conn:
             sql = f"""
                     DELETE FROM {self.index_reports_table}
                     WHERE originFile < '{cut_off_file_name}' and originFileType = 'daily'
@@ -360,8 +466,3 @@ class ParquetDBIndexingAccessor(DB):
                     WHERE fileName < '{cut_off_file_name}' and length(fileName) = 12
                 """
             self.execute_single(sql=sql, conn=conn)
-
-            # Commit the transaction
-            conn.commit()
-        finally:
-            conn.close()
@@ -46,3 +46,17 @@ class IndexSearch:
         """
 
         return self.dbaccessor.find_company_by_name(name_part=name_part)
+
+    def search_companies(self, query: str, limit: int = 20) -> pd.DataFrame:
+        """
+        Searches companies by the words in the query and ranks the results, e.g. for a search
+        as you type. Upper/lower case is ignored, former names are also found.
+
+        Args:
+            query: the search query, like "micro corp"
+            limit: the maximum number of results
+
+        Returns:
+            pd.DataFrame: with columns 'name', 'cik'
+        """
+        return self.dbaccessor.search_companies(query=query, limit=limit)
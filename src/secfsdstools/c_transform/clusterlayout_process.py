@@ -0,0 +1,111 @@
+"""Rewrites existing parquet folders in the clustered layout (sorted by adsh/tag, bounded row groups)"""
+
+import logging
+import os
+from pathlib import Path
+from typing import List
+
+from secfsdstools.a_utils.constants import CLUSTER_COLS_MAP, NUM_TXT, PRE_TXT, SUB_TXT
+from secfsdstools.a_utils.fileutils import cluster_parquet_file, get_directories_in_directory, is_clustered_parquet_file
+from secfsdstools.c_automation.task_framework import AbstractProcessPoolProcess, Task
+
+LOGGER = logging.getLogger(__name__)
+
+CLUSTERED_FILES: List[str] = [SUB_TXT, PRE_TXT, NUM_TXT]
+
+
+def get_unclustered_files(folder: Path) -> List[str]:
+    """
+    returns the names (without the .parquet ending) of the files in the folder that are not
+    written in the clustered layout yet.
+
+    Args:
+        folder: folder containing the sub.txt.parquet, pre.txt.parquet, and num.txt.parquet files
+
+    Returns:
+        List[str]: the file names, e.g. ['pre.txt', 'num.txt']
+    """
+    unclustered: List[str] = []
+    for file in CLUSTERED_FILES:
+        file_path = folder / f"{file}.parquet"
+        if file_path.exists() and not is_clustered_parquet_file(str(file_path)):
+            unclustered.append(file)
+    return unclustered
+
+
+class ClusterLayoutTask:
+    """
+    Rewrites the parquet files inside a single folder (e.g. parquet/quarter/2010q1.zip) in place
+    in the clustered layout.
+    """
+
+    def __init__(self, folder_path: Path, files: List[str]):
+        """
+        Constructor.
+        Args:
+            folder_path: folder that contains the parquet files
+            files: names of the files that have to be rewritten, e.g. ['pre.txt', 'num.txt']
+        """
+        self.folder_path = folder_path
+        self.files = files
+
+    def prepare(self):
+        """nothing to prepare."""
+
+    def execute(self):
+        """rewrite every file. Every file is replaced atomically, see cluster_parquet_file."""
+        for file in self.files:
+            cluster_parquet_file(file=str(self.folder_path / f"{file}.parquet"), sort_by=CLUSTER_COLS_MAP[file])
+
+    def commit(self) -> str:
+        """nothing special to do."""
+        return "success"
+
+    def exception(self, exception) -> str:
+        """log the problem. the original files are left untouched."""
+        LOGGER.error("failed to rewrite %s in clustered layout", self.folder_path)
+        return f"failed {exception}"
+
+    def __str__(self) -> str:
+        return f"ClusterLayoutTask(folder_path: {self.folder_path})"
+
+
+class ClusterLayoutProcess(AbstractProcessPoolProcess):
+    """
+    Migrates parquet folders which were created before the clustered layout was introduced.
+    Folders that already are in the clustered layout are detected by the metadata in the footer
+    of the parquet files and are skipped, so running this process repeatedly is cheap.
+    """
+
+    def __init__(self, parquet_dir: str, file_type: str, execute_serial: bool = False):
+        """
+        Constructor.
+        Args:
+            parquet_dir: base directory of the parquet files
+            file_type: file_type, either 'quarter' or 'daily' used to define the
+                       subfolder in the parquet dir
+        """
+        super().__init__(execute_serial=execute_serial, chunksize=0)
+
+        self.parquet_dir = parquet_dir
+        self.file_type = file_type
+
+    def calculate_tasks(self) -> List[Task]:
+        """
+        Returns:
+            List[ClusterLayoutTask]: one task for every folder with files that have to be rewritten
+        """
+        base_path = Path(self.parquet_dir) / self.file_type
+        tasks: List[Task] = []
+
+        for folder_name in get_directories_in_directory(str(base_path)):
+            folder_path = base_path / folder_name
+            # folders without a num file are not completely transformed yet
+            if not os.path.exists(folder_path / f"{NUM_TXT}.parquet"):
+                continue
+
+            files = get_unclustered_files(folder_path)
+            if len(files) > 0:
+                tasks.append(ClusterLayoutTask(folder_path=folder_path, files=files))
+
+        return tasks
@@ -0,0 +1,148 @@
+"""
+Joins the pre.txt and num.txt parquet files of every transformed folder once and stores the
+result as pre_num.txt parquet file inside the same folder, so that the data can directly be
+loaded as JoinedDataBag without merging pre and num again.
+"""
+
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+import pyarrow.parquet as pq
+
+from secfsdstools.a_utils.constants import NUM_TXT, PRE_NUM_TXT
+from secfsdstools.a_utils.fileutils import get_directories_in_directory
+from secfsdstools.c_automation.task_framework import AbstractThreadProcess, Task
+from secfsdstools.c_index.indexdataaccess import IndexFileProcessingState, ParquetDBIndexingAccessor
+
+LOGGER = logging.getLogger(__name__)
+
+
+class JoinedParquetTask:
+    """
+    Creates the pre_num.txt parquet file inside a single folder (e.g. parquet/quarter/2010q1.zip)
+    and registers the folder in the index_parquet_joined_state table.
+    """
+    PROCESSED_STR: str = 'processed'
+
+    def __init__(self,
+                 dbaccessor: ParquetDBIndexingAccessor,
+                 folder_path: Path,
+                 process_time: str,
+                 partitions: int = 8):
+        """
+        Constructor.
+        Args:
+            dbaccessor: dbaccessor helper class
+            folder_path: folder that contains the pre.txt and num.txt parquet files
+            process_time: process time that is used as timestamp in the created table entry
+            partitions: number of partitions that are used to join pre and num
+        """
+        self.dbaccessor = dbaccessor
+        self.folder_path = folder_path
+        self.process_time = process_time
+        self.partitions = partitions
+
+        self.target_file = folder_path / f"{PRE_NUM_TXT}.parquet"
+        self.tmp_file = folder_path / f"tmp_{PRE_NUM_TXT}.parquet"
+
+    def prepare(self):
+        """nothing to prepare."""
+
+    def execute(self):
+        """
+        joins pre and num into a tmp file, which is renamed to the pre_num.txt parquet file
+        afterward. so if the pre_num.txt parquet file exists, it is complete.
+        """
+        # importing d_container on module level would trigger the update check, which imports
+        # this module itself
+        # pylint: disable=C0415
+        from secfsdstools.d_container.partitionedjoin import join_pre_num_file_based
+
+        if self.target_file.exists():
+            # the file was written, but the folder was not registered
+            return
+
+        join_pre_num_file_based(path_to_bag=self.folder_path,
+                                target_file=self.tmp_file,
+                                partitions=self.partitions)
+        os.replace(self.tmp_file, self.target_file)
+
+    def commit(self) -> str:
+        """register the folder in the index."""
+        self.dbaccessor.insert_indexjoined(
+            IndexFileProcessingState(
+                fileName=self.folder_path.name,
+                fullPath=str(self.folder_path),
+                status=self.PROCESSED_STR,
+                entries=pq.read_metadata(self.target_file).num_rows,
+                processTime=self.process_time
+            ))
+        return "success"
+
+    def exception(self, exception) -> str:
+        """remove the tmp file, the original files are left untouched."""
+        LOGGER.error("failed to join pre and num in %s", self.folder_path)
+        self.tmp_file.unlink(missing_ok=True)
+        return f"failed {exception}"
+
+    def __str__(self) -> str:
+        return f"JoinedParquetTask(folder_path: {self.folder_path})"
+
+
+class JoinedParquetProcess(AbstractThreadProcess):
+    """
+    Materializes the join of pre and num for every folder that has not been joined yet.
+    Consumers which need joined data, like ZipCollector.collect_joined, read the pre_num.txt
+    parquet file directly instead of joining pre and num on every run.
+
+    The join itself is file based and uses threads, so the folders are processed one after
+    the other by default.
+    """
+
+    def __init__(self, db_dir: str, parquet_dir: str, file_type: str, execute_serial: bool = True,
+                 partitions: int = 8):
+        """
+        Constructor.
+        Args:
+            db_dir: location of the dbfile.
+            parquet_dir: base directory of the parquet files
+            file_type: file_type, either 'quarter' or 'daily' used to define the
+                       subfolder in the parquet dir
+            partitions: number of partitions that are used to join pre and num of a folder
+        """
+        super().__init__(execute_serial=execute_serial, chunksize=0)
+
+        self.dbaccessor = ParquetDBIndexingAccessor(db_dir=db_dir)
+        self.parquet_dir = parquet_dir
+        self.file_type = file_type
+        self.partitions = partitions
+
+        # get current datetime in UTC
+        utc_dt = datetime.now(timezone.utc)
+        # convert UTC time to ISO 8601 format string
+        self.process_time = utc_dt.astimezone().isoformat()
+
+    def calculate_tasks(self) -> List[Task]:
+        """
+        Returns:
+            List[JoinedParquetTask]: one task for every folder that is not registered as joined
+        """
+        base_path = Path(self.parquet_dir) / self.file_type
+        joined = {x.fileName for x in self.dbaccessor.read_all_indexjoined()}
+        tasks: List[Task] = []
+
+        for folder_name in get_directories_in_directory(str(base_path)):
+            folder_path = base_path / folder_name
+            # folders without a num file are not completely transformed yet
+            if folder_name in joined or not os.path.exists(folder_path / f"{NUM_TXT}.parquet"):
+                continue
+
+            tasks.append(JoinedParquetTask(dbaccessor=self.dbaccessor,
+                                           folder_path=folder_path,
+                                           process_time=self.process_time,
+                                           partitions=self.partitions))
+
+        return tasks
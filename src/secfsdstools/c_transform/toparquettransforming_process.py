@@ -6,21 +6,46 @@ import logging
 import os
 import shutil
 from pathlib import Path
-from typing import List
-
-from secfsdstools.a_utils.constants import NUM_DTYPE, NUM_TXT, PRE_DTYPE, PRE_TXT, SUB_DTYPE, SUB_TXT
-from secfsdstools.a_utils.fileutils import get_directories_in_directory, read_df_from_file_in_zip
+from typing import Dict, List, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from secfsdstools.a_utils.constants import CLUSTER_COLS_MAP, NUM_TXT, PA_SCHEMA_MAP, PRE_TXT, SUB_TXT
+from secfsdstools.a_utils.fileutils import (
+    get_directories_in_directory,
+    iter_batches_from_file_in_zip,
+    write_batches_clustered,
+)
 from secfsdstools.c_automation.task_framework import AbstractProcessPoolProcess, Task
 
 LOGGER = logging.getLogger(__name__)
 
+# tags in the num.txt of the daily files which contain strings instead of numbers in the value column
+DAILY_STRING_VALUE_TAGS: List[str] = ["SecurityExchangeName", "TradingSymbol"]
+
+
+def get_csv_column_types(file: str) -> Dict[str, pa.DataType]:
+    """
+    returns the types with which the columns of the csv file are read.
+    they are based on the PA_SCHEMA_MAP, only the value column in num.txt is read as string, since
+    the daily files also contain strings in that column.
+    """
+    column_types = {field.name: field.type for field in PA_SCHEMA_MAP[file]}
+    if file == NUM_TXT:
+        column_types["value"] = pa.string()
+    return column_types
+
 
 class ToParquetTransformTask:
     """
     Transforms a zip file containing csv files to a folder with parquet files.
     """
 
-    def __init__(self, zip_file_path: str, parquet_dir: str, file_type: str, keep_zip_files: bool):
+    def __init__(
+        self, zip_file_path: str, parquet_dir: str, file_type: str, keep_zip_files: bool, clustered_layout: bool = True
+    ):
         """
         Constructor.
         Args:
@@ -30,12 +55,16 @@ class ToParquetTransformTask:
                        subfolder in the parquet dir
             keep_zip_files: flag that indicates whether the zipfiles should be deleted after
                             successful transformation
+            clustered_layout: flag that indicates whether the parquet files are written sorted by
+                            adsh (and tag) in bounded row groups, so that filters on adsh only
+                            have to read the matching row groups.
         """
         self.zip_file_name = os.path.basename(zip_file_path)
         self.zip_file_path = zip_file_path
         self.parquet_dir = parquet_dir
         self.file_type = file_type
         self.keep_zip_files = keep_zip_files
+        self.clustered_layout = clustered_layout
 
         self.file_path = Path(self.parquet_dir) / self.file_type / self.zip_file_name
 
@@ -69,27 +98,69 @@ class ToParquetTransformTask:
     def __str__(self) -> str:
         return f"ToParquetTransformTask(zip_file_name: {self.zip_file_name})"
 
-    def _inner_transform_zip_file(self, target_path: Path, zip_file_path):
-        sub_df = read_df_from_file_in_zip(zip_file=zip_file_path, file_to_extract=SUB_TXT, dtype=SUB_DTYPE)
-        pre_df = read_df_from_file_in_zip(zip_file=zip_file_path, file_to_extract=PRE_TXT, dtype=PRE_DTYPE)
-
-        num_df = read_df_from_file_in_zip(zip_file=zip_file_path, file_to_extract=NUM_TXT, dtype=NUM_DTYPE)
+    def _conform_table(self, table: Union[pa.Table, pa.RecordBatch], file: str) -> pa.Table:
+        """
+        applies the necessary corrections to the read data and casts it to the schema
+        defined in PA_SCHEMA_MAP. Works on complete tables as well as on single batches.
+        """
+        if isinstance(table, pa.RecordBatch):
+            table = pa.Table.from_batches([table])
 
         # ensure period columns are valid ints
         # some report types don't have a value set for period
-        sub_df["period"] = sub_df["period"].fillna(-1).astype(int)
-        # same for line
-        pre_df["line"] = pre_df["line"].fillna(-1).astype(int)
+        if file == SUB_TXT:
+            table = table.set_column(
+                table.schema.get_field_index("period"), "period", pc.fill_null(table["period"], -1)
+            )
 
-        # special handling for field value in num, since the daily files can also contain strings
-        if self.file_type == "daily":
-            num_df = num_df[~num_df.tag.isin(["SecurityExchangeName", "TradingSymbol"])]
+        # same for line
+        if file == PRE_TXT:
+            table = table.set_column(table.schema.get_field_index("line"), "line", pc.fill_null(table["line"], -1))
+
+        if file == NUM_TXT:
+            # special handling for field value in num, since the daily files can also contain strings
+            if self.file_type == "daily":
+                table = table.filter(pc.invert(pc.is_in(table["tag"], value_set=pa.array(DAILY_STRING_VALUE_TAGS))))
+            table = table.set_column(
+                table.schema.get_field_index("value"), "value", pc.cast(table["value"], pa.float64())
+            )
 
-        num_df["value"] = num_df["value"].astype(float)
+        # daily files don't contain all the columns of the quarterly files, therefore only the
+        # fields of the schema that are present are used. the column order of the file is kept.
+        schema = PA_SCHEMA_MAP[file]
+        fields = [schema.field(field.name) if field.name in schema.names else field for field in table.schema]
+        return table.cast(pa.schema(fields))
+
+    def _transform_file(self, target_path: Path, zip_file_path: str, file: str):
+        target_file = str(target_path / f"{file}.parquet")
+        column_types = get_csv_column_types(file)
+
+        # the content is streamed batch by batch, so that only one batch is held in memory
+        tables = (
+            self._conform_table(batch, file)
+            for batch in iter_batches_from_file_in_zip(
+                zip_file=zip_file_path, file_to_extract=file, column_types=column_types
+            )
+        )
+
+        if self.clustered_layout:
+            # sorting needs at most CLUSTER_MAX_ROWS_IN_MEMORY rows in memory at once
+            write_batches_clustered(batches=tables, target_file=target_file, sort_by=CLUSTER_COLS_MAP[file])
+            return
+
+        writer = None
+        try:
+            for table in tables:
+                if writer is None:
+                    writer = pq.ParquetWriter(target_file, table.schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
 
-        sub_df.to_parquet(target_path / f"{SUB_TXT}.parquet")
-        pre_df.to_parquet(target_path / f"{PRE_TXT}.parquet")
-        num_df.to_parquet(target_path / f"{NUM_TXT}.parquet")
+    def _inner_transform_zip_file(self, target_path: Path, zip_file_path):
+        for file in [SUB_TXT, PRE_TXT, NUM_TXT]:
+            self._transform_file(target_path=target_path, zip_file_path=zip_file_path, file=file)
 
 
 class ToParquetTransformerProcess(AbstractProcessPoolProcess):
@@ -99,7 +170,13 @@ class ToParquetTransformerProcess(AbstractProcessPoolProcess):
     """
 
     def __init__(
-        self, zip_dir: str, parquet_dir: str, file_type: str, keep_zip_files: bool, execute_serial: bool = False
+        self,
+        zip_dir: str,
+        parquet_dir: str,
+        file_type: str,
+        keep_zip_files: bool,
+        execute_serial: bool = False,
+        clustered_layout: bool = True,
     ):
         """
         Constructor.
@@ -108,6 +185,8 @@ class ToParquetTransformerProcess(AbstractProcessPoolProcess):
             parquet_dir: target base directory for the parguet files
             file_type: file_type, either 'quarter' or 'daily' used to define the
                        subfolder in the parquet dir
+            clustered_layout: write the parquet files sorted by adsh (and tag) in bounded
+                       row groups. see ToParquetTransformTask
         """
         super().__init__(execute_serial=execute_serial, chunksize=0)
 
@@ -115,6 +194,7 @@ class ToParquetTransformerProcess(AbstractProcessPoolProcess):
         self.parquet_dir = parquet_dir
         self.file_type = file_type
         self.keep_zip_files = keep_zip_files
+        self.clustered_layout = clustered_layout
 
     def _calculate_not_transformed(self) -> List[str]:
         """
@@ -149,6 +229,7 @@ class ToParquetTransformerProcess(AbstractProcessPoolProcess):
                 parquet_dir=self.parquet_dir,
                 file_type=self.file_type,
                 keep_zip_files=self.keep_zip_files,
+                clustered_layout=self.clustered_layout,
             )
             for zip_file_path in not_transformed_paths
         ]
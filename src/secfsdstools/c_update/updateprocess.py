@@ -22,6 +22,8 @@ from secfsdstools.c_automation.task_framework import AbstractProcess, execute_pr
 from secfsdstools.c_daily.dailypreparation_process import DailyPreparationProcess
 from secfsdstools.c_download.secdownloading_process import SecDownloadingProcess
 from secfsdstools.c_index.indexing_process import ReportParquetIndexerProcess
+from secfsdstools.c_transform.clusterlayout_process import ClusterLayoutProcess
+from secfsdstools.c_transform.joinedparquet_process import JoinedParquetProcess
 from secfsdstools.c_transform.toparquettransforming_process import ToParquetTransformerProcess
 
 LOGGER = logging.getLogger(__name__)
@@ -158,6 +160,7 @@ class Updater:
         self.post_update_hook = config.post_update_hook
         self.post_update_processes = config.post_update_processes
         self.daily_processing = config.daily_processing
+        self.build_joined_parquet = config.build_joined_parquet
 
     def _check_for_update(self) -> bool:
         """checks if a new update check should be conducted."""
@@ -196,6 +199,16 @@ class Updater:
             )
         )
 
+        # rewrite parquet folders created before the clustered layout was introduced.
+        # already clustered folders are skipped.
+        process_list.append(
+            ClusterLayoutProcess(
+                parquet_dir=self.parquet_dir,
+                file_type="quarter",
+                execute_serial=self.no_parallel_processing,
+            )
+        )
+
         # index sec zip files
         process_list.append(
             ReportParquetIndexerProcess(
@@ -206,6 +219,17 @@ class Updater:
             )
         )
 
+        # materialize the join of pre and num once per quarter, so that joined data
+        # can be loaded without merging pre and num on every run.
+        if self.build_joined_parquet:
+            process_list.append(
+                JoinedParquetProcess(
+                    db_dir=self.db_dir,
+                    parquet_dir=self.parquet_dir,
+                    file_type="quarter",
+                )
+            )
+
         if self.daily_processing:
             dailyprocess = DailyPreparationProcess(
                 db_dir=self.db_dir, parquet_dir=self.parquet_dir, daily_dir=self.daily_dld_dir
@@ -222,6 +246,12 @@ class Updater:
                         file_type="daily",
                         execute_serial=self.no_parallel_processing,
                     ),
+                    # rewrite daily parquet folders created before the clustered layout was introduced
+                    ClusterLayoutProcess(
+                        parquet_dir=self.parquet_dir,
+                        file_type="daily",
+                        execute_serial=self.no_parallel_processing,
+                    ),
                     # index daily data
                     ReportParquetIndexerProcess(
                         db_dir=self.db_dir,
@@ -3,15 +3,20 @@ Defines the container that keeps the data of sub.txt, num.txt, and  pre.txt toge
 """
 import logging
 import os
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Generic, List, Optional, TypeVar
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar
 
 import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
-from secfsdstools.a_utils.constants import NUM_TXT, PRE_NUM_TXT, PRE_TXT, SUB_TXT
-from secfsdstools.a_utils.fileutils import check_dir, concat_parquet_files
+from secfsdstools.a_utils.constants import KEY_COLS_MAP, NUM_TXT, PRE_NUM_TXT, PRE_TXT, SUB_TXT
+from secfsdstools.a_utils.fileutils import check_dir, concat_parquet_files, read_df_from_parquet
 from secfsdstools.d_container.filter import FilterBase
+from secfsdstools.d_container.lazydatabag import LazyDataBag
+from secfsdstools.d_container.partitionedjoin import join_bag_file_based
 from secfsdstools.d_container.presentation import Presenter
 
 RAW = TypeVar('RAW', bound='RawDataBag')
@@ -45,6 +50,108 @@ def get_pre_num_filters(adshs: Optional[List[str]],
     return pre_filter, num_filter
 
 
+def add_pushdown_predicates(filters: Optional[List[Tuple]], file: str,
+                            pushdown_filters: Optional[List[FilterBase]]):
+    """
+    adds the arrow predicates of the pushdown_filters for the given file to the filter
+    definitions, so that they are applied while reading the parquet file.
+
+    Args:
+        filters: filter definitions as list of tuples, e.g. [('adsh', 'in', [...])]
+        file: the file type (SUB_TXT, PRE_TXT, NUM_TXT, PRE_NUM_TXT)
+        pushdown_filters: filters that support get_pushdown_predicates. raw filters can also
+                          be used for PRE_NUM_TXT, their pre and num predicates are combined.
+
+    Returns:
+        the unchanged list of tuples if there is no predicate for the file, otherwise a single
+        pyarrow expression. both can be passed as filters to read_df_from_parquet.
+    """
+    predicates: List[pc.Expression] = []
+    for pushdown_filter in pushdown_filters or []:
+        filter_predicates = pushdown_filter.get_pushdown_predicates()
+        if filter_predicates is None:
+            raise ValueError(f"filter {type(pushdown_filter).__name__} cannot be pushed down")
+        if file in filter_predicates:
+            predicates.append(filter_predicates[file])
+        elif file == PRE_NUM_TXT:
+            # a raw filter: a joined row only exists if its pre and its num row pass the filter
+            predicates.extend(filter_predicates[x] for x in [PRE_TXT, NUM_TXT] if x in filter_predicates)
+
+    if len(predicates) == 0:
+        return filters
+
+    if filters:
+        predicates.insert(0, pq.filters_to_expression(filters))
+
+    expression = predicates[0]
+    for predicate in predicates[1:]:
+        expression = expression & predicate
+    return expression
+
+
+def get_columns_with_keys(file: str, columns: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    adds the key columns (see KEY_COLS_MAP) of the file to the requested columns.
+    the key columns are always needed to join, concat, and filter the data.
+
+    Args:
+        file: the file type (SUB_TXT, PRE_TXT, NUM_TXT, PRE_NUM_TXT)
+        columns: the requested columns, None means all columns
+
+    Returns:
+        Optional[List[str]]: the columns to load, None if all columns have to be loaded
+    """
+    if columns is None:
+        return None
+    return KEY_COLS_MAP[file] + [col for col in columns if col not in KEY_COLS_MAP[file]]
+
+
+def align_categoricals(dfs: List[pd.DataFrame], columns: Optional[List[str]] = None) -> List[pd.DataFrame]:
+    """
+    ensures that columns which are categorical in all dataframes use the same categories.
+    pandas turns categorical columns with different categories into object columns when
+    the dataframes are concatenated or merged. This is prevented by unifying the categories.
+
+    Args:
+        dfs: the dataframes
+        columns: optional list of columns to consider, if None, all columns are considered
+
+    Returns:
+        List[pd.DataFrame]: the dataframes with unified categories
+    """
+    if len(dfs) < 2:
+        return dfs
+
+    if columns is None:
+        columns = list(dfs[0].columns)
+
+    cat_columns = [col for col in columns
+                   if all(col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype) for df in dfs)]
+
+    if not cat_columns:
+        return dfs
+
+    dfs = [df.copy(deep=False) for df in dfs]
+    for col in cat_columns:
+        categories = pd.Index(pd.concat([pd.Series(df[col].cat.categories) for df in dfs]).unique())
+        for df in dfs:
+            df[col] = df[col].cat.set_categories(categories)
+    return dfs
+
+
+def concat_dataframes(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    concatenates the dataframes and keeps categorical columns categorical.
+
+    Args:
+        dfs: the dataframes to concat
+
+    Returns:
+        pd.DataFrame: the concatenated dataframe with a new index
+    """
+    return pd.concat(align_categoricals(dfs), ignore_index=True)
+
+
 def concat_bags_file_based_internal(paths_to_concat: List[Path],
                                     target_path: Path,
                                     file_list: List[str],
@@ -88,7 +195,7 @@ def concat_bags_file_based_internal(paths_to_concat: List[Path],
         sub_df.to_parquet(target_path / f'{SUB_TXT}.parquet')
 
 
-class DataBagBase(Generic[T]):
+class DataBagBase(ABC, Generic[T]):
     """
     Base class for the DataBag types
     """
@@ -121,6 +228,55 @@ class DataBagBase(Generic[T]):
         """
         return bagfilter.filter(self)
 
+    def lazy(self) -> LazyDataBag[T]:
+        """
+        returns a LazyDataBag for this bag. filters applied on the LazyDataBag are just
+        recorded and the filtered bag is created only once, when its content is accessed:
+        bag.lazy()[filter1][filter2].materialize() is equal to bag[filter1][filter2]
+
+        Returns:
+            LazyDataBag: the lazy bag wrapping this bag
+        """
+        return LazyDataBag(self)
+
+    @classmethod
+    @abstractmethod
+    def create(cls, **dataframes: pd.DataFrame) -> T:
+        """
+        creates a new bag of this type. the names of the parameters are the keys of the
+        dictionary returned by get_dataframes.
+
+        Args:
+            dataframes: the dataframes of the new bag
+
+        Returns:
+            T: the new bag
+        """
+
+    @abstractmethod
+    def get_dataframes(self) -> Dict[str, pd.DataFrame]:
+        """
+        returns the dataframes of the bag. the keys are the names of the attributes, resp. the
+        names of the parameters of the create method.
+
+        Returns:
+            Dict[str, pd.DataFrame]: the dataframes of the bag
+        """
+
+    def apply_masks(self, masks: Dict[str, pd.Series]) -> T:
+        """
+        creates a new bag, in which only the rows selected by the boolean masks are contained.
+        dataframes without a mask are taken over as they are.
+
+        Args:
+            masks: the mask per dataframe, the key is the name of the dataframe attribute
+
+        Returns:
+            T: the databag with the filtered content
+        """
+        return self.create(**{name: df[masks[name]] if name in masks else df
+                              for name, df in self.get_dataframes().items()})
+
     def present(self, presenter: Presenter[T]) -> pd.DataFrame:
         """
         apply a presenter
@@ -131,7 +287,9 @@ class DataBagBase(Generic[T]):
     def load_sub_df_by_filter(target_path: str,
                               ciks: Optional[List[int]] = None,
                               adshs: Optional[List[str]] = None,
-                              forms: Optional[List[str]] = None) -> pd.DataFrame:
+                              forms: Optional[List[str]] = None,
+                              categorical: bool = False,
+                              columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
         loads the sub_txt datafrome from the target_path by directly applying the
         defined filters during loading.
@@ -141,6 +299,8 @@ class DataBagBase(Generic[T]):
             ciks: optional list of cik numbers to filter for during loading
             forms: optional list of forms (10-K, 10-Q) to filter for during loading
             adshs: optional list of adhs to filter during the loading
+            categorical: load columns with low cardinality as categoricals
+            columns: optional list of columns to load, the key columns are always loaded
 
         Returns:
             pd.DataFrame the loaded sub_df content
@@ -157,8 +317,10 @@ class DataBagBase(Generic[T]):
         if sub_filters:
             LOGGER.info("apply sub_df filter: %s", sub_filters)
 
-        sub_df = pd.read_parquet(os.path.join(target_path, f'{SUB_TXT}.parquet'),
-                                 filters=sub_filters if sub_filters else None)
+        sub_df = read_df_from_parquet(os.path.join(target_path, f'{SUB_TXT}.parquet'),
+                                      filters=sub_filters if sub_filters else None,
+                                      categorical=categorical,
+                                      columns=get_columns_with_keys(SUB_TXT, columns))
 
         return sub_df
 
@@ -170,7 +332,7 @@ class JoinedDataBag(DataBagBase[JOINED]):
     """
 
     @classmethod
-    def create(cls, sub_df: pd.DataFrame, pre_num_df: pd.DataFrame) -> JOINED:
+    def create(cls, sub_df: pd.DataFrame, pre_num_df: pd.DataFrame) -> JOINED:  # pylint: disable=W0221
         """
         create a new JoinedDataBag.
 
@@ -194,6 +356,15 @@ class JoinedDataBag(DataBagBase[JOINED]):
         self.sub_df = sub_df
         self.pre_num_df = pre_num_df
 
+    def get_dataframes(self) -> Dict[str, pd.DataFrame]:
+        """
+        returns the sub and the joined pre_num dataframe.
+
+        Returns:
+            Dict[str, pd.DataFrame]: the dataframes by attribute name
+        """
+        return {'sub_df': self.sub_df, 'pre_num_df': self.pre_num_df}
+
     def get_sub_copy(self) -> pd.DataFrame:
         """
         Returns a copy of the sub dataframe.
@@ -243,7 +414,10 @@ class JoinedDataBag(DataBagBase[JOINED]):
              adshs_filter: Optional[List[str]] = None,
              forms_filter: Optional[List[str]] = None,
              stmt_filter: Optional[List[str]] = None,
-             tag_filter: Optional[List[str]] = None) -> JOINED:
+             tag_filter: Optional[List[str]] = None,
+             categorical: bool = False,
+             columns: Optional[List[str]] = None,
+             pushdown_filters: Optional[List[FilterBase]] = None) -> JOINED:
         """
             Loads the content of the current bag at the specified location.
 
@@ -261,12 +435,22 @@ class JoinedDataBag(DataBagBase[JOINED]):
             adshs_filter: optional list of adhs to filter during the laoding
             stmt_filter: optional list of stmts (BS, IS, CF, ..) to filter during the loading
             tag_filter: optional list of tags to filter during the loading
+            categorical: load columns with low cardinality (tag, version, uom, stmt, ..) as
+                         categoricals, which reduces the memory footprint considerably.
+            columns: optional list of columns to load from all files, for instance
+                     ['value', 'fye'] to skip the text columns like plabel or the addresses.
+                     Columns not present in a file are ignored, the key columns of every
+                     file (adsh, tag, version, ..) are always loaded.
+            pushdown_filters: optional list of joined filters, like MainCoregJoinedFilter(), which
+                     are directly applied while reading the parquet files
+                     (see FilterBase.get_pushdown_predicates).
 
         Returns:
             RawDataBag: the loaded Databag
         """
         sub_df = DataBagBase.load_sub_df_by_filter(
-            target_path=target_path, adshs=adshs_filter, forms=forms_filter, ciks=ciks_filter
+            target_path=target_path, adshs=adshs_filter, forms=forms_filter, ciks=ciks_filter,
+            categorical=categorical, columns=columns
         )
 
         # if the forms and/or ciks filter was applied, overwrite the adshs list,
@@ -296,11 +480,18 @@ class JoinedDataBag(DataBagBase[JOINED]):
             pre_num_filter.append(('tag', 'in', tag_filter))
             filter_log_str.append(str(('tag', 'in', tag_filter)))
 
-        if len(pre_num_filter) > 0:
+        if pushdown_filters:
+            filter_log_str.extend(type(x).__name__ for x in pushdown_filters)
+
+        if len(filter_log_str) > 0:
             LOGGER.info("apply pre_num_df filter: %s", filter_log_str)
 
-        pre_num_df = pd.read_parquet(os.path.join(target_path, f'{PRE_NUM_TXT}.parquet'),
-                                     filters=pre_num_filter if pre_num_filter else None)
+        pre_num_df = read_df_from_parquet(os.path.join(target_path, f'{PRE_NUM_TXT}.parquet'),
+                                          filters=add_pushdown_predicates(pre_num_filter or None,
+                                                                          PRE_NUM_TXT,
+                                                                          pushdown_filters),
+                                          categorical=categorical,
+                                          columns=get_columns_with_keys(PRE_NUM_TXT, columns))
 
         return JoinedDataBag.create(sub_df=sub_df, pre_num_df=pre_num_df)
 
@@ -321,8 +512,8 @@ class JoinedDataBag(DataBagBase[JOINED]):
         sub_dfs = [db.sub_df for db in bags]
         pre_num_dfs = [db.pre_num_df for db in bags]
 
-        sub_df = pd.concat(sub_dfs, ignore_index=True)
-        pre_num_df = pd.concat(pre_num_dfs, ignore_index=True)
+        sub_df = concat_dataframes(sub_dfs)
+        pre_num_df = concat_dataframes(pre_num_dfs)
 
         if drop_duplicates_sub_df:
             sub_df.drop_duplicates(inplace=True)
@@ -387,7 +578,7 @@ class RawDataBag(DataBagBase[RAW]):
     """
 
     @classmethod
-    def create(cls, sub_df: pd.DataFrame, pre_df: pd.DataFrame, num_df: pd.DataFrame) -> RAW:
+    def create(cls, sub_df: pd.DataFrame, pre_df: pd.DataFrame, num_df: pd.DataFrame) -> RAW:  # pylint: disable=W0221
         """
         create method for RawDataBag
         Args:
@@ -405,6 +596,15 @@ class RawDataBag(DataBagBase[RAW]):
         self.pre_df = pre_df
         self.num_df = num_df
 
+    def get_dataframes(self) -> Dict[str, pd.DataFrame]:
+        """
+        returns the sub, pre, and num dataframe.
+
+        Returns:
+            Dict[str, pd.DataFrame]: the dataframes by attribute name
+        """
+        return {'sub_df': self.sub_df, 'pre_df': self.pre_df, 'num_df': self.num_df}
+
     def copy_bag(self):
         """
         creates a bag with new copies of the internal dataframes.
@@ -453,14 +653,40 @@ class RawDataBag(DataBagBase[RAW]):
 
         """
 
+        join_cols = ['adsh', 'tag', 'version']
+
+        # categorical join columns have to use the same categories, otherwise they are
+        # converted to object columns by the merge
+        num_df, pre_df = align_categoricals([self.num_df, self.pre_df], columns=join_cols)
+
         # merge num and pre together. only rows in num are considered for which entries in pre exist
-        pre_num_df = pd.merge(self.num_df,
-                              self.pre_df,
-                              on=['adsh', 'tag',
-                                  'version'])  # don't produce index_x and index_y columns
+        pre_num_df = pd.merge(num_df,
+                              pre_df,
+                              on=join_cols)  # don't produce index_x and index_y columns
 
         return JoinedDataBag.create(sub_df=self.sub_df, pre_num_df=pre_num_df)
 
+    @staticmethod
+    def join_filebased(path_to_bag: Path, target_path: Path, partitions: int = 16,
+                       max_workers: int = 2):
+        """
+        Joins the RawDataBag stored in path_to_bag and stores the JoinedDataBag into target_path.
+
+        It is directly working on the files: pre and num are split by adsh into partitions on
+        disk and every partition is joined independently. So the data of a concatenated bag
+        over many years can be joined without having num, pre, and the joined data in memory
+        at the same time. The order of the rows differs from the order produced by join.
+
+        Args:
+            path_to_bag (Path): path of the stored RawDataBag
+            target_path (Path): path to write the JoinedDataBag to
+            partitions (int, 16): number of partitions, the memory footprint is about the size
+                                  of the data divided by the partitions times the max_workers
+            max_workers (int, 2): number of partitions that are joined in parallel
+        """
+        join_bag_file_based(path_to_bag=Path(path_to_bag), target_path=Path(target_path),
+                            partitions=partitions, max_workers=max_workers)
+
     def statistics(self) -> RawDataBagStats:
         """
         calculate a few simple statistics of a report.
@@ -508,7 +734,10 @@ class RawDataBag(DataBagBase[RAW]):
              adshs_filter: Optional[List[str]] = None,
              forms_filter: Optional[List[str]] = None,
              stmt_filter: Optional[List[str]] = None,
-             tag_filter: Optional[List[str]] = None) -> RAW:
+             tag_filter: Optional[List[str]] = None,
+             categorical: bool = False,
+             columns: Optional[List[str]] = None,
+             pushdown_filters: Optional[List[FilterBase]] = None) -> RAW:
         """
             Loads the content of the current bag at the specified location.
 
@@ -528,12 +757,22 @@ class RawDataBag(DataBagBase[RAW]):
             adshs_filter: optional list of adhs to filter during the laoding
             stmt_filter: optional list of stmts (BS, IS, CF, ..) to filter during the loading
             tag_filter: optional list of tags to filter during the loading
+            categorical: load columns with low cardinality (tag, version, uom, stmt, ..) as
+                         categoricals, which reduces the memory footprint considerably.
+            columns: optional list of columns to load from all files, for instance
+                     ['value', 'fye'] to skip the text columns like plabel or the addresses.
+                     Columns not present in a file are ignored, the key columns of every
+                     file (adsh, tag, version, ..) are always loaded.
+            pushdown_filters: optional list of raw filters, like MainCoregRawFilter(), which
+                     are directly applied while reading the parquet files
+                     (see FilterBase.get_pushdown_predicates).
 
         Returns:
             RawDataBag: the loaded Databag
         """
         sub_df = DataBagBase.load_sub_df_by_filter(
-            target_path=target_path, adshs=adshs_filter, forms=forms_filter, ciks=ciks_filter
+            target_path=target_path, adshs=adshs_filter, forms=forms_filter, ciks=ciks_filter,
+            categorical=categorical, columns=columns
         )
 
         # if the forms and/or ciks filter was applied, overwrite the adshs list,
@@ -551,11 +790,20 @@ class RawDataBag(DataBagBase[RAW]):
         if len(pre_filter) > 0:
             LOGGER.info("apply pre_df filter: %s", pre_filter)
 
-        pre_df = pd.read_parquet(os.path.join(target_path, f'{PRE_TXT}.parquet'),
-                                 filters=pre_filter if pre_filter else None)
+        if pushdown_filters:
+            LOGGER.info("apply pushdown filters: %s", [type(x).__name__ for x in pushdown_filters])
 
-        num_df = pd.read_parquet(os.path.join(target_path, f'{NUM_TXT}.parquet'),
-                                 filters=num_filter if num_filter else None)
+        pre_df = read_df_from_parquet(os.path.join(target_path, f'{PRE_TXT}.parquet'),
+                                      filters=add_pushdown_predicates(pre_filter or None, PRE_TXT,
+                                                                      pushdown_filters),
+                                      categorical=categorical,
+                                      columns=get_columns_with_keys(PRE_TXT, columns))
+
+        num_df = read_df_from_parquet(os.path.join(target_path, f'{NUM_TXT}.parquet'),
+                                      filters=add_pushdown_predicates(num_filter or None, NUM_TXT,
+                                                                      pushdown_filters),
+                                      categorical=categorical,
+                                      columns=get_columns_with_keys(NUM_TXT, columns))
 
         return RawDataBag.create(sub_df=sub_df, pre_df=pre_df, num_df=num_df)
 
@@ -577,9 +825,9 @@ class RawDataBag(DataBagBase[RAW]):
         pre_dfs = [db.pre_df for db in bags]
         num_dfs = [db.num_df for db in bags]
 
-        sub_df = pd.concat(sub_dfs, ignore_index=True)
-        pre_df = pd.concat(pre_dfs, ignore_index=True)
-        num_df = pd.concat(num_dfs, ignore_index=True)
+        sub_df = concat_dataframes(sub_dfs)
+        pre_df = concat_dataframes(pre_dfs)
+        num_df = concat_dataframes(num_dfs)
 
         if drop_duplicates_sub_df:
             sub_df.drop_duplicates(inplace=True)
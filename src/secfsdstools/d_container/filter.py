@@ -2,7 +2,10 @@
 Base class for Filter implementations.
 """
 from abc import abstractmethod
-from typing import Generic, TypeVar
+from typing import Dict, Generic, Optional, TypeVar
+
+import pandas as pd
+import pyarrow.compute as pc
 
 T = TypeVar('T')
 
@@ -23,3 +26,53 @@ class FilterBase(Generic[T]):
             T: the new  bag with the filtered content
 
         """
+
+    def get_pushdown_predicates(self) -> Optional[Dict[str, pc.Expression]]:
+        """
+        returns the filter as arrow predicates per file (sub.txt, pre.txt, num.txt, pre_num.txt),
+        so that it can be applied directly while reading the parquet files.
+        only filters that don't depend on the content of another file can be expressed this way.
+        files without a predicate are not filtered.
+
+        Returns:
+            Optional[Dict[str, pc.Expression]]: the predicates by file name or None, if the
+                                                filter cannot be pushed down (default).
+        """
+        return None
+
+
+class MaskFilterBase(FilterBase[T]):
+    """
+    Base class for filters that just select rows of the dataframes in a bag. Instead of
+    creating the filtered bag, such a filter only returns a boolean mask per dataframe.
+
+    This allows a LazyDataBag to combine the masks of several chained filters and to select
+    the rows only once. Therefore, the mask of a dataframe has to be calculated row by row and
+    must only depend on the row itself and the content of the sub_df.
+    """
+
+    @abstractmethod
+    def get_masks(self, databag: T) -> Dict[str, pd.Series]:
+        """
+        calculates the boolean masks that define which rows of the dataframes of the bag are kept.
+
+        Args:
+            databag (T): the bag to calculate the masks for
+
+        Returns:
+            Dict[str, pd.Series]: the mask per dataframe, the key is the name of the dataframe
+                                  attribute (e.g. 'sub_df', 'num_df'). dataframes without a
+                                  mask are not filtered.
+        """
+
+    def filter(self, databag: T) -> T:
+        """
+        applies the masks returned by get_masks to the bag.
+
+        Args:
+            databag (T): the bag to apply the pathfilter to
+
+        Returns:
+            T: the new  bag with the filtered content
+        """
+        return databag.apply_masks(self.get_masks(databag))
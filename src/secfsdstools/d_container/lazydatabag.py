@@ -0,0 +1,127 @@
+"""
+Defines a lazy wrapper around the DataBags which just records the applied filters and creates
+the filtered bag only once, when the content is accessed.
+
+Applying filters on a normal bag, like bag[filter1][filter2][filter3], creates a new copy of
+the filtered dataframes for every filter. A LazyDataBag instead combines the masks of all
+filters which are implemented as MaskFilterBase into a single selection per dataframe,
+so that the rows are selected only once.
+"""
+from typing import Dict, Generic, Optional, TypeVar
+
+import numpy as np
+import pandas as pd
+
+from secfsdstools.d_container.filter import FilterBase, MaskFilterBase
+
+T = TypeVar('T')
+
+SUB_DF = 'sub_df'
+
+
+class LazyDataBag(Generic[T]):
+    """
+    Records the filters applied to a RawDataBag or JoinedDataBag and materializes the result
+    only once, when it is accessed.
+
+    The sub_df is always filtered directly, since it is small and the masks of the other
+    dataframes may depend on its content. For the other dataframes, the masks of the chained
+    filters are combined.
+
+    Note: the masks of all filters are calculated on the unfiltered dataframes (except the
+    sub_df), they are not applied in sequence. Therefore, the mask of a filter must not depend
+    on which rows of the same dataframe were removed by an earlier filter (e.g. a filter that
+    keeps the last row per adsh). This is what MaskFilterBase requires: the mask of a row may
+    only depend on the row itself and on the sub_df. Other filters have to be implemented as
+    FilterBase, they are applied on the materialized bag.
+
+    Filters that are not implemented as MaskFilterBase are supported as well. In that case, the
+    bag is materialized and the filter is applied directly on the materialized bag.
+
+    Access to any other attribute (like num_df, save, or join) is forwarded to the
+    materialized bag.
+    """
+
+    def __init__(self, databag: T, masks: Optional[Dict[str, np.ndarray]] = None,
+                 sub_df: Optional[pd.DataFrame] = None):
+        """
+        Constructor.
+
+        Args:
+            databag: the unfiltered bag
+            masks: the combined masks of the dataframes (except sub_df) of the databag
+            sub_df: the already filtered sub_df, if None, the sub_df of the databag is used
+        """
+        self._databag = databag
+        self._masks: Dict[str, np.ndarray] = masks if masks is not None else {}
+        self._sub_df = sub_df if sub_df is not None else getattr(databag, SUB_DF)
+        self._materialized: Optional[T] = None
+
+    def __getitem__(self, bagfilter: FilterBase[T]) -> 'LazyDataBag[T]':
+        """
+        records the filter, so that filters can be chained in a simple syntax:
+        bag[filter1][filter2] is equal to bag.filter(filter1).filter(filter2)
+
+        Args:
+            bagfilter: the filter to be applied
+
+        Returns:
+            LazyDataBag: the lazy bag containing the filter
+        """
+        return self.filter(bagfilter)
+
+    def filter(self, bagfilter: FilterBase[T]) -> 'LazyDataBag[T]':
+        """
+        records the filter and returns a new LazyDataBag. the masks of filters that are
+        implemented as MaskFilterBase are combined with the masks of the previous filters.
+        any other filter is applied directly on the materialized bag.
+
+        Args:
+            bagfilter: the filter to be applied
+
+        Returns:
+            LazyDataBag: the lazy bag containing the filter
+        """
+        if not isinstance(bagfilter, MaskFilterBase):
+            return LazyDataBag(bagfilter.filter(self.materialize()))
+
+        # the masks are calculated on the unfiltered dataframes, except for the sub_df
+        dataframes = self._databag.get_dataframes()
+        dataframes[SUB_DF] = self._sub_df
+        filter_view = self._databag.create(**dataframes)
+
+        new_masks = bagfilter.get_masks(filter_view)
+
+        sub_df = self._sub_df
+        if SUB_DF in new_masks:
+            sub_df = sub_df[new_masks[SUB_DF]]
+
+        masks = dict(self._masks)
+        for name, mask in new_masks.items():
+            if name == SUB_DF:
+                continue
+            mask = np.asarray(mask, dtype=bool)
+            masks[name] = masks[name] & mask if name in masks else mask
+
+        return LazyDataBag(self._databag, masks=masks, sub_df=sub_df)
+
+    def materialize(self) -> T:
+        """
+        creates the filtered bag. the rows of every dataframe are selected only once. the
+        result is cached, so the bag is only created on the first call.
+
+        Returns:
+            T: the filtered bag
+        """
+        if self._materialized is None:
+            dataframes = {name: df[self._masks[name]] if name in self._masks else df
+                          for name, df in self._databag.get_dataframes().items()}
+            dataframes[SUB_DF] = self._sub_df
+            self._materialized = self._databag.create(**dataframes)
+        return self._materialized
+
+    def __getattr__(self, name: str):
+        # only called, if the attribute was not found on the LazyDataBag itself
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
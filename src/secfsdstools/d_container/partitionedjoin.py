@@ -0,0 +1,205 @@
+"""
+Joins the pre.txt and num.txt parquet files of a RawDataBag directory into the pre_num.txt
+parquet file of a JoinedDataBag without loading the whole data into memory.
+
+Both files are streamed batch by batch and hash-partitioned by adsh into temporary parquet
+files. Since all entries of a report end up in the same partition, every partition can be
+joined independently. The joined partitions are written one after the other into the
+pre_num.txt parquet file, so only a few partitions have to be in memory at the same time.
+"""
+import logging
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Deque, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from secfsdstools.a_utils.constants import NUM_TXT, PA_SCHEMA_MAP, PRE_NUM_TXT, PRE_TXT, SUB_TXT
+
+LOGGER = logging.getLogger(__name__)
+
+JOIN_COLS = ['adsh', 'tag', 'version']
+
+PARTITION_BATCH_SIZE = 500_000
+
+
+def _get_partition_numbers(adsh: pa.Array, partitions: int) -> np.ndarray:
+    if pa.types.is_dictionary(adsh.type):
+        # only hash the dictionary and not every single entry
+        dictionary_numbers = _get_partition_numbers(adsh.dictionary, partitions)
+        return dictionary_numbers[adsh.indices.to_numpy(zero_copy_only=False)]
+
+    hashes = pd.util.hash_array(adsh.to_numpy(zero_copy_only=False), categorize=True)
+    return (hashes % partitions).astype(np.int64)
+
+
+def partition_parquet_file(file: str, target_dir: str, partitions: int) -> List[Optional[str]]:
+    """
+    splits the content of the parquet file by the hash of the adsh into partition files.
+
+    Args:
+        file: the parquet file to split, it has to contain the column adsh
+        target_dir: the directory into which the partition files are written
+        partitions: the number of partitions
+
+    Returns:
+        List[Optional[str]]: the path of the file for every partition, None for empty partitions
+    """
+    parquet_file = pq.ParquetFile(file)
+    file_name = Path(file).name
+
+    writers: List[Optional[pq.ParquetWriter]] = [None] * partitions
+    paths: List[Optional[str]] = [None] * partitions
+
+    try:
+        for batch in parquet_file.iter_batches(batch_size=PARTITION_BATCH_SIZE):
+            numbers = _get_partition_numbers(batch.column('adsh'), partitions)
+
+            # sort the rows by partition, so that every partition is a slice of the batch
+            order = np.argsort(numbers, kind='stable')
+            sorted_batch = pa.Table.from_batches([batch]).take(order)
+            counts = np.bincount(numbers, minlength=partitions)
+
+            offset = 0
+            for partition, count in enumerate(counts):
+                if count == 0:
+                    continue
+                if writers[partition] is None:
+                    paths[partition] = str(Path(target_dir) / f"{partition}_{file_name}")
+                    writers[partition] = pq.ParquetWriter(paths[partition], batch.schema)
+                writers[partition].write_table(sorted_batch.slice(offset, count))
+                offset += count
+    finally:
+        for writer in writers:
+            if writer is not None:
+                writer.close()
+
+    return paths
+
+
+def get_joined_schema(num_schema: pa.Schema, pre_schema: pa.Schema) -> pa.Schema:
+    """
+    the schema of the joined file. the columns are in the same order as with RawDataBag.join:
+    first the columns of num and then the columns of pre without the join columns. the types
+    are defined by PA_SCHEMA_MAP, dictionary encoded columns of other files are decoded.
+
+    Args:
+        num_schema: schema of the num.txt parquet file
+        pre_schema: schema of the pre.txt parquet file
+
+    Returns:
+        pa.Schema: the schema of the pre_num.txt parquet file
+    """
+    pre_num_schema = PA_SCHEMA_MAP[PRE_NUM_TXT]
+
+    fields: List[pa.Field] = []
+    for field in list(num_schema) + [x for x in pre_schema if x.name not in JOIN_COLS]:
+        if field.name in pre_num_schema.names:
+            fields.append(pre_num_schema.field(field.name))
+        elif pa.types.is_dictionary(field.type):
+            fields.append(pa.field(field.name, field.type.value_type))
+        else:
+            fields.append(field)
+    return pa.schema(fields)
+
+
+def join_partition(num_file: Optional[str], pre_file: Optional[str],
+                   schema: pa.Schema) -> Optional[pa.Table]:
+    """
+    joins the num and pre entries of a single partition.
+
+    Args:
+        num_file: the num partition file, None if the partition is empty
+        pre_file: the pre partition file, None if the partition is empty
+        schema: the schema of the joined table
+
+    Returns:
+        Optional[pa.Table]: the joined table, None if one side is empty
+    """
+    if num_file is None or pre_file is None:
+        return None
+
+    num_table = pq.read_table(num_file)
+    pre_table = pq.read_table(pre_file)
+
+    # same as the inner merge in RawDataBag.join
+    joined = num_table.join(pre_table, keys=JOIN_COLS, join_type='inner')
+    return joined.select(schema.names).cast(schema)
+
+
+def _write_result(writer: pq.ParquetWriter, future: Future):
+    table: Optional[pa.Table] = future.result()
+    if table is not None and table.num_rows > 0:
+        writer.write_table(table)
+
+
+def join_pre_num_file_based(path_to_bag: Path, target_file: Path, partitions: int = 16,
+                            max_workers: int = 2):
+    """
+    joins the pre.txt and num.txt parquet files of a RawDataBag directory and writes the result
+    into the target_file. the partitions are written into a temporary directory next to the
+    target_file, which is removed afterwards.
+
+    Args:
+        path_to_bag: directory of the RawDataBag
+        target_file: the parquet file to write the joined data into
+        partitions: number of partitions into which the data is split.
+                    the more data, the more partitions should be used.
+        max_workers: number of partitions that are joined in parallel
+    """
+    num_file = str(path_to_bag / f'{NUM_TXT}.parquet')
+    pre_file = str(path_to_bag / f'{PRE_TXT}.parquet')
+    schema = get_joined_schema(pq.read_schema(num_file), pq.read_schema(pre_file))
+
+    # the partitions are written next to the target, so they are on the same disk
+    tmp_dir = tempfile.mkdtemp(prefix="tmp_join_", dir=target_file.parent)
+    try:
+        LOGGER.info("partition %s into %d partitions", path_to_bag, partitions)
+        num_partitions = partition_parquet_file(num_file, tmp_dir, partitions)
+        pre_partitions = partition_parquet_file(pre_file, tmp_dir, partitions)
+
+        with pq.ParquetWriter(str(target_file), schema) as writer, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            # only max_workers partitions are joined at the same time, the results are
+            # written in the order of the partitions
+            pending: Deque[Future] = deque()
+            for num_partition, pre_partition in zip(num_partitions, pre_partitions):
+                pending.append(executor.submit(join_partition, num_partition, pre_partition,
+                                               schema))
+                if len(pending) >= max_workers:
+                    _write_result(writer, pending.popleft())
+
+            while pending:
+                _write_result(writer, pending.popleft())
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def join_bag_file_based(path_to_bag: Path, target_path: Path, partitions: int = 16,
+                        max_workers: int = 2):
+    """
+    creates a JoinedDataBag directory from a RawDataBag directory. the content of the pre.txt
+    and num.txt files is never loaded completely. the memory consumption is defined by the
+    size of a partition times the max_workers.
+
+    Args:
+        path_to_bag: directory of the RawDataBag
+        target_path: directory for the JoinedDataBag. the necessary directories will be created
+        partitions: number of partitions into which the data is split.
+                    the more data, the more partitions should be used.
+        max_workers: number of partitions that are joined in parallel
+    """
+    target_path.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(path_to_bag / f'{SUB_TXT}.parquet', target_path / f'{SUB_TXT}.parquet')
+
+    join_pre_num_file_based(path_to_bag=path_to_bag,
+                            target_file=target_path / f'{PRE_NUM_TXT}.parquet',
+                            partitions=partitions,
+                            max_workers=max_workers)
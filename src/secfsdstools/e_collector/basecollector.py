@@ -7,8 +7,62 @@ from typing import List, Optional, Tuple, Union
 
 import pandas as pd
 
-from secfsdstools.a_utils.constants import NUM_TXT, PRE_TXT, SUB_TXT
-from secfsdstools.d_container.databagmodel import RawDataBag, get_pre_num_filters
+from secfsdstools.a_utils.constants import NUM_TXT, PRE_NUM_TXT, PRE_TXT, SUB_TXT
+from secfsdstools.a_utils.fileutils import read_df_from_parquet
+from secfsdstools.a_utils.ipctransport import read_dataframes_from_ipc, remove_ipc_dir, write_dataframes_to_ipc
+from secfsdstools.a_utils.parallelexecution import ResultTransport
+from secfsdstools.d_container.databagmodel import (
+    JoinedDataBag,
+    RawDataBag,
+    add_pushdown_predicates,
+    get_columns_with_keys,
+    get_pre_num_filters,
+)
+from secfsdstools.d_container.filter import FilterBase
+
+
+def fill_na_with_empty_str(series: pd.Series) -> pd.Series:
+    """ replaces None/NaN entries with an empty string, also for categorical columns. """
+    if isinstance(series.dtype, pd.CategoricalDtype) and '' not in series.cat.categories:
+        series = series.cat.add_categories([''])
+    return series.fillna('')
+
+
+class RawDataBagIpcTransport(ResultTransport[RawDataBag]):
+    """
+    Hands the RawDataBags collected in worker processes back to the main process as Arrow IPC
+    files in shared memory, instead of pickling the dataframes through the pipe of the pool.
+    """
+
+    def dump(self, result: RawDataBag) -> str:
+        return write_dataframes_to_ipc({SUB_TXT: result.sub_df,
+                                        PRE_TXT: result.pre_df,
+                                        NUM_TXT: result.num_df})
+
+    def load(self, handle: str) -> RawDataBag:
+        dfs = read_dataframes_from_ipc(handle)
+        return RawDataBag.create(sub_df=dfs[SUB_TXT], pre_df=dfs[PRE_TXT], num_df=dfs[NUM_TXT])
+
+    def discard(self, handle: str):
+        remove_ipc_dir(handle)
+
+
+class JoinedDataBagIpcTransport(ResultTransport[JoinedDataBag]):
+    """
+    Hands the JoinedDataBags collected in worker processes back to the main process as Arrow
+    IPC files in shared memory, see RawDataBagIpcTransport.
+    """
+
+    def dump(self, result: JoinedDataBag) -> str:
+        return write_dataframes_to_ipc({SUB_TXT: result.sub_df,
+                                        PRE_NUM_TXT: result.pre_num_df})
+
+    def load(self, handle: str) -> JoinedDataBag:
+        dfs = read_dataframes_from_ipc(handle)
+        return JoinedDataBag.create(sub_df=dfs[SUB_TXT], pre_num_df=dfs[PRE_NUM_TXT])
+
+    def discard(self, handle: str):
+        remove_ipc_dir(handle)
 
 
 class BaseCollector(ABC):
@@ -18,17 +72,37 @@ class BaseCollector(ABC):
 
     def __init__(self, datapath: str,
                  stmt_filter: Optional[List[str]] = None,
-                 tag_filter: Optional[List[str]] = None):
+                 tag_filter: Optional[List[str]] = None,
+                 categorical: bool = False,
+                 columns: Optional[List[str]] = None,
+                 pushdown_filters: Optional[List[FilterBase[RawDataBag]]] = None):
+        """
+        Args:
+            datapath: folder with the parquet files of sub, pre, and num
+            stmt_filter: optional list of stmts (BS, IS, ...) to filter for during loading
+            tag_filter: optional list of tags to filter for during loading
+            categorical: load columns with low cardinality (tag, version, uom, ..)
+                         as categoricals, which reduces the memory footprint considerably.
+            columns: optional list of columns to load, the key columns of every file
+                     (adsh, tag, version, ..) are always loaded.
+            pushdown_filters: optional list of raw filters (like MainCoregRawFilter()) which
+                     are directly applied while reading the parquet files
+                     (see FilterBase.get_pushdown_predicates).
+        """
         self.datapath = datapath
         self.stmt_filter = stmt_filter
         self.tag_filter = tag_filter
+        self.categorical = categorical
+        self.columns = columns
+        self.pushdown_filters = pushdown_filters
 
     def _read_df_from_raw_parquet(self,
                                   file: str,
                                   filters=None) -> pd.DataFrame:
         try:
-            return pd.read_parquet(os.path.join(self.datapath, f'{file}.parquet'),
-                                   filters=filters)
+            return read_df_from_parquet(os.path.join(self.datapath, f'{file}.parquet'),
+                                        filters=filters, categorical=self.categorical,
+                                        columns=get_columns_with_keys(file, self.columns))
         except Exception as ex:
             print("Error reading file:", self.datapath, file, ex)
             raise ex
@@ -53,17 +127,19 @@ class BaseCollector(ABC):
                                                      tags=self.tag_filter)
 
         pre_df = self._read_df_from_raw_parquet(
-            file=PRE_TXT, filters=pre_filter if pre_filter else None
+            file=PRE_TXT,
+            filters=add_pushdown_predicates(pre_filter or None, PRE_TXT, self.pushdown_filters)
         )
 
         num_df = self._read_df_from_raw_parquet(
-            file=NUM_TXT, filters=num_filter if num_filter else None
+            file=NUM_TXT,
+            filters=add_pushdown_predicates(num_filter or None, NUM_TXT, self.pushdown_filters)
         )
 
         # pandas pivot works better if coreg and segments are not nan, so we set None values of
         # them to empty strings
-        num_df.loc[num_df.coreg.isna(), 'coreg'] = ''
-        num_df.loc[num_df.segments.isna(), 'segments'] = ''
+        num_df['coreg'] = fill_na_with_empty_str(num_df.coreg)
+        num_df['segments'] = fill_na_with_empty_str(num_df.segments)
 
         return RawDataBag.create(sub_df=sub_df, pre_df=pre_df, num_df=num_df)
 
@@ -5,7 +5,8 @@ from typing import List, Optional
 
 from secfsdstools.a_config.configmgt import ConfigurationManager
 from secfsdstools.a_config.configmodel import Configuration
-from secfsdstools.c_index.indexdataaccess import IndexReport, ParquetDBIndexingAccessor
+from secfsdstools.c_index.indexcache import get_index_accessor
+from secfsdstools.c_index.indexdataaccess import IndexReport
 from secfsdstools.e_collector.multireportcollecting import MultiReportCollector
 
 
@@ -22,7 +23,9 @@ class CompanyReportCollector:
             forms_filter: Optional[List[str]] = None,
             stmt_filter: Optional[List[str]] = None,
             tag_filter: Optional[List[str]] = None,
-            configuration: Optional[Configuration] = None):
+            configuration: Optional[Configuration] = None,
+            categorical: bool = False,
+            columns: Optional[List[str]] = None):
         """
         creates a MultiReportCollector instance for the provided ciks and forms (e.g. 10-K..)
         If no configuration object is passed,
@@ -38,6 +41,10 @@ class CompanyReportCollector:
             tag_filter (List[str], optional, None:
                 List of tags that should be read (Assets, Liabilities, ...)
             configuration (Configuration, optional, None): Optional configuration object
+            categorical (bool, optional, False): load columns with low cardinality
+                (tag, version, uom, ..) as categoricals to reduce the memory footprint.
+            columns (List[str], optional, None): load only these columns. the key columns
+                (adsh, tag, version, ..) are always loaded.
 
         Returns:
             MultiReportCollector: instance of MultiReportCollector
@@ -46,7 +53,7 @@ class CompanyReportCollector:
         if configuration is None:
             configuration = ConfigurationManager.read_config_file()
 
-        dbaccessor = ParquetDBIndexingAccessor(db_dir=configuration.db_dir)
+        dbaccessor = get_index_accessor(configuration)
 
         # todo: if daily entries are also in index, it returns mutliple matches!
         #       probably fix directly in read_index_reports-> pathfilter for two and check source
@@ -56,5 +63,7 @@ class CompanyReportCollector:
 
         return MultiReportCollector.get_reports_by_indexreports(index_reports=index_reports,
                                                                 stmt_filter=stmt_filter,
-                                                                tag_filter=tag_filter
+                                                                tag_filter=tag_filter,
+                                                                categorical=categorical,
+                                                                columns=columns
                                                                 )
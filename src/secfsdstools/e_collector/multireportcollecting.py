@@ -8,9 +8,10 @@ from typing import Dict, List, Optional
 from secfsdstools.a_config.configmgt import ConfigurationManager
 from secfsdstools.a_config.configmodel import Configuration
 from secfsdstools.a_utils.parallelexecution import ParallelExecutor
-from secfsdstools.c_index.indexdataaccess import IndexReport, ParquetDBIndexingAccessor
+from secfsdstools.c_index.indexcache import get_index_accessor
+from secfsdstools.c_index.indexdataaccess import IndexReport
 from secfsdstools.d_container.databagmodel import RawDataBag
-from secfsdstools.e_collector.basecollector import BaseCollector
+from secfsdstools.e_collector.basecollector import BaseCollector, RawDataBagIpcTransport
 
 
 @dataclass
@@ -24,7 +25,10 @@ class MultiReportCollector:
     def get_reports_by_adshs(cls, adshs: List[str],
                              stmt_filter: Optional[List[str]] = None,
                              tag_filter: Optional[List[str]] = None,
-                             configuration: Optional[Configuration] = None):
+                             configuration: Optional[Configuration] = None,
+                             categorical: bool = False,
+                             columns: Optional[List[str]] = None,
+                             keep_pool: bool = False):
         """
         creates the MultiReportCollector instance for a certain list of adshs.
 
@@ -39,24 +43,40 @@ class MultiReportCollector:
 
             configuration (Configuration optional, default=None): Optional configuration object
 
+            categorical (bool, optional, False): load columns with low cardinality
+                (tag, version, uom, ..) as categoricals to reduce the memory footprint.
+
+            columns (List[str], optional, None): load only these columns. the key columns
+                (adsh, tag, version, ..) are always loaded.
+
+            keep_pool (bool, optional, False): if True, the collector keeps its pool of worker
+                processes and reuses it for all calls of collect. The pool has to be released with
+                close(), or by using the collector as context manager.
+
         Returns:
             MultiReportCollector: instance of MultiReportCollector
         """
         if configuration is None:
             configuration = ConfigurationManager.read_config_file()
 
-        dbaccessor = ParquetDBIndexingAccessor(db_dir=configuration.db_dir)
+        dbaccessor = get_index_accessor(configuration)
 
         index_reports = dbaccessor.read_index_reports_for_adshs(adshs=adshs)
         return MultiReportCollector(index_reports=index_reports,
                                     stmt_filter=stmt_filter,
-                                    tag_filter=tag_filter)
+                                    tag_filter=tag_filter,
+                                    categorical=categorical,
+                                    columns=columns,
+                                    keep_pool=keep_pool)
 
     @classmethod
     def get_reports_by_indexreports(cls,
                                     index_reports: List[IndexReport],
                                     stmt_filter: Optional[List[str]] = None,
                                     tag_filter: Optional[List[str]] = None,
+                                    categorical: bool = False,
+                                    columns: Optional[List[str]] = None,
+                                    keep_pool: bool = False
                                     ):
         """
         crates the MultiReportCollector instance based on IndexReport instances
@@ -67,21 +87,65 @@ class MultiReportCollector:
                 List of stmts that should be read (BS, IS, ...)
             tag_filter (List[str], optional, None:
                 List of tags that should be read (Assets, Liabilities, ...)
+            categorical (bool, optional, False): load columns with low cardinality
+                (tag, version, uom, ..) as categoricals to reduce the memory footprint.
+
+            columns (List[str], optional, None): load only these columns. the key columns
+                (adsh, tag, version, ..) are always loaded.
+
+            keep_pool (bool, optional, False): if True, the collector keeps its pool of worker
+                processes and reuses it for all calls of collect. The pool has to be released with
+                close(), or by using the collector as context manager.
 
         Returns:
             MultiReportCollector: instance of MultiReportCollector
         """
         return MultiReportCollector(index_reports=index_reports,
                                     stmt_filter=stmt_filter,
-                                    tag_filter=tag_filter)
+                                    tag_filter=tag_filter,
+                                    categorical=categorical,
+                                    columns=columns,
+                                    keep_pool=keep_pool)
 
     def __init__(self, index_reports: List[IndexReport],
                  stmt_filter: Optional[List[str]] = None,
-                 tag_filter: Optional[List[str]] = None):
+                 tag_filter: Optional[List[str]] = None,
+                 categorical: bool = False,
+                 columns: Optional[List[str]] = None,
+                 keep_pool: bool = False):
         super().__init__()
         self.index_reports = index_reports
         self.stmt_filter = stmt_filter
         self.tag_filter = tag_filter
+        self.categorical = categorical
+        self.columns = columns
+        self.keep_pool = keep_pool
+        self._executor: Optional[ParallelExecutor] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        terminates the worker processes of the pool that was kept because of keep_pool=True.
+        """
+        if self._executor is not None:
+            self._executor.close()
+            self._executor = None
+
+    def _get_executor(self, execute_serial: bool) -> ParallelExecutor:
+        if not self.keep_pool:
+            return ParallelExecutor(chunksize=0, execute_serial=execute_serial,
+                                    transport=RawDataBagIpcTransport())
+
+        if self._executor is None:
+            self._executor = ParallelExecutor(chunksize=0, keep_pool=True,
+                                              transport=RawDataBagIpcTransport())
+        self._executor.execute_serial = execute_serial
+        return self._executor
 
     def _multi_collect(self) -> RawDataBag:
         """
@@ -113,7 +177,9 @@ class MultiReportCollector:
 
             collector = BaseCollector(datapath=datapath,
                                       stmt_filter=self.stmt_filter,
-                                      tag_filter=self.tag_filter)
+                                      tag_filter=self.tag_filter,
+                                      categorical=self.categorical,
+                                      columns=self.columns)
 
             adsh_filter = ('adsh', 'in', adshs)
 
@@ -126,7 +192,9 @@ class MultiReportCollector:
         execute_serial = False
         if len(self.index_reports) == 1:
             execute_serial = True
-        executor = ParallelExecutor(chunksize=0, execute_serial=execute_serial)
+        # the collected bags are handed back as arrow ipc files in shared memory, which is
+        # much faster than pickling the dataframes
+        executor = self._get_executor(execute_serial=execute_serial)
 
         executor.set_get_entries_function(get_entries)
         executor.set_process_element_function(process_element)
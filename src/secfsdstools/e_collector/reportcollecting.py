@@ -3,7 +3,8 @@ from typing import List, Optional
 
 from secfsdstools.a_config.configmgt import ConfigurationManager
 from secfsdstools.a_config.configmodel import Configuration
-from secfsdstools.c_index.indexdataaccess import IndexReport, ParquetDBIndexingAccessor
+from secfsdstools.c_index.indexcache import get_index_accessor
+from secfsdstools.c_index.indexdataaccess import IndexReport
 from secfsdstools.d_container.databagmodel import RawDataBag
 from secfsdstools.e_collector.basecollector import BaseCollector
 
@@ -18,7 +19,9 @@ class SingleReportCollector(BaseCollector):
     def get_report_by_adsh(cls, adsh: str,
                            stmt_filter: Optional[List[str]] = None,
                            tag_filter: Optional[List[str]] = None,
-                           configuration: Optional[Configuration] = None):
+                           configuration: Optional[Configuration] = None,
+                           categorical: bool = False,
+                           columns: Optional[List[str]] = None):
         """
         creates the ReportReader instance for a certain adsh.
         if no configuration is passed, it reads the configuration from the configuration file
@@ -34,6 +37,12 @@ class SingleReportCollector(BaseCollector):
 
             configuration (Configuration optional, default=None): Optional configuration object
 
+            categorical (bool, optional, False): load columns with low cardinality
+                (tag, version, uom, ..) as categoricals to reduce the memory footprint.
+
+            columns (List[str], optional, None): load only these columns. the key columns
+                (adsh, tag, version, ..) are always loaded.
+
         Returns:
             SingleReportCollector: instance of SingleReportCollector
 
@@ -41,17 +50,21 @@ class SingleReportCollector(BaseCollector):
         if configuration is None:
             configuration = ConfigurationManager.read_config_file()
 
-        dbaccessor = ParquetDBIndexingAccessor(db_dir=configuration.db_dir)
+        dbaccessor = get_index_accessor(configuration)
         return SingleReportCollector.get_report_by_indexreport(
             dbaccessor.read_index_report_for_adsh(adsh=adsh),
             stmt_filter=stmt_filter,
-            tag_filter=tag_filter)
+            tag_filter=tag_filter,
+            categorical=categorical,
+            columns=columns)
 
     @classmethod
     def get_report_by_indexreport(cls,
                                   index_report: IndexReport,
                                   stmt_filter: Optional[List[str]] = None,
-                                  tag_filter: Optional[List[str]] = None):
+                                  tag_filter: Optional[List[str]] = None,
+                                  categorical: bool = False,
+                                  columns: Optional[List[str]] = None):
         """
         crates the ReportReader instance based on the IndexReport instance
 
@@ -64,18 +77,30 @@ class SingleReportCollector(BaseCollector):
             tag_filter (List[str], optional, None:
                 List of tags that should be read (Assets, Liabilities, ...)
 
+            categorical (bool, optional, False): load columns with low cardinality
+                (tag, version, uom, ..) as categoricals to reduce the memory footprint.
+
+            columns (List[str], optional, None): load only these columns. the key columns
+                (adsh, tag, version, ..) are always loaded.
+
         Returns:
             SingleReportCollector: isntance of SingleReportCollector
         """
         return SingleReportCollector(report=index_report,
                                      tag_filter=tag_filter,
-                                     stmt_filter=stmt_filter)
+                                     stmt_filter=stmt_filter,
+                                     categorical=categorical,
+                                     columns=columns)
 
     def __init__(self,
                  report: IndexReport,
                  stmt_filter: Optional[List[str]] = None,
-                 tag_filter: Optional[List[str]] = None):
-        super().__init__(datapath=report.fullPath, stmt_filter=stmt_filter, tag_filter=tag_filter)
+                 tag_filter: Optional[List[str]] = None,
+                 categorical: bool = False,
+                 columns: Optional[List[str]] = None):
+        super().__init__(datapath=report.fullPath, stmt_filter=stmt_filter, tag_filter=tag_filter,
+                         categorical=categorical,
+                         columns=columns)
         self.report = report
         self.databag: Optional[RawDataBag] = None
 
@@ -3,17 +3,29 @@ loads all the data from one single zip file, resp. the folder with the three par
 which the zip file was transformed to.
 """
 import logging
-from typing import Callable, List, Optional
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterator, List, Optional, TypeVar
 
 from secfsdstools.a_config.configmgt import ConfigurationManager
 from secfsdstools.a_config.configmodel import Configuration
-from secfsdstools.a_utils.parallelexecution import ParallelExecutor
+from secfsdstools.a_utils.constants import PRE_NUM_TXT
+from secfsdstools.a_utils.parallelexecution import ParallelExecutor, ResultTransport
 from secfsdstools.c_index.indexdataaccess import ParquetDBIndexingAccessor
-from secfsdstools.d_container.databagmodel import RawDataBag
-from secfsdstools.e_collector.basecollector import BaseCollector
+from secfsdstools.d_container.databagmodel import JoinedDataBag, RawDataBag
+from secfsdstools.d_container.filter import FilterBase
+from secfsdstools.e_collector.basecollector import (
+    BaseCollector,
+    JoinedDataBagIpcTransport,
+    RawDataBagIpcTransport,
+    fill_na_with_empty_str,
+)
 
 LOGGER = logging.getLogger(__name__)
 
+BAG = TypeVar('BAG')
+
 
 class ZipCollector:
     """
@@ -28,7 +40,11 @@ class ZipCollector:
                         stmt_filter: Optional[List[str]] = None,
                         tag_filter: Optional[List[str]] = None,
                         post_load_filter: Optional[Callable[[RawDataBag], RawDataBag]] = None,
-                        configuration: Optional[Configuration] = None):
+                        configuration: Optional[Configuration] = None,
+                        categorical: bool = False,
+                        columns: Optional[List[str]] = None,
+                        pushdown_filters: Optional[List[FilterBase[RawDataBag]]] = None,
+                        keep_pool: bool = False):
         """
         creates a ZipReportReader instance for the given name of the zipfile.
         Args:
@@ -47,13 +63,31 @@ class ZipCollector:
                 that is directly applied after a single zip has been loaded.
 
             configuration (Configuration, optional, None): configuration object
+
+            categorical (bool, optional, False): load columns with low cardinality
+                (tag, version, uom, ..) as categoricals to reduce the memory footprint.
+
+            columns (List[str], optional, None): load only these columns. the key columns
+                (adsh, tag, version, ..) are always loaded.
+
+            pushdown_filters (List[FilterBase[RawDataBag]], optional, None): raw filters, like
+                MainCoregRawFilter() or USDOnlyRawFilter(), which are directly applied while
+                reading the parquet files, see FilterBase.get_pushdown_predicates.
+
+            keep_pool (bool, optional, False): if True, the collector keeps its pool of worker
+                processes and reuses it for all calls of collect. The pool has to be released with
+                close(), or by using the collector as context manager.
         """
         return cls.get_zip_by_names(names=[name],
                                     forms_filter=forms_filter,
                                     stmt_filter=stmt_filter,
                                     tag_filter=tag_filter,
                                     post_load_filter=post_load_filter,
-                                    configuration=configuration)
+                                    configuration=configuration,
+                                    categorical=categorical,
+                                    columns=columns,
+                                    pushdown_filters=pushdown_filters,
+                                    keep_pool=keep_pool)
 
     @classmethod
     def get_zip_by_names(cls,
@@ -62,7 +96,11 @@ class ZipCollector:
                          stmt_filter: Optional[List[str]] = None,
                          tag_filter: Optional[List[str]] = None,
                          post_load_filter: Optional[Callable[[RawDataBag], RawDataBag]] = None,
-                         configuration: Optional[Configuration] = None):
+                         configuration: Optional[Configuration] = None,
+                         categorical: bool = False,
+                         columns: Optional[List[str]] = None,
+                         pushdown_filters: Optional[List[FilterBase[RawDataBag]]] = None,
+                         keep_pool: bool = False):
         """
         creates a ZipReportReader instance for the given names of the zipfiles.
         Args:
@@ -81,6 +119,20 @@ class ZipCollector:
                 that is directly applied after a single zip has been loaded.
 
             configuration (Configuration, optional, None): configuration object
+
+            categorical (bool, optional, False): load columns with low cardinality
+                (tag, version, uom, ..) as categoricals to reduce the memory footprint.
+
+            columns (List[str], optional, None): load only these columns. the key columns
+                (adsh, tag, version, ..) are always loaded.
+
+            pushdown_filters (List[FilterBase[RawDataBag]], optional, None): raw filters, like
+                MainCoregRawFilter() or USDOnlyRawFilter(), which are directly applied while
+                reading the parquet files, see FilterBase.get_pushdown_predicates.
+
+            keep_pool (bool, optional, False): if True, the collector keeps its pool of worker
+                processes and reuses it for all calls of collect. The pool has to be released with
+                close(), or by using the collector as context manager.
         """
         if configuration is None:
             configuration = ConfigurationManager.read_config_file()
@@ -92,7 +144,11 @@ class ZipCollector:
                             forms_filter=forms_filter,
                             stmt_filter=stmt_filter,
                             tag_filter=tag_filter,
-                            post_load_filter=post_load_filter)
+                            post_load_filter=post_load_filter,
+                            categorical=categorical,
+                            columns=columns,
+                            pushdown_filters=pushdown_filters,
+                            keep_pool=keep_pool)
 
     @classmethod
     def get_all_zips(cls,
@@ -100,7 +156,11 @@ class ZipCollector:
                      stmt_filter: Optional[List[str]] = None,
                      tag_filter: Optional[List[str]] = None,
                      post_load_filter: Optional[Callable[[RawDataBag], RawDataBag]] = None,
-                     configuration: Optional[Configuration] = None):
+                     configuration: Optional[Configuration] = None,
+                     categorical: bool = False,
+                     columns: Optional[List[str]] = None,
+                     pushdown_filters: Optional[List[FilterBase[RawDataBag]]] = None,
+                     keep_pool: bool = False):
         """
         ATTENTION: this will take some time since data from all zip files are read at once.
         Moreover, if you don't apply directly filters, it will load a load of data.
@@ -122,6 +182,20 @@ class ZipCollector:
                 that is directly applied after a single zip has been loaded.
 
             configuration (Configuration, optional, None): configuration object
+
+            categorical (bool, optional, False): load columns with low cardinality
+                (tag, version, uom, ..) as categoricals to reduce the memory footprint.
+
+            columns (List[str], optional, None): load only these columns. the key columns
+                (adsh, tag, version, ..) are always loaded.
+
+            pushdown_filters (List[FilterBase[RawDataBag]], optional, None): raw filters, like
+                MainCoregRawFilter() or USDOnlyRawFilter(), which are directly applied while
+                reading the parquet files, see FilterBase.get_pushdown_predicates.
+
+            keep_pool (bool, optional, False): if True, the collector keeps its pool of worker
+                processes and reuses it for all calls of collect. The pool has to be released with
+                close(), or by using the collector as context manager.
         """
         if configuration is None:
             configuration = ConfigurationManager.read_config_file()
@@ -137,43 +211,122 @@ class ZipCollector:
                             forms_filter=forms_filter,
                             stmt_filter=stmt_filter,
                             tag_filter=tag_filter,
-                            post_load_filter=post_load_filter)
+                            post_load_filter=post_load_filter,
+                            categorical=categorical,
+                            columns=columns,
+                            pushdown_filters=pushdown_filters,
+                            keep_pool=keep_pool)
 
     def __init__(self,
                  datapaths: List[str],
                  forms_filter: Optional[List[str]] = None,
                  stmt_filter: Optional[List[str]] = None,
                  tag_filter: Optional[List[str]] = None,
-                 post_load_filter: Optional[Callable[[RawDataBag], RawDataBag]] = None):
+                 post_load_filter: Optional[Callable[[RawDataBag], RawDataBag]] = None,
+                 categorical: bool = False,
+                 columns: Optional[List[str]] = None,
+                 pushdown_filters: Optional[List[FilterBase[RawDataBag]]] = None,
+                 keep_pool: bool = False):
 
         self.datapaths = datapaths
         self.forms_filter = forms_filter
         self.stmt_filter = stmt_filter
         self.tag_filter = tag_filter
         self.post_load_filter = post_load_filter
+        self.categorical = categorical
+        self.columns = columns
+        self.pushdown_filters = pushdown_filters
+        self.keep_pool = keep_pool
+        self._executor: Optional[ParallelExecutor] = None
 
-    def _multi_zipcollect(self) -> RawDataBag:
+    def __enter__(self):
+        return self
 
-        datapaths: List[str] = self.datapaths
+    def __exit__(self, *args):
+        self.close()
 
-        def get_entries() -> List[str]:
-            return datapaths
+    def close(self):
+        """
+        terminates the worker processes of the pool that was kept because of keep_pool=True.
+        """
+        if self._executor is not None:
+            self._executor.close()
+            self._executor = None
+
+    def _get_executor(self, execute_serial: bool, transport: ResultTransport[BAG]) -> ParallelExecutor:
+        if not self.keep_pool:
+            return ParallelExecutor(chunksize=0, execute_serial=execute_serial, transport=transport)
 
-        def process_element(datapath: str) -> RawDataBag:
-            LOGGER.info("processing %s", datapath)
-            collector = BaseCollector(datapath=datapath,
-                                      stmt_filter=self.stmt_filter,
-                                      tag_filter=self.tag_filter)
+        if self._executor is None:
+            self._executor = ParallelExecutor(chunksize=0, keep_pool=True)
+        self._executor.execute_serial = execute_serial
+        self._executor.transport = transport
+        return self._executor
 
-            sub_filter = ('form', 'in', self.forms_filter) if self.forms_filter else None
+    def is_prejoined(self) -> bool:
+        """
+        checks whether all datapaths contain the joined pre_num.txt parquet file, which is
+        created by the JoinedParquetProcess.
+
+        Returns:
+            bool: True if the data of all datapaths can directly be loaded as JoinedDataBag
+        """
+        return all(os.path.exists(os.path.join(datapath, f'{PRE_NUM_TXT}.parquet'))
+                   for datapath in self.datapaths)
+
+    def _collect_datapath(self, datapath: str) -> RawDataBag:
+        LOGGER.info("processing %s", datapath)
+        collector = BaseCollector(datapath=datapath,
+                                  stmt_filter=self.stmt_filter,
+                                  tag_filter=self.tag_filter,
+                                  categorical=self.categorical,
+                                  columns=self.columns,
+                                  pushdown_filters=self.pushdown_filters)
+
+        sub_filter = ('form', 'in', self.forms_filter) if self.forms_filter else None
+
+        rawdatabag = collector.basecollect(sub_df_filter=sub_filter)
+
+        if self.post_load_filter is not None:
+            rawdatabag = self.post_load_filter(rawdatabag)
+        return rawdatabag
+
+    def _collect_joined_datapath(
+            self, datapath: str,
+            post_load_filter: Optional[Callable[[JoinedDataBag], JoinedDataBag]]) -> JoinedDataBag:
+        pre_num_file = os.path.join(datapath, f'{PRE_NUM_TXT}.parquet')
+
+        # a raw post_load_filter can only be applied before pre and num are joined
+        if self.post_load_filter is None and os.path.exists(pre_num_file):
+            LOGGER.info("processing %s (prejoined)", datapath)
+            joinedbag = JoinedDataBag.load(target_path=datapath,
+                                           forms_filter=self.forms_filter,
+                                           stmt_filter=self.stmt_filter,
+                                           tag_filter=self.tag_filter,
+                                           categorical=self.categorical,
+                                           columns=self.columns,
+                                           pushdown_filters=self.pushdown_filters)
+
+            # same as in BaseCollector.basecollect
+            joinedbag.pre_num_df['coreg'] = fill_na_with_empty_str(joinedbag.pre_num_df.coreg)
+            joinedbag.pre_num_df['segments'] = fill_na_with_empty_str(joinedbag.pre_num_df.segments)
+        else:
+            joinedbag = self._collect_datapath(datapath).join()
+
+        if post_load_filter is not None:
+            joinedbag = post_load_filter(joinedbag)
+        return joinedbag
+
+    def _multi_zipcollect(self,
+                          process_element: Callable[[str], BAG],
+                          transport: ResultTransport[BAG]) -> List[BAG]:
 
-            rawdatabag = collector.basecollect(sub_df_filter=sub_filter)
+        datapaths: List[str] = self.datapaths
 
-            if self.post_load_filter is not None:
-                rawdatabag = self.post_load_filter(rawdatabag)
-            return rawdatabag
+        def get_entries() -> List[str]:
+            return datapaths
 
-        def post_process(parts: List[RawDataBag]) -> List[RawDataBag]:
+        def post_process(parts: List[BAG]) -> List[BAG]:
             # do nothing
             return parts
 
@@ -181,17 +334,19 @@ class ZipCollector:
         # no need for parallel execution if there is just one zipfile to load
         if len(self.datapaths) == 1:
             execute_serial = True
-        executor = ParallelExecutor(chunksize=0, execute_serial=execute_serial)
+        # the collected bags are handed back as arrow ipc files in shared memory, which is
+        # much faster than pickling the dataframes
+        executor = self._get_executor(execute_serial=execute_serial, transport=transport)
 
         executor.set_get_entries_function(get_entries)
         executor.set_process_element_function(process_element)
         executor.set_post_process_chunk_function(post_process)
 
         # we ignore the missing, since get_entries always returns the whole list
-        collected_reports: List[RawDataBag]
+        collected_reports: List[BAG]
         collected_reports, _ = executor.execute()
 
-        return RawDataBag.concat(collected_reports)
+        return collected_reports
 
     def collect(self) -> RawDataBag:
         """
@@ -200,4 +355,74 @@ class ZipCollector:
         Returns:
             RawDataBag: the collected Data
         """
-        return self._multi_zipcollect()
+        return RawDataBag.concat(self._multi_zipcollect(process_element=self._collect_datapath,
+                                                        transport=RawDataBagIpcTransport()))
+
+    def collect_joined(
+            self,
+            post_load_filter: Optional[Callable[[JoinedDataBag], JoinedDataBag]] = None
+    ) -> JoinedDataBag:
+        """
+        collects the data and returns a JoinedDataBag.
+
+        Folders which contain the pre_num.txt parquet file (see JoinedParquetProcess and the
+        BuildJoinedParquet configuration) are directly loaded as JoinedDataBag, so that pre and
+        num do not have to be joined again. Such folders are only used, if no raw
+        post_load_filter is defined for the collector. The other folders are loaded as
+        RawDataBag and joined afterward.
+
+        Args:
+            post_load_filter (Callable[[JoinedDataBag], JoinedDataBag], optional, None): a
+                filter that is applied on the joined bag of every single zip file.
+
+        Returns:
+            JoinedDataBag: the collected Data
+        """
+
+        def process_element(datapath: str) -> JoinedDataBag:
+            return self._collect_joined_datapath(datapath, post_load_filter)
+
+        return JoinedDataBag.concat(self._multi_zipcollect(process_element=process_element,
+                                                           transport=JoinedDataBagIpcTransport()))
+
+    def iter_collect(self, read_ahead: int = 1) -> Iterator[RawDataBag]:
+        """
+        collects the data zip file by zip file and yields a separate RawDataBag for every
+        zip file, in the order of the datapaths. So if the data is processed zip file by zip file
+        (e.g. filter, join, and save), only the data of a few zip files is in memory at the same
+        time.
+
+        Example:
+            for datapath, bag in zip(collector.datapaths, collector.iter_collect()):
+                ...
+
+        Args:
+            read_ahead (int, optional, 1): number of zip files that are already loaded in
+                background threads, while the current bag is processed. 0 means that the
+                next zip file is only loaded when it is requested.
+
+        Returns:
+            Iterator[RawDataBag]: one bag per datapath
+        """
+        if read_ahead <= 0:
+            for datapath in self.datapaths:
+                yield self._collect_datapath(datapath)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=read_ahead)
+        try:
+            remaining = iter(self.datapaths)
+            futures: Deque[Future] = deque()
+            for datapath in remaining:
+                futures.append(executor.submit(self._collect_datapath, datapath))
+                if len(futures) >= read_ahead:
+                    break
+
+            while futures:
+                bag = futures.popleft().result()
+                next_datapath = next(remaining, None)
+                if next_datapath is not None:
+                    futures.append(executor.submit(self._collect_datapath, next_datapath))
+                yield bag
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -2,15 +2,30 @@
 This module contains some basic pathfilter implementations on the JoinedDataBag.
 
 Note: the filters don't create new copies of the pandas dataset
+
+All filters are implemented as MaskFilterBase, so they can also be combined
+by a LazyDataBag (bag.lazy()). Filters that only depend on the content of the pre_num file
+(stmt, tag, main coreg, no segments, USD only) also provide arrow predicates, so that they can
+be pushed down into the reading of the parquet files (see pushdown_filters of JoinedDataBag.load).
 """
-from typing import List
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow.compute as pc
 
-from secfsdstools.a_utils.basic import calculate_previous_period
+from secfsdstools.a_utils.constants import PRE_NUM_TXT
 from secfsdstools.d_container.databagmodel import JoinedDataBag
-from secfsdstools.d_container.filter import FilterBase
+from secfsdstools.d_container.filter import MaskFilterBase
+from secfsdstools.e_filter.rawfiltering import (
+    PeriodOffsetRawFilter,
+    empty_or_null_predicate,
+    get_period_offset_mask,
+    get_uoms_to_keep_for_usd_only,
+    usd_only_predicate,
+)
 
 
-class AdshJoinedFilter(FilterBase[JoinedDataBag]):
+class AdshJoinedFilter(MaskFilterBase[JoinedDataBag]):
     """
     Filters the data by a list of adshs. This pathfilter operates on the sub, pre_df and the num_df.
     """
@@ -18,7 +33,7 @@ class AdshJoinedFilter(FilterBase[JoinedDataBag]):
     def __init__(self, adshs: List[str]):
         self.adshs = adshs
 
-    def filter(self, databag: JoinedDataBag) -> JoinedDataBag:
+    def get_masks(self, databag: JoinedDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only datapoints of reports defined by the adshs list
         are contained.
@@ -27,16 +42,13 @@ class AdshJoinedFilter(FilterBase[JoinedDataBag]):
             databag(JoinedDataBag) : databag to apply the pathfilter to
 
         Returns:
-            JoinedDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the masks for the sub_df and the pre_num_df
         """
-        sub_filtered_for_adshs = databag.sub_df[databag.sub_df.adsh.isin(self.adshs)]
-        pre_num_filtered_for_adshs = databag.pre_num_df[databag.pre_num_df.adsh.isin(self.adshs)]
-
-        return JoinedDataBag.create(sub_df=sub_filtered_for_adshs,
-                                    pre_num_df=pre_num_filtered_for_adshs)
+        return {'sub_df': databag.sub_df.adsh.isin(self.adshs),
+                'pre_num_df': databag.pre_num_df.adsh.isin(self.adshs)}
 
 
-class StmtJoinedFilter(FilterBase[JoinedDataBag]):
+class StmtJoinedFilter(MaskFilterBase[JoinedDataBag]):
     """
     Filters the data by a list of statement type (BS, IS, CF, ...).
     This pathfilter operates on the pre_df.
@@ -45,7 +57,7 @@ class StmtJoinedFilter(FilterBase[JoinedDataBag]):
     def __init__(self, stmts: List[str]):
         self.stmts = stmts
 
-    def filter(self, databag: JoinedDataBag) -> JoinedDataBag:
+    def get_masks(self, databag: JoinedDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only datapoints of reports defined by the adshs list
         are contained.
@@ -54,21 +66,22 @@ class StmtJoinedFilter(FilterBase[JoinedDataBag]):
             databag(JoinedDataBag) : Joineddatabag to apply the pathfilter to
 
         Returns:
-            JoinedDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the pre_num_df
         """
-        pre_num_filtered_for_stmts = databag.pre_num_df[databag.pre_num_df.stmt.isin(self.stmts)]
+        return {'pre_num_df': databag.pre_num_df.stmt.isin(self.stmts)}
 
-        return JoinedDataBag.create(sub_df=databag.sub_df,
-                                    pre_num_df=pre_num_filtered_for_stmts)
+    def get_pushdown_predicates(self) -> Optional[Dict[str, pc.Expression]]:
+        """ stmt in stmts for the pre_num.txt file. """
+        return {PRE_NUM_TXT: pc.field('stmt').isin(self.stmts)}
 
 
-class ReportPeriodJoinedFilter(FilterBase[JoinedDataBag]):
+class ReportPeriodJoinedFilter(MaskFilterBase[JoinedDataBag]):
     """
     Filters the data so that only datapoints are contained which ddate-attribute equals the
     period date of the report. Therefore, the pathfilter operates on the num_df dataframe.
     """
 
-    def filter(self, databag: JoinedDataBag) -> JoinedDataBag:
+    def get_masks(self, databag: JoinedDataBag) -> Dict[str, pd.Series]:
         """
         pathfilter the databag so that only datapoints are contained which have a ddate-attribute
         that equals the period-attribute of the report.
@@ -76,27 +89,21 @@ class ReportPeriodJoinedFilter(FilterBase[JoinedDataBag]):
             databag(JoinedDataBag) : databag to apply the pathfilter to
 
         Returns:
-            JoinedDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the pre_num_df
         """
 
-        adsh_period_map = \
-            databag.sub_df[['adsh', 'period']].set_index('adsh').to_dict()['period']
+        return {'pre_num_df': get_period_offset_mask(databag.sub_df, databag.pre_num_df,
+                                                     offsets=[(0, 0)])}
 
-        mask = databag.pre_num_df['adsh'].map(adsh_period_map) == databag.pre_num_df['ddate']
-        pre_num_filtered_for_ddates = databag.pre_num_df[mask]
 
-        return JoinedDataBag.create(sub_df=databag.sub_df,
-                                    pre_num_df=pre_num_filtered_for_ddates)
-
-
-class ReportPeriodAndPreviousPeriodJoinedFilter(FilterBase[JoinedDataBag]):
+class ReportPeriodAndPreviousPeriodJoinedFilter(MaskFilterBase[JoinedDataBag]):
     """
     Filters the data so that only datapoints are contained which ddate-attribute equals the
     period date of the report or the period date of the previous (a year ago) report.
     Therefore, the pathfilter operates on the num_df dataframe.
     """
 
-    def filter(self, databag: JoinedDataBag) -> JoinedDataBag:
+    def get_masks(self, databag: JoinedDataBag) -> Dict[str, pd.Series]:
         """
         pathfilter the databag so that only datapoints are contained which have a ddate-attribute
         that equals the period-attribute of the report or the period of the previous (a year ago)
@@ -105,27 +112,49 @@ class ReportPeriodAndPreviousPeriodJoinedFilter(FilterBase[JoinedDataBag]):
             databag(JoinedDataBag) : databag to apply the pathfilter to
 
         Returns:
-            JoinedDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the pre_num_df
         """
 
-        adsh_period_map = \
-            databag.sub_df[['adsh', 'period']].set_index('adsh').to_dict()['period']
+        # the period of the report and the period a year before
+        return {'pre_num_df': get_period_offset_mask(databag.sub_df, databag.pre_num_df,
+                                                     offsets=[(0, 0), (1, 0)])}
 
-        # caculate the dates for the previous year
-        adsh_previous_period_map = {adsh: calculate_previous_period(period)
-                                    for adsh, period in adsh_period_map.items()}
 
-        mask = (databag.pre_num_df['adsh'].map(adsh_period_map) == databag.pre_num_df['ddate']) | \
-               (databag.pre_num_df['adsh'].map(adsh_previous_period_map) == databag.pre_num_df[
-                   'ddate'])
+class PeriodOffsetJoinedFilter(MaskFilterBase[JoinedDataBag]):
+    """
+    Generalisation of the ReportPeriodAndPreviousPeriodJoinedFilter. Filters the data so that
+    only datapoints are contained which ddate-attribute equals the period date of the report
+    shifted back by the defined number of years and quarters, e.g. years=2 keeps the values of
+    two years before, quarters=1 the values of the prior quarter.
+    Therefore, the pathfilter operates on the pre_num_df dataframe.
+    """
 
-        pre_num_filtered_for_ddates = databag.pre_num_df[mask]
+    def __init__(self, years: int = 0, quarters: int = 0, keep_report_period: bool = False):
+        """
+        Args:
+            years: number of years to go back
+            quarters: number of quarters to go back
+            keep_report_period: if True, also the datapoints for the period date of the report
+                                are kept
+        """
+        self.raw_filter = PeriodOffsetRawFilter(years=years, quarters=quarters,
+                                                keep_report_period=keep_report_period)
 
-        return JoinedDataBag.create(sub_df=databag.sub_df,
-                                    pre_num_df=pre_num_filtered_for_ddates)
+    def get_masks(self, databag: JoinedDataBag) -> Dict[str, pd.Series]:
+        """
+        pathfilter the databag so that only datapoints are contained which have a ddate-attribute
+        that equals the shifted period-attribute of the report.
+        Args:
+            databag(JoinedDataBag) : databag to apply the pathfilter to
+
+        Returns:
+            Dict[str, pd.Series]: the mask for the pre_num_df
+        """
+        return {'pre_num_df': get_period_offset_mask(databag.sub_df, databag.pre_num_df,
+                                                     offsets=self.raw_filter.get_offsets())}
 
 
-class TagJoinedFilter(FilterBase[JoinedDataBag]):
+class TagJoinedFilter(MaskFilterBase[JoinedDataBag]):
     """
     Filters the data by a list of tags. This pathfilter operates on the pre_df and the num_df.
     """
@@ -133,7 +162,7 @@ class TagJoinedFilter(FilterBase[JoinedDataBag]):
     def __init__(self, tags: List[str]):
         self.tags = tags
 
-    def filter(self, databag: JoinedDataBag) -> JoinedDataBag:
+    def get_masks(self, databag: JoinedDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only datapoints are contained which have a tag-attribute
         that is in the provided list.
@@ -141,20 +170,21 @@ class TagJoinedFilter(FilterBase[JoinedDataBag]):
             databag(JoinedDataBag) : databag to apply the pathfilter to
 
         Returns:
-            JoinedDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the pre_num_df
         """
-        pre_num_filtered_for_tags = databag.pre_num_df[databag.pre_num_df.tag.isin(self.tags)]
+        return {'pre_num_df': databag.pre_num_df.tag.isin(self.tags)}
 
-        return JoinedDataBag.create(sub_df=databag.sub_df,
-                                    pre_num_df=pre_num_filtered_for_tags)
+    def get_pushdown_predicates(self) -> Optional[Dict[str, pc.Expression]]:
+        """ tag in tags for the pre_num.txt file. """
+        return {PRE_NUM_TXT: pc.field('tag').isin(self.tags)}
 
 
-class MainCoregJoinedFilter(FilterBase[JoinedDataBag]):
+class MainCoregJoinedFilter(MaskFilterBase[JoinedDataBag]):
     """
     Filters only for the main coreg entries (coreg == '')
     """
 
-    def filter(self, databag: JoinedDataBag) -> JoinedDataBag:
+    def get_masks(self, databag: JoinedDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only the main coreg entries are contained
         (no data subsidiaries).
@@ -162,22 +192,23 @@ class MainCoregJoinedFilter(FilterBase[JoinedDataBag]):
             databag(JoinedDataBag) : databag to apply the pathfilter to
 
         Returns:
-            JoinedDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the pre_num_df
         """
-        pre_num_filtered_for_main_coreg = databag.pre_num_df[databag.pre_num_df.coreg == '']
+        return {'pre_num_df': databag.pre_num_df.coreg == ''}
 
-        return JoinedDataBag.create(sub_df=databag.sub_df,
-                                    pre_num_df=pre_num_filtered_for_main_coreg)
+    def get_pushdown_predicates(self) -> Optional[Dict[str, pc.Expression]]:
+        """ empty coreg for the pre_num.txt file. """
+        return {PRE_NUM_TXT: empty_or_null_predicate('coreg')}
 
 
-class OfficialTagsOnlyJoinedFilter(FilterBase[JoinedDataBag]):
+class OfficialTagsOnlyJoinedFilter(MaskFilterBase[JoinedDataBag]):
     """
     Filters only the official tags. These are the tags that contain an official XBRL version
     within the version column. "inofficial" (resp. company specific) tags are identified with
     the version column containing the value of the adsh.
     """
 
-    def filter(self, databag: JoinedDataBag) -> JoinedDataBag:
+    def get_masks(self, databag: JoinedDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that official tags are contained.
 
@@ -185,21 +216,17 @@ class OfficialTagsOnlyJoinedFilter(FilterBase[JoinedDataBag]):
             databag(JoinedDataBag) : databag to apply the pathfilter to
 
         Returns:
-            JoinedDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the pre_num_df
         """
-        pre_num_filtered_for_tags = databag.pre_num_df[
-            ~databag.pre_num_df.version.isin(databag.sub_df.adsh)]
-
-        return JoinedDataBag.create(sub_df=databag.sub_df,
-                                    pre_num_df=pre_num_filtered_for_tags)
+        return {'pre_num_df': ~databag.pre_num_df.version.isin(databag.sub_df.adsh)}
 
 
-class USDOnlyJoinedFilter(FilterBase[JoinedDataBag]):
+class USDOnlyJoinedFilter(MaskFilterBase[JoinedDataBag]):
     """
     Removes all entries which have a currency in the column uom that is not USD.
     """
 
-    def filter(self, databag: JoinedDataBag) -> JoinedDataBag:
+    def get_masks(self, databag: JoinedDataBag) -> Dict[str, pd.Series]:
         """
         Removes all currency entries in the uom colum of the pre_num_df that are not USD.
 
@@ -207,27 +234,23 @@ class USDOnlyJoinedFilter(FilterBase[JoinedDataBag]):
             databag(JoinedDataBag) : Joineddatabag to apply the pathfilter to
 
         Returns:
-            JoinedDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the pre_num_df
 
         """
-        # currency is always in uppercase, so if it is not all uppercase, it is not a currency
-        mask_has_lower = ~databag.pre_num_df.uom.str.isupper()
-        mask_is_none_currency = databag.pre_num_df.uom.str.len() != 3
-        mask_usd_only = databag.pre_num_df.uom == "USD"
-
-        prenum_filtered_for_usd = databag.pre_num_df[
-            mask_has_lower | mask_is_none_currency | mask_usd_only]
+        return {'pre_num_df': databag.pre_num_df.uom.isin(
+            get_uoms_to_keep_for_usd_only(databag.pre_num_df.uom))}
 
-        return JoinedDataBag.create(sub_df=databag.sub_df,
-                                    pre_num_df=prenum_filtered_for_usd)
+    def get_pushdown_predicates(self) -> Optional[Dict[str, pc.Expression]]:
+        """ non currency or USD uom for the pre_num.txt file. """
+        return {PRE_NUM_TXT: usd_only_predicate()}
 
 
-class NoSegmentInfoJoinedFilter(FilterBase[JoinedDataBag]):
+class NoSegmentInfoJoinedFilter(MaskFilterBase[JoinedDataBag]):
     """
     Filters only for the main coreg entries (coreg == '')
     """
 
-    def filter(self, databag: JoinedDataBag) -> JoinedDataBag:
+    def get_masks(self, databag: JoinedDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only the main coreg entries are contained
         (no data subsidiaries).
@@ -235,15 +258,16 @@ class NoSegmentInfoJoinedFilter(FilterBase[JoinedDataBag]):
             databag(JoinedDataBag) : databag to apply the pathfilter to
 
         Returns:
-            JoinedDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the pre_num_df
         """
-        pre_num_filtered_for_main_coreg = databag.pre_num_df[databag.pre_num_df.segments == '']
+        return {'pre_num_df': databag.pre_num_df.segments == ''}
 
-        return JoinedDataBag.create(sub_df=databag.sub_df,
-                                    pre_num_df=pre_num_filtered_for_main_coreg)
+    def get_pushdown_predicates(self) -> Optional[Dict[str, pc.Expression]]:
+        """ empty segments for the pre_num.txt file. """
+        return {PRE_NUM_TXT: empty_or_null_predicate('segments')}
 
 
-class CIKJoinedFilter(FilterBase[JoinedDataBag]):
+class CIKJoinedFilter(MaskFilterBase[JoinedDataBag]):
     """
     Filters the data by a list of ciks. This filter operates on the sub, pre_df and the num_df.
     """
@@ -251,7 +275,7 @@ class CIKJoinedFilter(FilterBase[JoinedDataBag]):
     def __init__(self, ciks: List[int]):
         self.ciks = ciks
 
-    def filter(self, databag: JoinedDataBag) -> JoinedDataBag:
+    def get_masks(self, databag: JoinedDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only datapoints belonging to the provided ciks
         are contained.
@@ -260,13 +284,10 @@ class CIKJoinedFilter(FilterBase[JoinedDataBag]):
             databag(JoinedDataBag) : joineddatabag to apply the filter to
 
         Returns:
-            JoinedDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the masks for the sub_df and the pre_num_df
         """
+        sub_mask = databag.sub_df.cik.isin(self.ciks)
+        adshs = databag.sub_df[sub_mask].adsh.tolist()
 
-        sub_filtered_for_adshs = databag.sub_df[databag.sub_df.cik.isin(self.ciks)]
-        adshs = sub_filtered_for_adshs.adsh.tolist()
-
-        pre_num_filtered_for_adshs = databag.pre_num_df[databag.pre_num_df.adsh.isin(adshs)]
-
-        return JoinedDataBag.create(sub_df=sub_filtered_for_adshs,
-                                    pre_num_df=pre_num_filtered_for_adshs)
+        return {'sub_df': sub_mask,
+                'pre_num_df': databag.pre_num_df.adsh.isin(adshs)}
@@ -2,15 +2,143 @@
 This module contains some basic pathfilter implementations on the RawDataBag.
 
 Note: the filters don't create new copies of the pandas dataset
+
+All filters are implemented as MaskFilterBase, so they can also be combined
+by a LazyDataBag (bag.lazy()). Filters that only depend on the content of a single file
+(stmt, tag, main coreg, no segments, USD only) also provide arrow predicates, so that they can
+be pushed down into the reading of the parquet files (see pushdown_filters of RawDataBag.load).
 """
-from typing import List
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
-from secfsdstools.a_utils.basic import calculate_previous_period
+from secfsdstools.a_utils.basic import calculate_period_offsets
+from secfsdstools.a_utils.constants import NUM_TXT, PRE_TXT
 from secfsdstools.d_container.databagmodel import RawDataBag
-from secfsdstools.d_container.filter import FilterBase
+from secfsdstools.d_container.filter import MaskFilterBase
+
+
+def get_uoms_to_keep_for_usd_only(uom: pd.Series) -> List[str]:
+    """
+    returns the units of the provided uom column that are kept if only USD shall remain as
+    currency. there are only a few different units, so the checks are done on the unique values
+    and not on every row.
+
+    Args:
+        uom: the uom column of the num_df, resp. the pre_num_df
+
+    Returns:
+        List[str]: the units that are not a currency and USD
+    """
+    uoms = pd.Series(uom.unique())
+
+    # currency is always in uppercase, so if it is not all uppercase, it is not a currency
+    mask_has_lower = ~uoms.str.isupper()
+
+    # currency is always 3 letters
+    mask_is_none_currency = uoms.str.len() != 3
+
+    # keep USD
+    mask_usd_only = uoms == "USD"
+
+    return uoms[mask_has_lower | mask_is_none_currency | mask_usd_only].tolist()
+
+
+def get_sub_positions_for_rows(sub_adsh: pd.Series, adsh: pd.Series) -> np.ndarray:
+    """
+    returns for every entry of the provided adsh column (e.g. num_df.adsh) the position of the
+    adsh in the sub_adsh column. if the adsh column is categorical, the positions are only
+    looked up for its categories.
+
+    Args:
+        sub_adsh: the unique adsh column of the sub_df
+        adsh: the adsh column of the rows
+
+    Returns:
+        np.ndarray: the position for every row, -1 if the adsh is not in sub_adsh
+    """
+    sub_index = pd.Index(np.asarray(sub_adsh, dtype=object))
+
+    if isinstance(adsh.dtype, pd.CategoricalDtype):
+        category_positions = sub_index.get_indexer(adsh.cat.categories)
+        # the code of missing values is -1, which selects the appended -1
+        return np.append(category_positions, -1)[adsh.cat.codes.to_numpy()]
+
+    return sub_index.get_indexer(adsh)
+
+
+def get_period_offset_mask(sub_df: pd.DataFrame, data_df: pd.DataFrame,
+                           offsets: List[Tuple[int, int]]) -> pd.Series:
+    """
+    calculates the mask for the rows of the data_df (num_df or pre_num_df) which ddate matches
+    the period of its report, shifted by one of the provided offsets.
+
+    the shifted periods are calculated once per report and then looked up by the position of
+    the adsh in the sub_df, instead of mapping every row through a dictionary.
+
+    Args:
+        sub_df: the sub_df with the periods of the reports
+        data_df: the dataframe with the columns adsh and ddate
+        offsets: list of (years, months) tuples, (0, 0) is the period of the report
+
+    Returns:
+        pd.Series: the mask for the data_df
+    """
+    if not sub_df.adsh.is_unique:
+        # same behavior as a dict created from the sub_df: the last entry wins
+        sub_df = sub_df.drop_duplicates(subset='adsh', keep='last')
+
+    positions = get_sub_positions_for_rows(sub_df.adsh, data_df.adsh)
+    periods = sub_df.period.to_numpy(dtype=np.float64)
+    ddates = data_df.ddate.to_numpy()
+
+    mask = np.zeros(len(data_df), dtype=bool)
+    for years, months in offsets:
+        if (years, months) == (0, 0):
+            shifted_periods = periods
+        else:
+            shifted_periods = calculate_period_offsets(periods, years=years, months=months)
+
+        # position -1 of rows with an unknown adsh selects the appended NaN
+        mask |= np.append(shifted_periods, np.nan)[positions] == ddates
+    return pd.Series(mask, index=data_df.index)
+
 
+def empty_or_null_predicate(column: str) -> pc.Expression:
+    """
+    arrow predicate that keeps the rows in which the column is empty. the parquet files created
+    from the zip files contain null instead of an empty string (e.g. for coreg and segments).
+
+    Args:
+        column: name of the column
+
+    Returns:
+        pc.Expression: the predicate
+    """
+    # null checks on dictionary encoded columns are not reliable if the file has several
+    # row groups, so the column is always compared as plain string
+    value = pc.field(column).cast(pa.string())
+    return value.is_null() | (value == '')
+
+
+def usd_only_predicate() -> pc.Expression:
+    """
+    arrow predicate with the same logic as get_uoms_to_keep_for_usd_only.
+
+    Returns:
+        pc.Expression: the predicate for the uom column
+    """
+    # the column could be dictionary encoded, the string functions need plain strings
+    uom = pc.field('uom').cast(pa.string())
+
+    # not all uppercase or not 3 letters is not a currency
+    return ~pc.utf8_is_upper(uom) | (pc.utf8_length(uom) != 3) | (uom == "USD")
 
-class AdshRawFilter(FilterBase[RawDataBag]):
+
+class AdshRawFilter(MaskFilterBase[RawDataBag]):
     """
     Filters the data by a list of adshs. This filter operates on the sub, pre_df and the num_df.
     """
@@ -18,7 +146,7 @@ class AdshRawFilter(FilterBase[RawDataBag]):
     def __init__(self, adshs: List[str]):
         self.adshs = adshs
 
-    def filter(self, databag: RawDataBag) -> RawDataBag:
+    def get_masks(self, databag: RawDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only datapoints of reports defined by the adshs list
         are contained.
@@ -27,18 +155,14 @@ class AdshRawFilter(FilterBase[RawDataBag]):
             databag(RawDataBag) : rawdatabag to apply the pathfilter to
 
         Returns:
-            RawDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the masks for the sub_df, pre_df, and num_df
         """
-        sub_filtered_for_adshs = databag.sub_df[databag.sub_df.adsh.isin(self.adshs)]
-        pre_filtered_for_adshs = databag.pre_df[databag.pre_df.adsh.isin(self.adshs)]
-        num_filtered_for_adshs = databag.num_df[databag.num_df.adsh.isin(self.adshs)]
-
-        return RawDataBag.create(sub_df=sub_filtered_for_adshs,
-                                 pre_df=pre_filtered_for_adshs,
-                                 num_df=num_filtered_for_adshs)
+        return {'sub_df': databag.sub_df.adsh.isin(self.adshs),
+                'pre_df': databag.pre_df.adsh.isin(self.adshs),
+                'num_df': databag.num_df.adsh.isin(self.adshs)}
 
 
-class StmtRawFilter(FilterBase[RawDataBag]):
+class StmtRawFilter(MaskFilterBase[RawDataBag]):
     """
     Filters the data by a list of statement type (BS, IS, CF, ...).
     This filter operates on the pre_df.
@@ -47,7 +171,7 @@ class StmtRawFilter(FilterBase[RawDataBag]):
     def __init__(self, stmts: List[str]):
         self.stmts = stmts
 
-    def filter(self, databag: RawDataBag) -> RawDataBag:
+    def get_masks(self, databag: RawDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only datapoints of reports defined by the adshs list
         are contained.
@@ -56,22 +180,22 @@ class StmtRawFilter(FilterBase[RawDataBag]):
             databag(RawDataBag) : rawdatabag to apply the filter to
 
         Returns:
-            RawDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the pre_df
         """
-        pre_filtered_for_stmts = databag.pre_df[databag.pre_df.stmt.isin(self.stmts)]
+        return {'pre_df': databag.pre_df.stmt.isin(self.stmts)}
 
-        return RawDataBag.create(sub_df=databag.sub_df,
-                                 pre_df=pre_filtered_for_stmts,
-                                 num_df=databag.num_df)
+    def get_pushdown_predicates(self) -> Optional[Dict[str, pc.Expression]]:
+        """ stmt in stmts for the pre.txt file. """
+        return {PRE_TXT: pc.field('stmt').isin(self.stmts)}
 
 
-class ReportPeriodRawFilter(FilterBase[RawDataBag]):
+class ReportPeriodRawFilter(MaskFilterBase[RawDataBag]):
     """
     Filters the data so that only datapoints are contained which ddate-attribute equals the
     period date of the report. Therefore, the filter operates on the num_df dataframe.
     """
 
-    def filter(self, databag: RawDataBag) -> RawDataBag:
+    def get_masks(self, databag: RawDataBag) -> Dict[str, pd.Series]:
         """
         filter the databag so that only datapoints are contained which have a ddate-attribute
         that equals the period-attribute of the report.
@@ -79,28 +203,20 @@ class ReportPeriodRawFilter(FilterBase[RawDataBag]):
             databag(RawDataBag) : rawdatabag to apply the filter to
 
         Returns:
-            RawDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the num_df
         """
 
-        adsh_period_map = \
-            databag.sub_df[['adsh', 'period']].set_index('adsh').to_dict()['period']
+        return {'num_df': get_period_offset_mask(databag.sub_df, databag.num_df, offsets=[(0, 0)])}
 
-        mask = databag.num_df['adsh'].map(adsh_period_map) == databag.num_df['ddate']
-        num_filtered_for_ddates = databag.num_df[mask]
 
-        return RawDataBag.create(sub_df=databag.sub_df,
-                                 pre_df=databag.pre_df,
-                                 num_df=num_filtered_for_ddates)
-
-
-class ReportPeriodAndPreviousPeriodRawFilter(FilterBase[RawDataBag]):
+class ReportPeriodAndPreviousPeriodRawFilter(MaskFilterBase[RawDataBag]):
     """
     Filters the data so that only datapoints are contained which ddate-attribute equals the
     period date of the report or the period date of the previous (a year ago) report.
     Therefore, the filter operates on the num_df dataframe.
     """
 
-    def filter(self, databag: RawDataBag) -> RawDataBag:
+    def get_masks(self, databag: RawDataBag) -> Dict[str, pd.Series]:
         """
         filter the databag so that only datapoints are contained which have a ddate-attribute
         that equals the period-attribute of the report or the period of the previous (a year ago)
@@ -109,27 +225,57 @@ class ReportPeriodAndPreviousPeriodRawFilter(FilterBase[RawDataBag]):
             databag(RawDataBag) : rawdatabag to apply the filter to
 
         Returns:
-            RawDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the num_df
         """
 
-        adsh_period_map = \
-            databag.sub_df[['adsh', 'period']].set_index('adsh').to_dict()['period']
+        # the period of the report and the period a year before
+        return {'num_df': get_period_offset_mask(databag.sub_df, databag.num_df,
+                                                 offsets=[(0, 0), (1, 0)])}
 
-        # caculate the dates for the previous year
-        adsh_previous_period_map = {adsh: calculate_previous_period(period)
-                                    for adsh, period in adsh_period_map.items()}
 
-        mask = (databag.num_df['adsh'].map(adsh_period_map) == databag.num_df['ddate']) | \
-               (databag.num_df['adsh'].map(adsh_previous_period_map) == databag.num_df['ddate'])
+class PeriodOffsetRawFilter(MaskFilterBase[RawDataBag]):
+    """
+    Generalisation of the ReportPeriodAndPreviousPeriodRawFilter. Filters the data so that only
+    datapoints are contained which ddate-attribute equals the period date of the report shifted
+    back by the defined number of years and quarters, e.g. years=2 keeps the values of two years
+    before, quarters=1 the values of the prior quarter.
+    Therefore, the filter operates on the num_df dataframe.
+    """
 
-        num_filtered_for_ddates = databag.num_df[mask]
+    def __init__(self, years: int = 0, quarters: int = 0, keep_report_period: bool = False):
+        """
+        Args:
+            years: number of years to go back
+            quarters: number of quarters to go back
+            keep_report_period: if True, also the datapoints for the period date of the report
+                                are kept
+        """
+        self.years = years
+        self.quarters = quarters
+        self.keep_report_period = keep_report_period
+
+    def get_offsets(self) -> List[Tuple[int, int]]:
+        """ the offsets as (years, months) tuples. """
+        offsets = [(self.years, self.quarters * 3)]
+        if self.keep_report_period:
+            offsets.append((0, 0))
+        return offsets
+
+    def get_masks(self, databag: RawDataBag) -> Dict[str, pd.Series]:
+        """
+        filter the databag so that only datapoints are contained which have a ddate-attribute
+        that equals the shifted period-attribute of the report.
+        Args:
+            databag(RawDataBag) : rawdatabag to apply the filter to
 
-        return RawDataBag.create(sub_df=databag.sub_df,
-                                 pre_df=databag.pre_df,
-                                 num_df=num_filtered_for_ddates)
+        Returns:
+            Dict[str, pd.Series]: the mask for the num_df
+        """
+        return {'num_df': get_period_offset_mask(databag.sub_df, databag.num_df,
+                                                 offsets=self.get_offsets())}
 
 
-class TagRawFilter(FilterBase[RawDataBag]):
+class TagRawFilter(MaskFilterBase[RawDataBag]):
     """
     Filters the data by a list of tags. This filter operates on the pre_df and the num_df.
     """
@@ -137,7 +283,7 @@ class TagRawFilter(FilterBase[RawDataBag]):
     def __init__(self, tags: List[str]):
         self.tags = tags
 
-    def filter(self, databag: RawDataBag) -> RawDataBag:
+    def get_masks(self, databag: RawDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only datapoints are contained which have a tag-attribute
         that is in the provided list.
@@ -145,22 +291,23 @@ class TagRawFilter(FilterBase[RawDataBag]):
             databag(RawDataBag) : rawdatabag to apply the filter to
 
         Returns:
-            RawDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the masks for the pre_df and the num_df
         """
-        pre_filtered_for_tags = databag.pre_df[databag.pre_df.tag.isin(self.tags)]
-        num_filtered_for_tags = databag.num_df[databag.num_df.tag.isin(self.tags)]
+        return {'pre_df': databag.pre_df.tag.isin(self.tags),
+                'num_df': databag.num_df.tag.isin(self.tags)}
 
-        return RawDataBag.create(sub_df=databag.sub_df,
-                                 pre_df=pre_filtered_for_tags,
-                                 num_df=num_filtered_for_tags)
+    def get_pushdown_predicates(self) -> Optional[Dict[str, pc.Expression]]:
+        """ tag in tags for the pre.txt and the num.txt file. """
+        return {PRE_TXT: pc.field('tag').isin(self.tags),
+                NUM_TXT: pc.field('tag').isin(self.tags)}
 
 
-class MainCoregRawFilter(FilterBase[RawDataBag]):
+class MainCoregRawFilter(MaskFilterBase[RawDataBag]):
     """
     Filters only for the main coreg entries (coreg == '')
     """
 
-    def filter(self, databag: RawDataBag) -> RawDataBag:
+    def get_masks(self, databag: RawDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only the main coreg entries are contained
         (no data subsidiaries).
@@ -168,23 +315,23 @@ class MainCoregRawFilter(FilterBase[RawDataBag]):
             databag(RawDataBag) : rawdatabag to apply the filter to
 
         Returns:
-            RawDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the num_df
         """
-        num_filtered_for_main_coreg = databag.num_df[databag.num_df.coreg == '']
+        return {'num_df': databag.num_df.coreg == ''}
 
-        return RawDataBag.create(sub_df=databag.sub_df,
-                                 pre_df=databag.pre_df,
-                                 num_df=num_filtered_for_main_coreg)
+    def get_pushdown_predicates(self) -> Optional[Dict[str, pc.Expression]]:
+        """ empty coreg for the num.txt file. """
+        return {NUM_TXT: empty_or_null_predicate('coreg')}
 
 
-class OfficialTagsOnlyRawFilter(FilterBase[RawDataBag]):
+class OfficialTagsOnlyRawFilter(MaskFilterBase[RawDataBag]):
     """
     Filters only the official tags. These are the tags that contain an official XBRL version
     within the version column. "inofficial" (resp. company specific) tags are identified with
     the version column containing the value of the adsh.
     """
 
-    def filter(self, databag: RawDataBag) -> RawDataBag:
+    def get_masks(self, databag: RawDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that official tags are contained.
 
@@ -192,24 +339,20 @@ class OfficialTagsOnlyRawFilter(FilterBase[RawDataBag]):
             databag(RawDataBag) : rawdatabag to apply the filter to
 
         Returns:
-            RawDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the masks for the pre_df and the num_df
         """
         # using isin is performant, so we just make sure to filter the rows
         # which do not have an adsh as version
-        pre_filtered_for_tags = databag.pre_df[~databag.pre_df.version.isin(databag.sub_df.adsh)]
-        num_filtered_for_tags = databag.num_df[~databag.num_df.version.isin(databag.sub_df.adsh)]
+        return {'pre_df': ~databag.pre_df.version.isin(databag.sub_df.adsh),
+                'num_df': ~databag.num_df.version.isin(databag.sub_df.adsh)}
 
-        return RawDataBag.create(sub_df=databag.sub_df,
-                                 pre_df=pre_filtered_for_tags,
-                                 num_df=num_filtered_for_tags)
 
-
-class USDOnlyRawFilter(FilterBase[RawDataBag]):
+class USDOnlyRawFilter(MaskFilterBase[RawDataBag]):
     """
     Removes all entries which have a currency in the column uom that is not USD.
     """
 
-    def filter(self, databag: RawDataBag) -> RawDataBag:
+    def get_masks(self, databag: RawDataBag) -> Dict[str, pd.Series]:
         """
         Removes all currency entries in the uom colum of the num_df that are not USD.
 
@@ -217,33 +360,24 @@ class USDOnlyRawFilter(FilterBase[RawDataBag]):
             databag(RawDataBag) : rawdatabag to apply the filter to
 
         Returns:
-            RawDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the num_df
 
         """
 
-        # currency is always in uppercase, so if it is not all uppercase, it is not a currency
-        mask_has_lower = ~databag.num_df.uom.str.isupper()
-
-        # currency is always 3 letters
-        mask_is_none_currency = databag.num_df.uom.str.len() != 3
+        return {'num_df': databag.num_df.uom.isin(
+            get_uoms_to_keep_for_usd_only(databag.num_df.uom))}
 
-        # keep USD
-        mask_usd_only = databag.num_df.uom == "USD"
+    def get_pushdown_predicates(self) -> Optional[Dict[str, pc.Expression]]:
+        """ non currency or USD uom for the num.txt file. """
+        return {NUM_TXT: usd_only_predicate()}
 
-        num_filtered_for_usd = \
-            databag.num_df[mask_has_lower | mask_is_none_currency | mask_usd_only]
 
-        return RawDataBag.create(sub_df=databag.sub_df,
-                                 pre_df=databag.pre_df,
-                                 num_df=num_filtered_for_usd)
-
-
-class NoSegmentInfoRawFilter(FilterBase[RawDataBag]):
+class NoSegmentInfoRawFilter(MaskFilterBase[RawDataBag]):
     """
     Filters only for the entries in num.txt that don't have a value in the segments column.)
     """
 
-    def filter(self, databag: RawDataBag) -> RawDataBag:
+    def get_masks(self, databag: RawDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only entries are contained that don't have segments info.
 
@@ -251,16 +385,16 @@ class NoSegmentInfoRawFilter(FilterBase[RawDataBag]):
             databag(RawDataBag) : rawdatabag to apply the filter to
 
         Returns:
-            RawDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the mask for the num_df
         """
-        num_filtered_for_main_coreg = databag.num_df[databag.num_df.segments == '']
+        return {'num_df': databag.num_df.segments == ''}
 
-        return RawDataBag.create(sub_df=databag.sub_df,
-                                 pre_df=databag.pre_df,
-                                 num_df=num_filtered_for_main_coreg)
+    def get_pushdown_predicates(self) -> Optional[Dict[str, pc.Expression]]:
+        """ empty segments for the num.txt file. """
+        return {NUM_TXT: empty_or_null_predicate('segments')}
 
 
-class CIKRawFilter(FilterBase[RawDataBag]):
+class CIKRawFilter(MaskFilterBase[RawDataBag]):
     """
     Filters the data by a list of ciks. This filter operates on the sub, pre_df and the num_df.
     """
@@ -268,7 +402,7 @@ class CIKRawFilter(FilterBase[RawDataBag]):
     def __init__(self, ciks: List[int]):
         self.ciks = ciks
 
-    def filter(self, databag: RawDataBag) -> RawDataBag:
+    def get_masks(self, databag: RawDataBag) -> Dict[str, pd.Series]:
         """
         filters the databag so that only datapoints belonging to the provided ciks
         are contained.
@@ -277,14 +411,11 @@ class CIKRawFilter(FilterBase[RawDataBag]):
             databag(RawDataBag) : rawdatabag to apply the filter to
 
         Returns:
-            RawDataBag: the databag with the filtered data
+            Dict[str, pd.Series]: the masks for the sub_df, pre_df, and num_df
         """
-        sub_filtered_for_adshs = databag.sub_df[databag.sub_df.cik.isin(self.ciks)]
-        adshs = sub_filtered_for_adshs.adsh.tolist()
-
-        pre_filtered_for_adshs = databag.pre_df[databag.pre_df.adsh.isin(adshs)]
-        num_filtered_for_adshs = databag.num_df[databag.num_df.adsh.isin(adshs)]
+        sub_mask = databag.sub_df.cik.isin(self.ciks)
+        adshs = databag.sub_df[sub_mask].adsh.tolist()
 
-        return RawDataBag.create(sub_df=sub_filtered_for_adshs,
-                                 pre_df=pre_filtered_for_adshs,
-                                 num_df=num_filtered_for_adshs)
+        return {'sub_df': sub_mask,
+                'pre_df': databag.pre_df.adsh.isin(adshs),
+                'num_df': databag.num_df.adsh.isin(adshs)}
@@ -4,11 +4,14 @@ a rule hierarchy that then is used in the standardizer.
 """
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List, Set
+from typing import TYPE_CHECKING, List, Optional, Set
 
 import pandas as pd
 import pandera as pa
 
+if TYPE_CHECKING:
+    from secfsdstools.f_standardize.rule_profiling import RuleProfiler
+
 
 @dataclass
 class DescriptionEntry:
@@ -241,20 +244,44 @@ class RuleGroup(RuleEntity):
             rule.set_id(f'{self.identifier}_#{idx}')
             idx = idx + 1
 
-    def process(self, data_df: pd.DataFrame) -> pd.DataFrame:
+    def process(self, data_df: pd.DataFrame,
+                profiler: Optional['RuleProfiler'] = None) -> pd.DataFrame:
         """
         process the dataframe and apply the rules of this group.
 
         Args:
             df (pd.DataFrame) : dataframe on which the rule has to be applied
+            profiler (RuleProfiler, optional, None): if provided, the time, the masked and
+                    the changed rows of every single rule are recorded by the profiler
         Returns:
             pd.DataFrame: make the process chainable
         """
         current_df = data_df
         for rule in self.rules:
-            current_df = rule.process(data_df=current_df)
+            if profiler is None:
+                current_df = rule.process(data_df=current_df)
+            elif isinstance(rule, RuleGroup):
+                current_df = rule.process(data_df=current_df, profiler=profiler)
+            else:
+                current_df = profiler.process_rule(rule, current_df)
         return current_df
 
+    def get_rules(self) -> List[Rule]:
+        """
+        returns the rules of this group and of all its subgroups in the order in which
+        they are processed.
+
+        Returns:
+            List[Rule]: the flattened list of rules
+        """
+        rules: List[Rule] = []
+        for rule in self.rules:
+            if isinstance(rule, RuleGroup):
+                rules.extend(rule.get_rules())
+            else:
+                rules.append(rule)
+        return rules
+
     def get_input_tags(self) -> Set[str]:
         """
         return all tags that the rules within this group need.
@@ -76,6 +76,11 @@ class ValidationRule(ABC):
         cat_column_name = f'{self.identifier}_cat'
 
         data_df[error_column_name] = np.nan
+        if len(data_df) == 0:
+            # loc cannot set a scalar on a dataframe without rows
+            data_df[cat_column_name] = np.nan
+            return
+
         data_df.loc[mask, error_column_name] = error
 
         data_df.loc[mask, cat_column_name] = 100  # gt > 0.1 / 10%
@@ -961,7 +961,11 @@ class CashFlowStandardizer(Standardizer):
                  main_iterations: int = 1,
                  invert_negated: bool = True,
                  additional_final_sub_fields: Optional[List[str]] = None,
-                 additional_final_tags: Optional[List[str]] = None):
+                 additional_final_tags: Optional[List[str]] = None,
+                 use_compiled_rules: bool = False,
+                 shards: int = 1,
+                 track_changes: bool = False,
+                 profile_rules: bool = False):
         """
         Initialize the CashFlow Standardizer.
 
@@ -1000,6 +1004,18 @@ class CashFlowStandardizer(Standardizer):
             additional_final_tags (List, Optional):
                      the "final_tags" list define the tags that will be present in the final result
                      dataframe. Additional tags can be added via this parameter. Default is None.
+            use_compiled_rules (bool, Optional, False):
+                     apply the rules with a compiled numpy execution plan instead of pandas
+                     operations, see Standardizer. The results are the same.
+            shards (int, Optional, 1):
+                     number of adsh partitions that are standardized in parallel processes,
+                     see Standardizer. The results are the same.
+            track_changes (bool, Optional, False):
+                     only evaluate the main rules on rows on which their inputs were changed
+                     in the previous main iteration, see Standardizer. The results are the same.
+            profile_rules (bool, Optional, False):
+                     record the time, the masked and the changed rows of every rule, see
+                     Standardizer. The profile is available as rule_profile_df.
         """
         super().__init__(
             prepivot_rule_tree=
@@ -1016,5 +1032,9 @@ class CashFlowStandardizer(Standardizer):
             main_iterations=main_iterations,
             invert_negated=invert_negated,
             additional_final_sub_fields=additional_final_sub_fields,
-            additional_final_tags=additional_final_tags
+            additional_final_tags=additional_final_tags,
+            use_compiled_rules=use_compiled_rules,
+            shards=shards,
+            track_changes=track_changes,
+            profile_rules=profile_rules
         )
@@ -0,0 +1,178 @@
+"""
+Tracks which rows of which tags were changed by the rules of a rule tree, so that a rule that
+is processed again (like the rules of the main rule tree in every main iteration) only has to be
+evaluated on the rows on which one of its input tags was changed since its last evaluation.
+
+This is possible for the rules in base_rules.py, since the mask and the changes of these rules
+only depend on the values of the input tags within the same row. Rows on which the inputs of
+such a rule did not change since its last evaluation cannot be selected by its mask again:
+either the mask was False before, or the rule was applied, which is tracked as a change itself.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from secfsdstools.f_standardize.base_rule_framework import Rule
+from secfsdstools.f_standardize.base_rules import (
+    CopyTagRule,
+    MissingSumRule,
+    MissingSummandRule,
+    PostCopyToFirstSummand,
+    PostFixSign,
+    PostSetToZero,
+    PreSumUpCorrection,
+    SetSumIfOnlyOneSummand,
+    SubtractFromRule,
+    SumUpRule,
+)
+from secfsdstools.f_standardize.rule_profiling import RuleProfiler, count_changed_rows
+
+# only the exact classes are tracked, subclasses could work across rows
+ROW_BASED_RULES = (
+    PreSumUpCorrection,
+    CopyTagRule,
+    MissingSumRule,
+    MissingSummandRule,
+    SumUpRule,
+    SubtractFromRule,
+    SetSumIfOnlyOneSummand,
+    PostCopyToFirstSummand,
+    PostSetToZero,
+    PostFixSign,
+)
+
+
+class RuleChangeTracker:
+    """
+    Keeps the rows that were changed by every evaluation of the provided rules and calculates
+    the rows on which a rule has to be evaluated when it is processed again. Rules which are
+    not in ROW_BASED_RULES are always evaluated on all rows.
+
+    The rules are identified by their position in the provided list, which has to be the order
+    in which they are processed (see RuleGroup.get_rules).
+    """
+
+    def __init__(self, rules: List[Rule], nr_of_rows: int):
+        """
+        Args:
+            rules: the rules to track, in the order in which they are processed
+            nr_of_rows: the number of rows of the processed dataframe
+        """
+        self.rules = rules
+        self.nr_of_rows = nr_of_rows
+        self.is_tracked: List[bool] = [type(rule) in ROW_BASED_RULES for rule in rules]
+        self.input_tags: List[List[str]] = [sorted(rule.get_input_tags()) for rule in rules]
+
+        self.step = 0
+        # the step of the last evaluation and the rows that were changed by it, for every rule
+        self.last_steps: List[Optional[int]] = [None] * len(rules)
+        self.last_changed_rows: List[np.ndarray] = [np.empty(0, dtype=np.int64)] * len(rules)
+        # the step and the changed rows of every evaluation that changed a tag
+        self.tag_changes: Dict[str, List[Tuple[int, np.ndarray]]] = {}
+
+        # counts of the evaluated and the saved rule evaluations on single rows
+        self.evaluated_rows = 0
+        self.saved_rows = 0
+
+    def get_rows_to_evaluate(self, position: int) -> Optional[np.ndarray]:
+        """
+        returns the rows on which the rule at the provided position has to be evaluated.
+
+        Args:
+            position: the position of the rule
+
+        Returns:
+            Optional[np.ndarray]: the sorted positions of the rows, None if the rule has to be
+                                  evaluated on all rows
+        """
+        last_step = self.last_steps[position]
+        if last_step is None or not self.is_tracked[position]:
+            return None
+
+        rows_parts = [self.last_changed_rows[position]]
+        for tag in self.input_tags[position]:
+            for step, changed_rows in reversed(self.tag_changes.get(tag, [])):
+                if step <= last_step:
+                    break
+                rows_parts.append(changed_rows)
+
+        return np.unique(np.concatenate(rows_parts))
+
+    def record(self, position: int, mask: np.ndarray, evaluated_rows: Optional[np.ndarray]):
+        """
+        records the result of an evaluation of the rule at the provided position.
+
+        Args:
+            position: the position of the rule
+            mask: the mask of the rule for all rows
+            evaluated_rows: the rows on which the rule was evaluated, None for all rows
+        """
+        self.step += 1
+        nr_of_evaluated_rows = self.nr_of_rows if evaluated_rows is None else len(evaluated_rows)
+        self.evaluated_rows += nr_of_evaluated_rows
+        self.saved_rows += self.nr_of_rows - nr_of_evaluated_rows
+
+        changed_rows = np.flatnonzero(mask)
+        if len(changed_rows) > 0:
+            for tag in self.rules[position].get_target_tags():
+                self.tag_changes.setdefault(tag, []).append((self.step, changed_rows))
+
+        self.last_steps[position] = self.step
+        self.last_changed_rows[position] = changed_rows
+
+    def is_stable(self) -> bool:
+        """
+        Returns:
+            bool: True if all rules are tracked and the last evaluation of every rule did not
+                  change anything, so that processing the rules again would not change anything
+        """
+        return (all(self.is_tracked)
+                and all(step is not None for step in self.last_steps)
+                and all(len(rows) == 0 for rows in self.last_changed_rows))
+
+
+def process_rules_tracked(rules: List[Rule], data_df: pd.DataFrame, tracker: RuleChangeTracker,
+                          profiler: Optional[RuleProfiler] = None):
+    """
+    processes the rules in place on the provided dataframe like RuleGroup.process does, but
+    evaluates every rule only on the rows that are returned by the tracker.
+
+    Args:
+        rules: the rules, which were also used to create the tracker
+        data_df: the pivoted dataframe on which the rules have to be applied
+        tracker: the tracker of the rules
+        profiler: if provided, the time, the masked and the changed rows of every rule are
+                  recorded by the profiler
+    """
+    for position, rule in enumerate(rules):
+        if profiler is not None:
+            before = profiler.get_target_values(rule, data_df)
+            start = time.perf_counter()
+
+        rows = tracker.get_rows_to_evaluate(position)
+
+        if rows is None:
+            rule.process(data_df=data_df)
+            mask = rule.masked.to_numpy(dtype=bool)
+        else:
+            mask = np.zeros(len(data_df), dtype=bool)
+            if len(rows) > 0:
+                # the rule only needs its input tags, the rule's changes are copied back
+                sub_df = data_df.iloc[rows, data_df.columns.get_indexer(tracker.input_tags[position])].copy()
+                rule.process(data_df=sub_df)
+                sub_mask = rule.masked.to_numpy(dtype=bool)
+                mask[rows] = sub_mask
+
+                target_tags = rule.get_target_tags()
+                data_df.iloc[rows[sub_mask], data_df.columns.get_indexer(target_tags)] = \
+                    sub_df.loc[sub_mask, target_tags].to_numpy()
+            rule.masked = pd.Series(mask, index=data_df.index)
+
+        tracker.record(position, mask, rows)
+
+        if profiler is not None:
+            profiler.add_entry(rule, time.perf_counter() - start, masked=np.count_nonzero(mask),
+                               changed=count_changed_rows(
+                                   before, profiler.get_target_values(rule, data_df)))
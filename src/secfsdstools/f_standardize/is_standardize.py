@@ -1109,7 +1109,11 @@ class IncomeStatementStandardizer(Standardizer):
                  main_iterations: int = 3,
                  invert_negated: bool = True,
                  additional_final_sub_fields: Optional[List[str]] = None,
-                 additional_final_tags: Optional[List[str]] = None):
+                 additional_final_tags: Optional[List[str]] = None,
+                 use_compiled_rules: bool = False,
+                 shards: int = 1,
+                 track_changes: bool = False,
+                 profile_rules: bool = False):
         """
         Initialize the Income Statement Standardizer.
 
@@ -1148,6 +1152,18 @@ class IncomeStatementStandardizer(Standardizer):
             additional_final_tags (List, Optional):
                      the "final_tags" list define the tags that will be present in the final result
                      dataframe. Additional tags can be added via this parameter. Default is None.
+            use_compiled_rules (bool, Optional, False):
+                     apply the rules with a compiled numpy execution plan instead of pandas
+                     operations, see Standardizer. The results are the same.
+            shards (int, Optional, 1):
+                     number of adsh partitions that are standardized in parallel processes,
+                     see Standardizer. The results are the same.
+            track_changes (bool, Optional, False):
+                     only evaluate the main rules on rows on which their inputs were changed
+                     in the previous main iteration, see Standardizer. The results are the same.
+            profile_rules (bool, Optional, False):
+                     record the time, the masked and the changed rows of every rule, see
+                     Standardizer. The profile is available as rule_profile_df.
         """
         super().__init__(
             prepivot_rule_tree=
@@ -1164,5 +1180,9 @@ class IncomeStatementStandardizer(Standardizer):
             main_iterations=main_iterations,
             invert_negated=invert_negated,
             additional_final_sub_fields=additional_final_sub_fields,
-            additional_final_tags=additional_final_tags
+            additional_final_tags=additional_final_tags,
+            use_compiled_rules=use_compiled_rules,
+            shards=shards,
+            track_changes=track_changes,
+            profile_rules=profile_rules
         )
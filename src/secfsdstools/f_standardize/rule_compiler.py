@@ -0,0 +1,359 @@
+"""
+Compiles the rules of a RuleGroup into an execution plan that works on a contiguous float64
+numpy array instead of the pivoted pandas dataframe.
+
+Every Rule in base_rules.py calculates its mask with pandas column operations and applies the
+changes with .loc assignments. For the typical rule trees of the standardizers, the overhead of
+these pandas operations is much bigger than the actual calculation. The compiled plan resolves
+the tag names to column indices once and executes the same logic with numpy. The results and
+the logs (the masks of the rules) are identical to the ones of RuleGroup.process.
+
+Rules without a compiled counterpart (like the special rules in is_standardize.py and
+cf_standardize.py) are executed as they are on the dataframe.
+"""
+import time
+from typing import Callable, Dict, List, Optional, Set, Union
+
+import numpy as np
+import pandas as pd
+
+from secfsdstools.f_standardize.base_rule_framework import Rule, RuleGroup
+from secfsdstools.f_standardize.base_rules import (
+    CopyTagRule,
+    MissingSumRule,
+    MissingSummandRule,
+    PostCopyToFirstSummand,
+    PostFixSign,
+    PostSetToZero,
+    PreSumUpCorrection,
+    SetSumIfOnlyOneSummand,
+    SubtractFromRule,
+    SumUpRule,
+)
+from secfsdstools.f_standardize.change_tracking import RuleChangeTracker
+from secfsdstools.f_standardize.rule_profiling import RuleProfiler, count_changed_rows
+
+# a compiled rule changes the values in place and returns the mask of the changed rows
+CompiledFunction = Callable[[np.ndarray], np.ndarray]
+
+
+def _isset(values: np.ndarray, col: int) -> np.ndarray:
+    return ~np.isnan(values[:, col])
+
+
+def _all_set(values: np.ndarray, cols: List[int]) -> np.ndarray:
+    mask = np.ones(len(values), dtype=bool)
+    for col in cols:
+        mask &= _isset(values, col)
+    return mask
+
+
+def _all_nan(values: np.ndarray, cols: List[int]) -> np.ndarray:
+    mask = np.ones(len(values), dtype=bool)
+    for col in cols:
+        mask &= np.isnan(values[:, col])
+    return mask
+
+
+def _any_set(values: np.ndarray, cols: List[int]) -> np.ndarray:
+    mask = np.zeros(len(values), dtype=bool)
+    for col in cols:
+        mask |= _isset(values, col)
+    return mask
+
+
+def _row_sum(values: np.ndarray, mask: np.ndarray, cols: List[int]) -> np.ndarray:
+    # same as DataFrame.sum(axis=1), the columns are added one after the other
+    total = np.where(np.isnan(values[mask, cols[0]]), 0.0, values[mask, cols[0]])
+    for col in cols[1:]:
+        total = total + np.where(np.isnan(values[mask, col]), 0.0, values[mask, col])
+    return total
+
+
+def _compile_presumupcorrection(rule: PreSumUpCorrection, idx: Dict[str, int]) -> CompiledFunction:
+    sum_col, mixed_col, other_col = idx[rule.sum_tag], idx[rule.mixed_up_summand], idx[rule.other_summand]
+
+    def execute(values: np.ndarray) -> np.ndarray:
+        mask = ((values[:, mixed_col] == values[:, sum_col] + values[:, other_col])
+                & (values[:, other_col] > 0))
+        mixed_up_values = values[mask, mixed_col]
+        values[mask, mixed_col] = values[mask, sum_col]
+        values[mask, sum_col] = mixed_up_values
+        return mask
+
+    return execute
+
+
+def _compile_copytag(rule: CopyTagRule, idx: Dict[str, int]) -> CompiledFunction:
+    target_col, original_col = idx[rule.target], idx[rule.original]
+
+    def execute(values: np.ndarray) -> np.ndarray:
+        mask = np.isnan(values[:, target_col]) & _isset(values, original_col)
+        values[mask, target_col] = values[mask, original_col]
+        return mask
+
+    return execute
+
+
+def _compile_missingsum(rule: MissingSumRule, idx: Dict[str, int]) -> CompiledFunction:
+    sum_col = idx[rule.sum_tag]
+    summand_cols = [idx[x] for x in rule.summand_tags]
+
+    def execute(values: np.ndarray) -> np.ndarray:
+        mask = np.isnan(values[:, sum_col]) & _all_set(values, summand_cols)
+        values[mask, sum_col] = _row_sum(values, mask, summand_cols)
+        return mask
+
+    return execute
+
+
+def _compile_missingsummand(rule: MissingSummandRule, idx: Dict[str, int]) -> CompiledFunction:
+    sum_col, missing_col = idx[rule.sum_tag], idx[rule.missing_summand_tag]
+    existing_cols = [idx[x] for x in rule.existing_summands_tags]
+
+    def execute(values: np.ndarray) -> np.ndarray:
+        mask = _isset(values, sum_col) & _all_set(values, existing_cols) & np.isnan(values[:, missing_col])
+        values[mask, missing_col] = values[mask, sum_col] - _row_sum(values, mask, existing_cols)
+        return mask
+
+    return execute
+
+
+def _compile_sumup(rule: SumUpRule, idx: Dict[str, int]) -> CompiledFunction:
+    sum_col = idx[rule.sum_tag]
+    potential_cols = [idx[x] for x in rule.potential_summands]
+    all_cols = [idx[x] for x in rule.all_summands]
+
+    def execute(values: np.ndarray) -> np.ndarray:
+        mask = np.isnan(values[:, sum_col]) & _any_set(values, potential_cols)
+        values[mask, sum_col] = 0.0
+        for col in all_cols:
+            summand_mask = mask & _isset(values, col)
+            values[summand_mask, sum_col] = values[summand_mask, sum_col] + values[summand_mask, col]
+        return mask
+
+    return execute
+
+
+def _compile_subtractfrom(rule: SubtractFromRule, idx: Dict[str, int]) -> CompiledFunction:
+    target_col, from_col = idx[rule.target_tag], idx[rule.subtract_from_tag]
+    subtract_cols = [idx[x] for x in rule.potential_subtract_tags]
+
+    def execute(values: np.ndarray) -> np.ndarray:
+        mask = np.isnan(values[:, target_col]) & _isset(values, from_col) & _any_set(values, subtract_cols)
+        values[mask, target_col] = values[mask, from_col]
+        for col in subtract_cols:
+            subtract_mask = mask & _isset(values, col)
+            values[subtract_mask, target_col] = values[subtract_mask, target_col] - values[subtract_mask, col]
+        return mask
+
+    return execute
+
+
+def _compile_setsumifonlyonesummand(rule: SetSumIfOnlyOneSummand, idx: Dict[str, int]) -> CompiledFunction:
+    sum_col, set_col = idx[rule.sum_tag], idx[rule.summand_set]
+    nan_cols = [idx[x] for x in rule.summands_nan]
+
+    def execute(values: np.ndarray) -> np.ndarray:
+        mask = np.isnan(values[:, sum_col]) & _isset(values, set_col) & _all_nan(values, nan_cols)
+        values[mask, sum_col] = values[mask, set_col]
+        for col in nan_cols:
+            values[mask, col] = 0.0
+        return mask
+
+    return execute
+
+
+def _compile_postcopytofirstsummand(rule: PostCopyToFirstSummand, idx: Dict[str, int]) -> CompiledFunction:
+    sum_col, first_col = idx[rule.sum_tag], idx[rule.first_summand]
+    other_cols = [idx[x] for x in rule.other_summands]
+
+    def execute(values: np.ndarray) -> np.ndarray:
+        mask = _isset(values, sum_col) & np.isnan(values[:, first_col]) & _all_nan(values, other_cols)
+        values[mask, first_col] = values[mask, sum_col]
+        for col in other_cols:
+            values[mask, col] = 0.0
+        return mask
+
+    return execute
+
+
+def _compile_postsettozero(rule: PostSetToZero, idx: Dict[str, int]) -> CompiledFunction:
+    cols = [idx[x] for x in rule.tags]
+
+    def execute(values: np.ndarray) -> np.ndarray:
+        mask = _all_nan(values, cols)
+        for col in cols:
+            values[mask, col] = 0.0
+        return mask
+
+    return execute
+
+
+def _compile_postfixsign(rule: PostFixSign, idx: Dict[str, int]) -> CompiledFunction:
+    start_col, summand_col, result_col = idx[rule.start_tag], idx[rule.summand_tag], idx[rule.result_tag]
+
+    def execute(values: np.ndarray) -> np.ndarray:
+        mask = ((values[:, summand_col] != 0)
+                & ((values[:, start_col] - values[:, summand_col]) == values[:, result_col]))
+        values[mask, summand_col] = -values[mask, summand_col]
+        return mask
+
+    return execute
+
+
+# only the exact classes are compiled, subclasses could change the logic
+RULE_COMPILERS: Dict[type, Callable[[Rule, Dict[str, int]], CompiledFunction]] = {
+    PreSumUpCorrection: _compile_presumupcorrection,
+    CopyTagRule: _compile_copytag,
+    MissingSumRule: _compile_missingsum,
+    MissingSummandRule: _compile_missingsummand,
+    SumUpRule: _compile_sumup,
+    SubtractFromRule: _compile_subtractfrom,
+    SetSumIfOnlyOneSummand: _compile_setsumifonlyonesummand,
+    PostCopyToFirstSummand: _compile_postcopytofirstsummand,
+    PostSetToZero: _compile_postsettozero,
+    PostFixSign: _compile_postfixsign,
+}
+
+
+class CompiledRule:
+    """
+    A rule together with its compiled function. The row_function is compiled for an array
+    that only contains the input columns (cols) of the rule, so that it can be applied on a
+    few selected rows without copying all the other columns.
+    """
+
+    def __init__(self, rule: Rule, tag_index: Dict[str, int]):
+        compiler = RULE_COMPILERS[type(rule)]
+        input_tags = sorted(rule.get_input_tags())
+
+        self.rule = rule
+        self.function: CompiledFunction = compiler(rule, tag_index)
+        self.cols: List[int] = [tag_index[tag] for tag in input_tags]
+        self.row_function: CompiledFunction = compiler(
+            rule, {tag: i for i, tag in enumerate(input_tags)})
+
+    def process_rows(self, values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """
+        applies the rule only on the provided rows of the values.
+
+        Args:
+            values: the values of all the columns of the group
+            rows: the positions of the rows to process
+
+        Returns:
+            np.ndarray: the mask for the provided rows
+        """
+        row_values = values[np.ix_(rows, self.cols)]
+        mask = self.row_function(row_values)
+        changed_rows = rows[mask]
+        if len(changed_rows) > 0:
+            values[np.ix_(changed_rows, self.cols)] = row_values[mask]
+        return mask
+
+
+class CompiledRuleGroup:
+    """
+    The execution plan of a RuleGroup. It can be used instead of the process method of the
+    RuleGroup, the masks of the rules are stored in the rules of the group, so that
+    RuleGroup.append_log works as usual.
+    """
+
+    def __init__(self, rule_group: RuleGroup):
+        """
+        Args:
+            rule_group: the rule group to compile
+        """
+        self.rule_group = rule_group
+
+        # all the columns that are read or written by the rules
+        self.tags: List[str] = sorted(rule_group.get_input_tags())
+        self.tag_index: Dict[str, int] = {tag: i for i, tag in enumerate(self.tags)}
+
+        self.steps: List[Union[CompiledRule, Rule]] = []
+        changed_tags: Set[str] = set()
+        for rule in rule_group.get_rules():
+            if type(rule) not in RULE_COMPILERS:
+                self.steps.append(rule)
+            else:
+                self.steps.append(CompiledRule(rule=rule, tag_index=self.tag_index))
+                changed_tags.update(rule.get_target_tags())
+
+        # only the columns that can be changed by compiled rules have to be written back
+        self.changed_cols: List[int] = sorted(self.tag_index[tag] for tag in changed_tags)
+
+        # the columns that can be changed by every step, only used for profiling
+        self.target_cols: List[List[int]] = [
+            [self.tag_index[tag] for tag in rule.get_target_tags() if tag in self.tag_index]
+            for rule in rule_group.get_rules()]
+
+    def _read_values(self, data_df: pd.DataFrame) -> np.ndarray:
+        # column major, so that every column is contiguous
+        return np.asfortranarray(data_df[self.tags].to_numpy(dtype=np.float64))
+
+    def _write_values(self, data_df: pd.DataFrame, values: np.ndarray):
+        for col in self.changed_cols:
+            data_df[self.tags[col]] = values[:, col].copy()
+
+    def is_fully_compiled(self) -> bool:
+        """
+        Returns:
+            bool: True if all rules of the group could be compiled
+        """
+        return all(isinstance(step, CompiledRule) for step in self.steps)
+
+    def process(self, data_df: pd.DataFrame,
+                tracker: Optional[RuleChangeTracker] = None,
+                profiler: Optional[RuleProfiler] = None) -> pd.DataFrame:
+        """
+        applies the rules of the group in place on the provided dataframe, like
+        RuleGroup.process does.
+
+        Args:
+            data_df (pd.DataFrame): the pivoted dataframe on which the rules have to be applied
+            tracker (RuleChangeTracker, optional, None): if provided, the rules are only
+                    evaluated on the rows that are returned by the tracker. it has to be
+                    created with the rules of the group (RuleGroup.get_rules)
+            profiler (RuleProfiler, optional, None): if provided, the time, the masked and
+                    the changed rows of every step are recorded by the profiler
+        Returns:
+            pd.DataFrame: make the process chainable
+        """
+        values = self._read_values(data_df)
+
+        for position, step in enumerate(self.steps):
+            if profiler is not None:
+                before = values[:, self.target_cols[position]]
+                start = time.perf_counter()
+
+            rows = tracker.get_rows_to_evaluate(position) if tracker is not None else None
+
+            if isinstance(step, CompiledRule):
+                if rows is None:
+                    mask = step.function(values)
+                else:
+                    mask = np.zeros(len(values), dtype=bool)
+                    if len(rows) > 0:
+                        mask[rows] = step.process_rows(values, rows)
+                step.rule.masked = pd.Series(mask, index=data_df.index)
+            else:
+                # rules that are not compiled work on the dataframe, so it has to contain the
+                # current values and the changes of the rule have to be read back
+                self._write_values(data_df, values)
+                step.process(data_df=data_df)
+                values = self._read_values(data_df)
+                mask = step.masked.to_numpy(dtype=bool)
+
+            if tracker is not None:
+                tracker.record(position, mask, rows)
+
+            if profiler is not None:
+                rule = step.rule if isinstance(step, CompiledRule) else step
+                profiler.add_entry(rule, time.perf_counter() - start,
+                                   masked=np.count_nonzero(mask),
+                                   changed=count_changed_rows(
+                                       before, values[:, self.target_cols[position]]))
+
+        self._write_values(data_df, values)
+        return data_df
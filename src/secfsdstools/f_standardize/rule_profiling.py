@@ -0,0 +1,140 @@
+"""
+Contains the optional profiling of the rules of a standardizer. For every rule that is processed,
+the time it took, the number of masked rows and the number of rows on which the rule actually
+changed a value are recorded together with the phase (PREPIVOT, PRE, MAIN_n, POST, VALID) in
+which it was processed.
+"""
+import time
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from secfsdstools.f_standardize.base_rule_framework import PrePivotRule, Rule, RuleEntity
+from secfsdstools.f_standardize.base_validation_rules import ValidationRule
+
+PROFILE_COLS = ['phase', 'identifier', 'ruleclass', 'duration', 'masked', 'changed']
+PROFILE_KEY_COLS = ['phase', 'identifier', 'ruleclass']
+
+
+def count_changed_rows(before: np.ndarray, after: np.ndarray) -> int:
+    """
+    counts the rows in which at least one value differs. NaN values are treated as equal.
+
+    Args:
+        before: the values of the target columns before a rule was processed
+        after: the values of the target columns after the rule was processed
+
+    Returns:
+        int: the number of changed rows
+    """
+    unchanged = (before == after) | (np.isnan(before) & np.isnan(after))
+    return int((~unchanged).any(axis=1).sum())
+
+
+class RuleProfiler:
+    """
+    Collects the profiling entries of the processed rules. The phase has to be set before the
+    rules of a phase are processed.
+    """
+
+    def __init__(self):
+        self.phase: str = ''
+        self.entries: List[Tuple[str, str, str, float, int, int]] = []
+
+    def add_entry(self, rule: Union[RuleEntity, ValidationRule], duration: float,
+                  masked: int, changed: int):
+        """
+        adds the profiling entry of a single rule.
+
+        Args:
+            rule: the processed rule
+            duration: the time the processing took in seconds
+            masked: the number of rows that were selected by the mask of the rule
+            changed: the number of rows on which the rule changed at least one value
+        """
+        self.entries.append((self.phase, rule.identifier, rule.__class__.__name__,
+                             duration, int(masked), int(changed)))
+
+    @staticmethod
+    def get_target_values(rule: Rule, data_df: pd.DataFrame) -> np.ndarray:
+        """
+        returns a copy of the values of the target tags of the rule.
+
+        Args:
+            rule: the rule
+            data_df: the pivoted dataframe
+
+        Returns:
+            np.ndarray: the values, one column per target tag
+        """
+        target_tags = [tag for tag in rule.get_target_tags() if tag in data_df.columns]
+        return data_df[target_tags].to_numpy(dtype=np.float64, copy=True)
+
+    def process_rule(self, rule: RuleEntity, data_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        processes a single rule and adds its profiling entry. For rules that are applied before
+        the pivot, every masked row counts as changed.
+
+        Args:
+            rule: the rule to process
+            data_df: the dataframe on which the rule has to be applied
+
+        Returns:
+            pd.DataFrame: the result of the process method of the rule
+        """
+        if isinstance(rule, Rule):
+            before = self.get_target_values(rule, data_df)
+            start = time.perf_counter()
+            result = rule.process(data_df=data_df)
+            duration = time.perf_counter() - start
+            after = self.get_target_values(rule, result)
+            self.add_entry(rule, duration, masked=np.count_nonzero(rule.get_mask()),
+                           changed=count_changed_rows(before, after))
+            return result
+
+        start = time.perf_counter()
+        result = rule.process(data_df=data_df)
+        duration = time.perf_counter() - start
+        masked = len(rule.log_df) if isinstance(rule, PrePivotRule) else 0
+        self.add_entry(rule, duration, masked=masked, changed=masked)
+        return result
+
+    def validate(self, validation_rule: ValidationRule, data_df: pd.DataFrame):
+        """
+        executes a validation rule and adds its profiling entry. validation rules do not change
+        any tags, so only the validated rows are counted as masked.
+
+        Args:
+            validation_rule: the validation rule to execute
+            data_df: the finalized dataframe
+        """
+        start = time.perf_counter()
+        validation_rule.validate(data_df)
+        duration = time.perf_counter() - start
+        masked = data_df[f'{validation_rule.identifier}_error'].notna().sum()
+        self.add_entry(validation_rule, duration, masked=masked, changed=0)
+
+    def to_df(self) -> pd.DataFrame:
+        """
+        Returns:
+            pd.DataFrame: one row per processed rule, in the order in which they were processed
+        """
+        return pd.DataFrame(self.entries, columns=PROFILE_COLS)
+
+    @staticmethod
+    def concat(profile_dfs: List[Optional[pd.DataFrame]]) -> Optional[pd.DataFrame]:
+        """
+        sums up the profiles of several standardizer runs (e.g. of the shards of the data) per
+        phase and rule.
+
+        Args:
+            profile_dfs: the profiles to combine
+
+        Returns:
+            Optional[pd.DataFrame]: the combined profile, None if one of the profiles is missing
+        """
+        if any(profile_df is None for profile_df in profile_dfs):
+            return None
+        return (pd.concat(profile_dfs, ignore_index=True)
+                .groupby(PROFILE_KEY_COLS, sort=False).sum().reset_index())
@@ -0,0 +1,245 @@
+"""
+Contains the compact representation of the log that shows which rules were applied
+on which row of the standardized data.
+"""
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RULES_LOG_INDEX_FILE = 'applied_rules_log_index.parquet'
+RULES_LOG_HITS_FILE = 'applied_rules_log_hits.parquet'
+
+HITS_SCHEMA = pa.schema([('rule_id', pa.string()), ('rows', pa.list_(pa.int32()))])
+
+
+class AppliedRulesLog:
+    """
+    Keeps the information which rules were applied on which row of the standardized data.
+
+    Instead of one boolean column per rule (and per main iteration), only the positions of the
+    rows on which a rule was applied are stored for every rule. Since most of the rules are only
+    applied on a small part of the rows, this needs a fraction of the memory and disk space.
+    The wide dataframe, with the identifier columns and one boolean column per rule, can be
+    created on demand with to_df.
+    """
+
+    def __init__(self, index_df: pd.DataFrame,
+                 rule_ids: Optional[List[str]] = None,
+                 rule_rows: Optional[List[np.ndarray]] = None):
+        """
+        Args:
+            index_df: the identifier columns of the rows (e.g. adsh, coreg, report, ddate, qtrs)
+            rule_ids: the identifiers of the rules, in the order in which they were applied
+            rule_rows: the positions of the rows, on which the rule was applied, for every rule
+        """
+        self.index_df = index_df
+        self.rule_ids: List[str] = rule_ids if rule_ids is not None else []
+        self.rule_rows: List[np.ndarray] = rule_rows if rule_rows is not None else []
+
+    def __len__(self) -> int:
+        return len(self.index_df)
+
+    def append(self, ids: List[str], masks: List[pd.Series]):
+        """
+        adds the masks of applied rules to the log.
+
+        Args:
+            ids: the identifiers of the rules
+            masks: boolean masks marking the rows on which the rule was applied. they have to
+                   have the same length and order as the index_df.
+        """
+        for rule_id, mask in zip(ids, masks):
+            self.rule_ids.append(rule_id)
+            self.rule_rows.append(np.flatnonzero(np.asarray(mask, dtype=bool)).astype(np.int32))
+
+    def sum(self) -> pd.Series:
+        """
+        Returns:
+            pd.Series: how often a rule was applied, indexed by the rule id
+        """
+        return pd.Series([len(rows) for rows in self.rule_rows], index=self.rule_ids,
+                         dtype=np.int64)
+
+    def to_df(self) -> pd.DataFrame:
+        """
+        creates the wide dataframe that contains the identifier columns and one boolean column
+        for every rule.
+
+        Returns:
+            pd.DataFrame: the wide log dataframe
+        """
+        applied = np.zeros((len(self.index_df), len(self.rule_ids)), dtype=bool)
+        for i, rows in enumerate(self.rule_rows):
+            applied[rows, i] = True
+
+        return pd.concat([self.index_df,
+                          pd.DataFrame(applied, columns=self.rule_ids, index=self.index_df.index)],
+                         axis=1)
+
+    @staticmethod
+    def from_df(log_df: pd.DataFrame, index_cols: List[str]) -> 'AppliedRulesLog':
+        """
+        creates the compact log from a wide log dataframe.
+
+        Args:
+            log_df: the wide log dataframe
+            index_cols: the identifier columns, all other columns are rule columns
+
+        Returns:
+            AppliedRulesLog: the compact log
+        """
+        rule_ids = [col for col in log_df.columns if col not in index_cols]
+        log = AppliedRulesLog(index_df=log_df[index_cols].copy())
+        # wide logs that were concatenated contain NaN for rules that are not present in all parts
+        log.append(rule_ids, [log_df[col].fillna(False) for col in rule_ids])
+        return log
+
+    @staticmethod
+    def concat(logs: List['AppliedRulesLog']) -> 'AppliedRulesLog':
+        """
+        concatenates the logs. rules which are not present in all logs are treated as not
+        applied in the logs in which they are missing.
+
+        Args:
+            logs: the logs to concatenate
+
+        Returns:
+            AppliedRulesLog: the concatenated log
+        """
+        rule_ids: List[str] = list(dict.fromkeys(rule_id for log in logs for rule_id in log.rule_ids))
+        rows_per_rule: List[List[np.ndarray]] = [[] for _ in rule_ids]
+        position = {rule_id: i for i, rule_id in enumerate(rule_ids)}
+
+        offset = 0
+        for log in logs:
+            for rule_id, rows in zip(log.rule_ids, log.rule_rows):
+                rows_per_rule[position[rule_id]].append(rows + offset)
+            offset += len(log)
+
+        return AppliedRulesLog(
+            index_df=pd.concat([log.index_df for log in logs], ignore_index=True),
+            rule_ids=rule_ids,
+            rule_rows=[np.concatenate(rows).astype(np.int32) if rows else np.empty(0, np.int32)
+                       for rows in rows_per_rule])
+
+    def save(self, target_path: str):
+        """
+        stores the log in two parquet files inside the target_path: one with the identifier
+        columns and one with the positions of the rows for every rule.
+
+        Args:
+            target_path: the directory in which the files are written
+        """
+        self.index_df.to_parquet(os.path.join(target_path, RULES_LOG_INDEX_FILE))
+        pq.write_table(self.get_hits_table(), os.path.join(target_path, RULES_LOG_HITS_FILE))
+
+    def get_hits_table(self, offset: int = 0) -> pa.Table:
+        """
+        creates the table with the positions of the rows for every rule, as it is stored in
+        the hits file.
+
+        Args:
+            offset: is added to all positions, used if the log is appended to the rows of
+                    other logs in the same file
+
+        Returns:
+            pa.Table: table with the columns rule_id and rows
+        """
+        offsets = np.zeros(len(self.rule_rows) + 1, dtype=np.int32)
+        offsets[1:] = np.cumsum([len(rows) for rows in self.rule_rows])
+        values = np.concatenate(self.rule_rows) + offset if self.rule_rows \
+            else np.empty(0, np.int32)
+
+        return pa.Table.from_arrays(
+            [pa.array(self.rule_ids, type=pa.string()),
+             pa.ListArray.from_arrays(pa.array(offsets),
+                                      pa.array(values.astype(np.int32), type=pa.int32()))],
+            schema=HITS_SCHEMA)
+
+    @staticmethod
+    def load(target_path: str) -> 'AppliedRulesLog':
+        """
+        loads a log that was stored with save. the hits file can contain several entries for
+        the same rule, if it was written in parts (see get_hits_table), they are combined.
+
+        Args:
+            target_path: the directory which contains the files
+
+        Returns:
+            AppliedRulesLog: the loaded log
+        """
+        index_df = pd.read_parquet(os.path.join(target_path, RULES_LOG_INDEX_FILE))
+
+        hits_table = pq.read_table(os.path.join(target_path, RULES_LOG_HITS_FILE))
+        rows_array = hits_table.column('rows').combine_chunks()
+        offsets = rows_array.offsets.to_numpy()
+        values = rows_array.values.to_numpy(zero_copy_only=False)
+
+        rows_per_rule: Dict[str, List[np.ndarray]] = {}
+        for rule_id, start, end in zip(hits_table.column('rule_id').to_pylist(),
+                                       offsets[:-1], offsets[1:]):
+            rows_per_rule.setdefault(rule_id, []).append(values[start:end])
+
+        return AppliedRulesLog(
+            index_df=index_df,
+            rule_ids=list(rows_per_rule.keys()),
+            rule_rows=[rows[0] if len(rows) == 1 else np.concatenate(rows)
+                       for rows in rows_per_rule.values()])
+
+    @staticmethod
+    def is_saved_in(target_path: str) -> bool:
+        """ Check whether the target_path contains the files of a saved log. """
+        return os.path.exists(os.path.join(target_path, RULES_LOG_HITS_FILE))
+
+
+class AppliedRulesLogHolder:
+    """
+    Base class for classes that keep an AppliedRulesLog (Standardizer and StandardizedBag).
+
+    Besides the compact log in applied_rules_log, the wide dataframe is available as
+    applied_rules_log_df. The dataframe is created once and kept, so that changes on it, like
+    adding a column, are not lost: they are written back into the compact log the next time
+    applied_rules_log is used. After that, a new dataframe is created on the next access.
+    """
+
+    # the identifier columns of the wide log dataframe
+    rules_log_index_cols: List[str] = ['adsh', 'coreg', 'report', 'ddate', 'qtrs']
+
+    _applied_rules_log: Optional[AppliedRulesLog] = None
+    _applied_rules_log_df: Optional[pd.DataFrame] = None
+
+    @property
+    def applied_rules_log(self) -> Optional[AppliedRulesLog]:
+        """
+        Returns:
+            AppliedRulesLog: the compact log, including the changes of the wide dataframe
+        """
+        if self._applied_rules_log_df is not None:
+            self._applied_rules_log = AppliedRulesLog.from_df(self._applied_rules_log_df,
+                                                              index_cols=self.rules_log_index_cols)
+            self._applied_rules_log_df = None
+        return self._applied_rules_log
+
+    @applied_rules_log.setter
+    def applied_rules_log(self, log: Optional[AppliedRulesLog]):
+        self._applied_rules_log = log
+        self._applied_rules_log_df = None
+
+    @property
+    def applied_rules_log_df(self) -> Optional[pd.DataFrame]:
+        """
+        Returns:
+            pd.DataFrame: the identifier columns and one boolean column for every applied rule
+        """
+        if self._applied_rules_log_df is None and self._applied_rules_log is not None:
+            self._applied_rules_log_df = self._applied_rules_log.to_df()
+        return self._applied_rules_log_df
+
+    @applied_rules_log_df.setter
+    def applied_rules_log_df(self, log_df: Optional[pd.DataFrame]):
+        self._applied_rules_log = None
+        self._applied_rules_log_df = log_df
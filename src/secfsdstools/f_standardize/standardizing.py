@@ -1,44 +1,112 @@
 """Contains the base implementation of the standardizer"""
+import copy
 import logging
 import os
 from pathlib import Path
-from typing import List, Optional, Set, TypeVar
+from typing import Any, Dict, List, Optional, Set, TypeVar
 
 import numpy as np
 import pandas as pd
-
-from secfsdstools.a_utils.fileutils import check_dir
-from secfsdstools.d_container.databagmodel import JoinedDataBag
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from secfsdstools.a_utils.constants import PRE_NUM_TXT
+from secfsdstools.a_utils.fileutils import check_dir, read_df_from_parquet
+from secfsdstools.a_utils.parallelexecution import ParallelExecutor
+from secfsdstools.d_container.databagmodel import JoinedDataBag, get_columns_with_keys
 from secfsdstools.e_presenter.presenting import Presenter
 from secfsdstools.f_standardize.base_rule_framework import DescriptionEntry, PrePivotRule, RuleGroup
 from secfsdstools.f_standardize.base_validation_rules import ValidationRule
+from secfsdstools.f_standardize.change_tracking import RuleChangeTracker, process_rules_tracked
+from secfsdstools.f_standardize.rule_compiler import CompiledRuleGroup
+from secfsdstools.f_standardize.rule_profiling import RuleProfiler
+from secfsdstools.f_standardize.rules_log import (
+    HITS_SCHEMA,
+    RULES_LOG_HITS_FILE,
+    RULES_LOG_INDEX_FILE,
+    AppliedRulesLog,
+    AppliedRulesLogHolder,
+)
 
 STANDARDIZED = TypeVar('STANDARDIZED', bound='StandardizedBag')
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_MAX_ROWS_PER_BATCH = 2_000_000
+
+
+def get_adsh_batches(pre_num_file: str, max_rows_per_batch: int) -> List[List[str]]:
+    """
+    splits the reports in the pre_num parquet file into batches of sorted adshs, so that a
+    batch contains at most max_rows_per_batch rows. A report is never split, so a single
+    report with more rows than max_rows_per_batch gets a batch on its own.
+    Only the adsh column is read, record batch by record batch.
+
+    Args:
+        pre_num_file: the pre_num parquet file of a JoinedDataBag
+        max_rows_per_batch: the maximal number of rows of a batch
 
-class StandardizedBag:
+    Returns:
+        List[List[str]]: the adshs of every batch
+    """
+    rows_per_adsh: Dict[str, int] = {}
+    for record_batch in pq.ParquetFile(pre_num_file).iter_batches(columns=['adsh']):
+        for adsh, count in record_batch.column(0).to_pandas().value_counts().items():
+            rows_per_adsh[adsh] = rows_per_adsh.get(adsh, 0) + count
+
+    batches: List[List[str]] = []
+    current_batch: List[str] = []
+    current_rows = 0
+    for adsh in sorted(rows_per_adsh):
+        if current_batch and current_rows + rows_per_adsh[adsh] > max_rows_per_batch:
+            batches.append(current_batch)
+            current_batch, current_rows = [], 0
+        current_batch.append(adsh)
+        current_rows += rows_per_adsh[adsh]
+
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+class StandardizedBag(AppliedRulesLogHolder):
     """
     A class to contain the results of a standardizer.
+
+    The log of the applied rules is kept in the compact form of AppliedRulesLog,
+    the wide dataframe with one column per rule is available as applied_rules_log_df.
+    The log can be provided either as wide dataframe (applied_rules_log_df) or in the
+    compact form (applied_rules_log).
+    If the rules were profiled, rule_profile_df contains the profile (see RuleProfiler).
+    If the changes of the main rules were tracked, rule_evaluations_df contains the number of
+    evaluated and saved rule evaluations per main iteration (see Stats.rule_evaluations).
     """
 
     def __init__(self,
                  result_df: pd.DataFrame,
                  applied_prepivot_rules_log_df: pd.DataFrame,
-                 applied_rules_log_df: pd.DataFrame,
+                 applied_rules_log_df: Optional[pd.DataFrame],
                  stats_df: pd.DataFrame,
                  applied_rules_sum_s: pd.Series,
                  validation_overview_df: pd.DataFrame,
-                 process_description_df: pd.DataFrame):
+                 process_description_df: pd.DataFrame,
+                 rule_profile_df: Optional[pd.DataFrame] = None,
+                 rule_evaluations_df: Optional[pd.DataFrame] = None,
+                 applied_rules_log: Optional[AppliedRulesLog] = None):
 
         self.result_df = result_df
         self.applied_prepivot_rules_log_df = applied_prepivot_rules_log_df
-        self.applied_rules_log_df = applied_rules_log_df
+        if applied_rules_log is not None:
+            self.applied_rules_log = applied_rules_log
+        else:
+            self.applied_rules_log_df = applied_rules_log_df
         self.stats_df = stats_df
         self.applied_rules_sum_s = applied_rules_sum_s
         self.validation_overview_df = validation_overview_df
         self.process_description_df = process_description_df
+        self.rule_profile_df = rule_profile_df
+        self.rule_evaluations_df = rule_evaluations_df
 
     def save(self, target_path: str):
         """
@@ -56,15 +124,19 @@ class StandardizedBag:
         self.result_df.to_parquet(os.path.join(target_path, 'result.parquet'))
         self.applied_prepivot_rules_log_df.to_parquet(
             os.path.join(target_path, 'applied_prepivot_rules_log.parquet'))
-
-        # this line causes problems when running in parallel
-        self.applied_rules_log_df.to_parquet(os.path.join(target_path, 'applied_rules_log.parquet'))
+        self.applied_rules_log.save(target_path)
         self.stats_df.to_parquet(os.path.join(target_path, 'stats.parquet'))
-        self.applied_rules_sum_s.to_csv(os.path.join(target_path, 'applied_rules_sum.csv'))
+        # without a header, since it is read without one and would become an entry otherwise
+        self.applied_rules_sum_s.to_csv(os.path.join(target_path, 'applied_rules_sum.csv'),
+                                        header=False)
         self.validation_overview_df.to_parquet(
             os.path.join(target_path, 'validation_overview.parquet'))
         self.process_description_df.to_parquet(
             os.path.join(target_path, 'process_description.parquet'))
+        if self.rule_profile_df is not None:
+            self.rule_profile_df.to_parquet(os.path.join(target_path, 'rule_profile.parquet'))
+        if self.rule_evaluations_df is not None:
+            self.rule_evaluations_df.to_parquet(os.path.join(target_path, 'rule_evaluations.parquet'))
 
     @staticmethod
     def load(target_path: str) -> STANDARDIZED:
@@ -77,12 +149,33 @@ class StandardizedBag:
         Returns:
             STANDARDIZED: the loaded Databag
         """
+        bag = StandardizedBag.load_summaries(target_path)
 
-        result_df = pd.read_parquet(os.path.join(target_path, 'result.parquet'))
-        applied_prepivot_rules_log_df = pd.read_parquet(
+        bag.result_df = pd.read_parquet(os.path.join(target_path, 'result.parquet'))
+        bag.applied_prepivot_rules_log_df = pd.read_parquet(
             os.path.join(target_path, 'applied_prepivot_rules_log.parquet'))
-        applied_rules_log_df = pd.read_parquet(
-            os.path.join(target_path, 'applied_rules_log.parquet'))
+        if AppliedRulesLog.is_saved_in(target_path):
+            bag.applied_rules_log = AppliedRulesLog.load(target_path)
+        else:
+            # bags that were saved with the wide log dataframe
+            bag.applied_rules_log = AppliedRulesLog.from_df(
+                pd.read_parquet(os.path.join(target_path, 'applied_rules_log.parquet')),
+                index_cols=StandardizedBag.rules_log_index_cols)
+        return bag
+
+    @staticmethod
+    def load_summaries(target_path: str) -> STANDARDIZED:
+        """
+        Loads only the summaries of the bag at the specified location: the stats, the applied
+        rules sum, the validation overview, the process description, the rule profile and the
+        rule evaluations. The result and the logs are None.
+
+        Args:
+            target_path: the directory which contains the parquet files
+
+        Returns:
+            STANDARDIZED: the bag with the summaries
+        """
         stats_df = pd.read_parquet(os.path.join(target_path, 'stats.parquet'))
         applied_rules_sum_s = pd.read_csv(
             os.path.join(target_path, 'applied_rules_sum.csv'),
@@ -91,13 +184,22 @@ class StandardizedBag:
             os.path.join(target_path, 'validation_overview.parquet'))
         process_description_df = pd.read_parquet(
             os.path.join(target_path, 'process_description.parquet'))
-
-        return StandardizedBag(result_df=result_df,
-                               applied_prepivot_rules_log_df=applied_prepivot_rules_log_df,
-                               applied_rules_log_df=applied_rules_log_df, stats_df=stats_df,
+        rule_profile_path = os.path.join(target_path, 'rule_profile.parquet')
+        rule_profile_df = pd.read_parquet(rule_profile_path) \
+            if os.path.exists(rule_profile_path) else None
+        rule_evaluations_path = os.path.join(target_path, 'rule_evaluations.parquet')
+        rule_evaluations_df = pd.read_parquet(rule_evaluations_path) \
+            if os.path.exists(rule_evaluations_path) else None
+
+        return StandardizedBag(result_df=None,
+                               applied_prepivot_rules_log_df=None,
+                               applied_rules_log_df=None,
+                               stats_df=stats_df,
                                applied_rules_sum_s=applied_rules_sum_s,
                                validation_overview_df=validation_overview_df,
-                               process_description_df=process_description_df)
+                               process_description_df=process_description_df,
+                               rule_profile_df=rule_profile_df,
+                               rule_evaluations_df=rule_evaluations_df)
 
     @staticmethod
     # pylint: disable=R0914
@@ -112,10 +214,31 @@ class StandardizedBag:
 
         """
 
-        result_dfs = [bag.result_df for bag in bags]
-        applied_prepivot_rules_log_dfs = [bag.applied_prepivot_rules_log_df for bag in bags]
-        applied_rules_log_dfs = [bag.applied_rules_log_df for bag in bags]
+        result_df = pd.concat([bag.result_df for bag in bags], ignore_index=True)
+        applied_prepivot_rules_log_df = pd.concat(
+            [bag.applied_prepivot_rules_log_df for bag in bags], ignore_index=True)
+        applied_rules_log = AppliedRulesLog.concat([bag.applied_rules_log for bag in bags])
+
+        return StandardizedBag(result_df=result_df,
+                               applied_prepivot_rules_log_df=applied_prepivot_rules_log_df,
+                               applied_rules_log_df=None, applied_rules_log=applied_rules_log,
+                               process_description_df=bags[0].process_description_df,
+                               **StandardizedBag.concat_summaries(bags, len(result_df)))
+
+    @staticmethod
+    def concat_summaries(bags: List[STANDARDIZED], nr_of_rows: int) -> Dict[str, Any]:
+        """
+        combines the stats, the applied rules sums, the validation overviews and the rule
+        profiles of multiple StandardizedBags.
+
+        Args:
+            bags: List of StandardizeBag instances, only the summaries are used
+            nr_of_rows: the number of rows of all the results together
 
+        Returns:
+            Dict[str, Any]: stats_df, applied_rules_sum_s, validation_overview_df,
+                            rule_profile_df and rule_evaluations_df
+        """
         # get stats_df, without the _rel and _gain cols
         stats_dfs = [bag.stats_df.loc[:, ~bag.stats_df.columns.str.endswith('_rel') &
                                          ~bag.stats_df.columns.str.endswith('_gain')]
@@ -127,13 +250,11 @@ class StandardizedBag:
         validation_overview_dfs = [bag.validation_overview_df.loc[:,
                                    ~bag.validation_overview_df.columns.str.endswith('_pct')]
                                    for bag in bags]
-        process_description_dfs = [bag.process_description_df for bag in bags]
 
-        result_df = pd.concat(result_dfs, ignore_index=True)
-        applied_prepivot_rules_log_df = pd.concat(applied_prepivot_rules_log_dfs, ignore_index=True)
-        applied_rules_log_df = pd.concat(applied_rules_log_dfs, ignore_index=True)
-        applied_rules_sum_s: pd.Series = sum(applied_rules_sum_ss)
-        process_description_df = process_description_dfs[0]
+        # a rule could be missing in the sums of some bags, so missing entries count as 0
+        applied_rules_sum_s: pd.Series = applied_rules_sum_ss[0]
+        for entry_s in applied_rules_sum_ss[1:]:
+            applied_rules_sum_s = applied_rules_sum_s.add(entry_s, fill_value=0)
 
         # handling stats
         #  stats_dfs only contains stats_df objects without _rel and _gain, so we can simply sum
@@ -141,27 +262,28 @@ class StandardizedBag:
         # next we use the Stats class do recalculate the _gain and _rel columns
         stats = Stats([])
         stats.stats = stats_df
-        stats.finalize_stats(len(result_df))
+        stats.finalize_stats(nr_of_rows)
 
         stats_df = stats.stats
 
         # handling validation overview
-        validation_overview_df = validation_overview_dfs[0]
+        validation_overview_df = validation_overview_dfs[0].copy()
         for entry_df in validation_overview_dfs[1:]:
             validation_overview_df = validation_overview_df.add(entry_df, fill_value=0)
 
         # calculate validation percentage columns
         for col in validation_overview_df.columns:
             validation_overview_df[f"{col}_pct"] = \
-                100 * (validation_overview_df[col] / len(result_df))
+                100 * (validation_overview_df[col] / nr_of_rows)
 
-        return StandardizedBag(result_df=result_df,
-                               applied_prepivot_rules_log_df=applied_prepivot_rules_log_df,
-                               applied_rules_log_df=applied_rules_log_df,
-                               stats_df=stats_df,
-                               applied_rules_sum_s=applied_rules_sum_s,
-                               validation_overview_df=validation_overview_df,
-                               process_description_df=process_description_df)
+        return {'stats_df': stats_df,
+                'applied_rules_sum_s': applied_rules_sum_s,
+                'validation_overview_df': validation_overview_df,
+                # the profiles are summed up per rule, if all bags were profiled
+                'rule_profile_df': RuleProfiler.concat([bag.rule_profile_df for bag in bags]),
+                # the evaluations are summed up per main iteration, if all bags tracked the changes
+                'rule_evaluations_df': Stats.concat_rule_evaluations(
+                    [bag.rule_evaluations_df for bag in bags])}
 
     @staticmethod
     def is_standardizebag_path(path: Path) -> bool:
@@ -170,6 +292,187 @@ class StandardizedBag:
                 (path / "applied_prepivot_rules_log.parquet").exists())
 
 
+class _ParquetAppender:
+    """
+    Appends dataframes with the same columns to a single parquet file. The schema is taken from
+    the first dataframe that is not empty, columns that only contain None in it are expected to
+    be string columns. The float_columns are always written as float64, since they only
+    contain integers in a dataframe without NaN values.
+    Every dataframe is cast to the schema with safe casting, so a column with a type that
+    cannot be converted without loss raises an error instead of writing wrong values.
+    """
+
+    def __init__(self, file: str, float_columns: Optional[List[str]] = None):
+        self.file = file
+        self.float_columns = float_columns or []
+        self.schema: Optional[pa.Schema] = None
+        self.writer: Optional[pq.ParquetWriter] = None
+        self.empty_df: Optional[pd.DataFrame] = None
+
+    def append(self, data_df: pd.DataFrame):
+        """ appends the rows of the dataframe to the file. """
+        if len(data_df) == 0:
+            if self.empty_df is None:
+                self.empty_df = data_df
+            return
+
+        float_columns = [col for col in self.float_columns if col in data_df.columns]
+        if float_columns:
+            data_df = data_df.astype({col: np.float64 for col in float_columns})
+        table = pa.Table.from_pandas(data_df, preserve_index=False)
+
+        if self.writer is None:
+            self.schema = pa.schema([field.with_type(pa.string())
+                                     if pa.types.is_null(field.type) else field
+                                     for field in table.schema], metadata=table.schema.metadata)
+            self.writer = pq.ParquetWriter(self.file, self.schema)
+
+        self.writer.write_table(table.select(self.schema.names).cast(self.schema, safe=True))
+
+    def append_file(self, file: str):
+        """ appends the rows of a parquet file record batch by record batch. """
+        parquet_file = pq.ParquetFile(file)
+        if parquet_file.metadata.num_rows == 0:
+            # keeps the columns, in case no other dataframe has rows
+            self.append(parquet_file.read().to_pandas())
+        for record_batch in parquet_file.iter_batches():
+            self.append(record_batch.to_pandas())
+
+    def close(self):
+        """ closes the file. if only empty dataframes were appended, an empty file is written. """
+        if self.writer is not None:
+            self.writer.close()
+        elif self.empty_df is not None:
+            self.empty_df.to_parquet(self.file)
+
+
+class StandardizedBagWriter:
+    """
+    Writes a StandardizedBag part by part into a directory, so that the results of the parts
+    never have to be in memory at the same time. The result, the logs and the summaries are
+    the same as if the parts were combined with StandardizedBag.concat and saved, the written
+    bag can be loaded with StandardizedBag.load.
+    """
+
+    def __init__(self, target_path: str, float_columns: Optional[List[str]] = None):
+        """
+        Args:
+            target_path: the directory to write the bag to. it has to exist and must be empty.
+            float_columns: the columns of the results that are always written as float64, like
+                           the tags and the validation columns
+        """
+        check_dir(target_path)
+        self.target_path = target_path
+
+        self.result_appender = _ParquetAppender(os.path.join(target_path, 'result.parquet'),
+                                                float_columns=float_columns)
+        self.prepivot_log_appender = _ParquetAppender(
+            os.path.join(target_path, 'applied_prepivot_rules_log.parquet'))
+        self.rules_log_index_appender = _ParquetAppender(
+            os.path.join(target_path, RULES_LOG_INDEX_FILE))
+        self.rules_log_hits_writer = pq.ParquetWriter(
+            os.path.join(target_path, RULES_LOG_HITS_FILE), HITS_SCHEMA)
+
+        # the summaries are small, so they are kept and combined at the end
+        self.summary_bags: List[StandardizedBag] = []
+        self.empty_bag: Optional[StandardizedBag] = None
+        self.nr_of_rows = 0
+        self.nr_of_log_rows = 0
+
+    def append(self, bag: StandardizedBag):
+        """
+        writes the result and the logs of the bag and keeps its summaries.
+
+        A part without any rows, e.g. because all its rows had segments or no main statement
+        tags, is skipped. If no other part is appended, it is written as empty bag.
+
+        Args:
+            bag: the StandardizedBag of the next part
+        """
+        if len(bag.result_df) == 0 and len(bag.applied_prepivot_rules_log_df) == 0:
+            self.empty_bag = bag
+            return
+        self._append(bag)
+
+    def _append(self, bag: StandardizedBag):
+        self.result_appender.append(bag.result_df)
+        self.prepivot_log_appender.append(bag.applied_prepivot_rules_log_df)
+        self.rules_log_index_appender.append(bag.applied_rules_log.index_df)
+        self.rules_log_hits_writer.write_table(
+            bag.applied_rules_log.get_hits_table(offset=self.nr_of_log_rows))
+
+        self.nr_of_rows += len(bag.result_df)
+        self.nr_of_log_rows += len(bag.applied_rules_log)
+
+        # only the summaries are kept, see StandardizedBag.concat_summaries
+        summary_bag = copy.copy(bag)
+        summary_bag.result_df = None
+        summary_bag.applied_prepivot_rules_log_df = None
+        summary_bag.applied_rules_log = None
+        self.summary_bags.append(summary_bag)
+
+    def append_saved(self, bag_path: str):
+        """
+        appends a StandardizedBag that was saved in bag_path without loading it at once. The
+        result and the logs are copied record batch by record batch, only the summaries are
+        loaded.
+
+        Args:
+            bag_path: the directory of the saved StandardizedBag
+        """
+        if not AppliedRulesLog.is_saved_in(bag_path):
+            # bags that were saved with the wide log dataframe have to be converted
+            self._append(StandardizedBag.load(bag_path))
+            return
+
+        result_file = os.path.join(bag_path, 'result.parquet')
+        log_index_file = os.path.join(bag_path, RULES_LOG_INDEX_FILE)
+        self.result_appender.append_file(result_file)
+        self.prepivot_log_appender.append_file(
+            os.path.join(bag_path, 'applied_prepivot_rules_log.parquet'))
+        self.rules_log_index_appender.append_file(log_index_file)
+
+        # the positions of the rows are shifted behind the rows of the parts before
+        offset = pa.scalar(self.nr_of_log_rows, pa.int32())
+        for record_batch in pq.ParquetFile(os.path.join(bag_path, RULES_LOG_HITS_FILE)).iter_batches():
+            rows = record_batch.column(1)
+            self.rules_log_hits_writer.write_table(pa.Table.from_arrays(
+                [record_batch.column(0),
+                 pa.ListArray.from_arrays(rows.offsets, pc.add(rows.values, offset))],
+                schema=HITS_SCHEMA))
+
+        self.nr_of_rows += pq.ParquetFile(result_file).metadata.num_rows
+        self.nr_of_log_rows += pq.ParquetFile(log_index_file).metadata.num_rows
+        self.summary_bags.append(StandardizedBag.load_summaries(bag_path))
+
+    def close(self):
+        """
+        closes the written files and writes the combined summaries.
+        """
+        if not self.summary_bags and self.empty_bag is not None:
+            self._append(self.empty_bag)
+
+        self.result_appender.close()
+        self.prepivot_log_appender.close()
+        self.rules_log_index_appender.close()
+        self.rules_log_hits_writer.close()
+
+        summaries = StandardizedBag.concat_summaries(self.summary_bags, self.nr_of_rows)
+        summaries['stats_df'].to_parquet(os.path.join(self.target_path, 'stats.parquet'))
+        summaries['applied_rules_sum_s'].to_csv(
+            os.path.join(self.target_path, 'applied_rules_sum.csv'), header=False)
+        summaries['validation_overview_df'].to_parquet(
+            os.path.join(self.target_path, 'validation_overview.parquet'))
+        self.summary_bags[0].process_description_df.to_parquet(
+            os.path.join(self.target_path, 'process_description.parquet'))
+        if summaries['rule_profile_df'] is not None:
+            summaries['rule_profile_df'].to_parquet(
+                os.path.join(self.target_path, 'rule_profile.parquet'))
+        if summaries['rule_evaluations_df'] is not None:
+            summaries['rule_evaluations_df'].to_parquet(
+                os.path.join(self.target_path, 'rule_evaluations.parquet'))
+
+
 class Stats:
     """
     Simple class to hold the process statics. This class contains
@@ -188,6 +491,10 @@ class Stats:
         # values were calculated.
         self.stats: Optional[pd.DataFrame] = None
 
+        # if the changes of the main rules are tracked, it contains the number of rule
+        # evaluations on single rows that were done and that were saved per process step
+        self.rule_evaluations: Optional[pd.DataFrame] = None
+
     def initialize(self, data_df: pd.DataFrame, process_step_name: str):
         """
         initializes the internal dataframe with the first process step
@@ -210,6 +517,35 @@ class Stats:
         stats_entry = self._calculate_stats(data_df=data_df, name=process_step_name)
         self.stats = self.stats.join(stats_entry)
 
+    def add_rule_evaluations_entry(self, evaluated: int, saved: int, process_step_name: str):
+        """
+        adds the number of the evaluated and the saved rule evaluations of a process step.
+        Args:
+            evaluated: the number of rule evaluations on single rows
+            saved: the number of rule evaluations on single rows that were not necessary
+            process_step_name: name of the process step
+        """
+        entry_df = pd.DataFrame({'evaluated': [evaluated], 'saved': [saved]},
+                                index=[process_step_name])
+        self.rule_evaluations = entry_df if self.rule_evaluations is None \
+            else pd.concat([self.rule_evaluations, entry_df])
+
+    @staticmethod
+    def concat_rule_evaluations(rule_evaluations_dfs: List[Optional[pd.DataFrame]]) \
+            -> Optional[pd.DataFrame]:
+        """
+        sums up the rule evaluations of several standardizer runs per process step.
+
+        Args:
+            rule_evaluations_dfs: the rule evaluations to combine
+
+        Returns:
+            Optional[pd.DataFrame]: the combined rule evaluations, None if one of them is missing
+        """
+        if any(entry_df is None for entry_df in rule_evaluations_dfs):
+            return None
+        return pd.concat(rule_evaluations_dfs).groupby(level=0, sort=False).sum()
+
     def _calculate_stats(self, data_df: pd.DataFrame, name: str) -> pd.Series:
         stats_s = data_df[self.tags].isna().sum(axis=0)
         stats_s.name = name
@@ -240,7 +576,7 @@ class Stats:
         self.stats = self.stats[final_stats_columns]
 
 
-class Standardizer(Presenter[JoinedDataBag]):
+class Standardizer(AppliedRulesLogHolder, Presenter[JoinedDataBag]):
     """
     The Standardizer implements the base processing logic to standardize financial statements.
     """
@@ -263,7 +599,11 @@ class Standardizer(Presenter[JoinedDataBag]):
                  main_iterations: int = 2,
                  invert_negated: bool = True,
                  additional_final_sub_fields: Optional[List[str]] = None,
-                 additional_final_tags: Optional[List[str]] = None):
+                 additional_final_tags: Optional[List[str]] = None,
+                 use_compiled_rules: bool = False,
+                 shards: int = 1,
+                 track_changes: bool = False,
+                 profile_rules: bool = False):
         """
 
         Args:
@@ -302,6 +642,28 @@ class Standardizer(Presenter[JoinedDataBag]):
             additional_final_tags:
                      the "final_tags" list define the tags that will be present in the final result
                      dataframe. Additional tags can be added via this parameter. Default is None.
+            use_compiled_rules (bool, Optional, False):
+                     executes the pre, main, and post rule trees with a compiled plan on a numpy
+                     array instead of pandas operations on the pivoted dataframe
+                     (see rule_compiler.CompiledRuleGroup). The results and logs are the same,
+                     but the processing is considerably faster.
+            shards (int, Optional, 1):
+                     number of partitions into which the data is split by adsh. if it is bigger
+                     than 1, the partitions are standardized in parallel processes and the results
+                     are merged like StandardizedBag.concat does. since the rules only work
+                     within a single report, the result is the same as without sharding.
+            track_changes (bool, Optional, False):
+                     tracks the rows that were changed by the main rules, so that in the
+                     following main iterations a rule is only evaluated on the rows on which
+                     one of its input tags was changed (see change_tracking.RuleChangeTracker).
+                     If an iteration did not change anything, the remaining iterations do not
+                     evaluate any rule. The results and logs are the same, the number of
+                     saved evaluations is available in stats.rule_evaluations.
+            profile_rules (bool, Optional, False):
+                     records the time, the number of masked rows and the number of changed
+                     rows of every rule in every phase (PREPIVOT, PRE, MAIN_n, POST, VALID).
+                     The profile is available as rule_profile_df and is stored with the
+                     StandardizedBag.
         """
         self.prepivot_rule_tree = prepivot_rule_tree
         self.pre_rule_tree = pre_rule_tree
@@ -328,6 +690,21 @@ class Standardizer(Presenter[JoinedDataBag]):
 
         self.final_col_order = self.identifier_cols + self.final_tags
 
+        self.shards = shards
+        self.track_changes = track_changes
+
+        self.profile_rules = profile_rules
+        self.rule_profiler: Optional[RuleProfiler] = None
+        # the profile of the last call of the process method, if profile_rules is set
+        self.rule_profile_df: Optional[pd.DataFrame] = None
+
+        self.use_compiled_rules = use_compiled_rules
+        self.compiled_rule_trees: Dict[str, CompiledRuleGroup] = {}
+        if use_compiled_rules:
+            self.compiled_rule_trees = {"PRE": CompiledRuleGroup(pre_rule_tree),
+                                        "MAIN": CompiledRuleGroup(main_rule_tree),
+                                        "POST": CompiledRuleGroup(post_rule_tree)}
+
         # attribute to store the last result of calling the process method
         self.result: Optional[pd.DataFrame] = None
 
@@ -335,15 +712,53 @@ class Standardizer(Presenter[JoinedDataBag]):
         # a special log that logs which prepivot rules were applied
         self.applied_prepivot_rules_log_df: Optional[pd.DataFrame] = None
         # .. the main_log that shows which rules were applied on which statement/row
-        self.applied_rules_log_df: Optional[pd.DataFrame] = None
-        # .. shows the total of how often a rule was applied, mainly counts the Trues per column
-        #    in self.applied_rules_log_df
+        self.applied_rules_log = None
+        # .. shows the total of how often a rule was applied
         self.applied_rules_sum_s: Optional[pd.Series] = None
         self.validation_overview_df: Optional[pd.DataFrame] = None
 
         self.stats = Stats(self.final_tags)
 
-    def _preprocess_pivot(self, data_df: pd.DataFrame, expected_tags: Set[str]) -> pd.DataFrame:
+    def _append_log(self, rule_tree: RuleGroup):
+        ids: List[str] = []
+        masks: List[pd.Series] = []
+        rule_tree.collect_masked_entries(ids, masks)
+        self.applied_rules_log.append(ids, masks)
+
+    def get_required_columns(self) -> List[str]:
+        """
+        returns the columns of the sub_df and the pre_num_df which are used by the process
+        and the present method. Can be used as the columns parameter when loading a bag, so
+        that the text columns (like plabel, footnote, or the addresses) are not loaded at all.
+
+        Returns:
+            List[str]: the names of the required columns
+        """
+        pre_num_cols = self.identifier_cols + ['tag', 'version', 'value', 'line', 'negating',
+                                               'uom', 'segments']
+        sub_cols = self.sub_df_result_cols + ['name', 'period'] + \
+            (self.additional_final_sub_fields if self.additional_final_sub_fields else [])
+
+        return list(dict.fromkeys(pre_num_cols + sub_cols))
+
+    def _process_rule_tree(self, part: str, rule_tree: RuleGroup, data_df: pd.DataFrame,
+                           tracker: Optional[RuleChangeTracker] = None,
+                           phase: Optional[str] = None) -> pd.DataFrame:
+        profiler = self.rule_profiler
+        if profiler is not None:
+            profiler.phase = phase if phase is not None else part
+
+        if self.use_compiled_rules:
+            return self.compiled_rule_trees[part].process(data_df, tracker=tracker,
+                                                          profiler=profiler)
+        if tracker is not None:
+            process_rules_tracked(rules=tracker.rules, data_df=data_df, tracker=tracker,
+                                  profiler=profiler)
+            return data_df
+        return rule_tree.process(data_df, profiler=profiler)
+
+    def _preprocess_pivot_with_pandas(self, data_df: pd.DataFrame,
+                                      expected_tags: Set[str]) -> pd.DataFrame:
         pivot_df = data_df.pivot(index=self.identifier_cols,
                                  columns='tag',
                                  values='value')
@@ -357,6 +772,65 @@ class Standardizer(Presenter[JoinedDataBag]):
         missing_df = pd.DataFrame(np.nan, index=pivot_df.index, columns=list(missing_cols))
         return pd.concat([pivot_df, missing_df], axis=1)
 
+    def _preprocess_pivot(self, data_df: pd.DataFrame, expected_tags: Set[str]) -> pd.DataFrame:
+        """ Creates the same result as DataFrame.pivot followed by adding the missing tags
+            as nan columns: the rows are sorted by the identifier columns, the columns
+            are the identifier columns, the present tags sorted by name, and the missing tags.
+
+            Instead of building a MultiIndex and unstacking it, the identifiers and the tags
+            are factorized into integer codes and the values are scattered directly into a
+            nan matrix that already covers the missing tags.
+            """
+        if len(data_df) == 0:
+            return self._preprocess_pivot_with_pandas(data_df, expected_tags)
+
+        # the codes of sorted uniques have the same order as the values
+        factorized = [pd.factorize(data_df[col], sort=True) for col in self.identifier_cols]
+        sizes = [len(uniques) for _, uniques in factorized]
+
+        # pivot has its own rules for sorting missing keys, and the combined key has to fit
+        # into an int64
+        if any((codes < 0).any() for codes, _ in factorized) or np.prod(sizes, dtype=float) >= 2 ** 62:
+            return self._preprocess_pivot_with_pandas(data_df, expected_tags)
+
+        # combine the codes of the identifier columns into a single key, which sorts like the
+        # identifier tuple, and number the distinct keys in sorted order
+        key = np.zeros(len(data_df), dtype=np.int64)
+        for (codes, _), size in zip(factorized, sizes):
+            key = key * size + codes
+        row_numbers, row_keys = pd.factorize(key, sort=True)
+
+        tag_codes, present_tags = pd.factorize(data_df['tag'], sort=True)
+        present_tags = present_tags.tolist()
+
+        # same duplicate check as in pivot: every cell may only be set once
+        is_set = np.zeros((len(row_keys), len(present_tags)), dtype=bool)
+        is_set[row_numbers, tag_codes] = True
+        if is_set.sum() < len(data_df):
+            raise ValueError("Index contains duplicate entries, cannot reshape")
+
+        missing_cols = list(set(expected_tags) - set(self.identifier_cols + present_tags))
+
+        values = np.full((len(row_keys), len(present_tags) + len(missing_cols)), np.nan)
+        values[row_numbers, tag_codes] = data_df['value'].to_numpy(dtype=np.float64)
+
+        # decode the identifier values from the sorted keys
+        index_data = {}
+        remaining_keys = np.asarray(row_keys)
+        for col, (_, uniques), size in reversed(list(zip(self.identifier_cols, factorized, sizes))):
+            index_data[col] = uniques.take(remaining_keys % size)
+            remaining_keys = remaining_keys // size
+
+        # inserting the identifier columns does not copy the values
+        pivot_df = pd.DataFrame(values, columns=present_tags + missing_cols)
+        for position, col in enumerate(self.identifier_cols):
+            pivot_df.insert(position, col, index_data[col])
+
+        if len(missing_cols) == 0:
+            # the columns of a pivoted dataframe are named by the pivot column
+            pivot_df.columns.name = 'tag'
+        return pivot_df
+
     def _preprocess_filter_pivot_for_main_statement(self, pivot_df: pd.DataFrame) -> pd.DataFrame:
         """ Some reports have more than one 'report number' (column report) for a
             certain statement. Generally, the one with the most tags is the one to take.
@@ -393,13 +867,23 @@ class Standardizer(Presenter[JoinedDataBag]):
         relevant_df = \
             data_df[relevant_pivot_cols][data_df.tag.isin(self.all_input_tags)]
 
+        # pivot and groupby would create entries for all categories of categorical columns,
+        # not just the ones that are present. so categorical columns are processed as objects.
+        categorical_cols = [col for col in relevant_pivot_cols
+                            if isinstance(relevant_df[col].dtype, pd.CategoricalDtype)]
+        if categorical_cols:
+            relevant_df = relevant_df.astype({col: object for col in categorical_cols})
+
         # invert the entries that have the negating flag set
         if self.invert_negated:
             relevant_df.loc[relevant_df.negating == 1, 'value'] = -relevant_df.value
 
         # apply prepivot_rule_tree
         self.prepivot_rule_tree.set_id("PREPIVOT")
-        relevant_df = self.prepivot_rule_tree.process(data_df=relevant_df)
+        if self.rule_profiler is not None:
+            self.rule_profiler.phase = "PREPIVOT"
+        relevant_df = self.prepivot_rule_tree.process(data_df=relevant_df,
+                                                      profiler=self.rule_profiler)
         # we cannot directly add rows to an existing dataframe,
         # so every prepivot rules stores the log within itself and in the end, we concat it together
         prepivot_logs = [x.log_df for x in self.prepivot_rule_tree.rules]
@@ -416,12 +900,12 @@ class Standardizer(Presenter[JoinedDataBag]):
             pivot_df = self._preprocess_filter_pivot_for_main_statement(pivot_df)
 
         # prepare the log dataframe -> it must have all rows
-        self.applied_rules_log_df = pivot_df[self.identifier_cols].copy()
+        self.applied_rules_log = AppliedRulesLog(index_df=pivot_df[self.identifier_cols].copy())
 
         # finally apply the pre-rules
         self.pre_rule_tree.set_id("PRE")
-        pivot_df = self.pre_rule_tree.process(pivot_df)
-        self.applied_rules_log_df = self.pre_rule_tree.append_log(self.applied_rules_log_df)
+        pivot_df = self._process_rule_tree("PRE", self.pre_rule_tree, pivot_df)
+        self._append_log(self.pre_rule_tree)
 
         # prepare the stats dataframe and calculate the stats after preprocessing
         self.stats.initialize(data_df=pivot_df, process_step_name="pre")
@@ -430,12 +914,35 @@ class Standardizer(Presenter[JoinedDataBag]):
 
     def _main_processing(self, data_df: pd.DataFrame) -> pd.DataFrame:
         current_df = data_df
+        tracker: Optional[RuleChangeTracker] = None
+        if self.track_changes:
+            tracker = RuleChangeTracker(rules=self.main_rule_tree.get_rules(),
+                                        nr_of_rows=len(current_df))
+
+        stable_logged = False
         for i in range(self.main_iterations):
+            if tracker is not None and not stable_logged and tracker.is_stable():
+                # the remaining iterations are still processed, so that the log and the stats
+                # contain their (empty) entries, but no rule is evaluated on any row anymore
+                stable_logged = True
+                LOGGER.info("main rules did not change anything in iteration %d, no rules are "
+                            "evaluated in the remaining iterations", i)
+
+            evaluated_before = tracker.evaluated_rows if tracker is not None else 0
+            saved_before = tracker.saved_rows if tracker is not None else 0
+
             # apply the main rule tree
             self.main_rule_tree.set_id(prefix=f"MAIN_{i + 1}")
-            self.main_rule_tree.process(data_df=current_df)
+            self._process_rule_tree("MAIN", self.main_rule_tree, current_df, tracker,
+                                    phase=f"MAIN_{i + 1}")
 
-            self.applied_rules_log_df = self.main_rule_tree.append_log(self.applied_rules_log_df)
+            if tracker is not None:
+                self.stats.add_rule_evaluations_entry(
+                    evaluated=tracker.evaluated_rows - evaluated_before,
+                    saved=tracker.saved_rows - saved_before,
+                    process_step_name=f'MAIN_{i + 1}')
+
+            self._append_log(self.main_rule_tree)
 
             # calculate stats and add them to the stats log
             self.stats.add_stats_entry(data_df=current_df, process_step_name=f'MAIN_{i + 1}')
@@ -444,9 +951,9 @@ class Standardizer(Presenter[JoinedDataBag]):
     def _post_processing(self, data_df: pd.DataFrame) -> pd.DataFrame:
         # apply the post rule tree
         self.post_rule_tree.set_id(prefix="POST")
-        current_df = self.post_rule_tree.process(data_df=data_df)
+        current_df = self._process_rule_tree("POST", self.post_rule_tree, data_df)
 
-        self.applied_rules_log_df = self.post_rule_tree.append_log(self.applied_rules_log_df)
+        self._append_log(self.post_rule_tree)
 
         # calculate stats and add them to the stats log
         self.stats.add_stats_entry(data_df=data_df, process_step_name='POST')
@@ -458,8 +965,13 @@ class Standardizer(Presenter[JoinedDataBag]):
         finalized_df = data_df[self.final_col_order].copy()
 
         # apply validation rules
+        if self.rule_profiler is not None:
+            self.rule_profiler.phase = "VALID"
         for validation_rule in self.validation_rules:
-            validation_rule.validate(finalized_df)
+            if self.rule_profiler is not None:
+                self.rule_profiler.validate(validation_rule, finalized_df)
+            else:
+                validation_rule.validate(finalized_df)
 
         cat_cols = [x for x in finalized_df.columns if x.endswith("_cat")]
         self.validation_overview_df = pd.DataFrame(index=[0, 1, 5, 10, 100], columns=cat_cols)
@@ -474,21 +986,76 @@ class Standardizer(Presenter[JoinedDataBag]):
                     **{new_column_name: (100 * self.validation_overview_df[column] / len(
                         finalized_df)).round(2)}))
 
-        # calculate log_df summaries
-        # pathfilter for rule columns but making sure the order stays the same
-        rule_columns = [x for x in self.applied_rules_log_df.columns if
-                        x not in self.identifier_cols]
-        main_post_applied_rules_sum_s = self.applied_rules_log_df[rule_columns].sum()
-
-        prepivot_applied_rules_sum_s = self.applied_prepivot_rules_log_df.id.value_counts()
-        self.applied_rules_sum_s = pd.concat([prepivot_applied_rules_sum_s,
-                                              main_post_applied_rules_sum_s])
+        self.applied_rules_sum_s = self._calculate_applied_rules_sum()
 
         # finalize the stats table, adding the rel and the gain columns
         self.stats.finalize_stats(len(data_df))
 
         return finalized_df
 
+    def _calculate_applied_rules_sum(self) -> pd.Series:
+        # calculate log summaries, the order of the rules stays the same
+        main_post_applied_rules_sum_s = self.applied_rules_log.sum()
+
+        prepivot_applied_rules_sum_s = self.applied_prepivot_rules_log_df.id.value_counts()
+        return pd.concat([prepivot_applied_rules_sum_s, main_post_applied_rules_sum_s])
+
+    def _split_by_adsh(self, data_df: pd.DataFrame) -> List[pd.DataFrame]:
+        # the reports are sorted and split into ranges of adsh. since the pivoted data is sorted
+        # by adsh, concatenating the results of the shards keeps the order of the rows.
+        adshs = np.sort(data_df.adsh.astype(object).unique())
+        shards = min(self.shards, len(adshs))
+
+        shard_numbers = np.repeat(np.arange(shards),
+                                  [len(x) for x in np.array_split(adshs, shards)])
+        adsh_to_shard = pd.Series(shard_numbers, index=adshs)
+        data_shard_numbers = data_df.adsh.map(adsh_to_shard).to_numpy()
+
+        return [data_df[data_shard_numbers == shard] for shard in range(shards)]
+
+    def _process_shard(self, data_df: pd.DataFrame) -> StandardizedBag:
+        # every shard is processed by its own copy, so that the logs and stats are not mixed
+        standardizer = copy.deepcopy(self)
+        standardizer.shards = 1
+        standardizer.process(data_df)
+        return standardizer.get_standardize_bag()
+
+    def _process_sharded(self, data_df: pd.DataFrame) -> pd.DataFrame:
+        shard_dfs = self._split_by_adsh(data_df)
+
+        def get_entries() -> List[pd.DataFrame]:
+            return shard_dfs
+
+        def post_process(parts: List[StandardizedBag]) -> List[StandardizedBag]:
+            return parts
+
+        executor = ParallelExecutor(chunksize=0, execute_serial=len(shard_dfs) == 1)
+        executor.set_get_entries_function(get_entries)
+        executor.set_process_element_function(self._process_shard)
+        executor.set_post_process_chunk_function(post_process)
+
+        # the results are returned in the order of the shards
+        shard_bags: List[StandardizedBag]
+        shard_bags, _ = executor.execute()
+
+        merged_bag = StandardizedBag.concat(shard_bags)
+        self.applied_prepivot_rules_log_df = merged_bag.applied_prepivot_rules_log_df
+        self.applied_rules_log = merged_bag.applied_rules_log
+        self.stats.stats = merged_bag.stats_df
+        self.rule_profile_df = merged_bag.rule_profile_df
+        self.stats.rule_evaluations = merged_bag.rule_evaluations_df
+
+        # a prepivot rule could be missing in the sums of some shards, so the sums are
+        # calculated from the merged logs
+        self.applied_rules_sum_s = self._calculate_applied_rules_sum()
+
+        # same precision as in _finalize
+        pct_cols = [x for x in merged_bag.validation_overview_df.columns if x.endswith('_pct')]
+        self.validation_overview_df = merged_bag.validation_overview_df.round(
+            {col: 2 for col in pct_cols})
+
+        return merged_bag.result_df
+
     def process(self, data_df: pd.DataFrame) -> pd.DataFrame:
         """
         process the provided DataFrame
@@ -503,6 +1070,13 @@ class Standardizer(Presenter[JoinedDataBag]):
         # ensure that there are no segments information in the data
         data_df = data_df[(data_df.segments == '') | data_df.segments.isna()]
 
+        if self.shards > 1 and len(data_df) > 0:
+            LOGGER.info("standardize in %d shards ...", self.shards)
+            self.result = self._process_sharded(data_df)
+            return self.result
+
+        self.rule_profiler = RuleProfiler() if self.profile_rules else None
+
         LOGGER.info("start PRE processing ...")
         ready_df = self._preprocess(data_df)
         LOGGER.info("start MAIN processing ...")
@@ -512,6 +1086,9 @@ class Standardizer(Presenter[JoinedDataBag]):
 
         LOGGER.info("start FINALIZE ...")
         self.result = self._finalize(post_df)
+
+        if self.rule_profiler is not None:
+            self.rule_profile_df = self.rule_profiler.to_df()
         return self.result
 
     def get_process_description(self) -> pd.DataFrame:
@@ -590,6 +1167,72 @@ class Standardizer(Presenter[JoinedDataBag]):
 
         return self.result
 
+    def standardize_in_batches(self, bag_path: str, target_path: str,
+                               max_rows_per_batch: int = DEFAULT_MAX_ROWS_PER_BATCH,
+                               present: bool = True):
+        """
+        standardizes the JoinedDataBag that is stored in bag_path without loading it at once.
+        The pre_num data is read in batches of whole reports (see get_adsh_batches), and the
+        results and logs of every batch are directly written to the StandardizedBag in
+        target_path (see StandardizedBagWriter). So the peak memory is given by the
+        max_rows_per_batch and not by the size of the bag.
+
+        Since the rules only work within a single report, the content is the same as if the
+        whole bag was standardized at once, but the rows of the result are only sorted
+        within every batch.
+
+        Args:
+            bag_path: the directory of the JoinedDataBag
+            target_path: the directory to write the StandardizedBag to, it has to be empty
+            max_rows_per_batch: the maximal number of pre_num rows that are loaded at once
+            present: if True, the result is created like present does (with the sub_df
+                     attributes), otherwise like process does
+        """
+        columns = self.get_required_columns()
+        pre_num_file = os.path.join(bag_path, f'{PRE_NUM_TXT}.parquet')
+
+        # the sub_df is small, it is loaded once, so that present finds the latest name
+        # of the companies in all the reports
+        sub_df = JoinedDataBag.load_sub_df_by_filter(target_path=bag_path, columns=columns) \
+            if present else None
+
+        # an empty bag is processed in a single empty batch, so that an empty bag is written
+        batches = get_adsh_batches(pre_num_file, max_rows_per_batch) or [[]]
+
+        writer = self.create_bag_writer(target_path)
+        for i, adshs in enumerate(batches):
+            LOGGER.info("standardize batch %d of %d with %d reports", i + 1, len(batches),
+                        len(adshs))
+            pre_num_df = read_df_from_parquet(pre_num_file,
+                                              filters=[('adsh', 'in', adshs)] if adshs else None,
+                                              columns=get_columns_with_keys(PRE_NUM_TXT, columns))
+            if present:
+                self.present(JoinedDataBag.create(sub_df=sub_df, pre_num_df=pre_num_df))
+            else:
+                self.process(pre_num_df)
+            del pre_num_df
+
+            # a batch without rows to standardize is skipped by the writer
+            writer.append(self.get_standardize_bag())
+        writer.close()
+
+    def create_bag_writer(self, target_path: str) -> StandardizedBagWriter:
+        """
+        creates a StandardizedBagWriter for the results of this standardizer, which writes the
+        tags and the validation columns always as float.
+
+        Args:
+            target_path: the directory to write the StandardizedBag to, it has to be empty
+
+        Returns:
+            StandardizedBagWriter: the writer
+        """
+        # the validation columns only contain integers in a part in which all rows were validated
+        float_columns = self.final_tags + [f'{rule.identifier}_{suffix}'
+                                           for rule in self.validation_rules
+                                           for suffix in ['error', 'cat']]
+        return StandardizedBagWriter(target_path, float_columns=float_columns)
+
     def get_standardize_bag(self) -> StandardizedBag:
         """
             returns an instance of StandardizedBag with all the calculated
@@ -597,9 +1240,11 @@ class Standardizer(Presenter[JoinedDataBag]):
             on disk and reload it for later analysis
         """
         return StandardizedBag(result_df=self.result,
-                               applied_rules_log_df=self.applied_rules_log_df,
+                               applied_rules_log_df=None, applied_rules_log=self.applied_rules_log,
                                applied_prepivot_rules_log_df=self.applied_prepivot_rules_log_df,
                                stats_df=self.stats.stats,
                                applied_rules_sum_s=self.applied_rules_sum_s,
                                validation_overview_df=self.validation_overview_df,
-                               process_description_df=self.get_process_description())
+                               process_description_df=self.get_process_description(),
+                               rule_profile_df=self.rule_profile_df,
+                               rule_evaluations_df=self.stats.rule_evaluations)
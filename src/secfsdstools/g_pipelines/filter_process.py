@@ -4,14 +4,16 @@ in parallel.
 """
 import os
 import shutil
+import threading
 from pathlib import Path
-from typing import Callable, List
+from typing import Callable, Iterator, List, Optional, Tuple
 
 from secfsdstools.a_utils.fileutils import get_directories_in_directory
 from secfsdstools.c_automation.automation_utils import delete_temp_folders
 from secfsdstools.c_automation.task_framework import AbstractThreadProcess, Task
 from secfsdstools.c_index.indexdataaccess import ParquetDBIndexingAccessor
-from secfsdstools.d_container.databagmodel import RawDataBag
+from secfsdstools.d_container.databagmodel import JoinedDataBag, RawDataBag
+from secfsdstools.d_container.filter import FilterBase
 from secfsdstools.e_collector.zipcollecting import ZipCollector
 from secfsdstools.e_filter.joinedfiltering import StmtJoinedFilter
 from secfsdstools.e_filter.rawfiltering import StmtRawFilter
@@ -31,8 +33,78 @@ def postloadfilter(databag: RawDataBag) -> RawDataBag:
         USDOnlyRawFilter,
     )
 
-    return databag[ReportPeriodRawFilter()][MainCoregRawFilter()][USDOnlyRawFilter()][
-        OfficialTagsOnlyRawFilter()]
+    # the lazy bag combines the masks of the filters and selects the rows only once
+    return databag.lazy()[ReportPeriodRawFilter()][MainCoregRawFilter()][USDOnlyRawFilter()][
+        OfficialTagsOnlyRawFilter()].materialize()
+
+
+def joined_postloadfilter(databag: JoinedDataBag) -> JoinedDataBag:
+    """
+    the same as postloadfilter for JoinedDataBags. It combines the filters:
+        ReportPeriodJoinedFilter, MainCoregJoinedFilter, USDOnlyJoinedFilter,
+        OfficialTagsOnlyJoinedFilter
+    """
+    # pylint: disable=C0415
+    from secfsdstools.e_filter.joinedfiltering import (
+        MainCoregJoinedFilter,
+        OfficialTagsOnlyJoinedFilter,
+        ReportPeriodJoinedFilter,
+        USDOnlyJoinedFilter,
+    )
+
+    return databag.lazy()[ReportPeriodJoinedFilter()][MainCoregJoinedFilter()][USDOnlyJoinedFilter()][
+        OfficialTagsOnlyJoinedFilter()].materialize()
+
+
+def postloadfilter_pushdown_filters() -> List[FilterBase[RawDataBag]]:
+    """
+    returns the filters of the postloadfilter method that can directly be applied while
+    reading the parquet files: MainCoregRawFilter and USDOnlyRawFilter.
+    """
+    # pylint: disable=C0415
+    from secfsdstools.e_filter.rawfiltering import MainCoregRawFilter, USDOnlyRawFilter
+
+    return [MainCoregRawFilter(), USDOnlyRawFilter()]
+
+
+class PrefetchingBagLoader:
+    """
+    Loads the raw databags of several zip files in a defined order with
+    ZipCollector.iter_collect, so that the next zip file is already read in the background
+    while the tasks for the current one are executed.
+    """
+
+    def __init__(self, collector: ZipCollector, read_ahead: int = 1):
+        """
+        Constructor.
+
+        Args:
+            collector: the collector for the zip files, the bags are provided in the
+                       order of its datapaths
+            read_ahead: number of zip files that are loaded in advance
+        """
+        self._bags: Iterator[Tuple[str, RawDataBag]] = \
+            zip([os.path.basename(x) for x in collector.datapaths],
+                collector.iter_collect(read_ahead=read_ahead))
+        self._lock = threading.Lock()
+
+    def get(self, zip_file_name: str) -> Optional[RawDataBag]:
+        """
+        returns the bag for the provided zip file name. Bags of zip files that are skipped
+        are discarded, so the bags have to be requested in the order of the datapaths.
+
+        Args:
+            zip_file_name: name of the zip file
+
+        Returns:
+            Optional[RawDataBag]: the bag, or None if the bag was already requested before or
+                                  the zip file is not part of the collector
+        """
+        with self._lock:
+            for name, bag in self._bags:
+                if name == zip_file_name:
+                    return bag
+        return None
 
 
 class AbstractFilterTask:
@@ -47,7 +119,9 @@ class AbstractFilterTask:
                  bag_type: str,  # raw or joined
                  stmts: List[str],
                  forms_filter=None,
-                 post_load_filter: Callable[[RawDataBag], RawDataBag] = postloadfilter
+                 post_load_filter: Callable[[RawDataBag], RawDataBag] = postloadfilter,
+                 bag_loader: Optional[PrefetchingBagLoader] = None,
+                 pushdown_filters: Optional[List[FilterBase[RawDataBag]]] = None
                  ):
         """
         Constructor.
@@ -61,11 +135,17 @@ class AbstractFilterTask:
             post_load_filter: pathfilter method to be applied after loading of the zip file.
                               default postloadfilter applies ReportPeriodRawFilter,
                               MainCoregRawFilter, USDOnlyRawFilter, OfficialTagsOnlyRawFilter
+            bag_loader: optional loader that provides the already loaded raw databag.
+                        it has to use the same filters as defined for this task.
+            pushdown_filters: raw filters that are directly applied while reading the
+                              parquet files (see FilterBase.get_pushdown_predicates)
         """
         if forms_filter is None:
             forms_filter = ['10-K', '10-Q']
         self.forms_filter = forms_filter
         self.post_load_filter = post_load_filter
+        self.bag_loader = bag_loader
+        self.pushdown_filters = pushdown_filters
 
         self.target_path = target_path
         self.stmts = stmts
@@ -75,6 +155,38 @@ class AbstractFilterTask:
         self.target_file_name = target_path.name
         self.tmp_path = target_path.parent / f"tmp_{self.target_file_name}"
 
+    def _load_raw_bag(self) -> RawDataBag:
+        if self.bag_loader is not None:
+            raw_bag = self.bag_loader.get(self.zip_file_name)
+            if raw_bag is not None:
+                return raw_bag
+
+        return ZipCollector.get_zip_by_name(name=self.zip_file_name,
+                                            forms_filter=self.forms_filter,
+                                            stmt_filter=self.stmts,
+                                            post_load_filter=self.post_load_filter,
+                                            pushdown_filters=self.pushdown_filters).collect()
+
+    def _load_joined_bag(self) -> JoinedDataBag:
+        if self.bag_loader is not None:
+            raw_bag = self.bag_loader.get(self.zip_file_name)
+            if raw_bag is not None:
+                return raw_bag.join()
+
+        collector = ZipCollector.get_zip_by_name(name=self.zip_file_name,
+                                                 forms_filter=self.forms_filter,
+                                                 stmt_filter=self.stmts,
+                                                 post_load_filter=self.post_load_filter,
+                                                 pushdown_filters=self.pushdown_filters)
+
+        # the default postloadfilter is also available for joined bags, so a prejoined
+        # pre_num file can be used instead of joining pre and num
+        if self.post_load_filter is postloadfilter and collector.is_prejoined():
+            collector.post_load_filter = None
+            return collector.collect_joined(post_load_filter=joined_postloadfilter)
+
+        return collector.collect_joined()
+
     def commit(self):
         """
         we commit by renaming the tmp_path. This is an atomic action and either fails
@@ -107,16 +219,10 @@ class FilterTask(AbstractFilterTask):
         Saves the result depending on the configuration either as raw or joined data bag in the
         defined target path.
         """
-        raw_bag = ZipCollector.get_zip_by_name(name=self.zip_file_name,
-                                               forms_filter=self.forms_filter,
-                                               stmt_filter=self.stmts,
-                                               post_load_filter=self.post_load_filter).collect()
-
         if self.bag_type.lower() == "raw":
-            raw_bag.save(str(self.tmp_path))
+            self._load_raw_bag().save(str(self.tmp_path))
         elif self.bag_type.lower() == "joined":
-            joined_bag = raw_bag.join()
-            joined_bag.save(str(self.tmp_path))
+            self._load_joined_bag().save(str(self.tmp_path))
         else:
             raise ValueError("bag_type must be either raw or joined")
 
@@ -149,15 +255,10 @@ class ByStmtFilterTask(AbstractFilterTask):
         Splits the results up by stmt ("BS", "IS", "CF", ...).
 
         """
-        raw_bag = ZipCollector.get_zip_by_name(name=self.zip_file_name,
-                                               forms_filter=self.forms_filter,
-                                               stmt_filter=self.stmts,
-                                               post_load_filter=self.post_load_filter).collect()
-
         if self.bag_type.lower() == "raw":
-            self._execute_raw(raw_bag)
+            self._execute_raw(self._load_raw_bag())
         elif self.bag_type.lower() == "joined":
-            self._execute_joined(raw_bag)
+            self._execute_joined(self._load_joined_bag())
         else:
             raise ValueError("bag_type must be either raw or joined")
 
@@ -165,9 +266,7 @@ class ByStmtFilterTask(AbstractFilterTask):
         for stmt in self.stmts:
             raw_bag[StmtRawFilter(stmts=[stmt])].save(str(self.tmp_path / stmt))
 
-    def _execute_joined(self, raw_bag: RawDataBag):
-        joined_bag = raw_bag.join()
-
+    def _execute_joined(self, joined_bag: JoinedDataBag):
         for stmt in self.stmts:
             joined_bag[StmtJoinedFilter(stmts=[stmt])].save(str(self.tmp_path / stmt))
 
@@ -194,7 +293,9 @@ class FilterProcess(AbstractThreadProcess):
                  stmts=None,
                  execute_serial: bool = False,
                  forms_filter=None,
-                 post_load_filter: Callable[[RawDataBag], RawDataBag] = postloadfilter
+                 post_load_filter: Callable[[RawDataBag], RawDataBag] = postloadfilter,
+                 read_ahead: int = 0,
+                 pushdown_filters: Optional[List[FilterBase[RawDataBag]]] = None
                  ):
         """
         Constructor.
@@ -213,6 +314,13 @@ class FilterProcess(AbstractThreadProcess):
             post_load_filter: postload-pathfilter function. Default is the defined
                               postloadfilter-function.
             forms_filter: defines which forms to laod (10-K, 10-Q, ...). Default is 10-K and 10-Q.
+            read_ahead: only used if execute_serial is True. Number of zip files that are
+                        already loaded in the background while the current one is filtered
+                        and saved. Default is 0.
+            pushdown_filters: raw filters that are directly applied while reading the parquet
+                              files, so that only the rows which are kept are loaded.
+                              If None and the default postloadfilter is used, its
+                              MainCoregRawFilter and USDOnlyRawFilter are pushed down.
         """
         super().__init__(execute_serial=execute_serial,
                          chunksize=0)
@@ -221,6 +329,11 @@ class FilterProcess(AbstractThreadProcess):
 
         self.forms_filter = forms_filter
         self.post_load_filter = post_load_filter
+        self.read_ahead = read_ahead
+
+        if pushdown_filters is None and post_load_filter is postloadfilter:
+            pushdown_filters = postloadfilter_pushdown_filters()
+        self.pushdown_filters = pushdown_filters
 
         self.stmts = ['BS', 'IS', 'CF', 'CP', 'CI', 'EQ']
 
@@ -244,6 +357,21 @@ class FilterProcess(AbstractThreadProcess):
         """
         delete_temp_folders(root_path=Path(self.target_dir) / self.file_type)
 
+    def _create_bag_loader(self, zip_file_names: List[str]) -> Optional[PrefetchingBagLoader]:
+        # reading ahead only makes sense, if the tasks are executed one after the other
+        if not self.execute_serial or self.read_ahead <= 0 or len(zip_file_names) == 0:
+            return None
+
+        index_files = self.dbaccessor.read_index_files_for_filenames(filenames=zip_file_names)
+        full_paths = {x.fileName: x.fullPath for x in index_files}
+
+        collector = ZipCollector(datapaths=[full_paths[x] for x in zip_file_names if x in full_paths],
+                                 forms_filter=self.forms_filter,
+                                 stmt_filter=self.stmts,
+                                 post_load_filter=self.post_load_filter,
+                                 pushdown_filters=self.pushdown_filters)
+        return PrefetchingBagLoader(collector=collector, read_ahead=self.read_ahead)
+
     def calculate_tasks(self) -> List[Task]:
         """
         Defines the zipfiles that have not yet been processed and creates appropriate
@@ -255,7 +383,10 @@ class FilterProcess(AbstractThreadProcess):
         existing = self._get_existing_filtered()
         available = self.dbaccessor.read_filenames_by_type(originFileType=self.file_type)
 
-        missings = set(available) - set(existing)
+        # sorted, so that the tasks are executed in the same order as the bag_loader reads the data
+        missings = sorted(set(available) - set(existing))
+        bag_loader = self._create_bag_loader(missings)
+
         if self.save_by_stmt:
             return [ByStmtFilterTask(
                 zip_file_name=missing,
@@ -263,7 +394,9 @@ class FilterProcess(AbstractThreadProcess):
                 stmts=self.stmts,
                 bag_type=self.bag_type,
                 forms_filter=self.forms_filter,
-                post_load_filter=self.post_load_filter
+                post_load_filter=self.post_load_filter,
+                bag_loader=bag_loader,
+                pushdown_filters=self.pushdown_filters
             )
                 for missing in missings]
 
@@ -273,6 +406,8 @@ class FilterProcess(AbstractThreadProcess):
             stmts=self.stmts,
             bag_type=self.bag_type,
             forms_filter=self.forms_filter,
-            post_load_filter=self.post_load_filter
+            post_load_filter=self.post_load_filter,
+            bag_loader=bag_loader,
+            pushdown_filters=self.pushdown_filters
         )
             for missing in missings]
@@ -6,8 +6,11 @@ import gc
 import logging
 import shutil
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
+import pandas as pd
+
+from secfsdstools.a_utils.constants import SUB_TXT
 from secfsdstools.a_utils.fileutils import get_directories_in_directory
 from secfsdstools.c_automation.automation_utils import delete_temp_folders
 from secfsdstools.c_automation.task_framework import AbstractThreadProcess, CheckByTimestampMergeBaseTask, Task
@@ -15,38 +18,113 @@ from secfsdstools.d_container.databagmodel import JoinedDataBag
 from secfsdstools.f_standardize.bs_standardize import BalanceSheetStandardizer
 from secfsdstools.f_standardize.cf_standardize import CashFlowStandardizer
 from secfsdstools.f_standardize.is_standardize import IncomeStatementStandardizer
+from secfsdstools.f_standardize.standardizing import Standardizer
 
 LOGGER = logging.getLogger(__name__)
 
 
-def _bs_standardization(root_path: Path, tmp_path: Path):
-    # standardize bs
-    bs_standardizer = BalanceSheetStandardizer()
+ADSH_MANIFEST = "adsh_manifest.parquet"
 
-    logging.info("create standardized BS dataset")
-    joined_bag_bs = JoinedDataBag.load(str(root_path / "BS"))
-    bs_standardizer.process(joined_bag_bs.pre_num_df)
-    bs_standardizer.get_standardize_bag().save(str(tmp_path / "BS"))
 
+def _read_adshs(bag_path: Path) -> List[str]:
+    return pd.read_parquet(bag_path / f"{SUB_TXT}.parquet", columns=['adsh'])['adsh'].tolist()
 
-def _is_standardization(root_path: Path, tmp_path: Path):
-    # standardize is
-    is_standardizer = IncomeStatementStandardizer()
 
-    logging.info("create standardized IS dataset")
-    joined_bag_is = JoinedDataBag.load(str(root_path / "IS"))
-    is_standardizer.process(joined_bag_is.pre_num_df)
-    is_standardizer.get_standardize_bag().save(str(tmp_path / "IS"))
+def _read_manifest(std_bag_path: Path) -> Optional[List[str]]:
+    manifest_file = std_bag_path / ADSH_MANIFEST
+    if not manifest_file.exists():
+        return None
+    return pd.read_parquet(manifest_file)['adsh'].tolist()
 
 
-def _cf_standardization(root_path: Path, tmp_path: Path):
-    # standardize cf
-    cf_standardizer = CashFlowStandardizer()
+def _write_manifest(std_bag_path: Path, adshs: List[str]):
+    pd.DataFrame({'adsh': adshs}).to_parquet(std_bag_path / ADSH_MANIFEST)
+
 
-    logging.info("create standardized CF dataset")
-    joined_bag_cf = JoinedDataBag.load(str(root_path / "CF"))
-    cf_standardizer.process(joined_bag_cf.pre_num_df)
-    cf_standardizer.get_standardize_bag().save(str(tmp_path / "CF"))
+def _standardization(standardizer: Standardizer, stmt: str, root_path: Path, tmp_path: Path,
+                     previous_path: Optional[Path] = None,
+                     max_rows_per_batch: Optional[int] = None):
+    """
+    standardizes the JoinedDataBag in root_path/stmt and saves the StandardizedBag in
+    tmp_path/stmt. Next to the bag, a manifest with the adshs of the input is stored.
+
+    If max_rows_per_batch is provided, the bag is not loaded at once but standardized in
+    batches of reports (see Standardizer.standardize_in_batches).
+
+    If a previous_path is provided and it contains a manifest, only the adshs that are not
+    in the manifest are standardized and appended to the StandardizedBag in previous_path.
+    Since every report is standardized on its own, the result is the same as standardizing
+    the whole input again, as long as the input is only extended.
+    """
+    input_path = root_path / stmt
+    target_path = tmp_path / stmt
+    all_adshs = _read_adshs(input_path)
+
+    processed_adshs = _read_manifest(previous_path / stmt) if previous_path else None
+
+    if processed_adshs is None and max_rows_per_batch is not None:
+        logging.info("create standardized %s dataset in batches", stmt)
+        standardizer.standardize_in_batches(str(input_path), str(target_path),
+                                            max_rows_per_batch=max_rows_per_batch,
+                                            present=False)
+        _write_manifest(target_path, all_adshs)
+        return
+
+    if processed_adshs is None:
+        logging.info("create standardized %s dataset", stmt)
+        joined_bag = JoinedDataBag.load(str(input_path),
+                                        columns=standardizer.get_required_columns())
+        standardizer.process(joined_bag.pre_num_df)
+        standardizer.get_standardize_bag().save(str(target_path))
+        _write_manifest(target_path, all_adshs)
+        return
+
+    processed_set = set(processed_adshs)
+    new_adshs = [adsh for adsh in all_adshs if adsh not in processed_set]
+
+    if len(new_adshs) == 0:
+        logging.info("no new reports for the standardized %s dataset", stmt)
+        shutil.copytree(previous_path / stmt, target_path, dirs_exist_ok=True)
+        return
+
+    logging.info("append %d new reports to the standardized %s dataset", len(new_adshs), stmt)
+    joined_bag = JoinedDataBag.load(str(input_path), adshs_filter=new_adshs,
+                                    columns=standardizer.get_required_columns())
+    standardizer.process(joined_bag.pre_num_df)
+    del joined_bag
+
+    # the result and the logs of the existing bag are copied part by part, only the stats and
+    # the validation overview are recalculated from the counts of both bags. if the new reports
+    # have no rows to standardize, the writer skips them.
+    writer = standardizer.create_bag_writer(str(target_path))
+    writer.append_saved(str(previous_path / stmt))
+    writer.append(standardizer.get_standardize_bag())
+    writer.close()
+    _write_manifest(target_path, processed_adshs + new_adshs)
+
+
+def _bs_standardization(root_path: Path, tmp_path: Path, previous_path: Optional[Path] = None,
+                        max_rows_per_batch: Optional[int] = None):
+    # standardize bs
+    _standardization(standardizer=BalanceSheetStandardizer(), stmt="BS",
+                     root_path=root_path, tmp_path=tmp_path, previous_path=previous_path,
+                     max_rows_per_batch=max_rows_per_batch)
+
+
+def _is_standardization(root_path: Path, tmp_path: Path, previous_path: Optional[Path] = None,
+                        max_rows_per_batch: Optional[int] = None):
+    # standardize is
+    _standardization(standardizer=IncomeStatementStandardizer(), stmt="IS",
+                     root_path=root_path, tmp_path=tmp_path, previous_path=previous_path,
+                     max_rows_per_batch=max_rows_per_batch)
+
+
+def _cf_standardization(root_path: Path, tmp_path: Path, previous_path: Optional[Path] = None,
+                        max_rows_per_batch: Optional[int] = None):
+    # standardize cf
+    _standardization(standardizer=CashFlowStandardizer(), stmt="CF",
+                     root_path=root_path, tmp_path=tmp_path, previous_path=previous_path,
+                     max_rows_per_batch=max_rows_per_batch)
 
 
 class StandardizerTask(CheckByTimestampMergeBaseTask):
@@ -56,11 +134,19 @@ class StandardizerTask(CheckByTimestampMergeBaseTask):
 
     The root_path is expected to contain the subfolders BS, IS, and CF.
     The data has to be present as JoinedDataBags.
+
+    In incremental mode, only the reports (adshs) that are not listed in the manifest of the
+    existing StandardizedBags in the target_path are standardized and appended to them.
+
+    If max_rows_per_batch is set, the bags are not loaded at once but standardized in batches
+    of reports, which are directly written to the StandardizedBags.
     """
 
     def __init__(self,
                  root_path: Path,
                  target_path: Path,
+                 incremental: bool = False,
+                 max_rows_per_batch: Optional[int] = None
                  ):
         """
         Task that creates the standardized datasets for BS, IS, and CF.
@@ -70,12 +156,21 @@ class StandardizerTask(CheckByTimestampMergeBaseTask):
             root_path: The root path, containing subfolders for BS, IS, and CF.
                        The Data has to be provided as standardized DataBags.
             target_path: the target path to write the results to
+            incremental: if True, only new reports are standardized and appended to the
+                       existing results in the target_path. This expects that reports are
+                       only added to the data in the root_path, but never changed or removed.
+            max_rows_per_batch: if set, the input bags are standardized in batches of reports
+                       with at most this number of pre_num rows, in order to limit the peak
+                       memory. the first standardization in incremental mode is also done in
+                       batches, appended reports are loaded at once.
         """
         super().__init__(
             root_path=root_path,
             pathfilter="*",  # can actually be ignored
             target_path=target_path
         )
+        self.incremental = incremental
+        self.max_rows_per_batch = max_rows_per_batch
 
     def prepare(self):
         """
@@ -92,7 +187,7 @@ class StandardizerTask(CheckByTimestampMergeBaseTask):
 
     def __str__(self) -> str:
         return (f"StandardizerTask(root_path: {self.root_path}, "
-                f"target_path: {self.target_path})")
+                f"target_path: {self.target_path}, incremental: {self.incremental})")
 
     def do_execution(self,
                      paths_to_process: List[Path],
@@ -107,11 +202,20 @@ class StandardizerTask(CheckByTimestampMergeBaseTask):
             folders have to processed (BS, IS, CF)
             tmp_path: target path to write the result to
         """
-        _bs_standardization(root_path=self.root_path, tmp_path=tmp_path)
+        # the existing results are only replaced in the commit, so they can be extended
+        previous_path = self.target_path if self.incremental and self.target_path.exists() else None
+
+        _bs_standardization(root_path=self.root_path, tmp_path=tmp_path,
+                            previous_path=previous_path,
+                            max_rows_per_batch=self.max_rows_per_batch)
         gc.collect()
-        _is_standardization(root_path=self.root_path, tmp_path=tmp_path)
+        _is_standardization(root_path=self.root_path, tmp_path=tmp_path,
+                            previous_path=previous_path,
+                            max_rows_per_batch=self.max_rows_per_batch)
         gc.collect()
-        _cf_standardization(root_path=self.root_path, tmp_path=tmp_path)
+        _cf_standardization(root_path=self.root_path, tmp_path=tmp_path,
+                            previous_path=previous_path,
+                            max_rows_per_batch=self.max_rows_per_batch)
         gc.collect()
 
 
@@ -126,13 +230,16 @@ class StandardizeProcess(AbstractThreadProcess):
     BS, IS, and CF unter the target_dir, resp. inside additional subfolders.
 
     Will be executed if anything has changed (modification timestamp) in the
-    root_dir since last execution.
+    root_dir since last execution. In incremental mode, only the new reports are standardized
+    and appended to the existing StandardizedBags.
     """
 
     def __init__(self,
                  root_dir: str,
                  target_dir: str,
-                 execute_serial=True
+                 execute_serial=True,
+                 incremental: bool = False,
+                 max_rows_per_batch: Optional[int] = None
                  ):
         """
         Expects subfolders BS, IS, CF inside the provided root_dir.
@@ -148,11 +255,17 @@ class StandardizeProcess(AbstractThreadProcess):
             root_dir: folder containing subfolders BS, IS, and CF which have to provide
             the data as JoinedDataBags
             target_dir: directory to write the resulting StandardizedBags to
+            incremental: only standardize the reports that were added since the last
+            execution, see StandardizerTask
+            max_rows_per_batch: standardize the bags in batches of reports with at most this
+            number of pre_num rows to limit the peak memory, see StandardizerTask
         """
         super().__init__(execute_serial=execute_serial,
                          chunksize=0)
         self.root_dir = root_dir
         self.target_dir = target_dir
+        self.incremental = incremental
+        self.max_rows_per_batch = max_rows_per_batch
 
     def pre_process(self):
         """
@@ -183,7 +296,9 @@ class StandardizeProcess(AbstractThreadProcess):
 
             tasks = [StandardizerTask(
                 root_path=Path(self.root_dir) / missing,
-                target_path=Path(self.target_dir) / missing
+                target_path=Path(self.target_dir) / missing,
+                incremental=self.incremental,
+                max_rows_per_batch=self.max_rows_per_batch
             ) for missing in not_standardized_folders]
 
             return tasks
@@ -192,7 +307,9 @@ class StandardizeProcess(AbstractThreadProcess):
         # so, we just have one task to create
         task = StandardizerTask(
             root_path=Path(self.root_dir),
-            target_path=Path(self.target_dir)
+            target_path=Path(self.target_dir),
+            incremental=self.incremental,
+            max_rows_per_batch=self.max_rows_per_batch
         )
 
         # since this is a one task process, we just check if there is really something to do
@@ -8,11 +8,13 @@ Please have a look at this notebook for a detailed explanation of the logic
 """
 import os
 from glob import glob
+from pathlib import Path
 from typing import Callable, List, Optional
 
 from secfsdstools.a_config.configmgt import ConfigurationManager
 from secfsdstools.c_index.indexdataaccess import ParquetDBIndexingAccessor
 from secfsdstools.d_container.databagmodel import JoinedDataBag, RawDataBag
+from secfsdstools.e_collector.datasetcollecting import DatasetCollector
 from secfsdstools.e_collector.zipcollecting import ZipCollector
 
 
@@ -30,8 +32,9 @@ def default_postloadfilter(databag: RawDataBag) -> RawDataBag:
         USDOnlyRawFilter,
     )
 
-    return databag[ReportPeriodRawFilter()][MainCoregRawFilter()][OfficialTagsOnlyRawFilter()][
-        USDOnlyRawFilter()]
+    # the lazy bag combines the masks of the filters and selects the rows only once
+    return databag.lazy()[ReportPeriodRawFilter()][MainCoregRawFilter()][
+        OfficialTagsOnlyRawFilter()][USDOnlyRawFilter()].materialize()
 
 
 def save_databag(databag: RawDataBag, base_path: str, sub_path: str) -> JoinedDataBag:
@@ -121,6 +124,66 @@ def create_datasets_for_main_statements_parallel(base_path: str = "./set/paralle
         save_databag(databag=rawdatabag, base_path=base_path, sub_path=statement_to_load)
 
 
+def load_all_financial_statements_dataset(
+        financial_statement: str,
+        post_load_filter: Optional[Callable[[RawDataBag], RawDataBag]] = None,
+        categorical: bool = False) -> RawDataBag:
+    """
+    loads the data for a certain statement (e.g. BS, CF, IS, ...) from all availalbe zip files
+    and returns a single RawDataBag with all information.
+    it filters for 10-K and 10-Q reports.
+
+    In contrast to load_all_financial_statements_parallel, the data is read with the
+    DatasetCollector in a single multithreaded scan, without the need to pickle the data
+    of every zip file from a subprocess back to the main process.
+
+    Args:
+        financial_statement (str): the statement you want to read the data for "BS", "CF", "IS"
+        post_load_filter (Callable, optional): a post_load_filter method that is applied
+         to the data of every zip file
+        categorical (bool, optional, False): load columns with low cardinality as categoricals
+
+    Returns:
+        RawDataBag: the databag with the read data
+    """
+    collector = DatasetCollector.get_all_zips(forms_filter=["10-K", "10-Q"],
+                                              stmt_filter=[financial_statement],
+                                              post_load_filter=post_load_filter,
+                                              categorical=categorical)
+    return collector.collect()
+
+
+def create_datasets_for_main_statements_dataset(base_path: str = "./set/dataset/"):
+    """
+    Creates the raw and joined datasets for all the three main statements: BS, CF, IS.
+
+    Same as create_datasets_for_main_statements_parallel, but the data is read with the
+    DatasetCollector, which needs considerably less memory.
+
+    the created folder hiearchy looks as follows:
+    <pre>
+        - <base_path>
+          - BS
+            - raw
+            - joined
+          - CF
+            - raw
+            - joined
+          - IS
+            - raw
+            - joined
+    </pre>
+    """
+
+    for statement_to_load in ["BS", "CF", "IS"]:
+        print("load data for ", statement_to_load)
+        rawdatabag = load_all_financial_statements_dataset(
+            financial_statement=statement_to_load,
+            post_load_filter=default_postloadfilter
+        )
+        save_databag(databag=rawdatabag, base_path=base_path, sub_path=statement_to_load)
+
+
 def read_all_zip_names() -> List[str]:
     """
     Returns a list with all available zip-file names.
@@ -142,6 +205,7 @@ def build_tmp_set(financial_statement: str,
                   post_load_filter: Optional[Callable[[RawDataBag], RawDataBag]] = None):
     """
     This function reads the data in sequence from the provided list of zip file names.
+    Only the data of the current and the next zip file is held in memory.
     It filters according to the defined financial_statement and stores the data in
     specific subfolders.
 
@@ -157,14 +221,14 @@ def build_tmp_set(financial_statement: str,
         base_path (str): base_path under which the process data is saved.
     """
 
-    for file_name in file_names:
-        collector = ZipCollector.get_zip_by_name(name=file_name,
-                                                 forms_filter=["10-K", "10-Q"],
-                                                 stmt_filter=[financial_statement],
-                                                 post_load_filter=post_load_filter)
-
-        rawdatabag = collector.collect()
+    collector = ZipCollector.get_zip_by_names(names=file_names,
+                                              forms_filter=["10-K", "10-Q"],
+                                              stmt_filter=[financial_statement],
+                                              post_load_filter=post_load_filter)
 
+    # the next zip file is already loaded in the background, while the current one is saved
+    for datapath, rawdatabag in zip(collector.datapaths, collector.iter_collect(read_ahead=1)):
+        file_name = os.path.basename(datapath)
         target_path = os.path.join(base_path, file_name)
         # saving the raw databag, joining and saving the joined databag
         save_databag(databag=rawdatabag, base_path=target_path, sub_path=financial_statement)
@@ -211,6 +275,26 @@ def create_joineddatabag(financial_statement: str,
     joined_databag.save(target_path_joined)
 
 
+def create_joineddatabag_from_rawdatabag(financial_statement: str,
+                                         target_path: str = "set/serial/",
+                                         partitions: int = 32):
+    """
+    Creates the joineddatabag by joining the rawdatabag created by create_rawdatabag directly on
+    the files (see RawDataBag.join_filebased). This needs much less memory than loading the
+    rawdatabag and joining it in memory.
+
+    Args:
+        financial_statement: the statement for which the joineddatabag has to be created.
+        target_path: the target path of the daset, containing the rawdatabag
+        partitions: number of partitions used to join the data
+    """
+    path_raw = Path(target_path) / financial_statement / 'raw'
+    target_path_joined = Path(target_path) / financial_statement / 'joined'
+    print(f"store joineddatabag under {target_path_joined}")
+    RawDataBag.join_filebased(path_to_bag=path_raw, target_path=target_path_joined,
+                              partitions=partitions)
+
+
 def create_datasets_for_main_statements_serial(target_path: str = "set/parallel/",
                                                tmp_path: str = "set/tmp"):
     """
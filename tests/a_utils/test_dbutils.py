@@ -1,3 +1,5 @@
+import os
+import threading
 from dataclasses import dataclass
 
 import pytest
@@ -107,6 +109,62 @@ def test_insert_dataclass(db: DB):
     assert insert_sql == "INSERT INTO testtable1 ('col1', 'col2') VALUES ('col1', 123)"
 
 
+def test_connection_per_thread(db: DB):
+    conn = db.get_connection()
+    assert db.get_connection() is conn
+    assert DB(db_dir=db.db_dir).get_connection() is conn
+
+    thread_connections = []
+    thread = threading.Thread(target=lambda: thread_connections.append(db.get_connection()))
+    thread.start()
+    thread.join()
+    assert thread_connections[0] is not conn
+
+    # a closed connection or a replaced db file lead to a new connection
+    conn.close()
+    new_conn = db.get_connection()
+    assert new_conn is not conn
+
+    os.remove(db.database)
+    assert db.get_connection() is not new_conn
+
+
+def test_typed_read_does_not_change_connection(db: DB):
+    with db.get_connection() as conn:
+        db.execute_single(sql_create, conn)
+        db.execute_many("INSERT INTO testtable1 ('col1', 'col2') VALUES (?, ?)", [('a', 'b')], conn)
+
+    assert db.execute_fetchall_typed(sql="SELECT * FROM testtable1", T=DataRow)[0].col1 == 'a'
+    assert db.execute_fetchall("SELECT * FROM testtable1") == [('a', 'b')]
+
+
+def test_read_while_writing_in_wal_mode(db: DB):
+    with db.get_connection() as conn:
+        db.execute_single(sql_create, conn)
+        db.execute_many("INSERT INTO testtable1 ('col1', 'col2') VALUES (?, ?)", [('a', 'b')], conn)
+    db.enable_wal_mode()
+    assert db.execute_fetchall("PRAGMA journal_mode") == [('wal',)]
+
+    writing = threading.Event()
+    done = threading.Event()
+
+    def write():
+        with db.get_connection() as write_conn:
+            db.execute_many("INSERT INTO testtable1 ('col1', 'col2') VALUES (?, ?)", [('c', 'd')],
+                            write_conn)
+            writing.set()
+            done.wait(timeout=10)
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    writing.wait(timeout=10)
+    # the uncommitted write neither blocks nor is visible to the reader
+    assert len(db.execute_fetchall("SELECT * FROM testtable1")) == 1
+    done.set()
+    thread.join()
+    assert len(db.execute_fetchall("SELECT * FROM testtable1")) == 2
+
+
 # --- Testing DBStateAccessor
 def test_insert_and_overwrite(dbstatus: DBStateAcessor):
     key = 'key1'
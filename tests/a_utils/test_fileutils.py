@@ -3,11 +3,16 @@ from typing import List
 
 import numpy as np
 from secfsdstools.a_utils.fileutils import (
+    cluster_parquet_file,
     concat_parquet_files,
     get_filenames_in_directory,
+    iter_batches_from_file_in_zip,
     read_content_from_zip,
     read_df_from_file_in_zip,
+    read_table_from_file_in_zip,
+    write_batches_clustered,
     write_content_to_zip,
+    write_table_clustered,
 )
 
 CURRENT_DIR, CURRENT_FILE = os.path.split(__file__)
@@ -52,6 +57,75 @@ def test_read_df_from_file_in_zip():
     assert len(cik_as_str_df.columns) == 2
 
 
+def test_read_table_from_file_in_zip():
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    zip_file = CURRENT_DIR + '/../_testdata/zip/2009q3.zip'
+    table = read_table_from_file_in_zip(zip_file=zip_file, file_to_extract='sub.txt',
+                                        column_types={'cik': pa.int32(), 'not_present': pa.string()})
+
+    assert table.num_rows == 435
+    assert table.num_columns == 36
+    assert table.schema.field('cik').type == pa.int32()
+
+
+def test_iter_batches_from_file_in_zip():
+    zip_file = CURRENT_DIR + '/../_testdata/zip/2009q3.zip'
+    batches = list(iter_batches_from_file_in_zip(zip_file=zip_file, file_to_extract='num.txt',
+                                                 block_size=1024 * 1024))
+
+    assert len(batches) > 1
+    assert sum(batch.num_rows for batch in batches) == 126650
+
+
+def test_write_batches_clustered(tmp_path):
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+    import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+    zip_file = CURRENT_DIR + '/../_testdata/zip/2009q3.zip'
+    batches = [pa.Table.from_batches([batch]) for batch in iter_batches_from_file_in_zip(
+        zip_file=zip_file, file_to_extract='num.txt', block_size=1024 * 1024)]
+    # rows without a key are written at the end
+    batches[1] = batches[1].set_column(0, 'adsh', pa.array([None] * batches[1].num_rows, pa.string()))
+    sort_by = ['adsh', 'tag']
+
+    expected_file = str(tmp_path / 'expected.parquet')
+    write_table_clustered(pa.concat_tables(batches), expected_file, sort_by=sort_by, row_group_size=5_000)
+    target_file = str(tmp_path / 'num.parquet')
+    write_batches_clustered(batches, target_file, sort_by=sort_by, row_group_size=5_000,
+                            max_rows_in_memory=20_000)
+
+    assert pq.read_table(target_file).equals(pq.read_table(expected_file))
+    assert pq.read_schema(target_file).metadata == pq.read_schema(expected_file).metadata
+    # the temporary files are removed
+    assert sorted(os.listdir(tmp_path)) == ['expected.parquet', 'num.parquet']
+
+
+def test_cluster_parquet_file(tmp_path):
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+    import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+    table = read_table_from_file_in_zip(zip_file=CURRENT_DIR + '/../_testdata/zip/2009q3.zip',
+                                        file_to_extract='num.txt')
+    sort_by = ['adsh', 'tag']
+    expected_file = str(tmp_path / 'expected.parquet')
+    write_table_clustered(table, expected_file, sort_by=sort_by, row_group_size=5_000)
+
+    file = str(tmp_path / 'num.parquet')
+    pq.write_table(table, file)
+    empty_file = str(tmp_path / 'empty.parquet')
+    pq.write_table(table.slice(0, 0), empty_file)
+
+    cluster_parquet_file(file, sort_by=sort_by, row_group_size=5_000, max_rows_in_memory=20_000)
+    cluster_parquet_file(empty_file, sort_by=sort_by)
+
+    assert pq.read_table(file).equals(pq.read_table(expected_file))
+    assert pq.read_schema(file).metadata == pq.read_schema(expected_file).metadata
+    assert pq.read_table(empty_file).num_rows == 0
+    assert pa.types.is_string(pq.read_schema(empty_file).field('adsh').type)
+    assert sorted(os.listdir(tmp_path)) == ['empty.parquet', 'expected.parquet', 'num.parquet']
+
+
 def test_get_filenames_in_directory(tmp_path):
     list_of_zips = get_filenames_in_directory(os.path.join(tmp_path, '*.zip'))
     assert len(list_of_zips) == 0
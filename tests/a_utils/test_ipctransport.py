@@ -0,0 +1,22 @@
+import os
+
+import pandas as pd
+
+from secfsdstools.a_utils.ipctransport import read_dataframes_from_ipc, write_dataframes_to_ipc
+
+
+def test_write_read_dataframes(tmp_path):
+    df_1 = pd.DataFrame({'adsh': ['a', 'b', None], 'value': [1.0, None, 3.0], 'line': [1, 2, 3]})
+    df_2 = pd.DataFrame({'tag': pd.Categorical(['Assets', 'Assets', 'Liabilities'])})
+
+    ipc_dir = write_dataframes_to_ipc({'first': df_1, 'second': df_2}, base_dir=str(tmp_path))
+    assert os.path.isdir(ipc_dir)
+
+    result = read_dataframes_from_ipc(ipc_dir)
+
+    pd.testing.assert_frame_equal(result['first'], df_1)
+    pd.testing.assert_frame_equal(result['second'], df_2)
+    assert isinstance(result['second'].tag.dtype, pd.CategoricalDtype)
+
+    # the folder is removed after reading
+    assert not os.path.exists(ipc_dir)
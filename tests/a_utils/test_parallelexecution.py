@@ -1,6 +1,17 @@
+import glob
+import os
 from typing import List
 
-from secfsdstools.a_utils.parallelexecution import ParallelExecutor
+import pandas as pd
+import pytest
+
+from secfsdstools.a_utils.ipctransport import (
+    IPC_DIR_PREFIX,
+    read_dataframes_from_ipc,
+    remove_ipc_dir,
+    write_dataframes_to_ipc,
+)
+from secfsdstools.a_utils.parallelexecution import ParallelExecutor, ResultTransport
 
 
 def test_parallelexcution():
@@ -37,3 +48,103 @@ def test_parallelexcution():
 
     assert len(processed) == 500
     assert len(missing) == 0
+
+
+class _PrefixTransport(ResultTransport[str]):
+    def dump(self, result: str) -> str:
+        return "dumped_" + result
+
+    def load(self, handle: str) -> str:
+        return handle.replace("dumped_", "loaded_")
+
+
+def test_parallelexecution_keep_pool_and_transport():
+    data_list = [str(x) for x in range(20)]
+
+    with ParallelExecutor[str, str, str](processes=2, chunksize=5, keep_pool=True,
+                                         transport=_PrefixTransport()) as executor:
+        executor.set_process_element_function(lambda x: "0" + x)
+        executor.set_post_process_chunk_function(lambda x: x)
+
+        for _ in range(2):
+            was_read = [False]
+
+            def get_entries() -> List[str]:
+                if not was_read[0]:
+                    was_read[0] = True
+                    return data_list
+                return []
+
+            executor.set_get_entries_function(get_entries)
+            processed, missing = executor.execute()
+
+            assert processed == ["loaded_0" + x for x in data_list]
+            assert len(missing) == 0
+
+        # the same pool is used for all chunks and all calls of execute
+        assert executor._pool is not None
+
+    assert executor._pool is None
+
+
+class _FailingTransport(_PrefixTransport):
+    def __init__(self):
+        self.discarded: List[str] = []
+
+    def load(self, handle: str) -> str:
+        if handle == "dumped_2":
+            raise ValueError("cannot load " + handle)
+        return super().load(handle)
+
+    def discard(self, handle: str):
+        self.discarded.append(handle)
+
+
+def test_parallelexecution_transport_discards_unloaded_handles():
+    transport = _FailingTransport()
+    executor = ParallelExecutor[str, str, str](processes=2, chunksize=0, transport=transport)
+    executor.set_get_entries_function(lambda: [str(x) for x in range(5)])
+    executor.set_process_element_function(lambda x: x)
+    executor.set_post_process_chunk_function(lambda x: x)
+
+    with pytest.raises(ValueError):
+        executor.execute()
+
+    # the failed handle and the ones after it were not loaded
+    assert transport.discarded == ["dumped_2", "dumped_3", "dumped_4"]
+
+
+class _DataFrameIpcTransport(ResultTransport[pd.DataFrame]):
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+
+    def dump(self, result: pd.DataFrame) -> str:
+        return write_dataframes_to_ipc({"df": result}, base_dir=self.base_dir)
+
+    def load(self, handle: str) -> pd.DataFrame:
+        return read_dataframes_from_ipc(handle)["df"]
+
+    def discard(self, handle: str):
+        remove_ipc_dir(handle)
+
+
+def _create_df(entry: str) -> pd.DataFrame:
+    if entry == "2":
+        raise ValueError("cannot process " + entry)
+    return pd.DataFrame({"value": [entry]})
+
+
+@pytest.mark.parametrize("keep_pool", [False, True])
+def test_parallelexecution_failing_entry_releases_ipc_dirs(tmp_path, keep_pool: bool):
+    with ParallelExecutor[str, pd.DataFrame, pd.DataFrame](
+            processes=2, chunksize=0, keep_pool=keep_pool,
+            transport=_DataFrameIpcTransport(str(tmp_path))) as executor:
+        executor.set_get_entries_function(lambda: [str(x) for x in range(5)])
+        executor.set_process_element_function(_create_df)
+        executor.set_post_process_chunk_function(lambda x: x)
+
+        with pytest.raises(ValueError):
+            executor.execute()
+
+    # the entries before and after the failing one were written, but are released again
+    assert glob.glob(os.path.join(str(tmp_path), IPC_DIR_PREFIX + "*")) == []
@@ -1,7 +1,25 @@
-from secfsdstools.a_utils.basic import calculate_previous_period
+import numpy as np
+
+from secfsdstools.a_utils.basic import calculate_period_offsets, calculate_previous_period
 
 
 def test_calculate_previous_period():
     assert calculate_previous_period(20220101) == 20210101
     assert calculate_previous_period(20200229) == 20190228
     assert calculate_previous_period(20210228) == 20200229
+
+
+def test_calculate_period_offsets():
+    periods = np.array([20220101, 20200229, 20210228, 20200228, 20240229, 20250228])
+
+    # one year back has to match calculate_previous_period
+    expected = [calculate_previous_period(x) for x in periods]
+    assert calculate_period_offsets(periods, years=1).tolist() == expected
+
+    # end of month stays end of month
+    assert calculate_period_offsets(np.array([20210630, 20210531, 20210515]), months=3).tolist() == \
+           [20210331, 20210228, 20210215]
+    assert calculate_period_offsets(np.array([20210331]), years=2, months=1).tolist() == [20190228]
+
+    # invalid periods
+    assert calculate_period_offsets(np.array([np.nan, 0]), years=1).tolist() == [-1, -1]
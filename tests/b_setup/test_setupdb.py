@@ -10,3 +10,24 @@ def test_db_creation(tmp_path):
     # check if expected tables are present
     assert len(creator.execute_fetchall("SELECT * FROM index_parquet_processing_state")) == 0
     assert len(creator.execute_fetchall("SELECT * FROM index_parquet_reports")) == 0
+    assert creator.execute_fetchall("PRAGMA journal_mode") == [('wal',)]
+
+
+def test_report_index_indexes(tmp_path):
+    creator = DbCreator(db_dir=str(tmp_path))
+    creator.create_db()
+    # the migrations can be applied again
+    creator.create_db()
+
+    sql = """SELECT name FROM sqlite_master
+              WHERE type = 'index' AND tbl_name = 'index_parquet_reports' AND sql IS NOT NULL"""
+    assert {x[0] for x in creator.execute_fetchall(sql)} == {
+        'idx_index_parquet_reports_cik_type_period',
+        'idx_index_parquet_reports_cik_form_period',
+        'idx_index_parquet_reports_type_file',
+        'idx_index_parquet_reports_name_cik'}
+
+    plan = creator.execute_fetchall(
+        "EXPLAIN QUERY PLAN SELECT * FROM index_parquet_reports "
+        "WHERE cik = 1 and originFileType = 'quarter' ORDER BY period DESC LIMIT 1")
+    assert 'idx_index_parquet_reports_cik_type_period' in plan[0][-1]
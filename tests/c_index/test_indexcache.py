@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from secfsdstools.a_config.configmodel import Configuration
+from secfsdstools.b_setup.setupdb import DbCreator
+from secfsdstools.c_index.indexcache import CachedIndexAccessor, get_index_accessor
+from secfsdstools.c_index.indexdataaccess import IndexFileProcessingState, IndexReport, ParquetDBIndexingAccessor
+
+from tests.c_index.test_indexdataaccess import _add_reports
+
+
+@pytest.fixture
+def accessors(tmp_path):
+    DbCreator(db_dir=str(tmp_path)).create_db()
+    db_accessor = ParquetDBIndexingAccessor(db_dir=str(tmp_path))
+    _add_reports(db_accessor, 1_000)
+
+    # the first report is also present in a daily file
+    db_accessor.insert_indexreport(IndexReport(
+        adsh="0000000000-10-000000", cik=0, name="company 0", form="10-K", filed=20100101,
+        period=20200101, fullPath="", originFile="20100101.zip", originFileType="daily", url=""))
+
+    yield db_accessor, CachedIndexAccessor(db_dir=str(tmp_path), check_interval=0)
+    CachedIndexAccessor.invalidate(str(tmp_path))
+
+
+def test_lookups_same_as_db(accessors):
+    db_accessor, cached_accessor = accessors
+
+    for adsh in ["0000000000-10-000000", "0000000000-10-000999"]:
+        assert cached_accessor.read_index_report_for_adsh(adsh) == db_accessor.read_index_report_for_adsh(adsh)
+
+    adshs = ["0000000000-10-000005", "0000000000-10-000000", "0000000000-10-000005", "unknown"]
+    assert cached_accessor.read_index_reports_for_adshs(adshs) == db_accessor.read_index_reports_for_adshs(adshs)
+
+    for filetype in ["quarter", "daily"]:
+        assert (cached_accessor.find_latest_company_report(0, filetype)
+                == db_accessor.find_latest_company_report(0, filetype))
+    assert cached_accessor.find_latest_company_report(4711) is None
+
+    for forms in [None, ['10-k']]:
+        assert ([report.adsh for report in cached_accessor.read_index_reports_for_ciks([3, 2, 3], forms)]
+                == [report.adsh for report in db_accessor.read_index_reports_for_ciks([3, 2, 3], forms)])
+        pd.testing.assert_frame_equal(cached_accessor.read_index_reports_for_ciks_df([1, 2], forms),
+                                      db_accessor.read_index_reports_for_ciks_df([1, 2], forms))
+
+
+def test_snapshot_reloaded_after_indexing(accessors):
+    db_accessor, cached_accessor = accessors
+    snapshot = cached_accessor.get_snapshot()
+    assert cached_accessor.get_snapshot() is snapshot
+    assert len(cached_accessor.read_index_reports_for_ciks([4711])) == 0
+
+    db_accessor.add_index_report(
+        pd.DataFrame([vars(IndexReport(adsh="0000004711-10-000001", cik=4711, name="new", form="10-K",
+                                       filed=20100101, period=20091231, fullPath="",
+                                       originFile="2010q2.zip", originFileType="quarter", url=""))]),
+        IndexFileProcessingState(fileName="2010q2.zip", fullPath="", status="processed",
+                                 entries=1, processTime="2010-07-01"))
+
+    assert len(cached_accessor.read_index_reports_for_ciks([4711])) == 1
+    assert cached_accessor.get_snapshot() is not snapshot
+
+
+def test_get_index_accessor(tmp_path):
+    configuration = Configuration(db_dir=str(tmp_path), download_dir="", user_agent_email="", parquet_dir="")
+    assert type(get_index_accessor(configuration)) is ParquetDBIndexingAccessor
+
+    configuration.use_index_cache = True
+    assert isinstance(get_index_accessor(configuration), CachedIndexAccessor)
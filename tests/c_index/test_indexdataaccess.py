@@ -373,3 +373,111 @@ def test_debug_clear_index_tables(parquetindexaccessor):
     assert remaining_reports[0].adsh == "keep"
     assert len(remaining_processing) == 1
     assert remaining_processing[0].fileName == "20220401.zip"
+
+
+def _add_reports(accessor: ParquetDBIndexingAccessor, nr_of_reports: int):
+    reports_df = pd.DataFrame({
+        'adsh': [f"0000000000-10-{i:06d}" for i in range(nr_of_reports)],
+        'cik': [i % 100 for i in range(nr_of_reports)],
+        'name': [f"company {i % 100}" for i in range(nr_of_reports)],
+        'form': ['10-K' if i % 2 == 0 else '10-Q' for i in range(nr_of_reports)],
+        'filed': 20100101,
+        'period': [20090101 + i for i in range(nr_of_reports)],
+        'fullPath': "",
+        'originFile': "2010q1.zip",
+        'originFileType': "quarter",
+        'url': ""})
+    with accessor.get_connection() as conn:
+        accessor.append_df_to_table(accessor.index_reports_table, reports_df, conn)
+
+
+def test_bulk_lookups(parquetindexaccessor):
+    _add_reports(parquetindexaccessor, 50_000)
+
+    # far more keys than SQLite allows as variables or in a single expression
+    adshs = [f"0000000000-10-{i:06d}" for i in range(0, 100_000, 2)]
+    reports = parquetindexaccessor.read_index_reports_for_adshs(adshs + adshs[:10])
+    assert len(reports) == 25_000
+    assert reports[0].adsh == adshs[0]
+
+    reports = parquetindexaccessor.read_index_reports_for_ciks([1, 2], forms=['10-k'])
+    assert len(reports) == 500
+    assert {report.cik for report in reports} == {2}
+    assert reports[0].period > reports[-1].period
+
+    reports_df = parquetindexaccessor.read_index_reports_for_ciks_df([1, 2])
+    assert len(reports_df) == 1_000
+
+    for filename in ["2022q1.zip", "2022q2.zip"]:
+        parquetindexaccessor.insert_indexfileprocessing(IndexFileProcessingState(
+            fileName=filename, status="processed", processTime="", fullPath="full", entries=1))
+    states = parquetindexaccessor.read_index_files_for_filenames(["2022q2.zip", "2023q1.zip"])
+    assert [state.fileName for state in states] == ["2022q2.zip"]
+
+
+def _add_company(accessor: ParquetDBIndexingAccessor, adsh: str, cik: int, name: str):
+    accessor.insert_indexreport(IndexReport(adsh=adsh, cik=cik, name=name, form="10-K", filed=20100101,
+                                            period=20091231, fullPath="", originFile="2010q1.zip",
+                                            originFileType="quarter", url=""))
+
+
+def _add_companies(accessor: ParquetDBIndexingAccessor):
+    _add_company(accessor, "a1", 1, "MICROSOFT CORP")
+    _add_company(accessor, "a2", 1, "MICROSOFT CORP")
+    # former name of a company
+    _add_company(accessor, "a3", 2, "FACEBOOK INC")
+    _add_company(accessor, "a4", 2, "META PLATFORMS, INC.")
+    _add_company(accessor, "a5", 3, "ADVANCED MICRO DEVICES INC")
+
+
+def test_company_names_maintained_by_indexing(parquetindexaccessor):
+    _add_companies(parquetindexaccessor)
+
+    assert parquetindexaccessor.has_company_names_fts()
+    result_df = parquetindexaccessor.find_company_by_name("micro")
+    assert result_df.name.tolist() == ["ADVANCED MICRO DEVICES INC", "MICROSOFT CORP"]
+    assert result_df.cik.tolist() == [3, 1]
+    assert parquetindexaccessor.find_company_by_name("book").cik.tolist() == [2]
+    assert len(parquetindexaccessor.find_company_by_name("x'y")) == 0
+
+
+def test_search_companies(parquetindexaccessor):
+    _add_companies(parquetindexaccessor)
+
+    # names that start with the query are ranked first
+    assert parquetindexaccessor.search_companies("micro").name.tolist() == [
+        "MICROSOFT CORP", "ADVANCED MICRO DEVICES INC"]
+    # the words can be in any order
+    assert parquetindexaccessor.search_companies("devices micro").cik.tolist() == [3]
+    assert parquetindexaccessor.search_companies("meta face", limit=5).cik.tolist() == []
+    assert parquetindexaccessor.search_companies("face").cik.tolist() == [2]
+    # too short for the full text index
+    assert parquetindexaccessor.search_companies("me").name.tolist() == ["META PLATFORMS, INC."]
+    assert parquetindexaccessor.search_companies("mi", limit=1).cik.tolist() == [1]
+    assert parquetindexaccessor.search_companies("ro").cik.tolist() == [3, 1]
+    # short words are not dropped
+    assert parquetindexaccessor.search_companies("micro de").cik.tolist() == [3]
+    assert parquetindexaccessor.search_companies("ad mi").cik.tolist() == [3]
+
+
+def test_company_names_of_existing_index(tmp_path):
+    creator = DbCreator(db_dir=str(tmp_path))
+    creator.create_db()
+    accessor = ParquetDBIndexingAccessor(db_dir=str(tmp_path))
+    # the state before the V7 migration
+    with accessor.get_connection() as conn:
+        conn.execute("DROP TRIGGER trg_index_parquet_reports_company_name")
+        for table in [accessor.company_names_fts_table, accessor.company_names_table]:
+            conn.execute(f"DROP TABLE {table}")
+    _add_companies(accessor)
+
+    # without the names table, the names are searched in the reports
+    old_accessor = ParquetDBIndexingAccessor(db_dir=str(tmp_path))
+    assert not old_accessor.has_company_names_table()
+    assert old_accessor.find_company_by_name("micro").cik.tolist() == [3, 1]
+    assert old_accessor.search_companies("micro").cik.tolist() == [1, 3]
+    assert old_accessor.search_companies("devices micro").cik.tolist() == [3]
+
+    # the names of the reports that were indexed before are registered by the migration
+    creator.create_db()
+    assert accessor.search_companies("micro").cik.tolist() == [1, 3]
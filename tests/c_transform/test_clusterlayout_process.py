@@ -0,0 +1,51 @@
+import os
+import shutil
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from secfsdstools.a_utils.constants import CLUSTER_COLS_MAP, NUM_TXT, PRE_TXT
+from secfsdstools.a_utils.fileutils import is_clustered_parquet_file
+from secfsdstools.c_transform.clusterlayout_process import ClusterLayoutProcess, get_unclustered_files
+
+CURRENT_DIR, _ = os.path.split(__file__)
+PARQUET_DIR = os.path.join(CURRENT_DIR, "../_testdata/parquet_new/quarter/2010q1.zip")
+
+
+def test_cluster_layout_process(tmp_path):
+    folder = tmp_path / "quarter" / "2010q1.zip"
+    shutil.copytree(PARQUET_DIR, folder)
+
+    orig_num_df = pd.read_parquet(folder / f"{NUM_TXT}.parquet")
+    orig_pre_df = pd.read_parquet(folder / f"{PRE_TXT}.parquet")
+
+    assert len(get_unclustered_files(folder)) == 3
+
+    process = ClusterLayoutProcess(parquet_dir=str(tmp_path), file_type="quarter", execute_serial=True)
+    assert len(process.calculate_tasks()) == 1
+    process.process()
+
+    assert get_unclustered_files(folder) == []
+    assert len(process.calculate_tasks()) == 0
+
+    for file, orig_df in [(NUM_TXT, orig_num_df), (PRE_TXT, orig_pre_df)]:
+        file_path = folder / f"{file}.parquet"
+        assert is_clustered_parquet_file(str(file_path))
+
+        new_df = pd.read_parquet(file_path)
+        sort_by = CLUSTER_COLS_MAP[file]
+        assert new_df.equals(new_df.sort_values(sort_by).reset_index(drop=True))
+
+        # same content, only the order changed
+        all_cols = list(orig_df.columns)
+        pd.testing.assert_frame_equal(
+            orig_df.sort_values(all_cols).reset_index(drop=True),
+            new_df.sort_values(all_cols).reset_index(drop=True),
+        )
+
+    # a single adsh is only contained in a few row groups
+    adsh = orig_num_df.adsh.iloc[0]
+    fragment = next(ds.dataset(folder / f"{NUM_TXT}.parquet").get_fragments())
+    matching = fragment.split_by_row_group(ds.field("adsh") == adsh)
+    assert len(fragment.row_groups) > 1
+    assert len(matching) < len(fragment.row_groups)
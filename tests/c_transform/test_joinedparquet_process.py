@@ -0,0 +1,41 @@
+import os
+import shutil
+
+import pandas as pd
+
+from secfsdstools.a_utils.constants import PRE_NUM_TXT
+from secfsdstools.b_setup.setupdb import DbCreator
+from secfsdstools.c_index.indexdataaccess import ParquetDBIndexingAccessor
+from secfsdstools.c_transform.joinedparquet_process import JoinedParquetProcess
+from secfsdstools.d_container.databagmodel import JoinedDataBag, RawDataBag
+
+CURRENT_DIR, _ = os.path.split(__file__)
+PARQUET_DIR = os.path.join(CURRENT_DIR, "../_testdata/parquet_new/quarter/2010q1.zip")
+
+
+def test_joined_parquet_process(tmp_path):
+    folder = tmp_path / "quarter" / "2010q1.zip"
+    shutil.copytree(PARQUET_DIR, folder)
+    DbCreator(db_dir=str(tmp_path)).create_db()
+
+    process = JoinedParquetProcess(db_dir=str(tmp_path), parquet_dir=str(tmp_path), file_type="quarter")
+    assert len(process.calculate_tasks()) == 1
+    process.process()
+
+    # the folder is registered and is not processed again
+    assert len(process.calculate_tasks()) == 0
+    joined_states = ParquetDBIndexingAccessor(db_dir=str(tmp_path)).read_all_indexjoined()
+    assert [x.fileName for x in joined_states] == ["2010q1.zip"]
+
+    # only the pre_num file was added to the folder
+    assert sorted(os.listdir(folder)) == sorted(os.listdir(PARQUET_DIR) + [f"{PRE_NUM_TXT}.parquet"])
+
+    expected_df = RawDataBag.load(str(folder)).join().pre_num_df
+    pre_num_df = JoinedDataBag.load(str(folder)).pre_num_df
+    assert joined_states[0].entries == len(expected_df)
+
+    sort_cols = ["adsh", "tag", "version", "ddate", "qtrs", "uom", "coreg", "segments", "report", "line"]
+    pd.testing.assert_frame_equal(
+        expected_df.sort_values(sort_cols).reset_index(drop=True),
+        pre_num_df.sort_values(sort_cols).reset_index(drop=True),
+    )
@@ -2,7 +2,10 @@ import os
 import shutil
 
 import pandas as pd
+import pyarrow.parquet as pq
 
+from secfsdstools.a_utils.constants import CLUSTER_COLS_MAP
+from secfsdstools.a_utils.fileutils import is_clustered_parquet_file
 from secfsdstools.c_transform.toparquettransforming_process import ToParquetTransformerProcess
 
 CURRENT_DIR, _ = os.path.split(__file__)
@@ -85,3 +88,50 @@ def test_daily_zip_transformation(tmp_path):
     assert num_1_df.shape == (1598, 10)
     assert pre_1_df.shape == (595, 10)
     assert sub_1_df.shape == (6, 11)
+
+
+def test_transformation_clustered_layout(tmp_path):
+    zip_temp_dir = tmp_path / "zip"
+    os.makedirs(zip_temp_dir)
+    shutil.copy(os.path.join(ZIP_DIR, "2010q2.zip"), zip_temp_dir)
+
+    transformer = ToParquetTransformerProcess(
+        zip_dir=str(zip_temp_dir), parquet_dir=str(tmp_path), file_type="quarter", keep_zip_files=True,
+        execute_serial=True
+    )
+    transformer.process()
+
+    target_dir = tmp_path / "quarter" / "2010q2.zip"
+    for file, sort_by in CLUSTER_COLS_MAP.items():
+        file_path = target_dir / f"{file}.parquet"
+        if not file_path.exists():
+            continue
+        assert is_clustered_parquet_file(str(file_path))
+        df = pd.read_parquet(file_path)
+        assert df.equals(df.sort_values(sort_by).reset_index(drop=True))
+
+    num_file = pq.ParquetFile(target_dir / "num.txt.parquet")
+    assert num_file.metadata.num_row_groups > 1
+    assert num_file.metadata.row_group(0).column(0).statistics.has_min_max
+
+    sub_df = pd.read_parquet(target_dir / "sub.txt.parquet")
+    assert sub_df.shape == (522, 36)
+
+
+def test_transformation_unclustered_layout(tmp_path):
+    zip_temp_dir = tmp_path / "zip"
+    os.makedirs(zip_temp_dir)
+    shutil.copy(os.path.join(ZIP_DIR, "2010q2.zip"), zip_temp_dir)
+
+    transformer = ToParquetTransformerProcess(
+        zip_dir=str(zip_temp_dir), parquet_dir=str(tmp_path), file_type="quarter", keep_zip_files=True,
+        execute_serial=True, clustered_layout=False
+    )
+    transformer.process()
+
+    target_dir = tmp_path / "quarter" / "2010q2.zip"
+    assert not is_clustered_parquet_file(str(target_dir / "num.txt.parquet"))
+
+    assert pd.read_parquet(target_dir / "sub.txt.parquet").shape == (522, 36)
+    assert pd.read_parquet(target_dir / "pre.txt.parquet").shape == (57596, 10)
+    assert pd.read_parquet(target_dir / "num.txt.parquet").shape == (136044, 10)
@@ -2,6 +2,8 @@ import os
 from pathlib import Path
 from typing import List
 
+import pandas as pd
+
 from secfsdstools.d_container.databagmodel import JoinedDataBag, RawDataBag, RawDataBagStats
 
 CURRENT_DIR, _ = os.path.split(__file__)
@@ -220,3 +222,115 @@ def test_joined_load_with_filters():
                                                         tag_filter=["Assets"])
     assert bag_by_combined.pre_num_df.shape == (167, 17)
     assert bag_by_combined.sub_df.shape == (80, 36)
+
+
+def test_load_categorical():
+    bag_1 = RawDataBag.load(PATH_TO_BAG_1, categorical=True)
+    bag_2 = RawDataBag.load(PATH_TO_BAG_2, categorical=True)
+
+    assert isinstance(bag_1.num_df.tag.dtype, pd.CategoricalDtype)
+    assert isinstance(bag_1.pre_df.stmt.dtype, pd.CategoricalDtype)
+    assert isinstance(bag_1.sub_df.form.dtype, pd.CategoricalDtype)
+    assert not isinstance(bag_1.num_df.value.dtype, pd.CategoricalDtype)
+
+    # concat keeps the categoricals
+    concat_bag = RawDataBag.concat([bag_1, bag_2])
+    assert isinstance(concat_bag.num_df.tag.dtype, pd.CategoricalDtype)
+    assert len(concat_bag.num_df) == len(bag_1.num_df) + len(bag_2.num_df)
+
+    # join keeps the categoricals
+    joined_bag = bag_1.join()
+    assert isinstance(joined_bag.pre_num_df.tag.dtype, pd.CategoricalDtype)
+    assert isinstance(joined_bag.pre_num_df.adsh.dtype, pd.CategoricalDtype)
+
+    plain_joined_bag = RawDataBag.load(PATH_TO_BAG_1).join()
+    assert joined_bag.pre_num_df.shape == plain_joined_bag.pre_num_df.shape
+
+
+def test_save_load_categorical(tmp_path):
+    bag = JoinedDataBag.load(PATH_TO_JOINED_BAG_1, categorical=True, stmt_filter=['BS'])
+    bag.save(str(tmp_path))
+
+    loaded_bag = JoinedDataBag.load(str(tmp_path))
+    assert isinstance(loaded_bag.pre_num_df.tag.dtype, pd.CategoricalDtype)
+    assert loaded_bag.pre_num_df.stmt.unique().tolist() == ['BS']
+    assert loaded_bag.pre_num_df.shape == bag.pre_num_df.shape
+
+
+def test_load_with_columns():
+    bag = RawDataBag.load(PATH_TO_BAG_1, forms_filter=['10-K'], columns=['value', 'fye'])
+
+    # the key columns are always loaded, the column order of the file is kept
+    assert bag.sub_df.columns.tolist() == ['adsh', 'cik', 'fye', 'form', 'period', 'filed']
+    assert bag.pre_df.columns.tolist() == ['adsh', 'report', 'line', 'stmt', 'tag', 'version']
+    assert bag.num_df.columns.tolist() == ['adsh', 'tag', 'version', 'ddate', 'qtrs', 'uom',
+                                           'segments', 'coreg', 'value']
+
+    full_bag = RawDataBag.load(PATH_TO_BAG_1, forms_filter=['10-K'])
+    assert bag.num_df.shape[0] == full_bag.num_df.shape[0]
+    assert bag.join().pre_num_df.shape[0] == full_bag.join().pre_num_df.shape[0]
+
+
+def test_joined_load_with_columns():
+    bag = JoinedDataBag.load(PATH_TO_JOINED_BAG_1, stmt_filter=['BS'], columns=['value', 'negating'])
+
+    assert 'plabel' not in bag.pre_num_df.columns
+    assert 'footnote' not in bag.pre_num_df.columns
+    assert {'value', 'negating', 'stmt', 'coreg'} <= set(bag.pre_num_df.columns)
+    assert 'name' not in bag.sub_df.columns
+
+    full_bag = JoinedDataBag.load(PATH_TO_JOINED_BAG_1, stmt_filter=['BS'])
+    assert bag.pre_num_df.shape[0] == full_bag.pre_num_df.shape[0]
+
+
+def test_load_with_pushdown_filters():
+    from secfsdstools.e_filter.rawfiltering import (
+        NoSegmentInfoRawFilter,
+        StmtRawFilter,
+        TagRawFilter,
+        USDOnlyRawFilter,
+    )
+
+    filters = [StmtRawFilter(stmts=['BS']), TagRawFilter(tags=['Assets', 'Liabilities', 'NetIncomeLoss']),
+               NoSegmentInfoRawFilter(), USDOnlyRawFilter()]
+    bag = RawDataBag.load(PATH_TO_BAG_1, pushdown_filters=filters)
+
+    # the segments column contains None in the raw parquet files
+    full_bag = RawDataBag.load(PATH_TO_BAG_1)
+    full_bag.num_df['segments'] = full_bag.num_df.segments.fillna('')
+    expected_bag = full_bag[filters[0]][filters[1]][filters[2]][filters[3]]
+
+    assert bag.pre_df.shape == expected_bag.pre_df.shape
+    assert bag.num_df.shape == expected_bag.num_df.shape
+    assert bag.num_df.value.sum() == expected_bag.num_df.value.sum()
+
+
+def test_joined_load_with_pushdown_filters():
+    from secfsdstools.e_filter.joinedfiltering import MainCoregJoinedFilter, StmtJoinedFilter, USDOnlyJoinedFilter
+
+    filters = [StmtJoinedFilter(stmts=['BS']), MainCoregJoinedFilter(), USDOnlyJoinedFilter()]
+    bag = JoinedDataBag.load(PATH_TO_JOINED_BAG_1, pushdown_filters=filters)
+
+    full_bag = JoinedDataBag.load(PATH_TO_JOINED_BAG_1)
+    full_bag.pre_num_df['coreg'] = full_bag.pre_num_df.coreg.fillna('')
+    expected_bag = full_bag[filters[0]][filters[1]][filters[2]]
+
+    assert bag.pre_num_df.shape == expected_bag.pre_num_df.shape
+    assert bag.pre_num_df.value.sum() == expected_bag.pre_num_df.value.sum()
+
+
+def test_join_filebased(tmp_path):
+    target_path = tmp_path / "joined"
+    RawDataBag.join_filebased(Path(PATH_TO_BAG_1), target_path, partitions=5)
+
+    bag = JoinedDataBag.load(str(target_path))
+    expected = RawDataBag.load(PATH_TO_BAG_1).join()
+
+    # only the order of the rows is different
+    sort_cols = ['adsh', 'tag', 'version', 'ddate', 'qtrs', 'uom', 'segments', 'coreg', 'report', 'line']
+    pd.testing.assert_frame_equal(bag.pre_num_df.sort_values(sort_cols).reset_index(drop=True),
+                                  expected.pre_num_df.sort_values(sort_cols).reset_index(drop=True))
+    pd.testing.assert_frame_equal(bag.sub_df, expected.sub_df)
+
+    # the temporary partition files are removed
+    assert [x.name for x in tmp_path.iterdir()] == ["joined"]
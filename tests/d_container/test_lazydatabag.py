@@ -0,0 +1,96 @@
+import os
+
+import pandas as pd
+import pytest
+
+from secfsdstools.d_container.databagmodel import JoinedDataBag, RawDataBag
+from secfsdstools.d_container.filter import FilterBase
+from secfsdstools.d_container.lazydatabag import LazyDataBag
+from secfsdstools.e_filter.joinedfiltering import (
+    CIKJoinedFilter,
+    MainCoregJoinedFilter,
+    OfficialTagsOnlyJoinedFilter,
+    ReportPeriodJoinedFilter,
+    StmtJoinedFilter,
+    USDOnlyJoinedFilter,
+)
+from secfsdstools.e_filter.rawfiltering import (
+    CIKRawFilter,
+    MainCoregRawFilter,
+    OfficialTagsOnlyRawFilter,
+    ReportPeriodRawFilter,
+    StmtRawFilter,
+    USDOnlyRawFilter,
+)
+
+CURRENT_DIR, _ = os.path.split(__file__)
+PATH_TO_BAG_1 = f'{CURRENT_DIR}/../_testdata/parquet_new/quarter/2010q1.zip'
+
+CIK_APPLE = 320193
+
+
+class _NoNonePeriodRawFilter(FilterBase[RawDataBag]):
+    """ a filter that does not provide masks. """
+
+    def filter(self, databag: RawDataBag) -> RawDataBag:
+        return RawDataBag.create(sub_df=databag.sub_df[databag.sub_df.period.notna()],
+                                 pre_df=databag.pre_df,
+                                 num_df=databag.num_df)
+
+
+@pytest.fixture
+def raw_bag() -> RawDataBag:
+    bag = RawDataBag.load(PATH_TO_BAG_1)
+
+    # fix coreg as it would be loaded by the collectors
+    bag.num_df.loc[bag.num_df.coreg.isna(), 'coreg'] = ''
+    bag.num_df.loc[bag.num_df.segments.isna(), 'segments'] = ''
+    return bag
+
+
+def _assert_bags_equal(bag1, bag2):
+    for name, df in bag1.get_dataframes().items():
+        pd.testing.assert_frame_equal(df, bag2.get_dataframes()[name])
+
+
+def test_lazy_raw_postloadfilter(raw_bag):
+    eager = raw_bag[ReportPeriodRawFilter()][MainCoregRawFilter()][USDOnlyRawFilter()][
+        OfficialTagsOnlyRawFilter()]
+
+    lazy = raw_bag.lazy()[ReportPeriodRawFilter()][MainCoregRawFilter()][USDOnlyRawFilter()][
+        OfficialTagsOnlyRawFilter()]
+
+    assert isinstance(lazy, LazyDataBag)
+    materialized = lazy.materialize()
+    assert isinstance(materialized, RawDataBag)
+    _assert_bags_equal(eager, materialized)
+
+    # the bag is only materialized once and attributes are forwarded to it
+    assert lazy.materialize() is materialized
+    assert lazy.num_df is materialized.num_df
+
+
+def test_lazy_raw_sub_and_eager_filters(raw_bag):
+    eager = raw_bag[CIKRawFilter(ciks=[CIK_APPLE])][_NoNonePeriodRawFilter()][
+        StmtRawFilter(stmts=['BS'])][ReportPeriodRawFilter()]
+
+    lazy = raw_bag.lazy()[CIKRawFilter(ciks=[CIK_APPLE])][_NoNonePeriodRawFilter()][
+        StmtRawFilter(stmts=['BS'])][ReportPeriodRawFilter()]
+
+    assert eager.sub_df.shape == (2, 36)
+    _assert_bags_equal(eager, lazy.materialize())
+
+
+def test_lazy_joined(raw_bag):
+    joined_bag: JoinedDataBag = raw_bag.join()
+
+    eager = joined_bag[CIKJoinedFilter(ciks=[CIK_APPLE])][StmtJoinedFilter(stmts=['BS'])][
+        ReportPeriodJoinedFilter()][MainCoregJoinedFilter()][USDOnlyJoinedFilter()][
+        OfficialTagsOnlyJoinedFilter()]
+
+    lazy = joined_bag.lazy()[CIKJoinedFilter(ciks=[CIK_APPLE])][StmtJoinedFilter(stmts=['BS'])][
+        ReportPeriodJoinedFilter()][MainCoregJoinedFilter()][USDOnlyJoinedFilter()][
+        OfficialTagsOnlyJoinedFilter()]
+
+    assert len(eager.pre_num_df) > 0
+    _assert_bags_equal(eager, lazy.materialize())
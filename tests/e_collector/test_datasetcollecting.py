@@ -0,0 +1,89 @@
+import os
+
+import pandas as pd
+
+from secfsdstools.d_container.databagmodel import RawDataBag
+from secfsdstools.e_collector.datasetcollecting import DatasetCollector
+from secfsdstools.e_collector.zipcollecting import ZipCollector
+
+CURRENT_DIR, _ = os.path.split(__file__)
+PARQUET_DIR = f"{CURRENT_DIR}/../_testdata/parquet_new"
+PATH_TO_ZIPS = [f"{PARQUET_DIR}/quarter/2010q1.zip", f"{PARQUET_DIR}/quarter/2010q2.zip"]
+
+
+def _sorted(df: pd.DataFrame, by) -> pd.DataFrame:
+    return df.sort_values(by).reset_index(drop=True)
+
+
+def _assert_bags_equal(dataset_bag: RawDataBag, zip_bag: RawDataBag):
+    pd.testing.assert_frame_equal(_sorted(dataset_bag.sub_df, ["adsh"]),
+                                  _sorted(zip_bag.sub_df, ["adsh"]), check_dtype=False)
+    pd.testing.assert_frame_equal(_sorted(dataset_bag.pre_df, ["adsh", "report", "line"]),
+                                  _sorted(zip_bag.pre_df, ["adsh", "report", "line"]), check_dtype=False)
+    num_keys = ["adsh", "tag", "version", "ddate", "qtrs", "uom", "coreg", "segments"]
+    pd.testing.assert_frame_equal(_sorted(dataset_bag.num_df, num_keys),
+                                  _sorted(zip_bag.num_df, num_keys), check_dtype=False)
+
+
+def test_collect_same_as_zipcollector():
+    dataset_bag = DatasetCollector(parquet_dir=PARQUET_DIR,
+                                   origin_files=["2010q1.zip", "2010q2.zip"],
+                                   forms_filter=["10-K"],
+                                   stmt_filter=["BS"]).collect()
+    zip_bag = ZipCollector(datapaths=PATH_TO_ZIPS, forms_filter=["10-K"], stmt_filter=["BS"]).collect()
+
+    assert dataset_bag.sub_df.form.unique().tolist() == ["10-K"]
+    assert dataset_bag.pre_df.stmt.unique().tolist() == ["BS"]
+    _assert_bags_equal(dataset_bag, zip_bag)
+
+
+def test_collect_with_post_load_filter():
+    def keep_first_report(bag: RawDataBag) -> RawDataBag:
+        # the filter has to see the data of a single zip file
+        assert bag.sub_df.shape[0] > 0
+        first_adsh = sorted(bag.sub_df.adsh.tolist())[0]
+        return RawDataBag.create(sub_df=bag.sub_df[bag.sub_df.adsh == first_adsh],
+                                 pre_df=bag.pre_df[bag.pre_df.adsh == first_adsh],
+                                 num_df=bag.num_df[bag.num_df.adsh == first_adsh])
+
+    bag = DatasetCollector(parquet_dir=PARQUET_DIR,
+                           origin_files=["2010q1.zip", "2010q2.zip"],
+                           post_load_filter=keep_first_report).collect()
+
+    assert bag.sub_df.shape[0] == 2
+    assert bag.num_df.adsh.nunique() == 2
+
+
+def test_collect_categorical():
+    bag = DatasetCollector(parquet_dir=PARQUET_DIR,
+                           origin_files=["2010q1.zip"],
+                           tag_filter=["Assets"],
+                           categorical=True).collect()
+
+    assert isinstance(bag.num_df.tag.dtype, pd.CategoricalDtype)
+    assert bag.num_df.tag.unique().tolist() == ["Assets"]
+    assert (bag.num_df.coreg == "").sum() > 0
+
+
+def test_collect_pushdown_filters():
+    from secfsdstools.g_pipelines.filter_process import postloadfilter_pushdown_filters
+
+    dataset_bag = DatasetCollector(parquet_dir=PARQUET_DIR,
+                                   origin_files=["2010q1.zip", "2010q2.zip"],
+                                   forms_filter=["10-K"],
+                                   pushdown_filters=postloadfilter_pushdown_filters()).collect()
+    zip_bag = ZipCollector(datapaths=PATH_TO_ZIPS, forms_filter=["10-K"],
+                           pushdown_filters=postloadfilter_pushdown_filters()).collect()
+
+    assert (dataset_bag.num_df.coreg == "").all()
+    assert "EUR" not in dataset_bag.num_df.uom.unique().tolist()
+    _assert_bags_equal(dataset_bag, zip_bag)
+
+    # the result is the same as if the filters are applied after loading
+    unfiltered_bag = DatasetCollector(parquet_dir=PARQUET_DIR,
+                                      origin_files=["2010q1.zip", "2010q2.zip"],
+                                      forms_filter=["10-K"]).collect()
+    filtered_bag = unfiltered_bag
+    for pushdown_filter in postloadfilter_pushdown_filters():
+        filtered_bag = filtered_bag[pushdown_filter]
+    _assert_bags_equal(dataset_bag, filtered_bag)
@@ -136,3 +136,18 @@ def test_optimized_load(basicconf, caplog):
         assert len(result.sub_df.adsh.unique()) == 8
 
         assert caplog.messages[0].endswith(' 4')
+
+
+def test_collect_keep_pool(multireportcollector):
+    expected_bag = multireportcollector.collect()
+
+    with MultiReportCollector.get_reports_by_indexreports(index_reports=multireportcollector.index_reports,
+                                                          keep_pool=True) as collector:
+        first_bag = collector.collect()
+        pool = collector._executor._pool
+        second_bag = collector.collect()
+        assert collector._executor._pool is pool
+
+    assert collector._executor is None
+    assert first_bag.num_df.shape == expected_bag.num_df.shape
+    assert second_bag.num_df.shape == expected_bag.num_df.shape
@@ -1,4 +1,5 @@
 import os
+import shutil
 from unittest.mock import patch
 
 import pandas as pd
@@ -77,3 +78,102 @@ def test_tag_filter():
 
     assert bag.pre_df.tag.unique().tolist() == ["Assets"]
     assert bag.num_df.tag.unique().tolist() == ["Assets"]
+
+
+def test_collect_categorical():
+    plain_bag = ZipCollector(datapaths=[PATH_TO_ZIP], forms_filter=["10-K"]).collect()
+    categorical_bag = ZipCollector(datapaths=[PATH_TO_ZIP], forms_filter=["10-K"], categorical=True).collect()
+
+    assert isinstance(categorical_bag.num_df.coreg.dtype, pd.CategoricalDtype)
+    assert categorical_bag.num_df.shape == plain_bag.num_df.shape
+    assert categorical_bag.pre_df.shape == plain_bag.pre_df.shape
+
+    # coreg and segments use empty strings instead of None in both cases
+    assert categorical_bag.num_df.coreg.isna().sum() == 0
+    assert (categorical_bag.num_df.coreg == "").sum() == (plain_bag.num_df.coreg == "").sum()
+
+
+def test_collect_columns():
+    bag = ZipCollector(datapaths=[PATH_TO_ZIP], columns=["value"]).collect()
+
+    assert bag.sub_df.shape == (495, 5)
+    assert "plabel" not in bag.pre_df.columns
+    assert "footnote" not in bag.num_df.columns
+    assert bag.num_df.shape == (194741, 9)
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+def test_collect_pushdown_filters(categorical):
+    from secfsdstools.g_pipelines.filter_process import postloadfilter, postloadfilter_pushdown_filters
+
+    bag = ZipCollector(datapaths=[PATH_TO_ZIP], forms_filter=["10-K", "10-Q"], post_load_filter=postloadfilter,
+                       categorical=categorical).collect()
+    pushdown_bag = ZipCollector(datapaths=[PATH_TO_ZIP], forms_filter=["10-K", "10-Q"],
+                                post_load_filter=postloadfilter, categorical=categorical,
+                                pushdown_filters=postloadfilter_pushdown_filters()).collect()
+
+    pd.testing.assert_frame_equal(bag.num_df.reset_index(drop=True), pushdown_bag.num_df.reset_index(drop=True),
+                                  check_categorical=False)
+    pd.testing.assert_frame_equal(bag.pre_df, pushdown_bag.pre_df, check_categorical=False)
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+def test_collect_joined(tmp_path, categorical):
+    from secfsdstools.d_container.partitionedjoin import join_pre_num_file_based
+    from secfsdstools.g_pipelines.filter_process import (
+        joined_postloadfilter,
+        postloadfilter,
+        postloadfilter_pushdown_filters,
+    )
+
+    folder = tmp_path / "2010q1.zip"
+    shutil.copytree(PATH_TO_ZIP, folder)
+
+    expected_bag = ZipCollector(datapaths=[str(folder)], forms_filter=["10-K", "10-Q"], stmt_filter=["BS", "IS"],
+                                post_load_filter=postloadfilter, categorical=categorical).collect().join()
+
+    join_pre_num_file_based(path_to_bag=folder, target_file=folder / "pre_num.txt.parquet")
+    collector = ZipCollector(datapaths=[str(folder)], forms_filter=["10-K", "10-Q"], stmt_filter=["BS", "IS"],
+                             categorical=categorical, pushdown_filters=postloadfilter_pushdown_filters())
+    assert collector.is_prejoined()
+    joined_bag = collector.collect_joined(post_load_filter=joined_postloadfilter)
+
+    # categoricals would be sorted by the order of their categories
+    sort_cols = ["adsh", "tag", "version", "ddate", "qtrs", "uom", "coreg", "segments", "report", "line"]
+    pd.testing.assert_frame_equal(
+        expected_bag.pre_num_df.sort_values(sort_cols, key=lambda x: x.astype(str)).reset_index(drop=True),
+        joined_bag.pre_num_df.sort_values(sort_cols, key=lambda x: x.astype(str)).reset_index(drop=True),
+        check_categorical=False,
+    )
+    assert set(expected_bag.sub_df.adsh) == set(joined_bag.sub_df.adsh)
+
+
+@pytest.mark.parametrize("read_ahead", [0, 1, 2])
+def test_iter_collect(read_ahead):
+    path_to_zip_2 = f"{CURRENT_DIR}/../_testdata/parquet_new/quarter/2010q2.zip"
+    collector = ZipCollector(datapaths=[PATH_TO_ZIP, path_to_zip_2, PATH_TO_ZIP], forms_filter=["10-K"])
+
+    bags = list(collector.iter_collect(read_ahead=read_ahead))
+
+    assert len(bags) == 3
+    single_bag = ZipCollector(datapaths=[PATH_TO_ZIP], forms_filter=["10-K"]).collect()
+    pd.testing.assert_frame_equal(bags[0].num_df, single_bag.num_df)
+    pd.testing.assert_frame_equal(bags[2].num_df, single_bag.num_df)
+    assert bags[1].sub_df.adsh.isin(single_bag.sub_df.adsh).sum() == 0
+
+
+def test_collect_keep_pool():
+    path_to_zip_2 = f"{CURRENT_DIR}/../_testdata/parquet_new/quarter/2010q2.zip"
+    expected_bag = ZipCollector(datapaths=[PATH_TO_ZIP, path_to_zip_2], forms_filter=["10-K"]).collect()
+
+    with ZipCollector(datapaths=[PATH_TO_ZIP, path_to_zip_2], forms_filter=["10-K"], keep_pool=True) as collector:
+        bag = collector.collect()
+        pool = collector._executor._pool
+        joined_bag = collector.collect_joined()
+
+        # collect and collect_joined used the same pool
+        assert collector._executor._pool is pool
+
+    assert collector._executor is None
+    pd.testing.assert_frame_equal(expected_bag.num_df, bag.num_df)
+    assert joined_bag.sub_df.shape == expected_bag.sub_df.shape
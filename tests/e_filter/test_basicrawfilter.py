@@ -1,5 +1,7 @@
 import os
 
+import pandas as pd
+
 from secfsdstools.d_container.databagmodel import RawDataBag
 from secfsdstools.e_filter.rawfiltering import (
     AdshRawFilter,
@@ -7,6 +9,7 @@ from secfsdstools.e_filter.rawfiltering import (
     MainCoregRawFilter,
     NoSegmentInfoRawFilter,
     OfficialTagsOnlyRawFilter,
+    PeriodOffsetRawFilter,
     ReportPeriodAndPreviousPeriodRawFilter,
     ReportPeriodRawFilter,
     StmtRawFilter,
@@ -83,6 +86,25 @@ def test_filter_ReportPeriodAndPreviousPeriodRawFilter():
     assert len(filtered_bag.num_df[['adsh', 'ddate']].value_counts()) == 2 * len(bag1.sub_df)
 
 
+def test_filter_PeriodOffsetRawFilter():
+    bag1: RawDataBag = RawDataBag.load(PATH_TO_BAG_1)
+
+    report_and_previous = ReportPeriodAndPreviousPeriodRawFilter().filter(bag1)
+    offset_bag = PeriodOffsetRawFilter(years=1, keep_report_period=True).filter(bag1)
+    pd.testing.assert_frame_equal(report_and_previous.num_df, offset_bag.num_df)
+
+    previous_year_bag = PeriodOffsetRawFilter(years=1).filter(bag1)
+    previous_quarter_bag = PeriodOffsetRawFilter(quarters=1).filter(bag1)
+
+    report_bag = ReportPeriodRawFilter().filter(bag1)
+    assert len(report_bag.num_df) + len(previous_year_bag.num_df) == len(report_and_previous.num_df)
+    assert len(previous_quarter_bag.num_df) > 0
+
+    # the datapoints of the prior quarter end 3 months before the period of the report
+    merged = previous_quarter_bag.num_df.merge(bag1.sub_df[['adsh', 'period']], on='adsh')
+    assert ((merged.period // 100 - merged.ddate // 100) % 100).isin([3, 91]).all()
+
+
 def test_filter_MainCoregRawFilter():
     bag1: RawDataBag = RawDataBag.load(PATH_TO_BAG_1)
     # fix coreg as it would be loaded by the collectors
@@ -36,6 +36,15 @@ def test_simple_validation_rule_categories(sample_dataframe):
         .equals(pd.Series([0.0, 0.01, 0.05, 1.0]))
 
 
+def test_simple_validation_rule_without_rows():
+    data_df = pd.DataFrame({'Value': pd.Series([], dtype=np.float64)})
+    rule = SimpleValidationRule(identifier='test_rule')
+    rule.validate(data_df)
+
+    assert data_df.columns.tolist() == ['Value', 'test_rule_error', 'test_rule_cat']
+    assert len(data_df) == 0
+
+
 # ----------------------------------------------------------------------------------
 # Tests for the SumValidationRule
 
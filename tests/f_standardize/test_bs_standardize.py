@@ -4,12 +4,19 @@ import pandas as pd
 import pytest
 from secfsdstools.d_container.databagmodel import JoinedDataBag
 from secfsdstools.e_collector.zipcollecting import ZipCollector
-from secfsdstools.e_filter.joinedfiltering import AdshJoinedFilter
+from secfsdstools.e_filter.joinedfiltering import (
+    AdshJoinedFilter,
+    MainCoregJoinedFilter,
+    ReportPeriodJoinedFilter,
+    StmtJoinedFilter,
+    USDOnlyJoinedFilter,
+)
 from secfsdstools.f_standardize.bs_standardize import BalanceSheetStandardizer
 from secfsdstools.u_usecases.bulk_loading import default_postloadfilter
 
 CURRENT_DIR, _ = os.path.split(__file__)
 PATH_TO_PARQUET_2021_Q1 = f'{CURRENT_DIR}/../_testdata/parquet_new/quarter/2021q1.zip'
+PATH_TO_JOINED_2010_Q1 = f'{CURRENT_DIR}/../_testdata/joined/2010q1.zip'
 
 APPLE_10Q_2021Q1 = '0000320193-21-000010'
 
@@ -78,6 +85,35 @@ def test_options_standardizing(joined_bag):
     assert 'zipba' in result_df.columns.to_list()
 
 
+@pytest.fixture
+def joined_bag_2010q1() -> JoinedDataBag:
+    joined_bag = JoinedDataBag.load(PATH_TO_JOINED_2010_Q1)
+    # the main coreg is stored as None in this older file
+    joined_bag.pre_num_df['coreg'] = joined_bag.pre_num_df.coreg.fillna('')
+    return joined_bag.lazy()[StmtJoinedFilter(stmts=['BS'])][ReportPeriodJoinedFilter()][
+        MainCoregJoinedFilter()][USDOnlyJoinedFilter()].materialize()
+
+
+def test_sharded_standardizing(joined_bag_2010q1):
+    standardizer = BalanceSheetStandardizer()
+    standardizer.present(joined_bag_2010q1)
+    expected_bag = standardizer.get_standardize_bag()
+    assert len(expected_bag.result_df) > 400
+
+    sharded_standardizer = BalanceSheetStandardizer(shards=3)
+    sharded_standardizer.present(joined_bag_2010q1)
+    sharded_bag = sharded_standardizer.get_standardize_bag()
+
+    pd.testing.assert_frame_equal(expected_bag.result_df, sharded_bag.result_df)
+    pd.testing.assert_frame_equal(expected_bag.applied_rules_log_df,
+                                  sharded_bag.applied_rules_log_df)
+    pd.testing.assert_frame_equal(expected_bag.stats_df, sharded_bag.stats_df)
+    pd.testing.assert_series_equal(expected_bag.applied_rules_sum_s.sort_index(),
+                                   sharded_bag.applied_rules_sum_s.sort_index())
+    assert len(expected_bag.applied_prepivot_rules_log_df) == \
+           len(sharded_bag.applied_prepivot_rules_log_df)
+
+
 def test_real_values(joined_bag):
     standardizer = BalanceSheetStandardizer()
 
@@ -0,0 +1,57 @@
+import pandas as pd
+
+from secfsdstools.f_standardize.change_tracking import RuleChangeTracker, process_rules_tracked
+from secfsdstools.f_standardize.rule_compiler import CompiledRuleGroup
+
+from tests.f_standardize.test_rule_compiler import _create_data, _create_rule_group
+
+ITERATIONS = 4
+
+
+def _process_untracked() -> pd.DataFrame:
+    data_df = _create_data()
+    group = _create_rule_group(with_uncompiled_rule=False)
+    for _ in range(ITERATIONS):
+        group.process(data_df=data_df)
+    return data_df
+
+
+def test_process_rules_tracked():
+    expected_df = _process_untracked()
+
+    data_df = _create_data()
+    rules = _create_rule_group(with_uncompiled_rule=False).get_rules()
+    tracker = RuleChangeTracker(rules=rules, nr_of_rows=len(data_df))
+    for _ in range(ITERATIONS):
+        process_rules_tracked(rules=rules, data_df=data_df, tracker=tracker)
+
+    pd.testing.assert_frame_equal(expected_df, data_df, check_exact=True)
+    assert tracker.is_stable()
+    assert tracker.saved_rows > 0
+    assert tracker.evaluated_rows + tracker.saved_rows == ITERATIONS * len(rules) * len(data_df)
+
+
+def test_compiled_rule_group_tracked():
+    expected_df = _process_untracked()
+
+    data_df = _create_data()
+    group = _create_rule_group(with_uncompiled_rule=False)
+    compiled = CompiledRuleGroup(group)
+    tracker = RuleChangeTracker(rules=group.get_rules(), nr_of_rows=len(data_df))
+    for _ in range(ITERATIONS):
+        compiled.process(data_df=data_df, tracker=tracker)
+
+    pd.testing.assert_frame_equal(expected_df, data_df, check_exact=True)
+    assert tracker.is_stable()
+    assert tracker.saved_rows > 0
+
+
+def test_untracked_rule_is_always_evaluated():
+    data_df = _create_data()
+    rules = _create_rule_group(with_uncompiled_rule=True).get_rules()
+    tracker = RuleChangeTracker(rules=rules, nr_of_rows=len(data_df))
+    for _ in range(2):
+        process_rules_tracked(rules=rules, data_df=data_df, tracker=tracker)
+
+    assert tracker.get_rows_to_evaluate(4) is None
+    assert not tracker.is_stable()
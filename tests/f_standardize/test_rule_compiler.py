@@ -0,0 +1,153 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from secfsdstools.d_container.databagmodel import JoinedDataBag
+from secfsdstools.e_filter.joinedfiltering import (
+    MainCoregJoinedFilter,
+    ReportPeriodJoinedFilter,
+    StmtJoinedFilter,
+    USDOnlyJoinedFilter,
+)
+from secfsdstools.f_standardize.base_rule_framework import Rule, RuleGroup
+from secfsdstools.f_standardize.base_rules import (
+    CopyTagRule,
+    MissingSummandRule,
+    MissingSumRule,
+    PostCopyToFirstSummand,
+    PostFixSign,
+    PostSetToZero,
+    PreSumUpCorrection,
+    SetSumIfOnlyOneSummand,
+    SubtractFromRule,
+    SumUpRule,
+)
+from secfsdstools.f_standardize.bs_standardize import BalanceSheetStandardizer
+from secfsdstools.f_standardize.cf_standardize import CashFlowStandardizer
+from secfsdstools.f_standardize.is_standardize import IncomeStatementStandardizer
+from secfsdstools.f_standardize.rule_compiler import CompiledRuleGroup
+
+CURRENT_DIR, _ = os.path.split(__file__)
+PATH_TO_JOINED_2010_Q1 = f'{CURRENT_DIR}/../_testdata/joined/2010q1.zip'
+PATH_TO_JOINED_2010_Q2 = f'{CURRENT_DIR}/../_testdata/joined/2010q2.zip'
+
+
+class _DoubleRule(Rule):
+    """a rule without a compiled counterpart"""
+
+    def get_target_tags(self):
+        return ['A']
+
+    def get_input_tags(self):
+        return {'A'}
+
+    def mask(self, data_df: pd.DataFrame) -> pd.Series:
+        return data_df['A'].notna()
+
+    def apply(self, data_df: pd.DataFrame, mask: pd.Series):
+        data_df.loc[mask, 'A'] = data_df.loc[mask, 'A'] * 2
+        return data_df
+
+    def get_description(self) -> str:
+        return "double A"
+
+
+def _create_rule_group(with_uncompiled_rule: bool) -> RuleGroup:
+    rules = [
+        PreSumUpCorrection(sum_tag='A', mixed_up_summand='B', other_summand='C'),
+        CopyTagRule(original='X', target='A'),
+        MissingSumRule(sum_tag='A', summand_tags=['B', 'C']),
+        MissingSummandRule(sum_tag='A', missing_summand_tag='C', existing_summands_tags=['B']),
+        RuleGroup(prefix="SUB", rules=[
+            SumUpRule(sum_tag='D', potential_summands=['B', 'C'], optional_summands=['X']),
+            SubtractFromRule(target_tag='E', subtract_from_tag='A', potential_subtract_tags=['B', 'C']),
+        ]),
+        SetSumIfOnlyOneSummand(sum_tag='F', summand_set='B', summands_nan=['C', 'X']),
+        PostCopyToFirstSummand(sum_tag='A', first_summand='B', other_summands=['C']),
+        PostSetToZero(tags=['X']),
+        PostFixSign(start_tag='A', summand_tag='B', result_tag='E'),
+    ]
+    if with_uncompiled_rule:
+        rules.insert(4, _DoubleRule())
+
+    group = RuleGroup(prefix="TEST", rules=rules)
+    group.set_id("R")
+    return group
+
+
+def _create_data() -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    values = rng.integers(-5, 10, size=(200, 7)).astype(float)
+    values[rng.random(size=values.shape) < 0.4] = np.nan
+    data_df = pd.DataFrame(values, columns=['A', 'B', 'C', 'D', 'E', 'F', 'X'])
+    data_df['adsh'] = [f'adsh{i}' for i in range(len(data_df))]
+    return data_df
+
+
+def _assert_same(with_uncompiled_rule: bool):
+    expected_df = _create_data()
+    expected_group = _create_rule_group(with_uncompiled_rule)
+    expected_group.process(data_df=expected_df)
+
+    compiled_df = _create_data()
+    compiled_group = _create_rule_group(with_uncompiled_rule)
+    compiled = CompiledRuleGroup(compiled_group)
+    compiled.process(data_df=compiled_df)
+
+    assert compiled.is_fully_compiled() is not with_uncompiled_rule
+    pd.testing.assert_frame_equal(expected_df, compiled_df, check_exact=True)
+
+    expected_log = pd.DataFrame(expected_df['adsh'])
+    expected_group.append_log(expected_log)
+    compiled_log = pd.DataFrame(compiled_df['adsh'])
+    compiled_group.append_log(compiled_log)
+    pd.testing.assert_frame_equal(expected_log, compiled_log)
+
+
+def test_compiled_rule_group():
+    _assert_same(with_uncompiled_rule=False)
+
+
+def test_compiled_rule_group_with_uncompiled_rule():
+    _assert_same(with_uncompiled_rule=True)
+
+
+def _load_joined_bag(path: str, stmt: str) -> JoinedDataBag:
+    joined_bag = JoinedDataBag.load(path)
+    # the main coreg is stored as None in these older files
+    joined_bag.pre_num_df['coreg'] = joined_bag.pre_num_df.coreg.fillna('')
+    return joined_bag.lazy()[StmtJoinedFilter(stmts=[stmt])][ReportPeriodJoinedFilter()][
+        MainCoregJoinedFilter()][USDOnlyJoinedFilter()].materialize()
+
+
+@pytest.mark.parametrize("path", [PATH_TO_JOINED_2010_Q1, PATH_TO_JOINED_2010_Q2])
+@pytest.mark.parametrize("track_changes", [False, True])
+@pytest.mark.parametrize("standardizer_class, stmt", [(BalanceSheetStandardizer, 'BS'),
+                                                      (IncomeStatementStandardizer, 'IS'),
+                                                      (CashFlowStandardizer, 'CF')])
+def test_compiled_standardizing(standardizer_class, stmt, track_changes, path):
+    joined_bag = _load_joined_bag(path, stmt)
+
+    standardizer = standardizer_class(track_changes=track_changes)
+    standardizer.present(joined_bag)
+    expected_bag = standardizer.get_standardize_bag()
+    assert len(expected_bag.result_df) > 0
+
+    compiled_standardizer = standardizer_class(track_changes=track_changes, use_compiled_rules=True)
+    compiled_standardizer.present(joined_bag)
+    compiled_bag = compiled_standardizer.get_standardize_bag()
+
+    pd.testing.assert_frame_equal(expected_bag.result_df, compiled_bag.result_df, check_exact=True)
+    pd.testing.assert_frame_equal(expected_bag.applied_rules_log_df,
+                                  compiled_bag.applied_rules_log_df)
+    pd.testing.assert_frame_equal(expected_bag.applied_prepivot_rules_log_df,
+                                  compiled_bag.applied_prepivot_rules_log_df)
+    pd.testing.assert_frame_equal(expected_bag.stats_df, compiled_bag.stats_df)
+    pd.testing.assert_series_equal(expected_bag.applied_rules_sum_s, compiled_bag.applied_rules_sum_s)
+    pd.testing.assert_frame_equal(expected_bag.validation_overview_df,
+                                  compiled_bag.validation_overview_df)
+    if track_changes:
+        pd.testing.assert_frame_equal(expected_bag.rule_evaluations_df,
+                                      compiled_bag.rule_evaluations_df)
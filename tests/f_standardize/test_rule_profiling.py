@@ -0,0 +1,52 @@
+import pandas as pd
+
+from secfsdstools.f_standardize.rule_compiler import CompiledRuleGroup
+from secfsdstools.f_standardize.rule_profiling import PROFILE_COLS, RuleProfiler
+
+from tests.f_standardize.test_rule_compiler import _create_data, _create_rule_group
+
+
+def _profile(compiled: bool) -> pd.DataFrame:
+    data_df = _create_data()
+    group = _create_rule_group(with_uncompiled_rule=True)
+    profiler = RuleProfiler()
+    profiler.phase = "MAIN_1"
+    if compiled:
+        CompiledRuleGroup(group).process(data_df=data_df, profiler=profiler)
+    else:
+        group.process(data_df=data_df, profiler=profiler)
+    return profiler.to_df()
+
+
+def test_profile():
+    profile_df = _profile(compiled=False)
+    rules = _create_rule_group(with_uncompiled_rule=True).get_rules()
+
+    assert profile_df.columns.tolist() == PROFILE_COLS
+    assert len(profile_df) == len(rules)
+    assert (profile_df.phase == "MAIN_1").all()
+    assert profile_df.identifier.tolist() == [rule.identifier for rule in rules]
+    assert (profile_df.changed <= profile_df.masked).all()
+    assert (profile_df.duration >= 0).all()
+
+    # the uncompiled rule doubles all set values of A, which changes all values except 0
+    double_entry = profile_df[profile_df.ruleclass == '_DoubleRule'].iloc[0]
+    assert 0 < double_entry.changed < double_entry.masked
+
+
+def test_profile_compiled_same_as_pandas():
+    profile_df = _profile(compiled=False)
+    compiled_profile_df = _profile(compiled=True)
+
+    cols = ['phase', 'identifier', 'ruleclass', 'masked', 'changed']
+    pd.testing.assert_frame_equal(profile_df[cols], compiled_profile_df[cols])
+
+
+def test_concat():
+    profile_df = _profile(compiled=False)
+
+    result_df = RuleProfiler.concat([profile_df, profile_df])
+
+    assert result_df.identifier.tolist() == profile_df.identifier.tolist()
+    assert result_df.masked.tolist() == (2 * profile_df.masked).tolist()
+    assert RuleProfiler.concat([profile_df, None]) is None
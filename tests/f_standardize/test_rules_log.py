@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from secfsdstools.f_standardize.rules_log import AppliedRulesLog
+
+INDEX_COLS = ['adsh', 'qtrs']
+
+
+def _create_log_df(adshs) -> pd.DataFrame:
+    log_df = pd.DataFrame({'adsh': adshs, 'qtrs': [4] * len(adshs)})
+    log_df['R1'] = [i % 2 == 0 for i in range(len(adshs))]
+    log_df['R2'] = False
+    log_df['R3'] = [i == 1 for i in range(len(adshs))]
+    return log_df
+
+
+def test_from_df_to_df():
+    log_df = _create_log_df(['a', 'b', 'c'])
+
+    log = AppliedRulesLog.from_df(log_df, index_cols=INDEX_COLS)
+
+    assert len(log) == 3
+    assert log.rule_ids == ['R1', 'R2', 'R3']
+    pd.testing.assert_frame_equal(log.to_df(), log_df)
+    assert log.sum().to_dict() == {'R1': 2, 'R2': 0, 'R3': 1}
+
+
+def test_append():
+    log = AppliedRulesLog(index_df=pd.DataFrame({'adsh': ['a', 'b', 'c'], 'qtrs': [4, 4, 4]}))
+
+    log.append(['R1'], [pd.Series([True, False, True])])
+
+    assert log.rule_ids == ['R1']
+    assert log.rule_rows[0].tolist() == [0, 2]
+
+
+def test_concat():
+    log1 = AppliedRulesLog.from_df(_create_log_df(['a', 'b', 'c']), index_cols=INDEX_COLS)
+    log2_df = _create_log_df(['d', 'e']).drop(columns=['R2'])
+    log2_df['R4'] = True
+    log2 = AppliedRulesLog.from_df(log2_df, index_cols=INDEX_COLS)
+
+    result = AppliedRulesLog.concat([log1, log2])
+
+    assert len(result) == 5
+    assert result.rule_ids == ['R1', 'R2', 'R3', 'R4']
+    result_df = result.to_df()
+    assert result_df.adsh.tolist() == ['a', 'b', 'c', 'd', 'e']
+    assert result_df.R1.tolist() == [True, False, True, True, False]
+    assert result_df.R2.tolist() == [False] * 5
+    assert result_df.R3.tolist() == [False, True, False, False, True]
+    assert result_df.R4.tolist() == [False, False, False, True, True]
+
+
+def test_save_load(tmp_path):
+    log = AppliedRulesLog.from_df(_create_log_df(['a', 'b', 'c', 'd']), index_cols=INDEX_COLS)
+
+    assert not AppliedRulesLog.is_saved_in(str(tmp_path))
+    log.save(str(tmp_path))
+    assert AppliedRulesLog.is_saved_in(str(tmp_path))
+
+    loaded = AppliedRulesLog.load(str(tmp_path))
+    assert loaded.rule_ids == log.rule_ids
+    assert all(np.array_equal(x, y) for x, y in zip(loaded.rule_rows, log.rule_rows))
+    pd.testing.assert_frame_equal(loaded.to_df(), log.to_df())
+
+
+def test_save_load_empty(tmp_path):
+    log = AppliedRulesLog(index_df=pd.DataFrame({'adsh': ['a'], 'qtrs': [4]}))
+
+    log.save(str(tmp_path))
+    loaded = AppliedRulesLog.load(str(tmp_path))
+
+    assert loaded.rule_ids == []
+    assert loaded.to_df().columns.tolist() == INDEX_COLS
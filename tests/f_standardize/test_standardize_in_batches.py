@@ -0,0 +1,105 @@
+import os
+
+import pandas as pd
+import pytest
+from secfsdstools.d_container.databagmodel import JoinedDataBag
+from secfsdstools.e_filter.joinedfiltering import (
+    MainCoregJoinedFilter,
+    ReportPeriodJoinedFilter,
+    StmtJoinedFilter,
+    USDOnlyJoinedFilter,
+)
+from secfsdstools.f_standardize.bs_standardize import BalanceSheetStandardizer
+from secfsdstools.f_standardize.standardizing import StandardizedBag, get_adsh_batches
+
+CURRENT_DIR, _ = os.path.split(__file__)
+PATH_TO_JOINED_2010_Q1 = f'{CURRENT_DIR}/../_testdata/joined/2010q1.zip'
+
+SORT_COLS = ['adsh', 'coreg', 'report', 'ddate', 'qtrs']
+
+
+@pytest.fixture
+def joined_bag_2010q1() -> JoinedDataBag:
+    joined_bag = JoinedDataBag.load(PATH_TO_JOINED_2010_Q1)
+    # the main coreg is stored as None in this older file
+    joined_bag.pre_num_df['coreg'] = joined_bag.pre_num_df.coreg.fillna('')
+    return joined_bag.lazy()[StmtJoinedFilter(stmts=['BS'])][ReportPeriodJoinedFilter()][
+        MainCoregJoinedFilter()][USDOnlyJoinedFilter()].materialize()
+
+
+def _sorted(result_df: pd.DataFrame) -> pd.DataFrame:
+    return result_df.sort_values(SORT_COLS).reset_index(drop=True)
+
+
+def test_get_adsh_batches(tmp_path):
+    file = str(tmp_path / 'pre_num.txt.parquet')
+    pd.DataFrame({'adsh': ['b'] * 2 + ['a'] * 5 + ['d'] * 3 + ['c']}).to_parquet(file)
+
+    # report 'a' has more rows than the budget and gets a batch on its own
+    assert get_adsh_batches(file, max_rows_per_batch=4) == [['a'], ['b', 'c'], ['d']]
+    assert get_adsh_batches(file, max_rows_per_batch=100) == [['a', 'b', 'c', 'd']]
+
+
+def test_get_adsh_batches_empty_file(tmp_path):
+    file = str(tmp_path / 'pre_num.txt.parquet')
+    pd.DataFrame({'adsh': pd.Series([], dtype=object)}).to_parquet(file)
+
+    assert get_adsh_batches(file, max_rows_per_batch=4) == []
+
+
+def test_standardize_in_batches(joined_bag_2010q1, tmp_path):
+    standardizer = BalanceSheetStandardizer()
+    standardizer.present(joined_bag_2010q1)
+    expected_bag = standardizer.get_standardize_bag()
+
+    joined_bag_2010q1.save(str(tmp_path / 'joined'))
+    os.makedirs(tmp_path / 'standardized')
+    BalanceSheetStandardizer().standardize_in_batches(str(tmp_path / 'joined'), str(tmp_path / 'standardized'),
+                                                      max_rows_per_batch=3000)
+    batch_bag = StandardizedBag.load(str(tmp_path / 'standardized'))
+
+    pd.testing.assert_frame_equal(_sorted(expected_bag.result_df), _sorted(batch_bag.result_df))
+    pd.testing.assert_frame_equal(expected_bag.stats_df, batch_bag.stats_df)
+    assert expected_bag.applied_rules_log_df.sum().equals(batch_bag.applied_rules_log_df.sum())
+
+
+def test_standardize_in_batches_skips_batches_without_rows(joined_bag_2010q1, tmp_path):
+    # the first report only has rows with segments, so its batch has no rows left
+    pre_num_df = joined_bag_2010q1.pre_num_df
+    first_adsh = pre_num_df.adsh.min()
+    pre_num_df.loc[pre_num_df.adsh == first_adsh, 'segments'] = 'Segment=1;'
+
+    standardizer = BalanceSheetStandardizer()
+    standardizer.present(joined_bag_2010q1)
+    expected_df = standardizer.result
+
+    joined_bag_2010q1.save(str(tmp_path / 'joined'))
+    os.makedirs(tmp_path / 'standardized')
+    BalanceSheetStandardizer().standardize_in_batches(str(tmp_path / 'joined'), str(tmp_path / 'standardized'),
+                                                      max_rows_per_batch=1)
+    batch_bag = StandardizedBag.load(str(tmp_path / 'standardized'))
+
+    assert first_adsh not in batch_bag.result_df.adsh.values
+    pd.testing.assert_frame_equal(_sorted(expected_df), _sorted(batch_bag.result_df))
+
+
+@pytest.mark.parametrize("only_segments", [False, True])
+def test_standardize_in_batches_empty_bag(joined_bag_2010q1, tmp_path, only_segments: bool):
+    if only_segments:
+        # there are reports, but no rows are left after the segments are removed
+        joined_bag_2010q1.pre_num_df['segments'] = 'Segment=1;'
+        empty_bag = joined_bag_2010q1
+    else:
+        empty_bag = JoinedDataBag.create(sub_df=joined_bag_2010q1.sub_df.iloc[0:0],
+                                         pre_num_df=joined_bag_2010q1.pre_num_df.iloc[0:0])
+
+    empty_bag.save(str(tmp_path / 'joined'))
+    os.makedirs(tmp_path / 'standardized')
+    standardizer = BalanceSheetStandardizer()
+    standardizer.standardize_in_batches(str(tmp_path / 'joined'), str(tmp_path / 'standardized'),
+                                        max_rows_per_batch=3000)
+
+    batch_bag = StandardizedBag.load(str(tmp_path / 'standardized'))
+    assert len(batch_bag.result_df) == 0
+    assert set(standardizer.final_tags).issubset(batch_bag.result_df.columns)
+    assert len(batch_bag.applied_rules_log_df) == 0
@@ -1,8 +1,11 @@
 import os
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+import pyarrow as pa
 import pytest
-from secfsdstools.f_standardize.standardizing import StandardizedBag
+from secfsdstools.f_standardize.standardizing import StandardizedBag, StandardizedBagWriter, _ParquetAppender
 
 CURRENT_DIR, _ = os.path.split(__file__)
 
@@ -36,3 +39,104 @@ def test_is_standardizedbag():
 
     assert not StandardizedBag.is_standardizebag_path(
         Path(CURRENT_DIR) / ".." / "_testdata" / "joined" / "2010q1.zip")
+
+
+def test_applied_rules_log_df(sample_bag1, tmp_path):
+    log_df = sample_bag1.applied_rules_log_df
+    assert sample_bag1.applied_rules_log_df is log_df
+
+    # changes on the wide dataframe are kept ..
+    sample_bag1.applied_rules_log_df['RULE1'] = True
+    assert sample_bag1.applied_rules_log.sum().loc['RULE1'] == len(log_df)
+
+    # .. and the bag can still be created from a wide dataframe
+    bag = StandardizedBag(result_df=sample_bag1.result_df,
+                          applied_prepivot_rules_log_df=sample_bag1.applied_prepivot_rules_log_df,
+                          applied_rules_log_df=log_df,
+                          stats_df=sample_bag1.stats_df,
+                          applied_rules_sum_s=sample_bag1.applied_rules_sum_s,
+                          validation_overview_df=sample_bag1.validation_overview_df,
+                          process_description_df=sample_bag1.process_description_df)
+    bag.save(str(tmp_path))
+    pd.testing.assert_frame_equal(StandardizedBag.load(str(tmp_path)).applied_rules_log_df, log_df)
+
+
+def test_save_load_rule_evaluations(sample_bag1, sample_bag2, tmp_path):
+    rule_evaluations_df = pd.DataFrame({'evaluated': [10, 4], 'saved': [0, 6]},
+                                       index=['MAIN_1', 'MAIN_2'])
+    sample_bag1.rule_evaluations_df = rule_evaluations_df
+    sample_bag2.rule_evaluations_df = rule_evaluations_df
+
+    concat_bag = StandardizedBag.concat([sample_bag1, sample_bag2])
+    concat_bag.save(str(tmp_path))
+
+    loaded = StandardizedBag.load(str(tmp_path))
+    pd.testing.assert_frame_equal(loaded.rule_evaluations_df, rule_evaluations_df * 2)
+
+
+def test_parquet_appender_nullability_differs(tmp_path):
+    file = str(tmp_path / "appended.parquet")
+    appender = _ParquetAppender(file, float_columns=['value'])
+    # no NaN and no coreg in the first part, so value is int64 and coreg only contains None
+    appender.append(pd.DataFrame({'adsh': ['a'], 'coreg': [None], 'qtrs': np.array([0], dtype=np.int32),
+                                  'value': [1]}))
+    appender.append(pd.DataFrame({'adsh': ['b', 'c'], 'coreg': ['X', None],
+                                  'qtrs': np.array([4, 4], dtype=np.int64), 'value': [np.nan, 2.5]}))
+    appender.close()
+
+    result_df = pd.read_parquet(file)
+    assert result_df.coreg.tolist() == [None, 'X', None]
+    assert result_df.qtrs.dtype == np.int32
+    assert result_df.value.dtype == np.float64
+    assert result_df.value.fillna(-1).tolist() == [1.0, -1.0, 2.5]
+
+    # without the float declaration, NaN is written as null, but a fraction cannot be written
+    # into the int column of the first part
+    file = str(tmp_path / "undeclared.parquet")
+    appender = _ParquetAppender(file)
+    appender.append(pd.DataFrame({'value': [1]}))
+    appender.append(pd.DataFrame({'value': [np.nan]}))
+    with pytest.raises(pa.ArrowInvalid):
+        appender.append(pd.DataFrame({'value': [2.5]}))
+    appender.close()
+    assert pd.read_parquet(file).value.fillna(-1).tolist() == [1.0, -1.0]
+
+
+def test_standardized_bag_writer(sample_bag1, sample_bag2, tmp_path):
+    writer = StandardizedBagWriter(str(tmp_path), float_columns=['Revenues'])
+    writer.append(sample_bag2)
+    writer.append(sample_bag1)
+    writer.close()
+
+    expected = StandardizedBag.concat([sample_bag2, sample_bag1])
+    written = StandardizedBag.load(str(tmp_path))
+    pd.testing.assert_frame_equal(written.result_df, expected.result_df)
+    pd.testing.assert_frame_equal(written.applied_rules_log_df, expected.applied_rules_log_df)
+
+
+def test_standardized_bag_writer_append_saved(sample_bag1, sample_bag2, tmp_path):
+    saved_path = tmp_path / 'saved'
+    target_path = tmp_path / 'target'
+    os.makedirs(saved_path)
+    os.makedirs(target_path)
+    sample_bag2.save(str(saved_path))
+
+    writer = StandardizedBagWriter(str(target_path), float_columns=['Revenues'])
+    writer.append_saved(str(saved_path))
+    writer.append(sample_bag1)
+    writer.close()
+
+    expected = StandardizedBag.concat([sample_bag2, sample_bag1])
+    written = StandardizedBag.load(str(target_path))
+    pd.testing.assert_frame_equal(written.result_df, expected.result_df)
+    pd.testing.assert_frame_equal(written.applied_rules_log_df, expected.applied_rules_log_df)
+    pd.testing.assert_frame_equal(written.stats_df, expected.stats_df)
+    pd.testing.assert_series_equal(written.applied_rules_sum_s, expected.applied_rules_sum_s,
+                                   check_dtype=False, check_names=False)
+
+
+def test_save_load_applied_rules_sum(sample_bag1, tmp_path):
+    sample_bag1.save(str(tmp_path))
+
+    pd.testing.assert_series_equal(StandardizedBag.load(str(tmp_path)).applied_rules_sum_s,
+                                   sample_bag1.applied_rules_sum_s)
@@ -84,6 +84,26 @@ def test_preprocess_pivot(empty_instance, sample_dataframe_pivot):
                 assert np.isnan(value)
 
 
+def test_preprocess_pivot_same_as_pandas_pivot(empty_instance):
+    data_df = pd.DataFrame({
+        'adsh': ['A2', 'A1', 'A1', 'A2', 'A1', 'A3'],
+        'coreg': ['', '', 'C1', '', '', ''],
+        'report': [2, 1, 1, 2, 3, 1],
+        'ddate': [20201231, 20201231, 20201231, 20191231, 20201231, 20201231],
+        'qtrs': [0, 0, 0, 0, 4, 0],
+        'tag': ['T2', 'T1', 'T1', 'T2', 'T3', 'T1'],
+        'value': [1.0, 2.0, 3.0, 4.0, np.nan, 6.0],
+    })
+
+    for expected_tags in [{'T1', 'T2', 'T3'}, {'T1', 'T2', 'T3', 'T4', 'T5'}]:
+        pd.testing.assert_frame_equal(
+            empty_instance._preprocess_pivot(data_df, expected_tags),
+            empty_instance._preprocess_pivot_with_pandas(data_df, expected_tags))
+
+    with pytest.raises(ValueError):
+        empty_instance._preprocess_pivot(pd.concat([data_df, data_df.iloc[:1]]), {'T1'})
+
+
 @pytest.fixture
 def sample_dataframe_filter():
     # Create a sample DataFrame for testing
@@ -74,3 +74,20 @@ def test_finalize_stats(stats_instance, sample_dataframe):
     # Test values in 'gain' columns
     assert stats_instance.stats['iteration_1_gain'].tolist() == [0.25, 0.25, 0.25, 0.0, 0.0, 0.0, 0.0,
                                                                  0.0]
+
+
+def test_concat_rule_evaluations():
+    stats1 = Stats([])
+    stats1.add_rule_evaluations_entry(evaluated=10, saved=0, process_step_name='MAIN_1')
+    stats1.add_rule_evaluations_entry(evaluated=4, saved=6, process_step_name='MAIN_2')
+    stats2 = Stats([])
+    stats2.add_rule_evaluations_entry(evaluated=20, saved=0, process_step_name='MAIN_1')
+    stats2.add_rule_evaluations_entry(evaluated=0, saved=20, process_step_name='MAIN_2')
+
+    result = Stats.concat_rule_evaluations([stats1.rule_evaluations, stats2.rule_evaluations])
+
+    assert result.index.tolist() == ['MAIN_1', 'MAIN_2']
+    assert result.evaluated.tolist() == [30, 4]
+    assert result.saved.tolist() == [0, 26]
+
+    assert Stats.concat_rule_evaluations([stats1.rule_evaluations, None]) is None
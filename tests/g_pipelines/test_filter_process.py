@@ -2,7 +2,8 @@ import os
 from pathlib import Path
 from unittest.mock import patch
 
-from secfsdstools.c_index.indexdataaccess import ParquetDBIndexingAccessor
+from secfsdstools.c_automation.task_framework import TaskResultState
+from secfsdstools.c_index.indexdataaccess import IndexFileProcessingState, ParquetDBIndexingAccessor
 from secfsdstools.d_container.databagmodel import JoinedDataBag, RawDataBag
 from secfsdstools.e_collector.zipcollecting import ZipCollector
 from secfsdstools.g_pipelines.filter_process import ByStmtFilterTask, FilterProcess, FilterTask, postloadfilter
@@ -177,3 +178,34 @@ def test_filterprocess(tmp_path):
                       return_value=["2010q1.zip", "2010q2.zip"]):
         tasks = process.calculate_tasks()
         assert len(tasks) == 1
+
+
+def test_filterprocess_read_ahead(tmp_path):
+    target_path: Path = tmp_path / "target"
+    process = FilterProcess(
+        bag_type="raw",
+        db_dir=".",
+        target_dir=str(target_path),
+        stmts=["BS", "IS"],
+        execute_serial=True,
+        read_ahead=1
+    )
+
+    zip_names = ["2010q2.zip", "2010q1.zip"]
+    index_files = [IndexFileProcessingState(fileName=name, status="", entries=0, processTime="",
+                                            fullPath=str(TESTDATA_PATH / "parquet_new" / "quarter" / name))
+                   for name in zip_names]
+
+    with patch.object(ParquetDBIndexingAccessor, "read_filenames_by_type", return_value=zip_names), \
+            patch.object(ParquetDBIndexingAccessor, "read_index_files_for_filenames", return_value=index_files), \
+            patch.object(ZipCollector, "get_zip_by_name", side_effect=AssertionError("no direct load expected")):
+        tasks = process.calculate_tasks()
+
+        # the tasks are sorted in the order in which the data is read
+        assert [task.zip_file_name for task in tasks] == ["2010q1.zip", "2010q2.zip"]
+        for task in tasks:
+            assert FilterProcess.process_task(task).state == TaskResultState.SUCCESS
+
+    fitlered_bag: RawDataBag = RawDataBag.load(str(target_path / "quarter" / "2010q1.zip"))
+    assert len(fitlered_bag.num_df) == 57_433
+    assert len(fitlered_bag.pre_df) == 28_404
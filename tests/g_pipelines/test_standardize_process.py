@@ -1,7 +1,12 @@
 import os
+import shutil
 from pathlib import Path
+from typing import List
+
+import pandas as pd
 
 from secfsdstools.c_automation.task_framework import TaskResultState
+from secfsdstools.d_container.databagmodel import JoinedDataBag
 from secfsdstools.e_collector.zipcollecting import ZipCollector
 from secfsdstools.e_filter.joinedfiltering import StmtJoinedFilter
 from secfsdstools.f_standardize.standardizing import StandardizedBag
@@ -88,3 +93,114 @@ def test_standardizer_process_subfolders(tmp_path):
     assert len(std_bs_bag_q2.result_df) == 457
     assert len(std_is_bag_q2.result_df) == 516
     assert len(std_cf_bag_q2.result_df) == 464
+
+
+def _create_concatenated_subfolders(data_paths: List[Path], root_path: Path):
+    joined_input_bag = JoinedDataBag.concat([
+        ZipCollector(
+            datapaths=[str(data_path)],
+            forms_filter=["10-K", "10-Q"],
+            stmt_filter=["BS", "IS", "CF"],
+            tag_filter=None,
+            post_load_filter=postloadfilter).collect().join()
+        for data_path in data_paths])
+
+    shutil.rmtree(root_path, ignore_errors=True)
+    for stmt in ["BS", "IS", "CF"]:
+        (root_path / stmt).mkdir(parents=True)
+        joined_input_bag[StmtJoinedFilter(stmts=[stmt])].save(target_path=str(root_path / stmt))
+
+
+def test_standardizer_process_incremental(tmp_path):
+    root_path = tmp_path / "root"
+    target_path = tmp_path / "target"
+    full_target_path = tmp_path / "full_target"
+    quarter_path = TESTDATA_PATH / "parquet_new" / "quarter"
+
+    _create_concatenated_subfolders([quarter_path / "2010q1.zip"], root_path)
+    StandardizeProcess(root_dir=str(root_path), target_dir=str(target_path),
+                       incremental=True).process()
+    assert len(StandardizedBag.load(str(target_path / "BS")).result_df) == 458
+
+    # add the second quarter, only the new reports are standardized and appended
+    _create_concatenated_subfolders([quarter_path / "2010q1.zip", quarter_path / "2010q2.zip"],
+                                    root_path)
+    process = StandardizeProcess(root_dir=str(root_path), target_dir=str(target_path),
+                                 incremental=True)
+    process.process()
+    assert len(process.results[TaskResultState.SUCCESS]) == 1
+
+    StandardizeProcess(root_dir=str(root_path), target_dir=str(full_target_path)).process()
+
+    for stmt in ["BS", "IS", "CF"]:
+        incremental_bag = StandardizedBag.load(str(target_path / stmt))
+        full_bag = StandardizedBag.load(str(full_target_path / stmt))
+
+        sort_cols = ['adsh', 'coreg', 'report', 'ddate', 'qtrs']
+        pd.testing.assert_frame_equal(
+            incremental_bag.result_df.sort_values(sort_cols).reset_index(drop=True),
+            full_bag.result_df.sort_values(sort_cols).reset_index(drop=True))
+        pd.testing.assert_frame_equal(incremental_bag.stats_df, full_bag.stats_df)
+        pd.testing.assert_series_equal(incremental_bag.applied_rules_sum_s.sort_index(),
+                                       full_bag.applied_rules_sum_s.sort_index(),
+                                       check_dtype=False)
+        assert len(incremental_bag.applied_rules_log_df) == len(full_bag.applied_rules_log_df)
+
+
+def test_standardizer_process_incremental_without_new_rows(tmp_path):
+    root_path = tmp_path / "root"
+    target_path = tmp_path / "target"
+    quarter_path = TESTDATA_PATH / "parquet_new" / "quarter"
+
+    _create_concatenated_subfolders([quarter_path / "2010q1.zip"], root_path)
+    StandardizeProcess(root_dir=str(root_path), target_dir=str(target_path),
+                       incremental=True).process()
+    expected_bag = StandardizedBag.load(str(target_path / "BS"))
+    q1_adshs = JoinedDataBag.load(str(root_path / "BS")).sub_df.adsh
+
+    # the new BS reports of the second quarter only have rows with segments,
+    # so no rows are left to standardize
+    _create_concatenated_subfolders([quarter_path / "2010q1.zip", quarter_path / "2010q2.zip"],
+                                    root_path)
+    bs_bag = JoinedDataBag.load(str(root_path / "BS"))
+    bs_bag.pre_num_df.loc[~bs_bag.pre_num_df.adsh.isin(q1_adshs), 'segments'] = 'Segment=1;'
+    shutil.rmtree(root_path / "BS")
+    (root_path / "BS").mkdir()
+    bs_bag.save(str(root_path / "BS"))
+
+    process = StandardizeProcess(root_dir=str(root_path), target_dir=str(target_path),
+                                 incremental=True)
+    process.process()
+    assert len(process.results[TaskResultState.SUCCESS]) == 1
+
+    incremental_bag = StandardizedBag.load(str(target_path / "BS"))
+    pd.testing.assert_frame_equal(incremental_bag.result_df, expected_bag.result_df)
+    pd.testing.assert_frame_equal(incremental_bag.stats_df, expected_bag.stats_df)
+    assert len(StandardizedBag.load(str(target_path / "IS")).result_df) > 506
+
+
+def test_standardizer_process_in_batches(tmp_path):
+    root_path = tmp_path / "root"
+    target_path = tmp_path / "target"
+    full_target_path = tmp_path / "full_target"
+    quarter_path = TESTDATA_PATH / "parquet_new" / "quarter"
+
+    _create_concatenated_subfolders([quarter_path / "2010q1.zip", quarter_path / "2010q2.zip"],
+                                    root_path)
+    StandardizeProcess(root_dir=str(root_path), target_dir=str(target_path),
+                       max_rows_per_batch=5_000).process()
+    StandardizeProcess(root_dir=str(root_path), target_dir=str(full_target_path)).process()
+
+    for stmt in ["BS", "IS", "CF"]:
+        batch_bag = StandardizedBag.load(str(target_path / stmt))
+        full_bag = StandardizedBag.load(str(full_target_path / stmt))
+
+        # the batches are sorted ranges of adshs, so the order of the rows is the same
+        pd.testing.assert_frame_equal(batch_bag.result_df,
+                                      full_bag.result_df.reset_index(drop=True))
+        pd.testing.assert_frame_equal(batch_bag.applied_rules_log_df,
+                                      full_bag.applied_rules_log_df)
+        pd.testing.assert_frame_equal(batch_bag.stats_df, full_bag.stats_df)
+        pd.testing.assert_series_equal(batch_bag.applied_rules_sum_s.sort_index(),
+                                       full_bag.applied_rules_sum_s.sort_index(),
+                                       check_dtype=False)